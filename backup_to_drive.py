@@ -1,21 +1,21 @@
 # intranet_international/backup_to_drive.py
 
 import os
-import zipfile
-from datetime import datetime
+import sys
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
 
+from core.backup import GoogleDriveTarget, LocalDirectoryTarget, run_incremental_backup
+
 # --- CONFIGURATION DU SCRIPT ---
 # Le dossier Google Drive dans lequel les sauvegardes seront stockées.
 # Si ce dossier n'existe pas, il sera créé lors du premier lancement.
 DRIVE_FOLDER_NAME = "Intranet_International_Backups"
 
-# Fichiers et dossiers à inclure dans l'archive
-FILES_TO_BACKUP = [
-    'db.sqlite3',
-    'media',
-]
+# Base SQLite et dossier media à sauvegarder (racine du projet)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_FILE = os.path.join(BASE_DIR, 'db.sqlite3')
+MEDIA_DIR = os.path.join(BASE_DIR, 'media')
 
 def authenticate_drive():
     """Authentification PyDrive (utilise settings.yaml et génère token.json)"""
@@ -64,53 +64,29 @@ def find_or_create_folder(drive, folder_name):
         print(f"Dossier créé : '{folder_name}' ({folder['id']})")
         return folder['id']
 
-def run_backup():
-    # 1. Préparation du nom et de l'archive
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    archive_name = f"intranet_backup_{timestamp}.zip"
-
-    print(f"Création de l'archive locale : {archive_name}...")
+def run_backup(local_dir=None):
+    """
+    Sauvegarde incrémentale : instantané SQLite compressé + blocs media dédupliqués.
+    Seuls les fichiers nouveaux ou modifiés depuis le dernier manifeste sont envoyés.
+    Si `local_dir` est fourni, la sauvegarde est écrite dans ce dossier au lieu de Drive.
+    """
     try:
-        with zipfile.ZipFile(archive_name, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            # Ajout des fichiers/dossiers configurés
-            for path in FILES_TO_BACKUP:
-                if os.path.isdir(path):
-                    # Ajout récursif du dossier media/
-                    for root, _, files in os.walk(path):
-                        for file in files:
-                            file_path = os.path.join(root, file)
-                            # archive le chemin relatif pour la structure du zip
-                            zipf.write(file_path, os.path.relpath(file_path))
-                elif os.path.exists(path):
-                    # Ajout du fichier db.sqlite3
-                    zipf.write(path)
-                else:
-                    print(f"Attention : Chemin non trouvé : {path}")
-        print("Archive locale créée avec succès.")
-
-        # 2. Authentification et upload
-        drive = authenticate_drive()
-        drive_folder_id = find_or_create_folder(drive, DRIVE_FOLDER_NAME)
-
-        print(f"Téléversement de {archive_name} vers Google Drive...")
-        
-        # Création et téléversement du fichier
-        file_drive = drive.CreateFile({
-            'title': archive_name,
-            'parents': [{'id': drive_folder_id}]
-        })
-        file_drive.SetContentFile(archive_name)
-        file_drive.Upload()
-        print("Téléversement terminé avec succès !")
+        if local_dir:
+            target = LocalDirectoryTarget(local_dir)
+            print(f"Cible locale : {target.root}")
+        else:
+            # 1. Authentification et dossier Drive
+            drive = authenticate_drive()
+            drive_folder_id = find_or_create_folder(drive, DRIVE_FOLDER_NAME)
+            target = GoogleDriveTarget(drive, drive_folder_id)
+
+        # 2. Envoi direct vers la cible (aucune archive intermédiaire sur disque)
+        return run_incremental_backup(target, DATABASE_FILE, MEDIA_DIR)
 
     except Exception as e:
         print(f"ERREUR LORS DE LA SAUVEGARDE : {e}")
-
-    finally:
-        # 3. Nettoyage
-        if os.path.exists(archive_name):
-            os.remove(archive_name)
-            print(f"Nettoyage : Archive locale '{archive_name}' supprimée.")
+        # Propagée : la tâche planifiée est historisée en échec
+        raise
 
 if __name__ == "__main__":
     # Change le répertoire de travail pour s'assurer que db.sqlite3 et media/ sont trouvés
@@ -120,4 +96,5 @@ if __name__ == "__main__":
     # si le script est dans un sous-dossier, sinon on reste là.
     # Puisque le projet est à la racine de intranet_international, on reste là.
     
-    run_backup()
\ No newline at end of file
+    # Usage : python backup_to_drive.py [dossier_local]
+    run_backup(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
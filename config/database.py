@@ -0,0 +1,110 @@
+# config/database.py
+
+"""
+Gestion des connexions à la base, lue depuis l'environnement (settings.py).
+
+- Connexions persistantes (CONN_MAX_AGE) avec vérification avant réutilisation
+  (CONN_HEALTH_CHECKS) : une connexion coupée par le serveur est rouverte au
+  lieu de faire échouer la requête.
+- PostgreSQL, DB_POOL=True : pool de connexions psycopg (Django 5.1+,
+  psycopg[pool] requis) borné par processus ; remplace les connexions
+  persistantes, que Django refuse avec un pool.
+- Dimensionnement distinct pour les processus web et les workers
+  (planificateur, lots PDF, paie) : préfixe DB_ pour le web, DB_WORKER_
+  pour les workers (par processus : un lot PDF parallèle ouvre une
+  connexion ou un pool par processus enfant).
+- Réplique en lecture seule (replica_database) et bases par groupe de pays
+  (partition_databases), configurées de la même façon.
+"""
+
+import sys
+
+# Commandes de gestion lancées comme workers de fond
+WORKER_COMMANDS = {'run_scheduler', 'generate_hr_documents', 'run_payroll', 'process_site_imports'}
+
+DEFAULTS = {
+    'web': {'CONN_MAX_AGE': 60, 'POOL_MIN_SIZE': 2, 'POOL_MAX_SIZE': 10},
+    'worker': {'CONN_MAX_AGE': 600, 'POOL_MIN_SIZE': 1, 'POOL_MAX_SIZE': 4},
+}
+
+
+def process_role(env, argv=None):
+    """« worker » pour les commandes de WORKER_COMMANDS, sinon « web » ; PROCESS_ROLE prioritaire."""
+    argv = sys.argv if argv is None else argv
+    detected = 'worker' if len(argv) > 1 and argv[1] in WORKER_COMMANDS else 'web'
+    role = env('PROCESS_ROLE', default=detected)
+    if role not in DEFAULTS:
+        raise ValueError(f"PROCESS_ROLE invalide : {role!r} (web ou worker)")
+    return role
+
+
+def _setting(env, name, role):
+    """DB_<name> pour le web, DB_WORKER_<name> pour un worker (entiers)."""
+    prefix = 'DB_WORKER_' if role == 'worker' else 'DB_'
+    return env.int(f'{prefix}{name}', default=DEFAULTS[role][name])
+
+
+def configure_connections(database, env, role):
+    """Complète une configuration issue de env.db() ; retourne la configuration."""
+    database['CONN_HEALTH_CHECKS'] = env.bool('DB_CONN_HEALTH_CHECKS', default=True)
+    if database['ENGINE'] == 'django.db.backends.sqlite3' and env.bool('SQLITE_TUNING', default=True):
+        # Verrou d'écriture pris dès BEGIN (core/sqlite.py)
+        database.setdefault('OPTIONS', {}).setdefault('transaction_mode', 'IMMEDIATE')
+    pooled = database['ENGINE'] == 'django.db.backends.postgresql' and env.bool('DB_POOL', default=False)
+    if not pooled:
+        database['CONN_MAX_AGE'] = _setting(env, 'CONN_MAX_AGE', role)
+        return database
+
+    database['CONN_MAX_AGE'] = 0  # Le pool garde les connexions ouvertes
+    database.setdefault('OPTIONS', {})['pool'] = {
+        'min_size': _setting(env, 'POOL_MIN_SIZE', role),
+        'max_size': _setting(env, 'POOL_MAX_SIZE', role),
+        # Attente maximale d'une connexion libre avant erreur (PoolTimeout)
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        # Fermeture des connexions inutilisées au-delà de min_size, renouvellement périodique
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=600.0),
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=3600.0),
+        'name': role,
+    }
+    return database
+
+
+def replica_database(env, role):
+    """
+    Alias « replica » depuis DATABASE_REPLICA_URL (core/replica.py) ;
+    retourne (configuration ou None, chemin de l'instantané SQLite ou '').
+    """
+    if not env('DATABASE_REPLICA_URL', default=''):
+        return None, ''
+    database = configure_connections(env.db('DATABASE_REPLICA_URL'), env, role)
+    database['TEST'] = {'MIRROR': 'default'}
+    if database['ENGINE'] != 'django.db.backends.sqlite3':
+        return database, ''
+
+    # Instantané local recopié par refresh_replica_snapshot : ouvert en lecture seule,
+    # sans connexion persistante pour voir chaque nouvelle copie dès qu'elle est en place
+    snapshot_path = str(database['NAME'])
+    database['NAME'] = f"file:{snapshot_path}?mode=ro"
+    database['CONN_MAX_AGE'] = 0
+    database['OPTIONS'].pop('transaction_mode', None)
+    return database, snapshot_path
+
+
+def partition_databases(env, role):
+    """
+    Bases par groupe de pays (core/partitions.py) depuis
+    COUNTRY_PARTITIONS="alias:CODE,CODE;alias2:CODE" et DATABASE_URL_<ALIAS> ;
+    retourne ({alias: configuration}, {code pays: alias}).
+    """
+    databases, countries = {}, {}
+    for group in filter(None, (g.strip() for g in env('COUNTRY_PARTITIONS', default='').split(';'))):
+        alias, _, codes = group.partition(':')
+        alias = alias.strip()
+        if not alias or alias in ('default', 'replica') or not codes.strip():
+            raise ValueError(f"COUNTRY_PARTITIONS invalide : {group!r} (alias:CODE,CODE)")
+        databases[alias] = configure_connections(env.db(f'DATABASE_URL_{alias.upper()}'), env, role)
+        for code in filter(None, (c.strip().upper() for c in codes.split(','))):
+            if code in countries:
+                raise ValueError(f"COUNTRY_PARTITIONS : le pays {code} est dans deux groupes")
+            countries[code] = alias
+    return databases, countries
@@ -2,6 +2,8 @@ from pathlib import Path
 import os
 import environ
 
+from config.database import configure_connections, partition_databases, process_role, replica_database
+
 # Initialize django-environ
 env = environ.Env(
     # set casting, default value
@@ -60,12 +62,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",  # Durées et requêtes SQL par vue (/metrics)
     "django.middleware.security.SecurityMiddleware",  #
     "whitenoise.middleware.WhiteNoiseMiddleware",  #
     "django.contrib.sessions.middleware.SessionMiddleware",  #
+    "core.replica.ReplicaPinMiddleware",  # Lectures sur la base principale après une écriture (réplique)
     "django.middleware.common.CommonMiddleware",  #
     "django.middleware.csrf.CsrfViewMiddleware",  #
     "django.contrib.auth.middleware.AuthenticationMiddleware",  #
+    "core.partitions.PartitionMiddleware",  # Base du pays actif de l'utilisateur (COUNTRY_PARTITIONS)
+    "core.profiling.SQLProfilerMiddleware",  # Profilage SQL (SQL_PROFILER_ENABLED ou en-tête X-SQL-Profile)
     "django.contrib.messages.middleware.MessageMiddleware",  #
     "django.middleware.clickjacking.XFrameOptionsMiddleware",  #
 ]
@@ -100,6 +106,26 @@ DATABASES = {
     'default': env.db(),  #
 }
 
+# Connexions persistantes, pool PostgreSQL (DB_POOL) et dimensionnement web / workers (config/database.py)
+PROCESS_ROLE = process_role(env)  # « web » ou « worker »
+configure_connections(DATABASES['default'], env, PROCESS_ROLE)  #
+
+# Réplique en lecture seule des rapports, de l'analytique et des exports (core/replica.py)
+# DATABASE_REPLICA_URL : seconde base PostgreSQL, ou fichier SQLite recopié par refresh_replica_snapshot
+REPLICA_DATABASE, REPLICA_SNAPSHOT_PATH = replica_database(env, PROCESS_ROLE)
+if REPLICA_DATABASE:
+    DATABASES['replica'] = REPLICA_DATABASE  #
+# Durée pendant laquelle une session lit sur la base principale après une écriture
+REPLICA_LAG_SECONDS = env.int('REPLICA_LAG_SECONDS', default=330 if REPLICA_SNAPSHOT_PATH else 10)  # Instantané : intervalle de rafraîchissement + marge
+
+# Bases par groupe de pays (core/partitions.py) : COUNTRY_PARTITIONS="alias:CODE,CODE;alias2:CODE"
+# et DATABASE_URL_<ALIAS> par groupe ; les pays non listés restent sur la base centrale.
+PARTITION_DATABASES, COUNTRY_PARTITIONS = partition_databases(env, PROCESS_ROLE)
+TEST_COUNTRY_PARTITIONS = {}  # Tests des partitions : profil config.test_settings
+DATABASES.update(PARTITION_DATABASES)  #
+# Partitions d'abord (modèles par pays), puis réplique (lectures des rapports)
+DATABASE_ROUTERS = ['core.partitions.PartitionRouter', 'core.replica.ReplicaRouter']  #
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -162,4 +188,65 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 # Assure que les dossiers existent (utile pour le développement)
 os.makedirs(MEDIA_ROOT, exist_ok=True)  #
-os.makedirs(TEMP_MEDIA_ROOT, exist_ok=True)  #
\ No newline at end of file
+os.makedirs(TEMP_MEDIA_ROOT, exist_ok=True)  #
+
+# Rendu PDF (core/pdf.py)
+# URL de base utilisée pour résoudre les liens relatifs des templates PDF
+PDF_BASE_URL = env('PDF_BASE_URL', default='http://extranet.ntc-group.org/')  #
+# Mode strict : aucune ressource n'est téléchargée, tout est résolu depuis static/ et media/
+PDF_STRICT_LOCAL_ASSETS = env.bool('PDF_STRICT_LOCAL_ASSETS', default=True)  #
+PDF_ASSET_CACHE_SIZE = env.int('PDF_ASSET_CACHE_SIZE', default=256)  #
+# Rapports volumineux (core/chunked_pdf.py) : lignes par page (saut de page forcé), pages par lot
+# et processus de rendu par requête (0 = un par cœur, à réserver aux serveurs dédiés)
+PDF_ROWS_PER_PAGE = env.int('PDF_ROWS_PER_PAGE', default=25)  #
+PDF_CHUNK_PAGES = env.int('PDF_CHUNK_PAGES', default=12)  #
+PDF_RENDER_WORKERS = env.int('PDF_RENDER_WORKERS', default=2)  #
+
+# Registre des tables de référence (core/registry.py) : délai de relecture des versions hors requête HTTP
+LOOKUP_REGISTRY_CHECK_SECONDS = env.int('LOOKUP_REGISTRY_CHECK_SECONDS', default=5)  #
+
+# Listes à recherche (core/autocomplete.py) : résultats par page des points d'accès JSON
+AUTOCOMPLETE_PAGE_SIZE = env.int('AUTOCOMPLETE_PAGE_SIZE', default=20)  #
+
+# Synchronisation différentielle des clients mobiles (projects/sync.py)
+SYNC_CHANGE_RETENTION_DAYS = env.int('SYNC_CHANGE_RETENTION_DAYS', default=30)  #
+SYNC_CHANGE_LAG_SECONDS = env.int('SYNC_CHANGE_LAG_SECONDS', default=5)  #
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=1000)  #
+
+# Réponses conditionnelles (core/conditional.py)
+# Version du déploiement incluse dans les ETag ; à défaut, le commit git courant
+RELEASE_VERSION = env('RELEASE_VERSION', default='')  #
+
+# Profilage SQL par requête (core/profiling.py)
+# Toujours actif si True ; sinon seulement pour un superutilisateur envoyant « X-SQL-Profile: 1 »
+SQL_PROFILER_ENABLED = env.bool('SQL_PROFILER_ENABLED', default=False)  #
+SQL_PROFILER_SLOW_COUNT = env.int('SQL_PROFILER_SLOW_COUNT', default=5)  #
+SQL_PROFILER_DUPLICATE_THRESHOLD = env.int('SQL_PROFILER_DUPLICATE_THRESHOLD', default=3)  #
+
+# Réglages SQLite appliqués à chaque connexion (core/sqlite.py) ; sans effet sur les autres moteurs
+SQLITE_TUNING = env.bool('SQLITE_TUNING', default=True)  #
+SQLITE_BUSY_TIMEOUT_MS = env.int('SQLITE_BUSY_TIMEOUT_MS', default=10000)  # Attente maximale du verrou d'écriture
+SQLITE_CACHE_SIZE_KIB = env.int('SQLITE_CACHE_SIZE_KIB', default=65536)  # Cache de pages par connexion
+SQLITE_MMAP_SIZE_MIB = env.int('SQLITE_MMAP_SIZE_MIB', default=256)  #
+
+# Métriques Prometheus (core/metrics.py, vue /metrics)
+# Dossier partagé par les workers gunicorn (vide = métriques du seul processus courant)
+METRICS_DIR = env('METRICS_DIR', default='')  #
+METRICS_FLUSH_SECONDS = env.int('METRICS_FLUSH_SECONDS', default=5)  #
+# Jeton du collecteur (en-tête « Authorization: Bearer <jeton> ») ; vide = superutilisateurs seulement
+METRICS_TOKEN = env('METRICS_TOKEN', default='')  #
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "message": {"format": "%(message)s"},
+    },
+    "handlers": {
+        "sqlprofile": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        # Une ligne JSON par requête profilée
+        "core.sqlprofile": {"handlers": ["sqlprofile"], "level": "INFO", "propagate": False},
+    },
+}
@@ -11,3 +11,12 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# Base de partition des tests des bases par groupe de pays (core/partitions.py) :
+# les classes de tests concernées activent TEST_COUNTRY_PARTITIONS (override_settings),
+# les autres tests restent sur la seule base centrale.
+DATABASES['ouest'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': BASE_DIR / 'db_ouest.sqlite3',
+}
+TEST_COUNTRY_PARTITIONS = {'SEN': 'ouest', 'CIV': 'ouest'}
@@ -2,13 +2,14 @@
 
 from django.contrib import admin
 from django.urls import path, include
-from core.views import HomeView
+from core.views import HomeView, metrics_view
 from django.conf import settings
 from django.conf.urls.static import static
 
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     # Ajoutez les URLs d'authentification (connexion, déconnexion, etc.)
     path("accounts/", include("django.contrib.auth.urls")),
     path("users/", include("users.urls", namespace="users")),
@@ -1,8 +1,106 @@
+from django import forms
+import json
+
 from django.contrib import admin
-from .models import Departement
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.utils.html import format_html
+from django.utils import timezone
+from .models import Departement, Sequence, ScheduledJob, JobRun, Counter, QueryProfile
+from .scheduler import CronSchedule
 
 @admin.register(Departement)
 class DepartementAdmin(admin.ModelAdmin):
     list_display = ('name', 'country', 'is_active')
     list_filter = ('country', 'is_active')
-    search_fields = ('name', 'country__name')
\ No newline at end of file
+    search_fields = ('name', 'country__name')
+
+@admin.register(Sequence)
+class SequenceAdmin(admin.ModelAdmin):
+    list_display = ('name', 'period', 'last_value')
+    list_filter = ('name',)
+    search_fields = ('name',)
+
+
+class ScheduledJobForm(forms.ModelForm):
+    class Meta:
+        model = ScheduledJob
+        fields = '__all__'
+
+    def clean_schedule(self):
+        schedule = self.cleaned_data['schedule']
+        try:
+            CronSchedule(schedule)
+        except ValueError as e:
+            raise forms.ValidationError(str(e))
+        return schedule
+
+
+@admin.register(ScheduledJob)
+class ScheduledJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'schedule', 'enabled', 'next_run_at', 'last_run_at', 'last_status')
+    list_filter = ('enabled', 'last_status')
+    list_editable = ('enabled',)
+    form = ScheduledJobForm
+    readonly_fields = ('name', 'description', 'next_run_at', 'last_run_at', 'last_status')
+
+    def save_model(self, request, obj, form, change):
+        # Un planning modifié prend effet dès la prochaine boucle du planificateur
+        if 'schedule' in form.changed_data:
+            obj.next_run_at = CronSchedule(obj.schedule).next_after(timezone.now())
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(JobRun)
+class JobRunAdmin(admin.ModelAdmin):
+    list_display = ('job', 'started_at', 'duration', 'status')
+    list_filter = ('status', 'job')
+    readonly_fields = ('job', 'started_at', 'finished_at', 'duration', 'status', 'message')
+
+
+@admin.register(Counter)
+class CounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'computed_at')
+    readonly_fields = ('name', 'value', 'computed_at')
+
+
+@admin.register(QueryProfile)
+class QueryProfileAdmin(admin.ModelAdmin):
+    list_display = ('url_name', 'requests', 'avg_queries', 'max_queries', 'avg_db_ms', 'duplicate_queries', 'last_seen')
+    search_fields = ('url_name',)
+    exclude = ('sample',)
+    readonly_fields = (
+        'url_name', 'requests', 'total_queries', 'max_queries', 'duplicate_queries',
+        'total_db_ms', 'total_ms', 'last_seen', 'sample_display',
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            queries_per_request=Cast(F('total_queries'), FloatField()) / F('requests'),
+            db_ms_per_request=F('total_db_ms') / F('requests'),
+        )
+
+    # Profilage réservé aux superutilisateurs ; les lignes sont écrites par le middleware
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+    def has_view_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Requêtes SQL (moy.)", ordering='queries_per_request')
+    def avg_queries(self, obj):
+        return round(obj.queries_per_request, 1)
+
+    @admin.display(description="Temps SQL moyen (ms)", ordering='db_ms_per_request')
+    def avg_db_ms(self, obj):
+        return round(obj.db_ms_per_request, 1)
+
+    @admin.display(description="Échantillon (pire requête HTTP)")
+    def sample_display(self, obj):
+        return format_html("<pre>{}</pre>", json.dumps(obj.sample, indent=2, ensure_ascii=False))
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        import core.db  # Suivi des connexions à la base (métriques)
+        import core.sqlite  # Réglages SQLite de chaque connexion
+        import core.partitions  # Cache des codes pays (bases par groupe de pays)
+        core.partitions.connect_reference_copy()  # Référence recopiée dans les partitions
+        import core.registry  # Invalidation du registre des tables de référence
@@ -0,0 +1,167 @@
+# core/autocomplete.py
+
+"""
+Listes à recherche pour les tables volumineuses (employés, sites,
+équipements, véhicules).
+
+Un <select> classique lit et affiche toutes les lignes du queryset à chaque
+ouverture du formulaire. Ici :
+- le widget (AutocompleteSelect / AutocompleteSelectMultiple) ne rend que les
+  valeurs sélectionnées ; static/js/autocomplete.js interroge l'URL
+  `data-autocomplete-url` pendant la saisie ;
+- les vues (AutocompleteView) renvoient une page de AUTOCOMPLETE_PAGE_SIZE
+  résultats : {"results": [{"id": ..., "text": ...}], "more": bool} ;
+- la recherche porte sur le début des champs, sans distinction de casse
+  (prefix_filter), et s'appuie sur un index Upper(champ) déclaré dans le
+  Meta du modèle.
+
+La validation du formulaire reste celle du queryset du champ.
+"""
+
+from urllib.parse import urlencode
+
+from django import forms
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Upper
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+
+# Borne haute d'un préfixe : aucun caractère ne se classe après
+LAST_CHAR = '\U0010ffff'
+
+
+def prefix_filter(queryset, fields, term):
+    """
+    Lignes dont l'un des `fields` commence par `term` (casse ignorée).
+
+    Le préfixe est exprimé en intervalle [TERME, TERME + LAST_CHAR[ sur
+    Upper(champ) pour utiliser l'index fonctionnel ; le startswith ne fait
+    que confirmer les lignes de l'intervalle. La mise en majuscules est faite
+    par la base (SQLite ne convertit que l'ASCII).
+    """
+    term = term.strip()
+    if not term:
+        return queryset
+    prefix = Upper(Value(term))
+    condition = Q()
+    for field in fields:
+        alias = f'{field}_upper'
+        queryset = queryset.alias(**{alias: Upper(field)})
+        condition |= Q(**{
+            f'{alias}__gte': prefix,
+            f'{alias}__lt': Concat(prefix, Value(LAST_CHAR)),
+            f'{alias}__startswith': prefix,
+        })
+    return queryset.filter(condition)
+
+
+class AutocompleteView(LoginRequiredMixin, View):
+    """
+    Point d'accès JSON d'une liste à recherche : ?q=<début>&page=<n>.
+    Les sous-classes définissent `model`, `search_fields`, `ordering` et
+    limitent le queryset (pays de l'utilisateur...) dans get_queryset().
+    """
+
+    model = None
+    search_fields = ()
+    ordering = ('pk',)
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def label(self, obj):
+        return str(obj)
+
+    def get_ids(self, name):
+        """Identifiants passés en paramètre (?name=1&name=2) ; valeurs non numériques ignorées."""
+        return [int(value) for value in self.request.GET.getlist(name) if value.isdigit()]
+
+    def get_page(self):
+        try:
+            return max(1, int(self.request.GET.get('page', 1)))
+        except ValueError:
+            return 1
+
+    def get(self, request, *args, **kwargs):
+        size = settings.AUTOCOMPLETE_PAGE_SIZE
+        queryset = prefix_filter(self.get_queryset(), self.search_fields, request.GET.get('q', ''))
+        start = (self.get_page() - 1) * size
+        # Une ligne de plus que la page : indique s'il reste des résultats, sans COUNT
+        rows = list(queryset.order_by(*self.ordering)[start:start + size + 1])
+        return JsonResponse({
+            'results': [{'id': obj.pk, 'text': self.label(obj)} for obj in rows[:size]],
+            'more': len(rows) > size,
+        })
+
+
+# =================================================================
+# Widgets
+# =================================================================
+
+class AutocompleteMixin:
+    """
+    Select dont les options sont chargées à la demande depuis `url_name`
+    (paramètres fixes `params` ajoutés à l'URL, ex. pays du projet).
+    """
+
+    def __init__(self, url_name, params=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.params = {key: value for key, value in (params or {}).items() if value not in (None, '', [])}
+
+    def get_url(self):
+        url = reverse(self.url_name)
+        return f"{url}?{urlencode(self.params, doseq=True)}" if self.params else url
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs['data-autocomplete-url'] = self.get_url()
+        attrs.setdefault('data-placeholder', "Rechercher…")
+        return attrs
+
+    def use_required_attribute(self, initial):
+        # Le <select> est masqué par le script : le caractère obligatoire est contrôlé côté serveur
+        return False
+
+    def optgroups(self, name, value, attrs=None):
+        """Seules les valeurs sélectionnées sont rendues (une requête sur leurs clés)."""
+        selected = [v for v in value if v not in (None, '')]
+        groups = []
+        if not self.allow_multiple_selected:
+            empty_label = self.choices.field.empty_label or "---------"
+            groups.append((None, [self.create_option(name, '', empty_label, not selected, 0)], 0))
+        if not selected:
+            return groups
+        field = self.choices.field
+        try:
+            objects = list(self.choices.queryset.filter(pk__in=selected))
+        except (ValueError, ValidationError):
+            # Valeur soumise invalide : le formulaire affiche déjà l'erreur
+            return groups
+        for index, obj in enumerate(objects, start=len(groups)):
+            option = self.create_option(name, field.prepare_value(obj), field.label_from_instance(obj), True, index)
+            groups.append((None, [option], index))
+        return groups
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
+
+
+def use_autocomplete(field, url_name, **params):
+    """Remplace la liste déroulante d'un ModelChoiceField par une liste à recherche."""
+    widget_class = (
+        AutocompleteSelectMultiple if isinstance(field, forms.ModelMultipleChoiceField) else AutocompleteSelect
+    )
+    field.widget = widget_class(url_name, params, attrs=field.widget.attrs)
+    field.widget.choices = field.choices
+    field.widget.is_required = field.required
+    return field
@@ -0,0 +1,408 @@
+# core/backup.py
+
+"""
+Moteur de sauvegarde incrémentale (base SQLite + dossier media/).
+
+- La base est copiée avec l'API de sauvegarde en ligne de SQLite (copie cohérente
+  même pendant les écritures), puis compressée en flux (gzip) vers la cible.
+- Les fichiers media sont découpés en blocs, identifiés par leur empreinte SHA-256
+  et dédupliqués : seuls les blocs absents de la cible sont envoyés.
+- Chaque exécution écrit un manifeste JSON qui décrit l'instantané complet.
+- Les cibles sont interchangeables (dossier local, Google Drive).
+
+Ce module n'importe pas Django : il est utilisé tel quel par backup_to_drive.py.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+
+CHUNK_SIZE = 4 * 1024 * 1024  # 4 Mo par bloc
+STREAM_BUFFER = 1024 * 1024
+SQLITE_BACKUP_PAGES = 1024  # Pages copiées par étape (libère le verrou entre deux étapes)
+
+MANIFEST_PREFIX = "manifests/"
+CHUNK_PREFIX = "chunks/"
+DATABASE_PREFIX = "database/"
+
+
+class BackupError(Exception):
+    """Erreur levée lors d'une sauvegarde ou d'une restauration."""
+
+
+# =================================================================
+# 1. CIBLES DE STOCKAGE
+# =================================================================
+
+class BackupTarget:
+    """
+    Interface d'une cible de sauvegarde. Les objets sont adressés par une clé
+    de type chemin (ex: 'chunks/ab/abcdef...').
+    """
+
+    def list_keys(self, prefix=""):
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def open_write(self, key):
+        """Context manager : fichier binaire en écriture, publié seulement à la fermeture."""
+        raise NotImplementedError
+
+    def open_read(self, key):
+        """Context manager : fichier binaire en lecture."""
+        raise NotImplementedError
+
+    def put_bytes(self, key, data):
+        with self.open_write(key) as fh:
+            fh.write(data)
+
+    def get_bytes(self, key):
+        with self.open_read(key) as fh:
+            return fh.read()
+
+
+class LocalDirectoryTarget(BackupTarget):
+    """Cible dans un dossier local (disque externe, montage réseau, ou tests)."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise BackupError(f"Clé invalide : {key}")
+        return path
+
+    def list_keys(self, prefix=""):
+        keys = []
+        base = self._path(prefix) if prefix else self.root
+        search_root = base if os.path.isdir(base) else os.path.dirname(base)
+        for root, _, files in os.walk(search_root):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                key = os.path.relpath(os.path.join(root, name), self.root).replace(os.sep, "/")
+                if key.startswith(prefix):
+                    keys.append(key)
+        return keys
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    @contextmanager
+    def open_write(self, key):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.part"
+        try:
+            with open(tmp_path, "wb") as fh:
+                yield fh
+            os.replace(tmp_path, path)  # Publication atomique
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    @contextmanager
+    def open_read(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise BackupError(f"Objet introuvable dans la cible : {key}")
+        with open(path, "rb") as fh:
+            yield fh
+
+
+class GoogleDriveTarget(BackupTarget):
+    """
+    Cible Google Drive (PyDrive2). Tous les objets sont stockés à plat dans un
+    dossier ; le titre du fichier Drive est la clé.
+    """
+
+    def __init__(self, drive, folder_id):
+        self.drive = drive
+        self.folder_id = folder_id
+        self._index = None  # clé -> id Drive, chargé une seule fois
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            file_list = self.drive.ListFile({
+                'q': f"'{self.folder_id}' in parents and trashed=false",
+                'maxResults': 1000,
+            }).GetList()
+            for item in file_list:
+                self._index[item['title']] = item['id']
+        return self._index
+
+    def list_keys(self, prefix=""):
+        return [key for key in self._load_index() if key.startswith(prefix)]
+
+    def exists(self, key):
+        return key in self._load_index()
+
+    @contextmanager
+    def open_write(self, key):
+        # Les blocs font au plus CHUNK_SIZE : on garde en mémoire, au-delà on bascule sur disque.
+        spool = tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 2)
+        try:
+            yield spool
+            spool.seek(0)
+            file_drive = self.drive.CreateFile({
+                'title': key,
+                'parents': [{'id': self.folder_id}],
+            })
+            file_drive.content = spool
+            file_drive.Upload()
+            self._load_index()[key] = file_drive['id']
+        finally:
+            spool.close()
+
+    @contextmanager
+    def open_read(self, key):
+        file_id = self._load_index().get(key)
+        if not file_id:
+            raise BackupError(f"Objet introuvable sur Drive : {key}")
+        file_drive = self.drive.CreateFile({'id': file_id})
+        with tempfile.TemporaryFile() as tmp:
+            for data in file_drive.GetContentIOBuffer():
+                tmp.write(data)
+            tmp.seek(0)
+            yield tmp
+
+
+# =================================================================
+# 2. OUTILS
+# =================================================================
+
+def chunk_key(digest):
+    return f"{CHUNK_PREFIX}{digest[:2]}/{digest}"
+
+
+def load_latest_manifest(target):
+    """Retourne le manifeste le plus récent de la cible (ou None)."""
+    manifests = sorted(target.list_keys(MANIFEST_PREFIX))
+    if not manifests:
+        return None
+    return json.loads(target.get_bytes(manifests[-1]).decode("utf-8"))
+
+
+def load_manifest(target, snapshot_id=None):
+    if snapshot_id is None:
+        manifest = load_latest_manifest(target)
+        if manifest is None:
+            raise BackupError("Aucun instantané trouvé dans la cible.")
+        return manifest
+    key = f"{MANIFEST_PREFIX}{snapshot_id}.json"
+    if not target.exists(key):
+        raise BackupError(f"Instantané introuvable : {snapshot_id}")
+    return json.loads(target.get_bytes(key).decode("utf-8"))
+
+
+# =================================================================
+# 3. SAUVEGARDE
+# =================================================================
+
+def snapshot_database(db_path, target, key):
+    """
+    Copie cohérente de la base via l'API de sauvegarde en ligne de SQLite,
+    puis compression gzip en flux vers la cible.
+    Retourne les métadonnées (empreinte de la base non compressée, tailles).
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".sqlite3")
+    os.close(fd)
+    try:
+        source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        destination = sqlite3.connect(tmp_path)
+        try:
+            source.backup(destination, pages=SQLITE_BACKUP_PAGES)
+        finally:
+            destination.close()
+            source.close()
+
+        raw_digest = hashlib.sha256()
+        raw_size = 0
+        with open(tmp_path, "rb") as src, target.open_write(key) as out:
+            with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=6, mtime=0) as gz:
+                for block in iter(lambda: src.read(STREAM_BUFFER), b""):
+                    raw_digest.update(block)
+                    raw_size += len(block)
+                    gz.write(block)
+        return {"key": key, "sha256": raw_digest.hexdigest(), "size": raw_size}
+    finally:
+        os.remove(tmp_path)
+
+
+def backup_media(media_root, target, previous_files, known_chunks, log=print):
+    """
+    Parcourt media/ et retourne (entrées du manifeste, statistiques).
+    Un fichier dont la taille et la date de modification n'ont pas changé
+    depuis le dernier manifeste est repris sans être relu.
+    """
+    files = {}
+    stats = {"files": 0, "unchanged": 0, "chunks_uploaded": 0, "bytes_uploaded": 0}
+
+    if not os.path.isdir(media_root):
+        log(f"Attention : dossier media introuvable : {media_root}")
+        return files, stats
+
+    for root, _, names in os.walk(media_root):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel_path = os.path.relpath(path, media_root).replace(os.sep, "/")
+            st = os.stat(path)
+            stats["files"] += 1
+
+            previous = previous_files.get(rel_path)
+            if previous and previous["size"] == st.st_size and previous["mtime"] == st.st_mtime_ns:
+                files[rel_path] = previous
+                stats["unchanged"] += 1
+                continue
+
+            file_digest = hashlib.sha256()
+            chunks = []
+            with open(path, "rb") as fh:
+                for block in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                    file_digest.update(block)
+                    digest = hashlib.sha256(block).hexdigest()
+                    chunks.append(digest)
+                    if digest not in known_chunks:
+                        target.put_bytes(chunk_key(digest), block)
+                        known_chunks.add(digest)
+                        stats["chunks_uploaded"] += 1
+                        stats["bytes_uploaded"] += len(block)
+
+            files[rel_path] = {
+                "size": st.st_size,
+                "mtime": st.st_mtime_ns,
+                "sha256": file_digest.hexdigest(),
+                "chunks": chunks,
+            }
+    return files, stats
+
+
+def run_incremental_backup(target, db_path, media_root, log=print):
+    """
+    Exécute une sauvegarde incrémentale complète vers `target` et
+    retourne le manifeste écrit.
+    """
+    snapshot_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    previous = load_latest_manifest(target)
+    previous_files = previous["files"] if previous else {}
+
+    # Index des blocs déjà présents (une seule requête de listage)
+    known_chunks = {key.rsplit("/", 1)[-1] for key in target.list_keys(CHUNK_PREFIX)}
+
+    manifest = {
+        "snapshot": snapshot_id,
+        "created_at": datetime.now().isoformat(),
+        "chunk_size": CHUNK_SIZE,
+        "database": None,
+        "files": {},
+    }
+
+    if db_path and os.path.exists(db_path):
+        log(f"Instantané de la base : {db_path}...")
+        manifest["database"] = snapshot_database(
+            db_path, target, f"{DATABASE_PREFIX}{snapshot_id}.sqlite3.gz"
+        )
+    else:
+        log(f"Attention : base de données introuvable : {db_path}")
+
+    log(f"Analyse des fichiers media : {media_root}...")
+    manifest["files"], stats = backup_media(media_root, target, previous_files, known_chunks, log=log)
+    manifest["stats"] = stats
+
+    # Le manifeste est écrit en dernier : un instantané n'existe que s'il est complet.
+    target.put_bytes(
+        f"{MANIFEST_PREFIX}{snapshot_id}.json",
+        json.dumps(manifest, indent=1, sort_keys=True).encode("utf-8"),
+    )
+    log(
+        f"Sauvegarde {snapshot_id} terminée : {stats['files']} fichiers "
+        f"({stats['unchanged']} inchangés), {stats['chunks_uploaded']} blocs envoyés "
+        f"({stats['bytes_uploaded']} octets)."
+    )
+    return manifest
+
+
+# =================================================================
+# 4. RESTAURATION
+# =================================================================
+
+def restore_snapshot(target, destination, snapshot_id=None, verify_only=False, log=print):
+    """
+    Restaure un instantané dans `destination` (db.sqlite3 + media/) en vérifiant
+    les empreintes de chaque bloc, de chaque fichier et de la base.
+    Avec `verify_only`, rien n'est écrit sur disque.
+    Retourne la liste des erreurs rencontrées (vide si tout est correct).
+    """
+    manifest = load_manifest(target, snapshot_id)
+    errors = []
+    log(f"Restauration de l'instantané {manifest['snapshot']}...")
+
+    if not verify_only:
+        os.makedirs(destination, exist_ok=True)
+
+    database = manifest.get("database")
+    if database:
+        db_dest = os.path.join(destination, "db.sqlite3")
+        digest = hashlib.sha256()
+        with target.open_read(database["key"]) as src, gzip.GzipFile(fileobj=src, mode="rb") as gz:
+            out = None if verify_only else open(f"{db_dest}.part", "wb")
+            try:
+                for block in iter(lambda: gz.read(STREAM_BUFFER), b""):
+                    digest.update(block)
+                    if out:
+                        out.write(block)
+            finally:
+                if out:
+                    out.close()
+        if digest.hexdigest() != database["sha256"]:
+            errors.append(f"Base de données : empreinte invalide ({database['key']})")
+            if not verify_only:
+                os.remove(f"{db_dest}.part")
+        elif not verify_only:
+            os.replace(f"{db_dest}.part", db_dest)
+
+    media_dest = os.path.join(destination, "media")
+    for rel_path, entry in sorted(manifest["files"].items()):
+        file_digest = hashlib.sha256()
+        out_path = os.path.join(media_dest, *rel_path.split("/"))
+        out = None
+        if not verify_only:
+            os.makedirs(os.path.dirname(out_path), exist_ok=True)
+            out = open(f"{out_path}.part", "wb")
+        try:
+            for digest in entry["chunks"]:
+                block = target.get_bytes(chunk_key(digest))
+                if hashlib.sha256(block).hexdigest() != digest:
+                    raise BackupError(f"{rel_path} : bloc corrompu {digest}")
+                file_digest.update(block)
+                if out:
+                    out.write(block)
+            if file_digest.hexdigest() != entry["sha256"]:
+                raise BackupError(f"{rel_path} : empreinte du fichier invalide")
+        except BackupError as e:
+            errors.append(str(e))
+            if out:
+                out.close()
+                os.remove(f"{out_path}.part")
+            continue
+        if out:
+            out.close()
+            os.replace(f"{out_path}.part", out_path)
+            os.utime(out_path, ns=(entry["mtime"], entry["mtime"]))
+
+    if errors:
+        log(f"Restauration terminée avec {len(errors)} erreur(s).")
+    else:
+        log(f"Restauration vérifiée : {len(manifest['files'])} fichiers, base {'OK' if database else 'absente'}.")
+    return errors
+
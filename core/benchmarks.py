@@ -0,0 +1,196 @@
+# core/benchmarks.py
+
+"""
+Banc de mesure des vues principales (commande benchmark_views, core/tests.py).
+
+Chaque vue est appelée via le client de test Django, connecté avec un
+utilisateur du rôle voulu, sur les données présentes en base (par exemple
+générées par generate_load_dataset). Mesures par vue :
+- latence p50 / p95 (ms) sur plusieurs itérations, après échauffement ;
+- nombre de requêtes SQL ;
+- pic mémoire Python (tracemalloc) pendant un appel ;
+- taille de la réponse.
+
+Les résultats sont un dictionnaire JSON {"meta": ..., "results": {nom: mesures}}.
+compare() confronte des résultats à une référence (résultats précédents ou
+budgets de core/benchmark_budgets.json) et liste les dépassements.
+"""
+
+import datetime
+import statistics
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Union
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from projects.models import Project, Site
+from users.models import CustomUser, EmployeeCountryAssignment
+
+# Rôle -> nom du rôle d'affectation (None = superutilisateur)
+ROLES = {
+    'superuser': None,
+    'country_manager': "Country Manager",
+    'coordinator': "Coordinateur de projet",
+    'field_team': "Field Team",
+}
+
+
+@dataclass
+class Benchmark:
+    name: str
+    url_name: str
+    role: str = 'superuser'
+    params: Union[dict, Callable] = field(default_factory=dict)  # Paramètres GET (ou fonction)
+    kwargs: Callable = None  # Arguments de l'URL, calculés depuis les données présentes
+
+    def url(self):
+        kwargs = self.kwargs() if self.kwargs else None
+        if self.kwargs and kwargs is None:
+            return None
+        return reverse(self.url_name, kwargs=kwargs)
+
+
+def _largest_project():
+    """Projet comptant le plus de sites (page de détail la plus lourde)."""
+    pk = Project.objects.annotate(n=Count('sites')).order_by('-n', 'pk').values_list('pk', flat=True).first()
+    return {'pk': pk} if pk else None
+
+
+def _first_country_filter():
+    country_id = Site.objects.order_by('pk').values_list('project__country_id', flat=True).first()
+    return {'country': country_id} if country_id else {}
+
+
+BENCHMARKS = [
+    *[Benchmark(f"home_{role}", 'home', role=role) for role in ROLES],
+    Benchmark('project_list', 'projects:project_list'),
+    Benchmark('project_detail', 'projects:project_detail', kwargs=_largest_project),
+    Benchmark('ran_site_list', 'reporting:ran_site_list', params=_first_country_filter),
+    Benchmark('ran_site_list_excel', 'reporting:ran_site_list_excel', params=_first_country_filter),
+    Benchmark('ran_site_list_pdf', 'reporting:ran_site_list_pdf', params=_first_country_filter),
+    Benchmark('analytics_dashboard', 'data_analytics:dashboard'),
+    Benchmark('employee_performance', 'rh:employee_performance'),
+    Benchmark('expense_list', 'finance:expense_list'),
+]
+
+
+def user_for_role(role):
+    """Premier utilisateur actif ayant le rôle (affectation active), ou None."""
+    if ROLES[role] is None:
+        return CustomUser.objects.filter(is_superuser=True, is_active=True).order_by('pk').first()
+    user_id = EmployeeCountryAssignment.objects.filter(
+        role__name=ROLES[role], is_active=True, country__is_active=True, user__is_active=True,
+    ).order_by('user_id').values_list('user_id', flat=True).first()
+    return CustomUser.objects.filter(pk=user_id).first() if user_id else None
+
+
+def percentile(values, percent):
+    """Centile par rang le plus proche (valeurs non vides)."""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def run_benchmark(benchmark, client, iterations=10, warmup=2):
+    """Mesure une vue ; retourne un dictionnaire de mesures, ou None si inapplicable."""
+    url = benchmark.url()
+    if url is None:
+        return None
+    params = benchmark.params() if callable(benchmark.params) else benchmark.params
+
+    def call():
+        response = client.get(url, params)
+        # Les réponses en flux (fichiers) sont consommées pour mesurer leur coût complet
+        return response, len(b''.join(response.streaming_content) if response.streaming else response.content)
+
+    for _ in range(warmup):
+        call()
+
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response, size = call()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured.captured_queries))
+
+    # Mesure mémoire à part : tracemalloc ralentit fortement l'exécution
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'url': url,
+        'status': response.status_code,
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'queries': max(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'bytes': size,
+    }
+
+
+def run_benchmarks(benchmarks=None, iterations=10, warmup=2, log=None):
+    """Exécute les mesures ; les vues sans utilisateur ou sans données sont ignorées."""
+    results = {}
+    clients = {}
+    for benchmark in benchmarks or BENCHMARKS:
+        if benchmark.role not in clients:
+            user = user_for_role(benchmark.role)
+            client = None
+            if user is not None:
+                client = Client()
+                client.force_login(user)
+            clients[benchmark.role] = client
+        client = clients[benchmark.role]
+        result = run_benchmark(benchmark, client, iterations, warmup) if client else None
+        if log:
+            log(benchmark, result)
+        if result is not None:
+            results[benchmark.name] = result
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'iterations': iterations,
+            'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+            'sites': Site.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(results, reference, latency_tolerance=0.25, memory_tolerance=0.25, query_tolerance=0):
+    """
+    Dépassements de `results` par rapport à `reference` (mêmes formats).
+    Seules les mesures présentes dans la référence sont vérifiées : un fichier
+    de budgets peut ne fixer que le nombre de requêtes.
+    Retourne une liste de (vue, mesure, valeur, limite).
+    """
+    limits = {
+        'queries': lambda value: value + query_tolerance,
+        'p95_ms': lambda value: value * (1 + latency_tolerance),
+        'p50_ms': lambda value: value * (1 + latency_tolerance),
+        'peak_kib': lambda value: value * (1 + memory_tolerance),
+    }
+    regressions = []
+    for name, expected in reference.get('results', {}).items():
+        measured = results.get('results', {}).get(name)
+        if measured is None:
+            continue
+        if 'status' in expected and 'status' in measured and measured['status'] != expected['status']:
+            regressions.append((name, 'status', measured['status'], expected['status']))
+        for metric, limit in limits.items():
+            if metric in expected and metric in measured and measured[metric] > limit(expected[metric]):
+                regressions.append((name, metric, measured[metric], round(limit(expected[metric]), 2)))
+    return regressions
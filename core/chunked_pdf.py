@@ -0,0 +1,188 @@
+# core/chunked_pdf.py
+
+"""
+Rendu PDF par lots pour les rapports volumineux (listes de sites...).
+
+La mise en page WeasyPrint d'un tableau de plusieurs milliers de lignes est
+de plus en plus lente et gourmande en mémoire avec la taille du document :
+- les lignes sont découpées en lots de PDF_CHUNK_PAGES pages complètes
+  (rows_per_page lignes par page, requête et prefetch par lot), le HTML de
+  chaque lot est rendu dans le processus principal (accès base de données) ;
+- le template force un saut de page toutes les `rows_per_page` lignes : un
+  lot se termine sur une page pleine et la fusion ne laisse pas de page à
+  moitié vide entre deux lots ;
+- WeasyPrint convertit les lots en parallèle dans un pool de processus
+  (feuilles de style et polices partagées dans chaque processus, cf.
+  core.pdf : le CSS du rapport est passé en fichier static dans
+  `stylesheets` plutôt qu'en <style> relu à chaque lot), limité à
+  PDF_RENDER_WORKERS par requête ;
+- les PDF des lots sont concaténés dans l'ordre avec pypdf, puis la
+  numérotation « Page x / y » est apposée sur le document final.
+
+L'en-tête du tableau (thead) est répété sur chaque page par WeasyPrint ; le
+template reçoit `chunk_index` pour n'afficher le titre que sur le premier lot.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from io import BytesIO
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import QuerySet
+from django.template.loader import render_to_string
+from pypdf import PdfReader, PdfWriter
+from weasyprint import CSS
+
+from . import metrics
+from .partitions import MergedQuerySet
+from .pdf import build_document, render_pdf
+
+# Pied de page ajouté à chaque page du document fusionné
+PAGE_NUMBER_CSS = """
+@page {{ size: {width}pt {height}pt; margin: 0 0.8cm 0.3cm 0.8cm;
+        @bottom-right {{ content: "Page " counter(page) " / " counter(pages);
+                         font-family: sans-serif; font-size: 7px; color: #555; }} }}
+div + div {{ break-before: page; }}
+"""
+
+
+def iter_chunks(rows, chunk_size):
+    """Découpe une liste ou un queryset en lots (un queryset est lu lot par lot)."""
+    if isinstance(rows, (QuerySet, MergedQuerySet)) and not rows.ordered:
+        # Un découpage LIMIT/OFFSET n'est stable que sur un ordre déterministe
+        rows = rows.order_by('pk')
+    if isinstance(rows, MergedQuerySet):
+        # Plusieurs bases (core/partitions.py) : lectures en flux fusionnées dans l'ordre
+        iterator = rows.iterator(chunk_size=chunk_size)
+        while chunk := list(islice(iterator, chunk_size)):
+            yield chunk
+        return
+    start = 0
+    while True:
+        chunk = list(rows[start:start + chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        start += chunk_size
+
+
+def _init_worker():
+    """Initialise Django dans les processus du pool (nécessaire hors fork)."""
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        django.setup()
+
+
+def _render_chunk(job):
+    index, html_string, stylesheets, document = job
+    pdf = render_pdf(html_string, stylesheets, document=document)
+    # Les processus du pool se terminent sans passer par atexit
+    metrics.registry.flush(force=True)
+    return index, pdf
+
+
+def _render_all(jobs, workers):
+    """PDF de chaque lot, dans l'ordre des lots."""
+    if workers == 1:
+        return [_render_chunk(job)[1] for job in jobs]
+
+    results = {}
+    # Les connexions ne doivent pas être partagées avec les processus enfants.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        # Avec fork, tous les processus sont créés au premier submit : il a lieu
+        # avant la première lecture de `jobs` (générateur paresseux qui rouvre la
+        # connexion, et dont le curseur en flux doit rester ouvert ensuite).
+        executor.submit(os.getpid)
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            # Fenêtre bornée : le HTML n'est préparé que deux lots d'avance par processus.
+            while not exhausted and len(pending) < workers * 2:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(_render_chunk, job))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index, pdf = future.result()
+                results[index] = pdf
+    return [results[index] for index in sorted(results)]
+
+
+def merge_pdfs(parts, number_pages=True):
+    """Concatène des PDF (octets) ; numérote les pages du résultat si demandé."""
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(BytesIO(part)))
+
+    if number_pages and writer.pages:
+        # Les lots partagent le format de page du template
+        box = writer.pages[0].mediabox
+        css = PAGE_NUMBER_CSS.format(width=float(box.width), height=float(box.height))
+        overlay = build_document(
+            f"<html><body>{'<div></div>' * len(writer.pages)}</body></html>",
+            stylesheets=[CSS(string=css)],
+        ).write_pdf()
+        for page, numbers in zip(writer.pages, PdfReader(BytesIO(overlay)).pages):
+            page.merge_page(numbers)
+
+    output = BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def chunk_rows(rows_per_page=None):
+    """Lignes par lot : un nombre entier de pages (PDF_CHUNK_PAGES pages de `rows_per_page` lignes)."""
+    rows_per_page = rows_per_page or settings.PDF_ROWS_PER_PAGE
+    return rows_per_page * max(1, settings.PDF_CHUNK_PAGES)
+
+
+def render_workers():
+    """Processus de rendu d'une requête : PDF_RENDER_WORKERS, 0 = un par cœur."""
+    return settings.PDF_RENDER_WORKERS or os.cpu_count() or 1
+
+
+def render_chunked_pdf(template_name, rows, item_name, context=None, request=None,
+                       stylesheets=(), rows_per_page=None, workers=None, number_pages=True):
+    """
+    Rendu PDF d'un template de liste : `rows` (queryset ou liste) est passé au
+    template lot par lot sous le nom `item_name`, avec `chunk_index` (0 pour le
+    premier lot) et `rows_per_page` (lignes par page, saut de page forcé par le
+    template). `stylesheets` : chemins static (ex: 'css/pdf.css') ou objets CSS
+    pré-analysés uniquement si workers == 1 (non transmissibles aux processus).
+    """
+    rows_per_page = rows_per_page or settings.PDF_ROWS_PER_PAGE
+    chunk_size = chunk_rows(rows_per_page)
+    workers = workers or render_workers()
+    context = context or {}
+
+    # Pas plus de processus que de lots (aucun pool pour un seul lot)
+    total = rows.count() if isinstance(rows, (QuerySet, MergedQuerySet)) else len(rows)
+    workers = max(1, min(workers, -(-total // chunk_size)))
+
+    def jobs():
+        for index, chunk in enumerate(iter_chunks(rows, chunk_size)):
+            html_string = render_to_string(
+                template_name, {**context, item_name: chunk, 'chunk_index': index, 'rows_per_page': rows_per_page}, request=request
+            )
+            yield index, html_string, tuple(stylesheets), f"{template_name} (lot)"
+
+    with metrics.timed('render_duration_seconds', format='pdf', document=template_name):
+        parts = _render_all(jobs(), workers)
+        if not parts:
+            # Liste vide : un seul document (titre et en-tête du tableau)
+            parts = [render_pdf(
+                render_to_string(template_name, {**context, item_name: [], 'chunk_index': 0, 'rows_per_page': rows_per_page}, request=request),
+                stylesheets, document=template_name,
+            )]
+        return merge_pdfs(parts, number_pages=number_pages)
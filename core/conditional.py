@@ -0,0 +1,94 @@
+# core/conditional.py
+
+"""
+Réponses conditionnelles (ETag / 304 Not Modified) pour les pages consultées
+en boucle (détail projet, site, tâche, rapports).
+
+L'empreinte d'une page combine :
+- un marqueur de version des données affichées, lu en une petite requête
+  (ex: projects.sync.change_marker sur le journal SyncChange) ;
+- le périmètre de l'utilisateur (pays, rôles, groupes) qui change les menus
+  et les boutons ;
+- l'URL complète, le jeton CSRF des formulaires et la version déployée.
+
+Si le navigateur présente la même empreinte (If-None-Match), la vue répond
+304 sans exécuter ses requêtes ni rendre le template. Les pages sont
+marquées « private, no-cache » : le navigateur revalide à chaque affichage.
+Désactivé en DEBUG (templates modifiés sans changement de version).
+"""
+
+import hashlib
+import subprocess
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+
+@lru_cache(maxsize=1)
+def release_version():
+    """Version déployée : RELEASE_VERSION, sinon le commit git courant."""
+    if settings.RELEASE_VERSION:
+        return settings.RELEASE_VERSION
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def user_scope(user):
+    """Ce qui, chez l'utilisateur, change le rendu d'une page : pays, rôles, groupes."""
+    assignments = sorted(
+        user.assignments.filter(is_active=True, country__is_active=True).values_list('country_id', 'role_id')
+    )
+    groups = sorted(user.groups.values_list('pk', flat=True))
+    return (user.pk, user.is_superuser, user.get_full_name(), assignments, groups)
+
+
+def compute_etag(request, *parts):
+    """ETag de la page pour cet utilisateur ; `parts` = marqueurs de version des données."""
+    state = repr((
+        release_version(),
+        request.get_full_path(),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        user_scope(request.user) if request.user.is_authenticated else None,
+        parts,
+    ))
+    return f'"{hashlib.md5(state.encode()).hexdigest()}"'
+
+
+def is_conditional(request):
+    """Seules les lectures sans message flash en attente peuvent répondre 304."""
+    if settings.DEBUG or request.method not in ('GET', 'HEAD'):
+        return False
+    return not len(get_messages(request))
+
+
+def finalize(response, etag):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_page(version):
+    """
+    Décorateur de vue fonction. `version(request, *args, **kwargs)` retourne le
+    marqueur de version des données ; la vue n'est exécutée que s'il a changé.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_conditional(request):
+                return view(request, *args, **kwargs)
+            etag = compute_etag(request, version(request, *args, **kwargs))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view(request, *args, **kwargs)
+            return finalize(response, etag)
+        return wrapper
+    return decorator
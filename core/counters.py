@@ -0,0 +1,35 @@
+# core/counters.py
+
+"""
+Compteurs précalculés par les tâches planifiées (modèle Counter).
+
+Les vues lisent la valeur stockée ; si elle est absente ou trop ancienne
+(planificateur arrêté), elles retombent sur le calcul direct.
+"""
+
+import datetime
+
+from django.utils import timezone
+
+from .models import Counter
+
+DEFAULT_MAX_AGE = datetime.timedelta(hours=2)
+
+
+def set_counters(values, now=None):
+    """Enregistre plusieurs compteurs {nom: valeur}."""
+    now = now or timezone.now()
+    for name, value in values.items():
+        Counter.objects.update_or_create(name=name, defaults={'value': value, 'computed_at': now})
+
+
+def get_counters(compute, max_age=DEFAULT_MAX_AGE):
+    """
+    Lit plusieurs compteurs en une requête. `compute` associe à chaque nom une
+    fonction de calcul direct, utilisée si le compteur manque ou est périmé.
+    """
+    limit = timezone.now() - max_age
+    stored = dict(
+        Counter.objects.filter(name__in=list(compute), computed_at__gte=limit).values_list('name', 'value')
+    )
+    return {name: stored[name] if name in stored else fallback() for name, fallback in compute.items()}
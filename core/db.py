@@ -0,0 +1,50 @@
+# core/db.py
+
+"""
+Suivi des connexions à la base (configuration : config/database.py).
+
+- db_connections_opened_total : chaque ouverture réelle de connexion
+  (signal connection_created). Avec des connexions persistantes ou un pool,
+  ce compteur doit rester très inférieur au nombre de requêtes HTTP.
+- PostgreSQL avec pool : taille, connexions libres, attentes et délais
+  dépassés du pool de chaque processus (étiquette pid), relevés à chaque
+  écriture des métriques ou appel de /metrics.
+"""
+
+import os
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core import metrics
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    metrics.inc('db_connections_opened_total', alias=connection.alias, role=settings.PROCESS_ROLE)
+
+
+def _pools():
+    """Pools déjà créés (sans en créer), par alias."""
+    for alias in connections:
+        pool = getattr(type(connections[alias]), '_connection_pools', {}).get(alias)
+        if pool is not None:
+            yield alias, pool
+
+
+def collect_pool_stats():
+    for alias, pool in _pools():
+        # pop_stats remet les compteurs du pool à zéro : on les ajoute aux nôtres
+        stats = pool.pop_stats()
+        labels = {'alias': alias, 'role': settings.PROCESS_ROLE}
+        metrics.set_gauge('db_pool_size', stats.get('pool_size', 0), pid=os.getpid(), **labels)
+        metrics.set_gauge('db_pool_available', stats.get('pool_available', 0), pid=os.getpid(), **labels)
+        metrics.set_gauge('db_pool_waiting', stats.get('requests_waiting', 0), pid=os.getpid(), **labels)
+        metrics.inc('db_pool_requests_total', stats.get('requests_num', 0), **labels)
+        metrics.inc('db_pool_wait_seconds_total', stats.get('requests_wait_ms', 0) / 1000, **labels)
+        metrics.inc('db_pool_timeouts_total', stats.get('requests_errors', 0), **labels)
+
+
+metrics.registry.add_collector(collect_pool_stats)
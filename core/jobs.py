@@ -0,0 +1,60 @@
+# core/jobs.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import JobRun
+from .partitions import copy_reference, partition_aliases
+from .replica import refresh_snapshot
+from .scheduler import job
+from .sqlite import run_maintenance
+
+JOB_HISTORY_DAYS = 30
+
+
+@job("0 2 * * *", enabled=False)
+def sauvegarde_incrementale():
+    """Sauvegarde incrémentale vers Google Drive (à activer dans l'admin une fois settings.yaml en place)."""
+    # Import local : pydrive2 n'est nécessaire que si la tâche est activée
+    from backup_to_drive import run_backup
+    stats = run_backup()["stats"]
+    return f"{stats['files']} fichier(s), {stats['chunks_uploaded']} bloc(s) envoyé(s)"
+
+
+@job("45 3 * * *")
+def purger_historique_taches():
+    """Supprime l'historique des exécutions de plus de 30 jours."""
+    deleted, _ = JobRun.objects.filter(started_at__lt=timezone.now() - timedelta(days=JOB_HISTORY_DAYS)).delete()
+    return f"{deleted} exécution(s) supprimée(s)"
+
+
+@job("30 4 * * 0")
+def maintenance_sqlite():
+    """Maintenance hebdomadaire de la base SQLite (ANALYZE, optimize, vacuum incrémental)."""
+    if connection.vendor != 'sqlite':
+        return "Base non SQLite : rien à faire"
+    before, after, _ = run_maintenance()
+    freed = (before['file_bytes'] + before['wal_bytes'] - after['file_bytes'] - after['wal_bytes']) / 1024 / 1024
+    return f"{after['freelist_count']} page(s) libre(s), {freed:.1f} Mio récupéré(s)"
+
+
+@job("*/5 * * * *")
+def rafraichir_replique():
+    """Recopie la base SQLite vers l'instantané de la réplique (si configuré)."""
+    if not settings.REPLICA_SNAPSHOT_PATH or connection.vendor != 'sqlite':
+        return "Pas d'instantané SQLite configuré"
+    seconds = refresh_snapshot(connection.settings_dict['NAME'], settings.REPLICA_SNAPSHOT_PATH)
+    return f"Instantané rafraîchi en {seconds:.1f} s"
+
+
+@job("15 * * * *")
+def synchroniser_partitions():
+    """Recopie la référence centrale dans les bases par groupe de pays (écritures sans signaux)."""
+    aliases = partition_aliases()
+    if not aliases:
+        return "COUNTRY_PARTITIONS non configuré"
+    copied = sum(copy_reference(alias) for alias in aliases)
+    return f"{copied} ligne(s) de référence dans {len(aliases)} partition(s)"
@@ -0,0 +1,421 @@
+# core/loadtest.py
+
+"""
+Test de charge HTTP : parcours scriptés par rôle (commande load_test).
+
+Des utilisateurs virtuels (un thread et une session HTTP chacun) se
+connectent via EnhancedLoginView puis rejouent en boucle le parcours de
+leur rôle, avec un temps de réflexion aléatoire entre deux étapes :
+- terrain : accueil, mes tâches, mise à jour de tâche (API), envoi de
+  photo (API), rapport de tâche ;
+- coordinateur : accueil, liste des projets, détail de projet, détail de
+  site, export Excel des sites RAN.
+
+Les comptes utilisés sont ceux du jeu synthétique (generate_load_dataset,
+noms « <préfixe>_user_… ») : leur mot de passe est fixé avant le test, les
+autres comptes ne sont jamais modifiés. Le serveur ciblé doit utiliser la
+même base que la commande (tâches et projets des parcours lus en base).
+
+Attente sur verrous :
+- erreurs de verrou côté serveur : compteur db_lock_errors_total de
+  /metrics, relevé avant et après le test (accès local autorisé) ;
+- PostgreSQL : nombre de connexions en attente d'un verrou
+  (pg_stat_activity), échantillonné pendant le test ;
+- SQLite : l'attente (busy timeout) n'est pas observable directement, elle
+  apparaît dans la latence des étapes d'écriture.
+"""
+
+import datetime
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Callable
+
+import requests
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.urls import reverse
+from PIL import Image
+
+from core.benchmarks import percentile
+from projects.models import Project, Site, Task
+from users.models import CustomUser, EmployeeCountryAssignment
+
+FIELD_ROLES = ("Field Team", "Technician", "Rigger")
+COORDINATOR_ROLES = ("Coordinateur de projet",)
+
+ACTIVE_TASK_STATUSES = ("TO_DO", "IN_PROGRESS", "QC_PENDING")
+
+CSRF_INPUT = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+LOCK_METRIC = re.compile(r'^db_lock_errors_total\{[^}]*\} (\S+)$', re.MULTILINE)
+
+
+@dataclass
+class Step:
+    name: str
+    method: str
+    url: Callable  # (profil) -> URL, ou None si l'étape ne s'applique pas
+    payload: Callable = None  # (profil, session) -> arguments de requests (json, files, data, params)
+
+
+@dataclass
+class Profile:
+    """Utilisateur virtuel : compte et objets accessibles."""
+    user_id: int
+    username: str
+    role: str
+    task_ids: list = field(default_factory=list)
+    project_ids: list = field(default_factory=list)
+    site_ids: list = field(default_factory=list)
+    country_id: int = None
+    rng: random.Random = None
+
+    def pick(self, values):
+        return self.rng.choice(values) if values else None
+
+
+def _url(name, attribute=None):
+    """URL nommée ; avec `attribute`, paramètre pk tiré au hasard dans la liste du profil."""
+    def build(profile):
+        if attribute is None:
+            return reverse(name)
+        pk = profile.pick(getattr(profile, attribute))
+        return reverse(name, kwargs={'pk': pk}) if pk else None
+    return build
+
+
+_photo_cache = {}
+
+
+def sample_photo(size):
+    """JPEG de test (dégradé bruité : la compression n'est pas triviale)."""
+    if size not in _photo_cache:
+        width, height = size, size * 3 // 4
+        image = Image.effect_noise((width, height), 64).convert('RGB')
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=90)
+        _photo_cache[size] = buffer.getvalue()
+    return _photo_cache[size]
+
+
+def _task_update_payload(profile, session):
+    return {'json': {'ticket_number': f"LT-{profile.rng.randrange(10 ** 6):06d}"}}
+
+
+def _photo_payload(profile, session):
+    return {
+        'data': {'caption': "Test de charge"},
+        'files': {'photo': ('load-test.jpg', sample_photo(session.photo_size), 'image/jpeg')},
+    }
+
+
+def _report_params(profile, session):
+    return {'params': {'country': profile.country_id}}
+
+
+JOURNEYS = {
+    'field': [
+        Step('home', 'GET', _url('home')),
+        Step('task_list', 'GET', _url('projects:team_lead_tasks_by_site')),
+        Step('task_update', 'POST', _url('projects:api_task_update', 'task_ids'), _task_update_payload),
+        Step('photo_upload', 'POST', _url('projects:api_task_photos', 'task_ids'), _photo_payload),
+        Step('task_report', 'GET', _url('projects:task_report', 'task_ids')),
+    ],
+    'coordinator': [
+        Step('home', 'GET', _url('home')),
+        Step('project_list', 'GET', _url('projects:project_list')),
+        Step('project_detail', 'GET', _url('projects:project_detail', 'project_ids')),
+        Step('site_detail', 'GET', _url('projects:site_detail', 'site_ids')),
+        Step('report_download', 'GET', _url('reporting:ran_site_list_excel'), _report_params),
+    ],
+}
+
+
+# =================================================================
+# Préparation
+# =================================================================
+
+def load_profiles(prefix, role, count, seed=0):
+    """
+    Profils du rôle parmi les comptes du jeu synthétique. S'il y a moins de
+    comptes que demandé, plusieurs utilisateurs virtuels partagent un compte.
+    """
+    roles = FIELD_ROLES if role == 'field' else COORDINATOR_ROLES
+    assignments = list(
+        EmployeeCountryAssignment.objects.filter(
+            user__username__startswith=f"{prefix.lower()}_user_", user__is_active=True,
+            role__name__in=roles, is_active=True, country__is_active=True,
+        ).order_by('user_id').values_list('user_id', 'user__username', 'country_id')
+    )
+    if role == 'field':
+        # Seuls les techniciens ayant des tâches en cours ont un parcours complet
+        with_tasks = set(
+            Task.objects.filter(assigned_to_id__in=[a[0] for a in assignments], status__in=ACTIVE_TASK_STATUSES)
+            .values_list('assigned_to_id', flat=True).distinct()
+        )
+        assignments = [a for a in assignments if a[0] in with_tasks]
+    if not assignments or not count:
+        return []
+
+    rng = random.Random(seed)
+    profiles = []
+    for index in range(count):
+        user_id, username, country_id = assignments[index % len(assignments)]
+        profile = Profile(user_id, username, role, country_id=country_id, rng=random.Random(rng.random()))
+        if role == 'field':
+            profile.task_ids = list(
+                Task.objects.filter(assigned_to_id=user_id, status__in=ACTIVE_TASK_STATUSES)
+                .order_by('pk').values_list('pk', flat=True)[:50]
+            )
+        else:
+            profile.project_ids = list(
+                Project.objects.filter(coordinator_id=user_id).order_by('pk').values_list('pk', flat=True)[:20]
+            ) or list(Project.objects.filter(country_id=country_id).order_by('pk').values_list('pk', flat=True)[:20])
+            profile.site_ids = list(
+                Site.objects.filter(project_id__in=profile.project_ids).order_by('pk').values_list('pk', flat=True)[:100]
+            )
+        profiles.append(profile)
+    return profiles
+
+
+def set_passwords(profiles, password):
+    """Même mot de passe pour les comptes des profils (un seul hachage)."""
+    user_ids = {profile.user_id for profile in profiles}
+    return CustomUser.objects.filter(pk__in=user_ids).update(password=make_password(password))
+
+
+# =================================================================
+# Exécution
+# =================================================================
+
+class Stats:
+    """Mesures partagées entre threads : (étape -> latences, erreurs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = defaultdict(list)
+        self.statuses = defaultdict(int)
+        self.completed = []  # Horodatages de fin (débit par intervalle)
+
+    def record(self, step, seconds, status, error=None):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            self.statuses[status] += 1
+            self.completed.append(time.monotonic())
+            if error:
+                self.errors[step] += 1
+                if len(self.error_samples[step]) < 5:
+                    self.error_samples[step].append(error)
+
+
+class LoadSession(requests.Session):
+    def __init__(self, base_url, timeout, photo_size):
+        super().__init__()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.photo_size = photo_size
+
+    def call(self, method, path, **kwargs):
+        headers = kwargs.pop('headers', {})
+        if method != 'GET':
+            headers['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+            headers['Referer'] = self.base_url + path
+        return self.request(method, self.base_url + path, headers=headers, timeout=self.timeout,
+                            allow_redirects=False, **kwargs)
+
+
+def _timed(stats, name, action, expected=None):
+    """
+    Exécute une requête et enregistre sa durée ; retourne la réponse ou None.
+    Erreur : exception, statut >= 400 ou statut différent de `expected`.
+    """
+    start = time.perf_counter()
+    try:
+        response = action()
+    except requests.RequestException as e:
+        stats.record(name, time.perf_counter() - start, 'exception', f"{type(e).__name__}: {e}")
+        return None
+    # Le corps est lu entièrement : un export n'est terminé qu'une fois téléchargé
+    response.content
+    elapsed = time.perf_counter() - start
+    failed = response.status_code >= 400 or (expected and response.status_code != expected)
+    error = f"HTTP {response.status_code} {response.url}" if failed else None
+    stats.record(name, elapsed, response.status_code, error)
+    return response
+
+
+def login(session, profile, password, stats):
+    login_url = reverse('users:login')
+    page = _timed(stats, 'login_page', lambda: session.call('GET', login_url))
+    if page is None or page.status_code != 200:
+        return False
+    token = CSRF_INPUT.search(page.text)
+    data = {
+        'username': profile.username, 'password': password, 'next': '',
+        'csrfmiddlewaretoken': token.group(1) if token else session.cookies.get('csrftoken', ''),
+    }
+    # Succès = redirection ; des identifiants refusés réaffichent le formulaire (200)
+    response = _timed(stats, 'login', lambda: session.call('POST', login_url, data=data), expected=302)
+    return response is not None and response.status_code == 302
+
+
+def virtual_user(profile, options, stats, deadline, start_delay):
+    time.sleep(start_delay)
+    session = LoadSession(options['base_url'], options['timeout'], options['photo_size'])
+    try:
+        if not login(session, profile, options['password'], stats):
+            return
+        steps = JOURNEYS[profile.role]
+        while time.monotonic() < deadline:
+            for step in steps:
+                if time.monotonic() >= deadline:
+                    break
+                url = step.url(profile)
+                if url is None:
+                    continue
+                kwargs = step.payload(profile, session) if step.payload else {}
+                _timed(stats, f"{profile.role}:{step.name}", lambda: session.call(step.method, url, **kwargs))
+                if options['think_time']:
+                    pause = profile.rng.expovariate(1 / options['think_time'])
+                    time.sleep(max(0, min(pause, deadline - time.monotonic())))
+    finally:
+        session.close()
+
+
+class LockSampler(threading.Thread):
+    """PostgreSQL : connexions en attente d'un verrou, échantillonnées pendant le test."""
+
+    QUERY = (
+        "SELECT count(*) FROM pg_stat_activity "
+        "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+    )
+
+    def __init__(self, interval=0.5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.finished = threading.Event()
+
+    def run(self):
+        try:
+            while not self.finished.wait(self.interval):
+                with connection.cursor() as cursor:
+                    cursor.execute(self.QUERY)
+                    self.samples.append(cursor.fetchone()[0])
+        finally:
+            connection.close()
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+def scrape_lock_errors(base_url, timeout=10):
+    """Total de db_lock_errors_total exposé par /metrics (None si inaccessible)."""
+    try:
+        response = requests.get(f"{base_url.rstrip('/')}{reverse('metrics')}", timeout=timeout)
+    except requests.RequestException:
+        return None
+    if response.status_code != 200:
+        return None
+    return sum(float(value) for value in LOCK_METRIC.findall(response.text))
+
+
+def run_load_test(profiles, options, progress=None):
+    """
+    Lance les utilisateurs virtuels pendant options['duration'] secondes
+    (démarrages étalés sur options['ramp_up']) et retourne le rapport.
+    """
+    stats = Stats()
+    lock_errors_before = scrape_lock_errors(options['base_url'])
+    sampler = LockSampler() if connection.vendor == 'postgresql' else None
+    if sampler:
+        sampler.start()
+
+    started = time.monotonic()
+    deadline = started + options['ramp_up'] + options['duration']
+    threads = []
+    for index, profile in enumerate(profiles):
+        delay = options['ramp_up'] * index / max(len(profiles), 1)
+        thread = threading.Thread(target=virtual_user, args=(profile, options, stats, deadline, delay), daemon=True)
+        thread.start()
+        threads.append(thread)
+
+    while any(thread.is_alive() for thread in threads):
+        time.sleep(1)
+        if progress and time.monotonic() < deadline:
+            progress(stats, time.monotonic() - started)
+    elapsed = time.monotonic() - started
+
+    if sampler:
+        sampler.stop()
+    lock_errors_after = scrape_lock_errors(options['base_url'])
+    return build_report(stats, profiles, options, started, elapsed, sampler, lock_errors_before, lock_errors_after)
+
+
+def summarize(latencies, errors):
+    milliseconds = [value * 1000 for value in latencies]
+    return {
+        'requests': len(milliseconds),
+        'errors': errors,
+        'error_rate': round(errors / len(milliseconds), 4) if milliseconds else 0,
+        'p50_ms': round(percentile(milliseconds, 50), 1),
+        'p95_ms': round(percentile(milliseconds, 95), 1),
+        'p99_ms': round(percentile(milliseconds, 99), 1),
+        'max_ms': round(max(milliseconds), 1),
+    }
+
+
+def build_report(stats, profiles, options, started, elapsed, sampler, lock_errors_before, lock_errors_after):
+    steps = {
+        name: summarize(latencies, stats.errors[name])
+        for name, latencies in sorted(stats.latencies.items()) if latencies
+    }
+    all_latencies = [value for latencies in stats.latencies.values() for value in latencies]
+    total_errors = sum(stats.errors.values())
+    # Débit mesuré sur la phase de charge pleine (après la montée en charge)
+    steady_start = started + options['ramp_up']
+    steady = [moment for moment in stats.completed if moment >= steady_start]
+    steady_seconds = max(started + elapsed - steady_start, 1e-9)
+
+    locks = {'errors': None}
+    if lock_errors_before is not None and lock_errors_after is not None:
+        locks['errors'] = int(lock_errors_after - lock_errors_before)
+    if sampler is not None and sampler.samples:
+        locks['waiting_max'] = max(sampler.samples)
+        locks['waiting_avg'] = round(sum(sampler.samples) / len(sampler.samples), 2)
+        locks['samples_with_waits'] = round(sum(1 for value in sampler.samples if value) / len(sampler.samples), 3)
+
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'base_url': options['base_url'],
+            'database': connection.vendor,
+            'virtual_users': dict(sorted(_count_roles(profiles).items())),
+            'accounts': len({profile.user_id for profile in profiles}),
+            'duration_s': round(elapsed, 1),
+            'ramp_up_s': options['ramp_up'],
+            'think_time_s': options['think_time'],
+        },
+        'total': {
+            **(summarize(all_latencies, total_errors) if all_latencies else {'requests': 0}),
+            'throughput_rps': round(len(steady) / steady_seconds, 1) if steady else 0,
+            'statuses': {str(status): count for status, count in sorted(stats.statuses.items(), key=str)},
+        },
+        'steps': steps,
+        'locks': locks,
+        'error_samples': {name: samples for name, samples in stats.error_samples.items()},
+    }
+
+
+def _count_roles(profiles):
+    counts = defaultdict(int)
+    for profile in profiles:
+        counts[profile.role] += 1
+    return counts
@@ -0,0 +1,87 @@
+# core/management/commands/benchmark_views.py
+
+"""
+Mesure les vues principales sur les données de la base (core.benchmarks).
+
+    python manage.py benchmark_views --output bench.json
+    python manage.py benchmark_views --compare bench.json          # échoue si régression
+    python manage.py benchmark_views --compare core/benchmark_budgets.json --only home_superuser,project_list
+
+À lancer sur une base peuplée par generate_load_dataset (jamais en production :
+les vues sont réellement exécutées et peuvent écrire sessions et compteurs).
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.benchmarks import BENCHMARKS, compare, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Mesure latence, requêtes SQL, mémoire et taille des vues principales."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=10, help="Appels mesurés par vue (défaut : 10)")
+        parser.add_argument('--warmup', type=int, default=2, help="Appels d'échauffement non mesurés (défaut : 2)")
+        parser.add_argument('--only', help="Vues à mesurer, séparées par des virgules")
+        parser.add_argument('--output', help="Fichier JSON où écrire les résultats")
+        parser.add_argument('--compare', help="Résultats ou budgets de référence (JSON) : erreur si dépassement")
+        parser.add_argument('--latency-tolerance', type=float, default=0.25,
+                            help="Marge de latence acceptée par rapport à la référence (défaut : 0.25 = +25 %%)")
+        parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Marge de pic mémoire (défaut : 0.25)")
+        parser.add_argument('--query-tolerance', type=int, default=0, help="Requêtes SQL supplémentaires tolérées (défaut : 0)")
+
+    def handle(self, *args, **options):
+        benchmarks = BENCHMARKS
+        if options['only']:
+            names = set(options['only'].split(','))
+            unknown = names - {benchmark.name for benchmark in BENCHMARKS}
+            if unknown:
+                raise CommandError(
+                    f"Vue(s) inconnue(s) : {', '.join(sorted(unknown))}. "
+                    f"Disponibles : {', '.join(benchmark.name for benchmark in BENCHMARKS)}"
+                )
+            benchmarks = [benchmark for benchmark in BENCHMARKS if benchmark.name in names]
+
+        reference = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as fh:
+                    reference = json.load(fh)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Référence illisible : {e}")
+
+        self.stdout.write(f"{'Vue':<24} {'statut':>6} {'p50 ms':>9} {'p95 ms':>9} {'requêtes':>9} {'mém. KiB':>10} {'octets':>10}")
+
+        def log(benchmark, result):
+            if result is None:
+                self.stdout.write(self.style.WARNING(f"{benchmark.name:<24} ignorée (aucun utilisateur ou aucune donnée)"))
+                return
+            self.stdout.write(
+                f"{benchmark.name:<24} {result['status']:>6} {result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} "
+                f"{result['queries']:>9} {result['peak_kib']:>10.0f} {result['bytes']:>10}"
+            )
+
+        # Le client de test utilise l'hôte « testserver » ; DEBUG coupé comme en production
+        with override_settings(ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            results = run_benchmarks(benchmarks, options['iterations'], options['warmup'], log=log)
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(results, fh, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['output']}")
+
+        if reference is not None:
+            regressions = compare(
+                results, reference,
+                latency_tolerance=options['latency_tolerance'],
+                memory_tolerance=options['memory_tolerance'],
+                query_tolerance=options['query_tolerance'],
+            )
+            for name, metric, value, limit in regressions:
+                self.stderr.write(self.style.ERROR(f"{name} : {metric} = {value} (limite {limit})"))
+            if regressions:
+                raise CommandError(f"{len(regressions)} dépassement(s) par rapport à {options['compare']}.")
+            self.stdout.write(self.style.SUCCESS(f"Aucune régression par rapport à {options['compare']}."))
@@ -0,0 +1,409 @@
+# core/management/commands/generate_load_dataset.py
+
+"""
+Génère un jeu de données synthétique volumineux et reproductible pour les
+tests de charge et les mesures de performance.
+
+    python manage.py generate_load_dataset --scale 0.1
+    python manage.py generate_load_dataset --scale 1 --seed 7 --prefix LD2
+
+À l'échelle 1 : 10 pays, 500 projets, 100 000 sites, 800 000 tâches,
+1 000 000 d'enregistrements de travaux, 200 000 dépenses et 300 000 photos.
+Chaque volume peut être fixé individuellement (--sites 5000, ...).
+
+- Insertion par bulk_create en lots, une transaction par lot.
+- Graine fixe (--seed) : même graine, même échelle et même date de fin
+  (--until) donnent les mêmes données.
+- Tous les objets portent le préfixe --prefix (codes pays, noms, IDs client)
+  pour être reconnaissables ; un préfixe déjà utilisé est refusé.
+- Les photos pointent vers quelques fichiers JPEG de substitution partagés.
+- bulk_create n'émet pas de signaux : le registre des coûts et les tables
+  de faits sont recalculés à la fin (sauf --skip-derived).
+"""
+
+import datetime
+import random
+import time
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from core.registry import registry
+from data_analytics.facts import rebuild_all
+from finance.ledger import rebuild_ledger
+from finance.models import Depense
+from projects.models import (
+    Client,
+    Project,
+    ProjectType,
+    Site,
+    Task,
+    TaskPhoto,
+    TaskResultType,
+    TaskType,
+    WorkCompletionRecord,
+)
+from users.models import Country, CustomUser, EmployeeCountryAssignment, Role
+
+PROFILE = {
+    'countries': 10,
+    'employees': 5_000,
+    'projects': 500,
+    'sites': 100_000,
+    'tasks': 800_000,
+    'work_records': 1_000_000,
+    'expenses': 200_000,
+    'photos': 300_000,
+}
+ROLES = ("Country Manager", "Coordinateur de projet", "Field Team", "Technician", "Rigger")
+FIELD_ROLES = ROLES[2:]
+TASK_STATUSES = (("COMPLETED", 55), ("IN_PROGRESS", 15), ("TO_DO", 20), ("QC_PENDING", 6), ("BLOCKED", 4))
+SITE_STATUSES = (("TO_DO", 20), ("IN_PROGRESS", 35), ("SRS_COMPLETED", 15), ("IMK_COMPLETED", 10), ("COMPLETED", 20))
+PROJECT_STATUSES = (("PREPARATION", 10), ("IN_PROGRESS", 50), ("COMPLETED", 20), ("INVOICED", 10), ("PAID", 10))
+EXPENSE_CATEGORIES = (
+    ("CARBURANT", 30), ("TRANSPORT", 15), ("ACHAT_MATERIEL", 15), ("SOUS_TRAITANT", 10),
+    ("REPARATION_VEHICULE", 8), ("LOYER", 5), ("ELECTRICITE", 4), ("AUTRE", 13),
+)
+GENERIC_TASK_TYPES = (
+    ("Survey", "SURVEY", "PREPARATION"),
+    ("Installation", "INSTALL", "INSTALLATION"),
+    ("Intégration", "INTEG", "TESTING"),
+    ("Contrôle qualité", "QA", "CLOSURE"),
+)
+PLACEHOLDER_DIR = "task_photos/load"
+HOURLY_RATE = Decimal("6.25")
+
+
+def _weighted(rng, table):
+    values, weights = zip(*table)
+    return rng.choices(values, weights)[0]
+
+
+class Command(BaseCommand):
+    help = "Génère un jeu de données synthétique volumineux et reproductible (tests de charge)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=0.01,
+                            help="Facteur appliqué au profil de référence (1 = 100 000 sites). Défaut : 0.01")
+        for name, count in PROFILE.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, dest=name,
+                                help=f"Nombre de lignes (défaut : {count:,} x échelle)")
+        parser.add_argument('--seed', type=int, default=42, help="Graine aléatoire (défaut : 42)")
+        parser.add_argument('--prefix', default='LD', help="Préfixe des objets générés (3 caractères max., défaut : LD)")
+        parser.add_argument('--until', type=datetime.date.fromisoformat, default=None,
+                            help="Date de fin des données (AAAA-MM-JJ, défaut : aujourd'hui)")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Taille des lots d'insertion")
+        parser.add_argument('--placeholders', type=int, default=16, help="Nombre de fichiers photo de substitution")
+        parser.add_argument('--skip-derived', action='store_true',
+                            help="Ne pas recalculer le registre des coûts ni les tables de faits")
+
+    # =================================================================
+    # Outils
+    # =================================================================
+
+    def _insert(self, model, objects):
+        """bulk_create ; renseigne les clés primaires si la base ne les retourne pas."""
+        if not objects:
+            return objects
+        returns_pks = connections[model.objects.db].features.can_return_rows_from_bulk_insert
+        before = 0 if returns_pks else (model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0)
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if not returns_pks:
+            pks = model.objects.filter(pk__gt=before).order_by('pk').values_list('pk', flat=True)
+            for obj, pk in zip(created, pks):
+                obj.pk = pk
+        return created
+
+    def _step(self, label, count):
+        elapsed = time.monotonic() - self._clock
+        self.stdout.write(f"  {label:<28} {count:>10,}   ({elapsed:6.1f} s)")
+
+    def _date_between(self, start, end):
+        days = (end - start).days
+        return start + datetime.timedelta(days=self.rng.randint(0, max(days, 0)))
+
+    @staticmethod
+    def _aware(day):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+
+    def _chunks(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    # =================================================================
+    # Génération
+    # =================================================================
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name] if options[name] is not None else max(1, round(count * options['scale']))
+            for name, count in PROFILE.items()
+        }
+        self.rng = random.Random(options['seed'])
+        self.seed = options['seed']
+        self.prefix = options['prefix'].upper()
+        self.batch_size = options['batch_size']
+        self.placeholder_count = options['placeholders']
+        self.until = options['until'] or datetime.date.today()
+        self.since = self.until - datetime.timedelta(days=3 * 365)
+
+        if not 1 <= len(self.prefix) <= 3:
+            raise CommandError("Le préfixe doit faire 1 à 3 caractères (codes pays sur 5 caractères).")
+        if Country.objects.filter(code__startswith=self.prefix).exists():
+            raise CommandError(
+                f"Des données avec le préfixe « {self.prefix} » existent déjà : "
+                f"choisissez un autre --prefix ou une base vide."
+            )
+        if counts['countries'] > 99:
+            raise CommandError("99 pays au maximum (codes pays sur 5 caractères).")
+
+        self.stdout.write(
+            f"Génération (graine {options['seed']}, préfixe {self.prefix}) : "
+            + ", ".join(f"{name} {count:,}" for name, count in counts.items())
+        )
+        self._clock = time.monotonic()
+
+        with transaction.atomic():
+            countries = self._countries(counts['countries'])
+            employees = self._employees(counts['employees'], countries)
+            projects = self._projects(counts['projects'], countries, employees)
+            task_types, result_types = self._task_types()
+        sites = self._sites(counts['sites'], projects, employees)
+        self._tasks(counts, sites, employees, task_types, result_types)
+        self._expenses(counts['expenses'], projects, sites, employees)
+
+        if not options['skip_derived']:
+            self._step("Registre des coûts", rebuild_ledger())
+            self._step("Tables de faits", rebuild_all())
+        self.stdout.write(self.style.SUCCESS(f"Jeu de données généré en {time.monotonic() - self._clock:.1f} s."))
+
+    def _countries(self, count):
+        countries = self._insert(Country, [
+            Country(name=f"{self.prefix} Pays {index:02d}", code=f"{self.prefix}{index:02d}", is_active=True)
+            for index in range(1, count + 1)
+        ])
+        registry.invalidate(Country)  # bulk_create n'émet pas de signaux
+        self._step("Pays", len(countries))
+        return [country.pk for country in countries]
+
+    def _employees(self, count, countries):
+        """Employés répartis entre les pays ; chaque pays a un CM et des coordinateurs."""
+        roles = {name: Role.objects.get_or_create(name=name)[0].pk for name in ROLES}
+        password = make_password(None)  # Mot de passe inutilisable : aucun hachage coûteux
+        users = self._insert(CustomUser, [
+            CustomUser(
+                username=f"{self.prefix.lower()}_user_{index:06d}",
+                first_name=f"Prénom{index}",
+                last_name=f"{self.prefix} Employé",
+                email=f"{self.prefix.lower()}_user_{index:06d}@example.com",
+                password=password,
+                hire_date=self._date_between(self.since, self.until),
+                statut_actuel=_weighted(self.rng, (("ACTIF", 92), ("EN_CONGE", 5), ("INACTIF", 3))),
+                salaire_mensuel_base=Decimal(self.rng.randrange(300, 1500, 25)),
+            )
+            for index in range(count)
+        ])
+
+        by_country = {country: {'cm': [], 'coordinators': [], 'field': []} for country in countries}
+        assignments = []
+        for index, user in enumerate(users):
+            country = countries[index % len(countries)]
+            group = by_country[country]
+            if not group['cm']:
+                role, bucket = "Country Manager", 'cm'
+            elif len(group['coordinators']) < max(1, len(users) // len(countries) // 20):
+                role, bucket = "Coordinateur de projet", 'coordinators'
+            else:
+                role, bucket = self.rng.choice(FIELD_ROLES), 'field'
+            group[bucket].append(user.pk)
+            assignments.append(EmployeeCountryAssignment(
+                user_id=user.pk, country_id=country, role_id=roles[role],
+                start_date=user.hire_date, is_active=True,
+            ))
+        for group in by_country.values():
+            group['field'] = group['field'] or group['coordinators'] or group['cm']
+        self._insert(EmployeeCountryAssignment, assignments)
+        self._step("Employés", len(users))
+        return by_country
+
+    def _projects(self, count, countries, employees):
+        client = Client.objects.get_or_create(name=f"{self.prefix} Client")[0]
+        project_types = [
+            ProjectType.objects.get_or_create(name=f"{self.prefix} {name}", defaults={'is_transmission': transmission})[0].pk
+            for name, transmission in (("RAN", False), ("Transmission", True))
+        ]
+        projects = []
+        for index in range(count):
+            country = countries[index % len(countries)]
+            start = self._date_between(self.since, self.until - datetime.timedelta(days=30))
+            projects.append(Project(
+                country_id=country,
+                client=client,
+                name=f"{self.prefix} Projet {index:05d}",
+                budget_alloue=Decimal(self.rng.randrange(50_000, 2_000_000, 1000)),
+                statut=_weighted(self.rng, PROJECT_STATUSES),
+                coordinator_id=self.rng.choice(employees[country]['coordinators'] or employees[country]['cm']),
+                start_date=start,
+                end_date=start + datetime.timedelta(days=self.rng.randint(90, 540)),
+                is_active=True,
+                project_type_id=project_types[0] if self.rng.random() < 0.8 else project_types[1],
+            ))
+        projects = self._insert(Project, projects)
+        self._step("Projets", len(projects))
+        # Poids : quelques gros projets et beaucoup de petits
+        return [(project.pk, project.country_id, project.start_date, self.rng.paretovariate(1.5)) for project in projects]
+
+    def _task_types(self):
+        task_types = list(TaskType.objects.filter(is_active=True).values_list('pk', flat=True))
+        if not task_types:
+            task_types = [
+                TaskType.objects.get_or_create(
+                    code=f"{self.prefix}_{code}", defaults={'name': name, 'category': category},
+                )[0].pk
+                for name, code, category in GENERIC_TASK_TYPES
+            ]
+        result_types = list(TaskResultType.objects.values_list('pk', flat=True))
+        return task_types, result_types
+
+    def _sites(self, count, projects, employees):
+        """Retourne [(id, projet, pays, date de début)] ; une transaction par lot."""
+        weights = [project[3] for project in projects]
+        sites = []
+        for start, size in self._chunks(count):
+            chosen = self.rng.choices(projects, weights, k=size)
+            batch = []
+            for offset, (project_id, country, project_start, _) in enumerate(chosen):
+                index = start + offset
+                site_start = self._date_between(project_start, self.until)
+                batch.append(Site(
+                    project_id=project_id,
+                    site_id_client=f"{self.prefix}-{index:07d}",
+                    name=f"{self.prefix} Site {index:07d}",
+                    location=f"Zone {self.rng.randint(1, 400)}",
+                    team_lead_id=self.rng.choice(employees[country]['field']),
+                    start_date=site_start,
+                    end_date=site_start + datetime.timedelta(days=self.rng.randint(5, 120)),
+                    status=_weighted(self.rng, SITE_STATUSES),
+                    progress_percentage=Decimal(self.rng.randint(0, 100)),
+                    prix_facturation=Decimal(self.rng.randrange(500, 20_000, 50)),
+                    po_recu=self.rng.random() < 0.6,
+                ))
+            with transaction.atomic():
+                batch = self._insert(Site, batch)
+            sites.extend(
+                (site.pk, site.project_id, project[1], site.start_date) for site, project in zip(batch, chosen)
+            )
+        self._step("Sites", len(sites))
+        return sites
+
+    def _tasks(self, counts, sites, employees, task_types, result_types):
+        """Tâches par lot de sites, puis leurs enregistrements de travaux et photos."""
+        tasks_per_site = counts['tasks'] / len(sites)
+        records_per_task = counts['work_records'] / max(counts['tasks'], 1)
+        photos_per_task = counts['photos'] / max(counts['tasks'], 1)
+        placeholders = self._placeholders()
+        totals = {'tasks': 0, 'work_records': 0, 'photos': 0}
+
+        def draw(average):
+            whole = int(average)
+            return whole + (self.rng.random() < average - whole)
+
+        site_batch = max(1, int(self.batch_size / max(tasks_per_site, 1)))
+        for start in range(0, len(sites), site_batch):
+            tasks, meta = [], []
+            for site_id, _, country, site_start in sites[start:start + site_batch]:
+                for _ in range(draw(tasks_per_site)):
+                    status = _weighted(self.rng, TASK_STATUSES)
+                    done = status == "COMPLETED"
+                    due = self._date_between(site_start, site_start + datetime.timedelta(days=90))
+                    assignee = self.rng.choice(employees[country]['field'])
+                    tasks.append(Task(
+                        site_id=site_id,
+                        task_type_id=self.rng.choice(task_types),
+                        description=f"{self.prefix} tâche",
+                        assigned_to_id=assignee,
+                        due_date=due,
+                        status=status,
+                        progress_percentage=100 if done else self.rng.choice((0, 25, 50, 75)),
+                        result_type_id=self.rng.choice(result_types) if done and result_types else None,
+                        completion_date=self._aware(min(due, self.until)) if done else None,
+                    ))
+                    meta.append((assignee, due))
+
+            with transaction.atomic():
+                tasks = self._insert(Task, tasks)
+                records, photos = [], []
+                for task, (assignee, due) in zip(tasks, meta):
+                    for _ in range(draw(records_per_task)):
+                        hours = Decimal(self.rng.choice((2, 4, 6, 8)))
+                        work_date = min(due, self.until)
+                        records.append(WorkCompletionRecord(
+                            task_id=task.pk, employee_id=assignee, date=work_date,
+                            duration_hours=hours, completion_percentage=self.rng.choice((25, 50, 100)),
+                            hourly_rate_used=HOURLY_RATE, cost=hours * HOURLY_RATE,
+                            is_paid_out=(self.until - work_date).days > 60,
+                        ))
+                    for _ in range(draw(photos_per_task)):
+                        photos.append(TaskPhoto(
+                            task_id=task.pk, photo=self.rng.choice(placeholders),
+                            caption=f"{self.prefix} photo", uploaded_by_id=assignee,
+                        ))
+                WorkCompletionRecord.objects.bulk_create(records, batch_size=self.batch_size)
+                TaskPhoto.objects.bulk_create(photos, batch_size=self.batch_size)
+            totals['tasks'] += len(tasks)
+            totals['work_records'] += len(records)
+            totals['photos'] += len(photos)
+
+        self._step("Tâches", totals['tasks'])
+        self._step("Enregistrements de travaux", totals['work_records'])
+        self._step("Photos", totals['photos'])
+
+    def _placeholders(self):
+        """Quelques petits JPEG partagés par toutes les photos générées."""
+        # Générateur distinct : que les fichiers existent déjà ou non, les tirages
+        # du jeu de données restent les mêmes pour une graine donnée
+        rng = random.Random(self.seed)
+        names = []
+        for index in range(max(1, self.placeholder_count)):
+            name = f"{PLACEHOLDER_DIR}/{self.prefix.lower()}_{index:03d}.jpg"
+            if not default_storage.exists(name):
+                output = BytesIO()
+                color = tuple(rng.randrange(256) for _ in range(3))
+                Image.new('RGB', (64, 48), color).save(output, format='JPEG', quality=60)
+                name = default_storage.save(name, ContentFile(output.getvalue()))
+            names.append(name)
+        return names
+
+    def _expenses(self, count, projects, sites, employees):
+        project_country = {project[0]: project[1] for project in projects}
+        total = 0
+        for start, size in self._chunks(count):
+            batch = []
+            for offset in range(size):
+                # 70 % des dépenses rattachées à un site (et à son projet), les autres au projet seul
+                if self.rng.random() < 0.7:
+                    site_id, project_id, country, site_start = self.rng.choice(sites)
+                else:
+                    site_id, site_start = None, self.since
+                    project_id = self.rng.choice(projects)[0]
+                    country = project_country[project_id]
+                batch.append(Depense(
+                    date=self._date_between(site_start, self.until),
+                    montant=Decimal(self.rng.randrange(500, 500_000, 100)) / 100,
+                    description=f"{self.prefix} dépense {start + offset:07d}",
+                    categorie=_weighted(self.rng, EXPENSE_CATEGORIES),
+                    projet_associe_id=project_id,
+                    site_concerne_id=site_id,
+                    employe_declarant_id=self.rng.choice(employees[country]['field']),
+                ))
+            with transaction.atomic():
+                Depense.objects.bulk_create(batch, batch_size=self.batch_size)
+            total += len(batch)
+        self._step("Dépenses", total)
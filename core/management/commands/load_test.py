@@ -0,0 +1,158 @@
+# core/management/commands/load_test.py
+
+"""
+Test de charge local : parcours terrain et coordinateur en parallèle (core.loadtest).
+
+    python manage.py generate_load_dataset --scale 0.05
+    python manage.py load_test --technicians 200 --coordinators 30 --duration 120
+    python manage.py load_test --url http://127.0.0.1:8000 --output charge.json
+
+Sans --url, un serveur de développement (runserver, un processus multi-
+threadé) est démarré sur la même base pour la durée du test. Pour
+dimensionner les workers, démarrer soi-même le serveur de production
+(même base, METRICS_DIR défini) avec le nombre de workers voulu et le
+cibler avec --url.
+
+Jamais en production : le test écrit réellement (tâches, photos) et fixe le
+mot de passe des comptes du jeu synthétique.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core.loadtest import load_profiles, run_load_test, set_passwords
+
+
+class Command(BaseCommand):
+    help = "Charge HTTP concurrente : parcours par rôle, débit, latences, erreurs et verrous."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help="Serveur déjà démarré (défaut : runserver lancé par la commande)")
+        parser.add_argument('--prefix', default='LD', help="Préfixe du jeu synthétique (défaut : LD)")
+        parser.add_argument('--technicians', type=int, default=200, help="Utilisateurs virtuels terrain (défaut : 200)")
+        parser.add_argument('--coordinators', type=int, default=30, help="Utilisateurs virtuels coordinateurs (défaut : 30)")
+        parser.add_argument('--duration', type=int, default=60, help="Durée de la charge pleine en secondes (défaut : 60)")
+        parser.add_argument('--ramp-up', type=int, default=10, help="Étalement des connexions en secondes (défaut : 10)")
+        parser.add_argument('--think-time', type=float, default=1.0,
+                            help="Pause moyenne entre deux étapes en secondes (défaut : 1 ; 0 = sans pause)")
+        parser.add_argument('--timeout', type=float, default=60, help="Délai maximal d'une requête (défaut : 60 s)")
+        parser.add_argument('--photo-size', type=int, default=1600, help="Largeur des photos envoyées (défaut : 1600 px)")
+        parser.add_argument('--password', default='load-test', help="Mot de passe fixé sur les comptes du jeu (défaut : load-test)")
+        parser.add_argument('--seed', type=int, default=42, help="Graine des choix aléatoires (défaut : 42)")
+        parser.add_argument('--output', help="Fichier JSON où écrire le rapport")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        profiles = (
+            load_profiles(prefix, 'field', options['technicians'], options['seed'])
+            + load_profiles(prefix, 'coordinator', options['coordinators'], options['seed'] + 1)
+        )
+        if not profiles:
+            raise CommandError(
+                f"Aucun compte du jeu « {prefix} » utilisable. Lancer d'abord generate_load_dataset --prefix {prefix}."
+            )
+        set_passwords(profiles, options['password'])
+        accounts = len({profile.user_id for profile in profiles})
+        self.stdout.write(f"{len(profiles)} utilisateurs virtuels sur {accounts} comptes.")
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server, base_url = self._start_server()
+        options['base_url'] = base_url
+
+        last_report = [0]
+
+        def progress(stats, elapsed):
+            if elapsed - last_report[0] < 5:
+                return
+            last_report[0] = elapsed
+            self.stdout.write(
+                f"  {elapsed:6.0f} s  {len(stats.completed):>8} requêtes  {sum(stats.errors.values()):>6} erreurs"
+            )
+
+        try:
+            self.stdout.write(f"Charge sur {base_url} : {options['ramp_up']} s de montée puis {options['duration']} s.")
+            report = run_load_test(profiles, options, progress=progress)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+        self._print(report)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"Rapport écrit dans {options['output']}")
+
+    def _start_server(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        base_url = f"http://127.0.0.1:{port}"
+        server = subprocess.Popen(
+            [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', f"127.0.0.1:{port}",
+             '--noreload', '--skip-checks'],
+            cwd=settings.BASE_DIR, env=os.environ.copy(),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"Le serveur de test s'est arrêté (code {server.returncode}).")
+            try:
+                response = requests.get(base_url + reverse('users:login'), timeout=5)
+            except requests.RequestException:
+                time.sleep(0.5)
+                continue
+            if response.status_code == 400:
+                server.terminate()
+                raise CommandError("Requête refusée par le serveur : ajouter 127.0.0.1 à ALLOWED_HOSTS.")
+            self.stdout.write(f"Serveur de test démarré sur {base_url}.")
+            return server, base_url
+        server.terminate()
+        raise CommandError("Le serveur de test n'a pas répondu dans les 60 s.")
+
+    def _print(self, report):
+        total = report['total']
+        self.stdout.write("")
+        self.stdout.write(f"{'Étape':<28} {'requêtes':>9} {'erreurs':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for name, step in report['steps'].items():
+            line = (
+                f"{name:<28} {step['requests']:>9} {step['errors']:>8} {step['p50_ms']:>9.0f} "
+                f"{step['p95_ms']:>9.0f} {step['p99_ms']:>9.0f} {step['max_ms']:>9.0f}"
+            )
+            self.stdout.write(self.style.ERROR(line) if step['errors'] else line)
+        if not total['requests']:
+            raise CommandError("Aucune requête aboutie.")
+        self.stdout.write("")
+        self.stdout.write(
+            f"Total : {total['requests']} requêtes, débit {total['throughput_rps']} req/s, "
+            f"p95 {total['p95_ms']:.0f} ms, erreurs {total['error_rate']:.2%} "
+            f"(statuts : {', '.join(f'{status}={count}' for status, count in total['statuses'].items())})"
+        )
+
+        locks = report['locks']
+        lock_line = "Verrous : " + (
+            f"{locks['errors']} erreur(s) de verrou côté serveur" if locks['errors'] is not None
+            else "/metrics inaccessible, erreurs de verrou non relevées"
+        )
+        if 'waiting_max' in locks:
+            lock_line += (
+                f" ; connexions en attente max {locks['waiting_max']}, moyenne {locks['waiting_avg']}, "
+                f"{locks['samples_with_waits']:.0%} des relevés avec attente"
+            )
+        self.stdout.write(self.style.WARNING(lock_line) if locks['errors'] else lock_line)
+
+        for name, samples in report['error_samples'].items():
+            for sample in samples:
+                self.stdout.write(self.style.ERROR(f"  {name} : {sample}"))
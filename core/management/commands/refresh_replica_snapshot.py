@@ -0,0 +1,28 @@
+# core/management/commands/refresh_replica_snapshot.py
+
+"""
+Recopie la base SQLite principale vers l'instantané servant de réplique
+(DATABASE_REPLICA_URL=sqlite:///...). Planifiée toutes les 5 minutes
+(core.jobs.rafraichir_replique) ; la commande permet un rafraîchissement
+immédiat, par exemple avant un rapport de fin de mois.
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.replica import refresh_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rafraîchit l'instantané SQLite de la réplique de lecture."
+
+    def handle(self, *args, **options):
+        if not settings.REPLICA_SNAPSHOT_PATH:
+            raise CommandError("Aucun instantané configuré : DATABASE_REPLICA_URL doit désigner un fichier SQLite.")
+        if connection.vendor != 'sqlite':
+            raise CommandError("L'instantané n'est possible que depuis une base principale SQLite.")
+        seconds = refresh_snapshot(connection.settings_dict['NAME'], settings.REPLICA_SNAPSHOT_PATH)
+        self.stdout.write(self.style.SUCCESS(
+            f"Instantané {settings.REPLICA_SNAPSHOT_PATH} rafraîchi en {seconds:.1f} s."
+        ))
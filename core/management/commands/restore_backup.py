@@ -0,0 +1,45 @@
+# core/management/commands/restore_backup.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.backup import BackupError, GoogleDriveTarget, LocalDirectoryTarget, restore_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Restaure (ou vérifie) un instantané de sauvegarde incrémentale : "
+        "base SQLite + media, avec contrôle des empreintes SHA-256."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('destination', type=str, help="Dossier où restaurer db.sqlite3 et media/.")
+        parser.add_argument('--source', type=str, help="Dossier local contenant la sauvegarde (sinon Google Drive).")
+        parser.add_argument('--snapshot', type=str, help="Identifiant de l'instantané (par défaut : le plus récent).")
+        parser.add_argument('--verify-only', action='store_true', help="Vérifie les empreintes sans rien écrire.")
+
+    def handle(self, *args, **options):
+        if options['source']:
+            target = LocalDirectoryTarget(options['source'])
+        else:
+            # Import local : pydrive2 et settings.yaml ne sont nécessaires que pour Drive
+            from backup_to_drive import DRIVE_FOLDER_NAME, authenticate_drive, find_or_create_folder
+            drive = authenticate_drive()
+            target = GoogleDriveTarget(drive, find_or_create_folder(drive, DRIVE_FOLDER_NAME))
+
+        try:
+            errors = restore_snapshot(
+                target,
+                options['destination'],
+                snapshot_id=options['snapshot'],
+                verify_only=options['verify_only'],
+                log=self.stdout.write,
+            )
+        except BackupError as e:
+            raise CommandError(str(e))
+
+        if errors:
+            for error in errors:
+                self.stderr.write(self.style.ERROR(f"❌ {error}"))
+            raise CommandError(f"{len(errors)} objet(s) corrompu(s) dans la sauvegarde.")
+
+        self.stdout.write(self.style.SUCCESS("✅ Sauvegarde vérifiée avec succès."))
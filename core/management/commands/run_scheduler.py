@@ -0,0 +1,73 @@
+# core/management/commands/run_scheduler.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core import scheduler
+from core.models import JobRun, ScheduledJob
+
+
+class Command(BaseCommand):
+    help = (
+        "Lance le planificateur de tâches périodiques (plannings cron stockés en base). "
+        "Une seule instance exécute les tâches grâce à un bail en base de données."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Exécute les tâches échues puis s'arrête (usage depuis cron/systemd).")
+        parser.add_argument('--run', type=str, metavar='NOM', help="Exécute immédiatement une tâche, quel que soit son planning.")
+        parser.add_argument('--list', action='store_true', help="Affiche les tâches et leur prochaine exécution.")
+        parser.add_argument('--lease-ttl', type=int, default=300, help="Durée du bail en secondes (défaut : 300).")
+
+    def handle(self, *args, **options):
+        scheduler.autodiscover()
+        scheduler.sync_jobs()
+
+        if options['list']:
+            for job in ScheduledJob.objects.all():
+                state = "" if job.enabled else " (désactivée)"
+                self.stdout.write(f"{job.name:<40} {job.schedule:<18} prochaine : {job.next_run_at}{state}")
+            return
+
+        if options['run']:
+            job = ScheduledJob.objects.filter(name=options['run'], name__in=list(scheduler.registry)).first()
+            if job is None:
+                raise CommandError(f"Tâche inconnue : {options['run']}")
+            self._run(job)
+            return
+
+        owner = scheduler.default_owner()
+        ttl = options['lease_ttl']
+        self.stdout.write(f"Planificateur démarré ({owner}), {len(scheduler.registry)} tâche(s) enregistrée(s).")
+        try:
+            while True:
+                close_old_connections()
+                if scheduler.acquire_lease(owner, ttl):
+                    for job in scheduler.due_jobs():
+                        # Le bail est renouvelé avant chaque tâche
+                        if not scheduler.acquire_lease(owner, ttl):
+                            break
+                        # Échéance réservée avant l'exécution : une tâche plus longue que le bail
+                        # n'est pas reprise par une autre instance
+                        if scheduler.claim_run(job):
+                            self._run(job)
+                elif options['once']:
+                    self.stdout.write("Bail détenu par une autre instance : rien à faire.")
+
+                if options['once']:
+                    break
+                time.sleep(scheduler.seconds_until_next_job(maximum=min(60, ttl / 3)))
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé.")
+        finally:
+            scheduler.release_lease(owner)
+
+    def _run(self, job):
+        status, message = scheduler.run_job(job)
+        line = f"{job.name} : {status}" + (f" — {message.strip().splitlines()[-1]}" if message else "")
+        if status == JobRun.STATUS_SUCCESS:
+            self.stdout.write(self.style.SUCCESS(line))
+        else:
+            self.stderr.write(self.style.ERROR(line))
@@ -0,0 +1,67 @@
+# core/management/commands/sqlite_maintenance.py
+
+"""
+Maintenance de la base SQLite (core.sqlite) avec mesures avant / après.
+
+    python manage.py sqlite_maintenance
+    python manage.py sqlite_maintenance --vacuum-pages 5000 --no-analyze
+    python manage.py sqlite_maintenance --enable-incremental-vacuum   # une fois, base bloquée
+
+Également planifiée chaque semaine (core.jobs.maintenance_sqlite).
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.sqlite import run_maintenance
+
+
+def _mib(value):
+    return f"{value / 1024 / 1024:.1f} Mio"
+
+
+ROWS = [
+    ("Fichier", 'file_bytes', _mib),
+    ("WAL", 'wal_bytes', _mib),
+    ("Pages", 'page_count', str),
+    ("Pages libres", 'freelist_count', str),
+    ("Taille de page", 'page_size', str),
+    ("Journal", 'journal_mode', str),
+    ("auto_vacuum", 'auto_vacuum', str),
+    ("Index analysés", 'analyzed_indexes', str),
+]
+
+
+class Command(BaseCommand):
+    help = "ANALYZE, PRAGMA optimize, vacuum incrémental et point de contrôle WAL de la base SQLite."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-analyze', action='store_true', help="Ne pas lancer ANALYZE (PRAGMA optimize seul)")
+        parser.add_argument('--vacuum-pages', type=int, default=0,
+                            help="Pages libres à rendre au système (défaut : 0 = toutes)")
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help="Passer la base en auto_vacuum=INCREMENTAL (VACUUM complet, base bloquée)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"La base par défaut n'est pas SQLite ({connection.vendor}) : rien à faire.")
+
+        before, after, steps = run_maintenance(
+            analyze=not options['no_analyze'],
+            vacuum_pages=options['vacuum_pages'],
+            enable_incremental_vacuum=options['enable_incremental_vacuum'],
+        )
+
+        for label, seconds in steps:
+            self.stdout.write(f"  {label:<34} {seconds:8.2f} s")
+        self.stdout.write("")
+        self.stdout.write(f"{'':<16} {'avant':>12} {'après':>12}")
+        for label, key, fmt in ROWS:
+            self.stdout.write(f"{label:<16} {fmt(before[key]):>12} {fmt(after[key]):>12}")
+
+        if after['auto_vacuum'] != 'INCREMENTAL':
+            self.stdout.write(self.style.WARNING(
+                "auto_vacuum n'est pas INCREMENTAL : les pages libres ne sont pas rendues au système "
+                "(--enable-incremental-vacuum, une fois, hors heures d'activité)."
+            ))
+        self.stdout.write(self.style.SUCCESS("Maintenance terminée."))
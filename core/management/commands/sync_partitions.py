@@ -0,0 +1,109 @@
+# core/management/commands/sync_partitions.py
+
+"""
+Préparation et alimentation des bases par groupe de pays (core.partitions).
+
+    python manage.py migrate --database ouest           # tables de la partition
+    python manage.py sync_partitions --reserve-ids      # une fois, avant toute écriture
+    python manage.py sync_partitions                    # référence centrale -> partitions
+    python manage.py sync_partitions --move-country SEN # données existantes du pays -> sa base
+
+Sans option, recopie dans chaque partition les données de référence dont
+dépendent les modèles partitionnés (utilisateurs, pays, listes de valeurs,
+véhicules...). Les enregistrements ordinaires sont recopiés aussitôt
+(signaux, core.partitions) et la tâche core.synchroniser_partitions relance
+la copie chaque heure ; la commande sert à la mise en place et après une
+modification en masse. La partition en reçoit une copie exacte ; une ligne
+supprimée au centre mais encore utilisée par la partition fait échouer la
+copie (rien n'est modifié).
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+
+from core.partitions import (
+    ID_RANGE,
+    PARTITIONED_MODELS,
+    copy_reference,
+    copy_rows,
+    partition_aliases,
+    partitioned_models,
+)
+
+
+class Command(BaseCommand):
+    help = "Plages d'identifiants, copie de la référence et déplacement d'un pays vers les bases par groupe de pays."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reserve-ids', action='store_true',
+                            help="Placer les identifiants de chaque partition dans sa propre plage")
+        parser.add_argument('--move-country', metavar='CODE',
+                            help="Déplacer les données existantes du pays de la base centrale vers sa partition")
+
+    def handle(self, *args, **options):
+        aliases = partition_aliases()
+        if not aliases:
+            raise CommandError("COUNTRY_PARTITIONS n'est pas configuré : aucune partition.")
+
+        if options['reserve_ids']:
+            for index, alias in enumerate(aliases, start=1):
+                self.reserve_ids(alias, index * ID_RANGE)
+        for alias in aliases:
+            self.copy_reference(alias)
+        if options['move_country']:
+            self.move_country(options['move_country'].upper())
+        self.stdout.write(self.style.SUCCESS("Partitions à jour."))
+
+    def reserve_ids(self, alias, start):
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            for model in partitioned_models():
+                table = model._meta.db_table
+                current = model._base_manager.using(alias).aggregate(last=Max('pk'))['last'] or 0
+                value = max(start, current)
+                if connection.vendor == 'postgresql':
+                    cursor.execute("SELECT setval(pg_get_serial_sequence(%s, %s), %s)",
+                                   [table, model._meta.pk.column, value])
+                elif connection.vendor == 'sqlite':
+                    cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s", [value, table])
+                    if not cursor.rowcount:
+                        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)", [table, value])
+                else:
+                    raise CommandError(f"Plages d'identifiants non gérées pour le moteur « {connection.vendor} ».")
+        self.stdout.write(f"{alias} : identifiants à partir de {start + 1}")
+
+    def copy_reference(self, alias):
+        copied = copy_reference(alias)
+        self.stdout.write(f"{alias} : {copied} ligne(s) de référence")
+
+    def move_country(self, code):
+        alias = settings.COUNTRY_PARTITIONS.get(code)
+        if alias is None:
+            raise CommandError(f"Le pays {code} n'est dans aucun groupe de COUNTRY_PARTITIONS.")
+
+        querysets = []
+        for model in partitioned_models():
+            path = PARTITIONED_MODELS[model._meta.label]
+            if path is None:
+                continue
+            querysets.append(model._base_manager.using(DEFAULT_DB_ALIAS).filter(**{f'{path}__code': code}))
+            for field in model._meta.many_to_many:
+                through = field.remote_field.through
+                if through._meta.auto_created:
+                    querysets.append(through._base_manager.using(DEFAULT_DB_ALIAS).filter(
+                        **{f'{field.m2m_field_name()}__{path}__code': code}
+                    ))
+
+        with transaction.atomic(using=alias):
+            for queryset in querysets:
+                copied = copy_rows(queryset, alias)
+                self.stdout.write(f"  {queryset.model._meta.label:<40} {copied:>8}")
+
+        # Suppression au centre sans signaux (journal de synchronisation, registre et faits inchangés),
+        # enfants d'abord ; une référence centrale restante (paie...) annule la suppression
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            for queryset in reversed(querysets):
+                queryset._raw_delete(DEFAULT_DB_ALIAS)
+        self.stdout.write(f"{code} déplacé vers {alias}")
@@ -0,0 +1,315 @@
+# core/metrics.py
+
+"""
+Métriques applicatives au format texte Prometheus (vue /metrics).
+
+- Compteurs, jauges et histogrammes agrégés en mémoire dans chaque
+  processus (inc, set_gauge, observe, timed), protégés par un verrou.
+- Multiprocessus (workers gunicorn, planificateur, pools) : si METRICS_DIR
+  est défini, chaque processus y recopie régulièrement ses valeurs dans un
+  fichier qui lui est propre (au plus toutes les METRICS_FLUSH_SECONDS, et
+  à l'arrêt). La vue /metrics additionne tous les fichiers du dossier : les
+  valeurs d'un worker arrêté restent comptées, comme attendu pour des
+  compteurs cumulés.
+- Un processus issu d'un fork (pools de rendu PDF) repart de valeurs vides
+  et d'un fichier neuf : les valeurs du parent ne sont pas comptées deux fois.
+- Sans METRICS_DIR, seules les valeurs du processus courant sont exposées.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.db import OperationalError, connections
+
+# Messages des erreurs de verrou (SQLite, PostgreSQL)
+LOCK_ERROR_MARKERS = ('database is locked', 'database table is locked', 'deadlock detected', 'could not obtain lock', 'lock timeout')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+COUNTER = 'counter'
+GAUGE = 'gauge'
+HISTOGRAM = 'histogram'
+
+# Au-delà, les jauges du fichier d'un autre processus sont ignorées (worker arrêté ou inactif)
+GAUGE_MAX_AGE = 300
+
+# Nom -> (type, description, seuils des histogrammes)
+METRICS = {
+    'http_requests_total': (COUNTER, "Requêtes HTTP par vue, méthode et statut.", None),
+    'http_request_duration_seconds': (HISTOGRAM, "Durée des requêtes HTTP par vue et statut.", DURATION_BUCKETS),
+    'db_queries_per_request': (HISTOGRAM, "Nombre de requêtes SQL par requête HTTP.", QUERY_BUCKETS),
+    'db_time_seconds_per_request': (HISTOGRAM, "Temps SQL cumulé par requête HTTP.", DURATION_BUCKETS),
+    'db_lock_errors_total': (COUNTER, "Requêtes SQL échouées sur un verrou (base verrouillée, interblocage).", None),
+    'render_duration_seconds': (HISTOGRAM, "Durée de génération des documents (PDF, XLSX).", DURATION_BUCKETS),
+    'photo_processing_seconds': (HISTOGRAM, "Durée de traitement des photos (redimensionnement, JPEG).", DURATION_BUCKETS),
+    'cache_requests_total': (COUNTER, "Accès aux caches applicatifs (result=hit|miss).", None),
+    'scheduler_job_duration_seconds': (HISTOGRAM, "Durée des tâches planifiées par tâche et statut.", DURATION_BUCKETS),
+    'db_connections_opened_total': (COUNTER, "Connexions ouvertes vers la base (hors réutilisation).", None),
+    'db_pool_size': (GAUGE, "Connexions gérées par le pool du processus.", None),
+    'db_pool_available': (GAUGE, "Connexions libres dans le pool du processus.", None),
+    'db_pool_waiting': (GAUGE, "Demandes en attente d'une connexion du pool.", None),
+    'db_pool_requests_total': (COUNTER, "Connexions demandées au pool.", None),
+    'db_pool_wait_seconds_total': (COUNTER, "Attente cumulée d'une connexion du pool.", None),
+    'db_pool_timeouts_total': (COUNTER, "Demandes au pool échouées (délai dépassé).", None),
+}
+
+
+def _key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+class Registry:
+    """Valeurs du processus courant : {(métrique, étiquettes): valeur ou [seaux, somme, nombre]}."""
+
+    def __init__(self):
+        self._collectors = []
+        self.reset()
+
+    def reset(self):
+        """Vide les valeurs et oublie le fichier du processus (appelé après un fork)."""
+        self._lock = threading.Lock()
+        self._counters = defaultdict(float)
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = time.monotonic()
+        self._file = None
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _key(labels))] += value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _key(labels))] = value
+
+    def add_collector(self, collector):
+        """Fonction appelée avant chaque relevé (valeurs lues à la demande, ex. pools)."""
+        self._collectors.append(collector)
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, _key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def snapshot(self):
+        for collector in self._collectors:
+            collector()
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'histograms': [
+                    [name, list(labels), list(counts), total, count]
+                    for (name, labels), (counts, total, count) in self._histograms.items()
+                ],
+            }
+
+    # --- Partage entre processus ---
+
+    def file_path(self):
+        if self._file is None:
+            # PID + heure de démarrage : un PID réutilisé n'écrase pas le fichier d'un ancien worker
+            self._file = os.path.join(settings.METRICS_DIR, f"metrics-{os.getpid()}-{int(time.time() * 1000)}.json")
+        return self._file
+
+    def flush(self, force=False):
+        """Écrit les valeurs du processus dans METRICS_DIR (écriture atomique)."""
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_FLUSH_SECONDS:
+            return
+        self._last_flush = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, prefix='.tmp-')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(self.snapshot(), fh)
+        os.replace(tmp_path, self.file_path())
+
+
+registry = Registry()
+atexit.register(lambda: registry.flush(force=True))
+if hasattr(os, 'register_at_fork'):  # Absent sous Windows (processus lancés en spawn)
+    os.register_at_fork(after_in_child=registry.reset)
+
+
+def inc(name, value=1, **labels):
+    registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def set_gauge(name, value, **labels):
+    registry.set(name, value, **labels)
+
+
+class timed(ContextDecorator):
+    """Mesure une durée en secondes (bloc `with` ou décorateur) dans un histogramme."""
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def _recreate_cm(self):
+        # Décorateur : une instance par appel, le début de mesure n'est pas partagé entre threads
+        return type(self)(self.name, **self.labels)
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self._start, **self.labels)
+        return False
+
+
+# =================================================================
+# Exposition
+# =================================================================
+
+def collect():
+    """
+    Somme des valeurs du processus courant et des fichiers des autres
+    processus ; les jauges d'un fichier non mis à jour depuis GAUGE_MAX_AGE
+    sont ignorées.
+    """
+    snapshots = [(registry.snapshot(), True)]
+    if settings.METRICS_DIR and os.path.isdir(settings.METRICS_DIR):
+        own = os.path.basename(registry.file_path())
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.startswith('metrics-') or filename == own:
+                continue
+            path = os.path.join(settings.METRICS_DIR, filename)
+            try:
+                fresh = time.time() - os.path.getmtime(path) < GAUGE_MAX_AGE
+                with open(path) as fh:
+                    snapshots.append((json.load(fh), fresh))
+            except (OSError, ValueError):
+                continue  # Fichier supprimé ou en cours de remplacement
+
+    counters = defaultdict(float)
+    gauges = defaultdict(float)
+    histograms = {}
+    for snapshot, fresh in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, value in snapshot.get('gauges', []) if fresh else []:
+            gauges[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, counts, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            histogram = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            if len(histogram[0]) != len(counts):
+                continue  # Seuils modifiés entre deux versions
+            histogram[0] = [a + b for a, b in zip(histogram[0], counts)]
+            histogram[1] += total
+            histogram[2] += count
+    return counters, gauges, histograms
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_text():
+    """Format d'exposition texte Prometheus (version 0.0.4)."""
+    counters, gauges, histograms = collect()
+    lines = []
+    for name, (kind, description, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind in (COUNTER, GAUGE):
+            for (metric, labels), value in sorted((counters if kind == COUNTER else gauges).items()):
+                if metric == name:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            continue
+        for (metric, labels), (counts, total, count) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, bucket_count in zip(buckets, counts):
+                lines.append(f"{name}_bucket{_labels(labels, [('le', _number(bound))])} {bucket_count}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    return '\n'.join(lines) + '\n'
+
+
+# =================================================================
+# Middleware
+# =================================================================
+
+class QueryCounter:
+    """execute_wrapper léger : nombre et durée des requêtes SQL, erreurs de verrou."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.lock_errors = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as e:
+            if any(marker in str(e).lower() for marker in LOCK_ERROR_MARKERS):
+                self.lock_errors += 1
+            raise
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """À placer en tête de MIDDLEWARE pour mesurer toute la chaîne."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else '<non résolue>'
+        status = str(response.status_code)
+        inc('http_requests_total', view=view, method=request.method, status=status)
+        observe('http_request_duration_seconds', duration, view=view, status=status)
+        observe('db_queries_per_request', queries.count, view=view)
+        observe('db_time_seconds_per_request', queries.seconds, view=view)
+        if queries.lock_errors:
+            inc('db_lock_errors_total', queries.lock_errors, view=view)
+        registry.flush()
+        return response
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Sequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, verbose_name="Nom de la séquence"),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        blank=True, default="", max_length=7, verbose_name="Période"
+                    ),
+                ),
+                (
+                    "last_value",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Dernière valeur attribuée"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Séquence",
+                "verbose_name_plural": "Séquences",
+                "unique_together": {("name", "period")},
+            },
+        ),
+    ]
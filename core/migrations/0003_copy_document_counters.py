@@ -0,0 +1,26 @@
+from django.db import migrations
+
+def copy_document_counters(apps, schema_editor):
+    # Reprise des compteurs rh.DocumentCounter dans l'allocateur de séquences
+    DocumentCounter = apps.get_model('rh', 'DocumentCounter')
+    Sequence = apps.get_model('core', 'Sequence')
+    db_alias = schema_editor.connection.alias
+    Sequence.objects.using(db_alias).bulk_create([
+        Sequence(
+            name=f"reference:{counter.document_type}",
+            period=str(counter.year),
+            last_value=counter.last_number,
+        )
+        for counter in DocumentCounter.objects.using(db_alias).all()
+    ])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_sequence'),
+        ('rh', '0005_documentrequest'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_document_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,150 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_copy_document_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Counter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, unique=True, verbose_name="Nom"),
+                ),
+                ("value", models.BigIntegerField(default=0, verbose_name="Valeur")),
+                ("computed_at", models.DateTimeField(verbose_name="Calculé le")),
+            ],
+            options={
+                "verbose_name": "Compteur précalculé",
+                "verbose_name_plural": "Compteurs précalculés",
+            },
+        ),
+        migrations.CreateModel(
+            name="ScheduledJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, unique=True, verbose_name="Nom"),
+                ),
+                (
+                    "description",
+                    models.CharField(
+                        blank=True, max_length=255, verbose_name="Description"
+                    ),
+                ),
+                (
+                    "schedule",
+                    models.CharField(
+                        max_length=100,
+                        verbose_name="Planning (cron : min heure jour mois jour-semaine)",
+                    ),
+                ),
+                ("enabled", models.BooleanField(default=True, verbose_name="Active")),
+                (
+                    "next_run_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Prochaine exécution"
+                    ),
+                ),
+                (
+                    "last_run_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Dernière exécution"
+                    ),
+                ),
+                (
+                    "last_status",
+                    models.CharField(
+                        blank=True, max_length=10, verbose_name="Dernier statut"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tâche planifiée",
+                "verbose_name_plural": "Tâches planifiées",
+                "ordering": ["name"],
+            },
+        ),
+        migrations.CreateModel(
+            name="SchedulerLease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("owner", models.CharField(max_length=100)),
+                ("expires_at", models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name="JobRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField(verbose_name="Début")),
+                ("finished_at", models.DateTimeField(verbose_name="Fin")),
+                ("duration", models.DurationField(verbose_name="Durée")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("SUCCES", "Succès"), ("ECHEC", "Échec")],
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                ("message", models.TextField(blank=True, verbose_name="Message")),
+                (
+                    "job",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="runs",
+                        to="core.scheduledjob",
+                        verbose_name="Tâche",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Exécution de tâche",
+                "verbose_name_plural": "Exécutions de tâches",
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0004_scheduler"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QueryProfile",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "url_name",
+                    models.CharField(max_length=200, unique=True, verbose_name="Vue"),
+                ),
+                (
+                    "requests",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Requêtes HTTP"
+                    ),
+                ),
+                (
+                    "total_queries",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Requêtes SQL (total)"
+                    ),
+                ),
+                (
+                    "max_queries",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Requêtes SQL (max)"
+                    ),
+                ),
+                (
+                    "duplicate_queries",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Requêtes SQL répétées (total)"
+                    ),
+                ),
+                (
+                    "total_db_ms",
+                    models.FloatField(default=0, verbose_name="Temps SQL total (ms)"),
+                ),
+                (
+                    "total_ms",
+                    models.FloatField(default=0, verbose_name="Temps total (ms)"),
+                ),
+                (
+                    "sample",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        verbose_name="Échantillon (pire requête HTTP)",
+                    ),
+                ),
+                ("last_seen", models.DateTimeField(verbose_name="Dernière requête")),
+            ],
+            options={
+                "verbose_name": "Profil SQL",
+                "verbose_name_plural": "Profils SQL",
+                "ordering": ["-total_queries"],
+            },
+        ),
+    ]
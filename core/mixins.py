@@ -1,4 +1,8 @@
 from django.contrib.auth.mixins import AccessMixin
+from django.utils.cache import get_conditional_response
+
+from .conditional import compute_etag, finalize, is_conditional
+from .replica import render_inside, replica_configured, session_pinned, use_replica
 
 class TeamLeadOrCoordinatorRequiredMixin(AccessMixin):
     """Verify that the current user is a team lead or a coordinator."""
@@ -13,3 +17,44 @@ class ExpenseManagementMixin(AccessMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
+
+
+class ConditionalGetMixin:
+    """
+    Answer GET with 304 Not Modified when the page fingerprint is unchanged
+    (see core.conditional). Subclasses return the data version marker from
+    get_version(); access checks still run first through get_object().
+    """
+    def get_version(self):
+        raise NotImplementedError("ConditionalGetMixin requires get_version().")
+
+    def get_object(self, queryset=None):
+        # Fetched once for the version marker and once more by DetailView.get()
+        if queryset is not None or not hasattr(self, '_conditional_object'):
+            obj = super().get_object(queryset)
+            if queryset is not None:
+                return obj
+            self._conditional_object = obj
+        return self._conditional_object
+
+    def get(self, request, *args, **kwargs):
+        if not is_conditional(request):
+            return super().get(request, *args, **kwargs)
+        etag = compute_etag(request, self.get_version())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        return finalize(response, etag)
+
+
+class ReplicaReadMixin:
+    """
+    Read-only view: its database reads go to the read replica (see
+    core.replica) unless the session wrote recently. Place it after
+    LoginRequiredMixin so the user is loaded from the primary.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        if not replica_configured() or session_pinned(request):
+            return super().dispatch(request, *args, **kwargs)
+        with use_replica():
+            return render_inside(super().dispatch(request, *args, **kwargs))
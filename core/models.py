@@ -13,4 +13,117 @@ class Departement(models.Model):
         ordering = ['country', 'name']
 
     def __str__(self):
-        return f"{self.name} ({self.country.code})"
\ No newline at end of file
+        return f"{self.name} ({self.country.code})"
+
+class Sequence(models.Model):
+    """
+    Compteur générique utilisé par core.sequences : références de documents,
+    matricules, etc. Une ligne par (nom, période) ; la période est vide pour un
+    compteur sans remise à zéro, 'AAAA' (annuel) ou 'AAAA-MM' (mensuel).
+    """
+    name = models.CharField(max_length=100, verbose_name=_("Nom de la séquence"))
+    period = models.CharField(max_length=7, blank=True, default='', verbose_name=_("Période"))
+    last_value = models.PositiveBigIntegerField(default=0, verbose_name=_("Dernière valeur attribuée"))
+
+    class Meta:
+        verbose_name = _("Séquence")
+        verbose_name_plural = _("Séquences")
+        unique_together = ('name', 'period')
+
+    def __str__(self):
+        return f"{self.name} [{self.period or '-'}] : {self.last_value}"
+
+
+# =================================================================
+# Planificateur de tâches (core.scheduler, commande run_scheduler)
+# =================================================================
+
+class ScheduledJob(models.Model):
+    """Tâche périodique enregistrée par une application ; planning modifiable en admin."""
+    name = models.CharField(max_length=100, unique=True, verbose_name=_("Nom"))
+    description = models.CharField(max_length=255, blank=True, verbose_name=_("Description"))
+    schedule = models.CharField(max_length=100, verbose_name=_("Planning (cron : min heure jour mois jour-semaine)"))
+    enabled = models.BooleanField(default=True, verbose_name=_("Active"))
+    next_run_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Prochaine exécution"))
+    last_run_at = models.DateTimeField(null=True, blank=True, verbose_name=_("Dernière exécution"))
+    last_status = models.CharField(max_length=10, blank=True, verbose_name=_("Dernier statut"))
+
+    class Meta:
+        verbose_name = _("Tâche planifiée")
+        verbose_name_plural = _("Tâches planifiées")
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.schedule})"
+
+
+class JobRun(models.Model):
+    STATUS_SUCCESS = "SUCCES"
+    STATUS_FAILURE = "ECHEC"
+    STATUS_CHOICES = (
+        (STATUS_SUCCESS, _("Succès")),
+        (STATUS_FAILURE, _("Échec")),
+    )
+
+    job = models.ForeignKey(ScheduledJob, on_delete=models.CASCADE, related_name="runs", verbose_name=_("Tâche"))
+    started_at = models.DateTimeField(verbose_name=_("Début"))
+    finished_at = models.DateTimeField(verbose_name=_("Fin"))
+    duration = models.DurationField(verbose_name=_("Durée"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, verbose_name=_("Statut"))
+    message = models.TextField(blank=True, verbose_name=_("Message"))
+
+    class Meta:
+        verbose_name = _("Exécution de tâche")
+        verbose_name_plural = _("Exécutions de tâches")
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"{self.job.name} {self.started_at:%Y-%m-%d %H:%M} {self.status}"
+
+
+class SchedulerLease(models.Model):
+    """Bail garantissant qu'une seule instance du planificateur exécute les tâches."""
+    name = models.CharField(max_length=50, unique=True)
+    owner = models.CharField(max_length=100)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} : {self.owner} jusqu'à {self.expires_at}"
+
+
+class Counter(models.Model):
+    """Compteur précalculé par une tâche planifiée (lu par les tableaux de bord)."""
+    name = models.CharField(max_length=100, unique=True, verbose_name=_("Nom"))
+    value = models.BigIntegerField(default=0, verbose_name=_("Valeur"))
+    computed_at = models.DateTimeField(verbose_name=_("Calculé le"))
+
+    class Meta:
+        verbose_name = _("Compteur précalculé")
+        verbose_name_plural = _("Compteurs précalculés")
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+
+class QueryProfile(models.Model):
+    """
+    Résumé cumulé du profilage SQL par vue (core.profiling) : nombre de
+    requêtes, temps base de données et échantillon de la pire requête HTTP.
+    """
+    url_name = models.CharField(max_length=200, unique=True, verbose_name=_("Vue"))
+    requests = models.PositiveIntegerField(default=0, verbose_name=_("Requêtes HTTP"))
+    total_queries = models.PositiveBigIntegerField(default=0, verbose_name=_("Requêtes SQL (total)"))
+    max_queries = models.PositiveIntegerField(default=0, verbose_name=_("Requêtes SQL (max)"))
+    duplicate_queries = models.PositiveBigIntegerField(default=0, verbose_name=_("Requêtes SQL répétées (total)"))
+    total_db_ms = models.FloatField(default=0, verbose_name=_("Temps SQL total (ms)"))
+    total_ms = models.FloatField(default=0, verbose_name=_("Temps total (ms)"))
+    sample = models.JSONField(default=dict, blank=True, verbose_name=_("Échantillon (pire requête HTTP)"))
+    last_seen = models.DateTimeField(verbose_name=_("Dernière requête"))
+
+    class Meta:
+        verbose_name = _("Profil SQL")
+        verbose_name_plural = _("Profils SQL")
+        ordering = ['-total_queries']
+
+    def __str__(self):
+        return f"{self.url_name} ({self.requests} requêtes HTTP)"
@@ -0,0 +1,693 @@
+# core/partitions.py
+
+"""
+Partitionnement optionnel des données par groupe de pays.
+
+- COUNTRY_PARTITIONS="ouest:SEN,CIV;centre:CMR,GAB" (config/database.py) :
+  une base par groupe (DATABASE_URL_<ALIAS>) ; les pays non listés restent
+  sur la base centrale (« default »).
+- Les modèles de PARTITIONED_MODELS (projets, sites, tâches, photos,
+  inspections, relevés de travaux, dépenses et revenus de projet...) sont
+  lus et écrits sur la base du pays de leur projet. Les données de
+  référence (utilisateurs, pays, listes de valeurs, véhicules...), le
+  journal de synchronisation et le registre des coûts restent centraux ;
+  la référence est recopiée dans chaque partition pour les clés étrangères :
+  à chaque enregistrement ou suppression (signaux), et chaque heure pour
+  les écritures sans signaux (update, bulk_create ; core.jobs,
+  sync_partitions).
+- Choix de la base (PartitionRouter) : base de l'objet déjà chargé, pays
+  du projet (Project.country), objet parent déjà chargé, puis périmètre
+  actif : base centrale, ou partition_scope() / country_scope() /
+  for_each_partition().
+- Les rapports inter-pays lisent chaque base et fusionnent (fan_out,
+  merge_sums).
+- Vues web (PartitionMiddleware) : écritures dans la base du pays actif
+  de l'utilisateur (?country=, puis la session, puis son premier pays
+  actif) ; objet désigné dans l'URL lu dans la base de sa plage
+  d'identifiants ; listes et tableaux de bord lus dans toutes les bases
+  des pays de l'utilisateur et fusionnés (across_partitions).
+- Chaque partition attribue ses identifiants dans sa propre plage
+  (sync_partitions --reserve-ids) : un identifiant désigne un seul objet,
+  quelle que soit la base, ce qu'attendent les tables centrales
+  (SyncChange, CostLedger).
+- Une transaction sur des données partitionnées se déclare sur leur base :
+  transaction.atomic(using=partition_alias()).
+- Sans COUNTRY_PARTITIONS, tout reste sur la base centrale.
+"""
+
+import heapq
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, router, transaction
+from django.db.models import Avg, Count, Max, Min, Sum
+from django.db.models.functions import Coalesce
+from django.db.models.query import FlatValuesListIterable, ModelIterable, ValuesIterable
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .replica import REPLICA
+
+# Modèle -> chemin vers le pays, dans l'ordre des dépendances (copie, déplacement).
+# Un chemin dont la première clé étrangère est vide (dépense sans projet) reste central ;
+# None : pas de pays, l'objet suit le périmètre courant.
+PARTITIONED_MODELS = {
+    'projects.Project': 'country',
+    'projects.Site': 'project__country',
+    'projects.SiteRadioConfiguration': 'site__project__country',
+    'projects.Task': 'site__project__country',
+    'projects.WorkCompletionRecord': 'task__site__project__country',
+    'projects.TaskPhoto': 'task__site__project__country',
+    'projects.Inspection': 'site__project__country',
+    'projects.TransmissionLink': 'site_a__project__country',
+    'projects.UninstallationReport': 'task__site__project__country',
+    'projects.UninstalledEquipment': 'uninstallation_report__task__site__project__country',
+    'projects.SiteImport': 'project__country',
+    'finance.Depense': 'projet_associe__country',
+    'finance.ObligationFiscale': 'depense_associee__projet_associe__country',
+    'finance.Revenu': 'projet_facture__country',
+    'logistique.MissionLogistique': 'site_concerne__project__country',
+    'users.Assignation': 'projet__country',
+    'data_analytics.AnalyticsFact': 'country',
+    'data_analytics.ExpenseFact': 'country',
+    'data_analytics.DirtyBucket': None,
+}
+
+# Taille de la plage d'identifiants de chaque partition (la base centrale garde la première)
+ID_RANGE = 10 ** 12
+
+# Dernier pays choisi par ?country= (PartitionMiddleware)
+SESSION_KEY = '_partition_country'
+
+_scope = ContextVar('partition_scope', default=None)
+_read_scope = ContextVar('partition_read_scope', default=None)
+
+
+def partitioning_enabled():
+    return bool(settings.COUNTRY_PARTITIONS)
+
+
+def partition_aliases():
+    return sorted(set(settings.COUNTRY_PARTITIONS.values()))
+
+
+def all_databases():
+    """Base centrale puis partitions."""
+    return [DEFAULT_DB_ALIAS, *partition_aliases()]
+
+
+def is_partitioned(model):
+    model = model._meta.auto_created or model  # Table intermédiaire d'un ManyToMany
+    return model._meta.label in PARTITIONED_MODELS
+
+
+@lru_cache(maxsize=None)
+def _country_code(country_id):
+    Country = apps.get_model('users', 'Country')
+    return Country.objects.using(DEFAULT_DB_ALIAS).filter(pk=country_id).values_list('code', flat=True).first() or ''
+
+
+@receiver(post_save, sender='users.Country')
+@receiver(post_delete, sender='users.Country')
+def forget_country_codes(sender, **kwargs):
+    _country_code.cache_clear()
+
+
+def partition_for_country(country_id):
+    """Base des données du pays (« default » pour un pays non partitionné)."""
+    if country_id is None or not partitioning_enabled():
+        return DEFAULT_DB_ALIAS
+    return settings.COUNTRY_PARTITIONS.get(_country_code(country_id).upper(), DEFAULT_DB_ALIAS)
+
+
+def partition_alias():
+    """Base du périmètre courant."""
+    return _scope.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def partition_scope(alias):
+    """Modèles partitionnés lus et écrits sur la base alias dans le bloc."""
+    token = _scope.set(alias)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def country_scope(country_id):
+    return partition_scope(partition_for_country(country_id))
+
+
+def for_each_partition(func, *args, **kwargs):
+    """Exécute func dans le périmètre de chaque base ; retourne {alias: résultat}."""
+    results = {}
+    for alias in all_databases():
+        with partition_scope(alias):
+            results[alias] = func(*args, **kwargs)
+    return results
+
+
+def fan_out(queryset):
+    """Lignes du queryset lues dans chaque base (toutes les bases si partitions configurées)."""
+    rows = []
+    for alias in all_databases():
+        with partition_scope(alias):
+            rows.extend(queryset.all())
+    return rows
+
+
+def merge_sums(rows, keys, sums, reverse=False):
+    """Fusionne les lignes (dictionnaires) de même clé en additionnant les champs sums ; triées par clé."""
+    merged = {}
+    for row in rows:
+        key = tuple(row[name] for name in keys)
+        if key not in merged:
+            merged[key] = dict(row)
+            continue
+        for name in sums:
+            merged[key][name] = (merged[key][name] or 0) + (row[name] or 0)
+    return [merged[key] for key in sorted(merged, reverse=reverse)]
+
+
+def partition_for_id(pk):
+    """Base d'un objet partitionné d'après son identifiant (plages de sync_partitions --reserve-ids)."""
+    aliases = partition_aliases()
+    index = int(pk) // ID_RANGE
+    return aliases[index - 1] if 0 < index <= len(aliases) else DEFAULT_DB_ALIAS
+
+
+def add_partition_counts(objects, queryset):
+    """
+    Ajoute aux objets de référence (lus sur la base centrale) les compteurs
+    annotés du queryset évalué sur chaque partition, où la référence est
+    recopiée : compteurs de lignes partitionnées par utilisateur...
+    """
+    if not partitioning_enabled():
+        return objects
+    names = list(queryset.query.annotations)
+    by_pk = {obj.pk: obj for obj in objects}
+    for alias in partition_aliases():
+        for row in queryset.using(alias).values('pk', *names):
+            obj = by_pk.get(row['pk'])
+            if obj is None:
+                continue
+            for name in names:
+                setattr(obj, name, (getattr(obj, name) or 0) + (row[name] or 0))
+    return objects
+
+
+# =================================================================
+# Lectures sur plusieurs bases (vues web)
+# =================================================================
+
+def read_aliases():
+    """Bases lues par across_partitions() : celles de l'utilisateur (PartitionMiddleware), sinon le périmètre courant."""
+    return _read_scope.get() or [partition_alias()]
+
+
+@contextmanager
+def read_scope(aliases):
+    token = _read_scope.set(list(aliases))
+    try:
+        yield
+    finally:
+        _read_scope.reset(token)
+
+
+def across_partitions(queryset):
+    """Queryset d'un modèle partitionné lu dans chaque base de read_aliases() ; inchangé sans partitions."""
+    if not partitioning_enabled() or not is_partitioned(queryset.model):
+        return queryset
+    return MergedQuerySet(queryset, read_aliases())
+
+
+class _Descending:
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def _aggregate(expression):
+    """Agrégat d'une expression (éventuellement dans Coalesce)."""
+    return expression.source_expressions[0] if isinstance(expression, Coalesce) else expression
+
+
+def _aggregate_kind(expression):
+    for kind in (Sum, Count, Min, Max, Avg):
+        if isinstance(_aggregate(expression), kind):
+            return kind
+    raise ValueError(f"Agrégat non fusionnable entre bases : {expression!r}")
+
+
+def _combine(kind, values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    if kind is Min:
+        return min(values)
+    if kind is Max:
+        return max(values)
+    return sum(values)
+
+
+class MergedQuerySet:
+    """
+    Queryset lu dans plusieurs bases. filter(), annotate(), order_by()...
+    s'appliquent à chaque base ; à la lecture, les lignes sont fusionnées
+    dans l'ordre du queryset (les identifiants sont uniques toutes bases
+    confondues), les groupes de values().annotate() et les agrégats
+    additionnés (Avg recalculé depuis la somme et le nombre).
+
+    Les clés de tri doivent figurer dans les lignes lues (champs,
+    annotations, colonnes de values()). Une sous-requête ne peut pas
+    traverser les bases : passé à un filtre __in, un MergedQuerySet est lu
+    et transmis comme liste de valeurs.
+    """
+
+    CHAINED = (
+        'all', 'filter', 'exclude', 'select_related', 'prefetch_related', 'annotate', 'alias',
+        'order_by', 'distinct', 'only', 'defer', 'values', 'values_list', 'none',
+    )
+
+    def __init__(self, queryset, aliases):
+        self.queryset = queryset
+        self.aliases = list(aliases)
+        self._result_cache = None
+
+    def __getattr__(self, name):
+        if name not in self.CHAINED:
+            raise AttributeError(name)
+
+        def chain(*args, **kwargs):
+            return MergedQuerySet(getattr(self.queryset, name)(*args, **kwargs), self.aliases)
+        return chain
+
+    @property
+    def model(self):
+        return self.queryset.model
+
+    @property
+    def ordered(self):
+        return self.queryset.ordered
+
+    def __repr__(self):
+        return f'<MergedQuerySet {self.aliases} {self.queryset.query}>'
+
+    def _querysets(self):
+        """Queryset de chaque base, fixé sur la base (ou la réplique) choisie par les routeurs."""
+        querysets = []
+        for alias in self.aliases:
+            with partition_scope(alias):
+                querysets.append(self.queryset.using(router.db_for_read(self.model)))
+        return querysets
+
+    # --- Ordre -------------------------------------------------------
+
+    def _ordering(self):
+        query = self.queryset.query
+        if query.order_by:
+            ordering = query.order_by
+        elif query.default_ordering and self.queryset._iterable_class is ModelIterable:
+            ordering = self.model._meta.ordering
+        else:
+            ordering = ()
+        names = []
+        for item in ordering:
+            if isinstance(item, str):
+                if item != '?':
+                    names.append(item)
+            elif hasattr(item, 'expression') and hasattr(item.expression, 'name'):
+                names.append(('-' if item.descending else '') + item.expression.name)
+            else:
+                raise ValueError(f"Tri non fusionnable entre bases : {item!r}")
+        return names
+
+    def _columns(self):
+        fields = list(self.queryset._fields or ())
+        if not fields:
+            fields = [f.attname for f in self.model._meta.concrete_fields]
+            fields += list(self.queryset.query.annotation_select)
+        return fields
+
+    def _getter(self, name):
+        iterable = self.queryset._iterable_class
+        if iterable is ValuesIterable:
+            return lambda row: row.get(name)
+        if iterable is FlatValuesListIterable:
+            return lambda row: row
+        if iterable is not ModelIterable:
+            columns = self._columns()
+            index = columns.index(name) if name in columns else None
+            return lambda row: row[index] if index is not None else None
+
+        def value(obj):
+            for part in name.split('__'):
+                if obj is None:
+                    return None
+                obj = getattr(obj, part)
+            return getattr(obj, 'pk', obj)
+        return value
+
+    def _sort_key(self):
+        ordering = self._ordering()
+        if not ordering:
+            return None
+        nulls_last = connections[self.queryset.db].features.nulls_order_largest
+        getters = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            name = self.model._meta.pk.attname if name == 'pk' else name
+            getters.append((self._getter(name), descending))
+
+        def key(row):
+            parts = []
+            for getter, descending in getters:
+                value = getter(row)
+                part = ((value is None) == nulls_last, value)
+                parts.append(_Descending(part) if descending else part)
+            return parts
+        return key
+
+    # --- Lecture -----------------------------------------------------
+
+    def _grouped(self):
+        query = self.queryset.query
+        return self.queryset._iterable_class is ValuesIterable and (query.group_by is not None or query.distinct)
+
+    def _merge_groups(self, rows):
+        query = self.queryset.query
+        keys = list(query.values_select)
+        kinds = {
+            name: _aggregate_kind(annotation)
+            for name, annotation in query.annotation_select.items() if annotation.contains_aggregate
+        }
+        if any(kind is Avg for kind in kinds.values()):
+            raise ValueError("Moyenne par groupe non fusionnable entre bases")
+        keys += [name for name in query.annotation_select if name not in kinds]
+        merged = {}
+        for row in rows:
+            key = tuple(row[name] for name in keys)
+            if key in merged:
+                for name, kind in kinds.items():
+                    merged[key][name] = _combine(kind, [merged[key][name], row[name]])
+            else:
+                merged[key] = dict(row)
+        return list(merged.values())
+
+    def _fetch(self, limit=None):
+        rows = []
+        for queryset in self._querysets():
+            rows.extend(queryset if limit is None else queryset[:limit])
+        if self._grouped():
+            rows = self._merge_groups(rows)
+        elif self.queryset.query.distinct:
+            rows = list(dict.fromkeys(rows))
+        key = self._sort_key()
+        if key is not None:
+            rows.sort(key=key)
+        return rows
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = self._fetch()
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self._fetch_all())
+
+    def __len__(self):
+        return len(self._fetch_all())
+
+    def __bool__(self):
+        return bool(self._fetch_all())
+
+    def __getitem__(self, k):
+        if self._result_cache is not None:
+            return self._result_cache[k]
+        if isinstance(k, slice):
+            if k.stop is None or self._grouped():
+                return self._fetch()[k]
+            return self._fetch(limit=k.stop)[k]
+        rows = self._fetch(limit=k + 1)
+        return rows[k]
+
+    def iterator(self, chunk_size=2000):
+        """Lignes de chaque base lues par lots et fusionnées dans l'ordre (sans tout charger)."""
+        key = self._sort_key()
+        if self._grouped() or self.queryset.query.distinct or key is None:
+            yield from self._fetch()
+            return
+        yield from heapq.merge(*(qs.iterator(chunk_size=chunk_size) for qs in self._querysets()), key=key)
+
+    def first(self):
+        rows = self[:1]
+        return rows[0] if rows else None
+
+    def count(self):
+        if self._result_cache is not None or self._grouped() or self.queryset.query.distinct:
+            return len(self._fetch_all())
+        return sum(queryset.count() for queryset in self._querysets())
+
+    def exists(self):
+        if self._result_cache is not None:
+            return bool(self._result_cache)
+        return any(queryset.exists() for queryset in self._querysets())
+
+    def aggregate(self, **aggregates):
+        """Agrégats de chaque base combinés : sommes et nombres additionnés, Min/Max, Avg = somme / nombre."""
+        expressions = {}
+        for name, aggregate in aggregates.items():
+            if _aggregate_kind(aggregate) is Avg:
+                average = _aggregate(aggregate)
+                source = average.source_expressions[0]
+                expressions[f'{name}__sum'] = Sum(source, filter=average.filter)
+                expressions[f'{name}__count'] = Count(source, filter=average.filter)
+            else:
+                expressions[name] = aggregate
+        partial = [queryset.aggregate(**expressions) for queryset in self._querysets()]
+        result = {}
+        for name, aggregate in aggregates.items():
+            kind = _aggregate_kind(aggregate)
+            if kind is Avg:
+                total = _combine(Sum, [row[f'{name}__sum'] for row in partial])
+                count = _combine(Count, [row[f'{name}__count'] for row in partial])
+                result[name] = total / count if count else _aggregate(aggregate).default
+            else:
+                result[name] = _combine(kind, [row[name] for row in partial])
+        return result
+
+
+# =================================================================
+# Copie de la référence
+# =================================================================
+
+BATCH_SIZE = 500
+
+
+def partitioned_models():
+    return [apps.get_model(label) for label in PARTITIONED_MODELS]
+
+
+def reference_models():
+    """Modèles centraux référencés (directement ou non) par les modèles partitionnés, dépendances d'abord."""
+    ordered, seen = [], set()
+
+    def visit(model):
+        if model in seen or is_partitioned(model):
+            return
+        seen.add(model)
+        for field in model._meta.concrete_fields:
+            if field.is_relation and field.related_model is not model:
+                visit(field.related_model)
+        ordered.append(model)
+
+    for model in partitioned_models():
+        relations = list(model._meta.concrete_fields) + list(model._meta.many_to_many)
+        for field in relations:
+            if field.is_relation:
+                visit(field.related_model)
+    return ordered
+
+
+def copy_rows(queryset, alias):
+    """Insère ou met à jour les lignes du queryset dans la base alias (mêmes identifiants)."""
+    model = queryset.model
+    fields = [f.attname for f in model._meta.concrete_fields if not f.primary_key]
+    options = (
+        {'update_conflicts': True, 'unique_fields': [model._meta.pk.name], 'update_fields': fields}
+        if fields else {'ignore_conflicts': True}
+    )
+    copied = 0
+    batch = []
+    for obj in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        batch.append(obj)
+        if len(batch) == BATCH_SIZE:
+            model._base_manager.using(alias).bulk_create(batch, **options)
+            copied += len(batch)
+            batch = []
+    if batch:
+        model._base_manager.using(alias).bulk_create(batch, **options)
+        copied += len(batch)
+    return copied
+
+
+def copy_reference(alias):
+    """
+    Copie exacte de la référence centrale dans la base alias ; retourne le
+    nombre de lignes copiées. Une ligne supprimée au centre mais encore
+    utilisée par la partition fait échouer la copie (rien n'est modifié).
+    """
+    connection = connections[alias]
+    # Références circulaires (manager d'un utilisateur...) : contraintes vérifiées à la fin
+    models = reference_models()
+    with connection.constraint_checks_disabled(), transaction.atomic(using=alias):
+        # Lignes absentes du centre (supprimées, ou créées par les migrations de la partition)
+        for model in reversed(models):
+            central = set(model._base_manager.using(DEFAULT_DB_ALIAS).values_list('pk', flat=True))
+            stale = [pk for pk in model._base_manager.using(alias).values_list('pk', flat=True) if pk not in central]
+            for start in range(0, len(stale), BATCH_SIZE):
+                model._base_manager.using(alias).filter(pk__in=stale[start:start + BATCH_SIZE])._raw_delete(alias)
+        copied = sum(copy_rows(model._base_manager.using(DEFAULT_DB_ALIAS).all(), alias) for model in models)
+        connection.check_constraints()
+    return copied
+
+
+def copy_saved_reference(sender, instance, raw=False, using=None, **kwargs):
+    """Ligne de référence enregistrée au centre : recopiée aussitôt dans chaque partition."""
+    if raw or using != DEFAULT_DB_ALIAS or not partitioning_enabled():
+        return
+    for alias in partition_aliases():
+        copy_rows(sender._base_manager.using(DEFAULT_DB_ALIAS).filter(pk=instance.pk), alias)
+
+
+def delete_copied_reference(sender, instance, using=None, **kwargs):
+    """Ligne de référence supprimée au centre : supprimée des partitions (échoue si elle y est utilisée)."""
+    if using != DEFAULT_DB_ALIAS or not partitioning_enabled():
+        return
+    for alias in partition_aliases():
+        sender._base_manager.using(alias).filter(pk=instance.pk)._raw_delete(alias)
+
+
+def connect_reference_copy():
+    """Branche la copie de la référence sur ses modèles (CoreConfig.ready)."""
+    for model in reference_models():
+        post_save.connect(copy_saved_reference, sender=model, dispatch_uid=f'partition_copy_{model._meta.label}')
+        post_delete.connect(delete_copied_reference, sender=model, dispatch_uid=f'partition_delete_{model._meta.label}')
+
+
+class PartitionRouter:
+    """Modèles partitionnés vers la base de leur pays ; None (routeur suivant) pour le reste."""
+
+    def _instance_db(self, instance):
+        if instance is None or not is_partitioned(type(instance)):
+            return None
+        if not instance._state.adding:
+            # Objet lu sur la réplique : base centrale
+            return DEFAULT_DB_ALIAS if instance._state.db == REPLICA else instance._state.db
+        # Nouvel objet : _state.db a pu être fixé par l'affectation d'un objet central (pays)
+        path = PARTITIONED_MODELS.get(instance._meta.label)
+        if path is None:
+            return None
+        field = instance._meta.get_field(path.split('__')[0])
+        if getattr(instance, field.attname) is None:
+            return DEFAULT_DB_ALIAS
+        if path == 'country':
+            return partition_for_country(instance.country_id)
+        if field.is_cached(instance):
+            return self._instance_db(field.get_cached_value(instance))
+        return None
+
+    def _db(self, model, instance=None):
+        if not partitioning_enabled() or not is_partitioned(model):
+            return None
+        alias = self._instance_db(instance) or partition_alias()
+        # Base centrale : le routeur suivant décide (lectures sur la réplique)
+        return alias if alias != DEFAULT_DB_ALIAS else None
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints.get('instance'))
+
+
+def routed_by(kwarg):
+    """Vue fonction dont le paramètre d'URL kwarg désigne un objet partitionné (PartitionMiddleware)."""
+    def decorator(view):
+        view.partition_kwarg = kwarg
+        return view
+    return decorator
+
+
+class PartitionMiddleware:
+    """
+    Périmètre de la requête :
+    - écritures et lectures simples : base du pays actif de l'utilisateur ;
+    - objet désigné dans l'URL (pk d'une vue d'un modèle partitionné,
+      partition_kwarg, project_pk...) : base de sa plage d'identifiants ;
+    - across_partitions() : bases de tous les pays de l'utilisateur (toutes
+      pour un superutilisateur), ou celle du seul pays choisi (?country=).
+    """
+
+    OBJECT_KWARGS = ('project_pk', 'site_pk', 'task_pk')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not partitioning_enabled():
+            return self.get_response(request)
+        country_id, chosen, aliases = None, False, [DEFAULT_DB_ALIAS]
+        if request.user.is_authenticated:
+            country_id, chosen = self.active_country(request)
+            aliases = [partition_for_country(country_id)] if chosen else self.user_databases(request.user)
+        # process_view peut redéfinir la base : rétablie à la sortie du bloc
+        with country_scope(country_id), read_scope(aliases):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not partitioning_enabled():
+            return None
+        view_class = getattr(view_func, 'view_class', None)
+        kwarg = getattr(view_func, 'partition_kwarg', None) or getattr(view_class, 'partition_kwarg', None)
+        model = getattr(view_class, 'model', None)
+        if kwarg is None and model is not None and is_partitioned(model):
+            kwarg = 'pk'
+        for name in (kwarg, *self.OBJECT_KWARGS):
+            if name in view_kwargs:
+                _scope.set(partition_for_id(view_kwargs[name]))
+                break
+        return None
+
+    def active_country(self, request):
+        """(pays actif, choisi par ?country=) : paramètre, puis session, puis premier pays actif."""
+        user = request.user
+        allowed = None if user.is_superuser else user.active_country_ids
+        for chosen, candidate in ((True, request.GET.get('country')), (False, request.session.get(SESSION_KEY))):
+            try:
+                country_id = int(candidate)
+            except (TypeError, ValueError):
+                continue
+            if allowed is None or country_id in allowed:
+                if request.session.get(SESSION_KEY) != country_id:
+                    request.session[SESSION_KEY] = country_id
+                return country_id, chosen
+        return (allowed[0] if allowed else None), False
+
+    def user_databases(self, user):
+        if user.is_superuser:
+            return all_databases()
+        aliases = {partition_for_country(country_id) for country_id in user.active_country_ids}
+        return sorted(aliases) or [DEFAULT_DB_ALIAS]
@@ -0,0 +1,204 @@
+# core/pdf.py
+
+"""
+Service de rendu PDF partagé (WeasyPrint) pour toutes les vues PDF.
+
+- Les fichiers static/media sont servis depuis le disque via un cache LRU en
+  mémoire, indexé par (chemin, mtime) : un fichier modifié est relu automatiquement.
+- Les feuilles de style (objets CSS) et la configuration des polices sont
+  construites une seule fois par processus puis réutilisées.
+- En mode strict (PDF_STRICT_LOCAL_ASSETS, activé par défaut), aucune requête
+  réseau n'est faite : toute ressource non résolue localement est ignorée.
+"""
+
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urljoin, urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from weasyprint import CSS, HTML, default_url_fetcher
+from weasyprint.text.fonts import FontConfiguration
+
+from . import metrics
+
+# Les fichiers plus gros (ex: reçus scannés) sont servis sans être mis en cache.
+MAX_CACHED_ASSET_SIZE = 2 * 1024 * 1024
+
+
+class AssetCache:
+    """Cache LRU thread-safe : (chemin absolu, mtime_ns) -> (contenu, type MIME)."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        key = (path, mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.inc('cache_requests_total', cache='pdf_assets', result='hit')
+                return entry
+            self.misses += 1
+        metrics.inc('cache_requests_total', cache='pdf_assets', result='miss')
+
+        with open(path, "rb") as fh:
+            content = fh.read()
+        mime_type, _ = mimetypes.guess_type(path)
+        entry = (content, mime_type)
+
+        if len(content) <= MAX_CACHED_ASSET_SIZE:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+
+asset_cache = AssetCache(getattr(settings, "PDF_ASSET_CACHE_SIZE", 256))
+
+_font_config = None
+_stylesheets = {}
+_state_lock = threading.Lock()
+
+
+def get_font_config():
+    """Configuration des polices partagée par tous les rendus du processus."""
+    global _font_config
+    if _font_config is None:
+        with _state_lock:
+            if _font_config is None:
+                _font_config = FontConfiguration()
+    return _font_config
+
+
+def _resolve_local_path(url):
+    """Traduit une URL (file://, STATIC_URL, MEDIA_URL) en chemin disque, ou None."""
+    parsed = urlparse(url)
+
+    if parsed.scheme == "file":
+        return unquote(parsed.path)
+
+    path = unquote(parsed.path)
+    static_url = "/" + settings.STATIC_URL.lstrip("/") if settings.STATIC_URL else None
+    media_url = "/" + settings.MEDIA_URL.lstrip("/") if settings.MEDIA_URL else None
+
+    if static_url and path.startswith(static_url):
+        relative = path[len(static_url):]
+        candidate = os.path.abspath(os.path.join(settings.STATIC_ROOT, relative))
+        if not candidate.startswith(os.path.abspath(settings.STATIC_ROOT) + os.sep):
+            return None
+        if os.path.exists(candidate):
+            return candidate
+        # Les fichiers collectés sont prioritaires ; sinon on interroge les finders (dev).
+        return finders.find(relative)
+
+    if media_url and path.startswith(media_url):
+        relative = path[len(media_url):]
+        candidate = os.path.abspath(os.path.join(settings.MEDIA_ROOT, relative))
+        if candidate.startswith(os.path.abspath(settings.MEDIA_ROOT) + os.sep):
+            return candidate
+
+    return None
+
+
+def local_url_fetcher(url, *args, **kwargs):
+    """
+    URL fetcher WeasyPrint : static/media depuis le disque (avec cache LRU).
+    Les URL data: passent toujours par WeasyPrint ; le reste est bloqué en mode strict.
+    """
+    if url.startswith("data:"):
+        return default_url_fetcher(url, *args, **kwargs)
+
+    path = _resolve_local_path(url)
+    entry = asset_cache.get(path) if path else None
+    if entry is not None:
+        content, mime_type = entry
+        return {
+            "string": content,
+            "mime_type": mime_type,
+            "redirected_url": url,
+        }
+
+    if getattr(settings, "PDF_STRICT_LOCAL_ASSETS", True):
+        # WeasyPrint journalise l'erreur et ignore simplement la ressource.
+        raise ValueError(f"Ressource PDF non disponible localement (mode strict) : {url}")
+
+    return default_url_fetcher(url, *args, **kwargs)
+
+
+def get_stylesheet(static_path):
+    """
+    Retourne un objet CSS pré-analysé pour un fichier static (ex: 'css/pdf.css').
+    Le cache est invalidé si le fichier change sur le disque.
+    """
+    path = _resolve_local_path(f"{settings.STATIC_URL}{static_path}")
+    if not path or not os.path.isfile(path):
+        raise FileNotFoundError(f"Feuille de style introuvable : {static_path}")
+
+    key = (path, os.stat(path).st_mtime_ns)
+    stylesheet = _stylesheets.get(key)
+    if stylesheet is None:
+        content, _ = asset_cache.get(path)
+        stylesheet = CSS(
+            string=content.decode("utf-8"),
+            base_url=urljoin(settings.PDF_BASE_URL, f"{settings.STATIC_URL}{static_path}"),
+            url_fetcher=local_url_fetcher,
+            font_config=get_font_config(),
+        )
+        with _state_lock:
+            _stylesheets[key] = stylesheet
+    return stylesheet
+
+
+def build_document(html_string, stylesheets=()):
+    """Mise en page d'un document HTML ; retourne un weasyprint.Document."""
+    html = HTML(
+        string=html_string,
+        base_url=settings.PDF_BASE_URL,
+        url_fetcher=local_url_fetcher,
+    )
+    return html.render(
+        stylesheets=[get_stylesheet(s) if isinstance(s, str) else s for s in stylesheets],
+        font_config=get_font_config(),
+    )
+
+
+def render_pdf(html_string, stylesheets=(), document=''):
+    """Rendu HTML -> octets PDF avec les ressources et polices partagées."""
+    with metrics.timed('render_duration_seconds', format='pdf', document=document):
+        return build_document(html_string, stylesheets).write_pdf()
+
+
+def render_template_to_pdf(template_name, context, request=None, stylesheets=()):
+    html_string = render_to_string(template_name, context, request=request)
+    return render_pdf(html_string, stylesheets, document=template_name)
+
+
+def pdf_response(pdf, filename):
+    """Réponse HTTP de téléchargement pour un PDF déjà rendu."""
+    response = HttpResponse(pdf, content_type="application/pdf")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
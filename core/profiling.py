@@ -0,0 +1,195 @@
+# core/profiling.py
+
+"""
+Profilage SQL par requête HTTP (SQLProfilerMiddleware).
+
+Actif pour toutes les requêtes si SQL_PROFILER_ENABLED, ou pour une requête
+d'un superutilisateur envoyant l'en-tête « X-SQL-Profile: 1 ». Pour chaque
+requête profilée :
+- nombre de requêtes SQL, temps base de données, requêtes les plus lentes ;
+- requêtes répétées : même forme SQL (valeurs remplacées par « ? ») lancée
+  depuis le même endroit (ligne de code ou de template) au moins
+  SQL_PROFILER_DUPLICATE_THRESHOLD fois, signature typique d'un N+1 ;
+- une ligne JSON sur le logger « core.sqlprofile » ;
+- un cumul par vue dans QueryProfile (consultable dans l'admin).
+L'en-tête Server-Timing de la réponse résume le temps SQL.
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+import django.db
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import metrics
+from .models import QueryProfile
+
+logger = logging.getLogger('core.sqlprofile')
+
+PROFILE_HEADER = 'X-SQL-Profile'
+MAX_SQL_LENGTH = 500
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+_SPACES = re.compile(r"\s+")
+
+_PROJECT_DIR = os.path.join(str(settings.BASE_DIR), '')
+# Code traversé par toutes les requêtes (execute_wrapper, couche base de données
+# de Django) : jamais retenu comme origine
+_WRAPPER_FILES = frozenset(os.path.abspath(path) for path in (__file__, metrics.__file__))
+_DJANGO_DB_DIR = os.path.join(os.path.dirname(os.path.abspath(django.db.__file__)), '')
+
+
+def query_shape(sql):
+    """Forme d'une requête : valeurs littérales et listes IN (...) normalisées."""
+    shape = _STRINGS.sub('?', sql)
+    shape = _NUMBERS.sub('?', shape)
+    shape = _IN_LISTS.sub('(...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+def call_site():
+    """Ligne de template ou de code du projet la plus proche de la requête SQL."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if code.co_name == 'render_annotated' and 'self' in frame.f_locals:
+            # Nœud de template Django : nom du template et ligne
+            node = frame.f_locals['self']
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                return f"{origin.template_name}:{token.lineno}"
+        elif (
+            filename.startswith(_PROJECT_DIR)
+            and filename not in _WRAPPER_FILES
+            and not filename.startswith(_DJANGO_DB_DIR)
+            and 'site-packages' not in filename
+        ):
+            return f"{os.path.relpath(filename, _PROJECT_DIR)}:{frame.f_lineno} ({code.co_name})"
+        frame = frame.f_back
+    return '?'
+
+
+class QueryRecorder:
+    """execute_wrapper : mesure chaque requête SQL et note son origine."""
+
+    def __init__(self):
+        self.queries = []  # (sql, ms, origine)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, (time.perf_counter() - start) * 1000, call_site()))
+
+    def summary(self):
+        slowest = sorted(self.queries, key=lambda query: query[1], reverse=True)
+        groups = defaultdict(lambda: [0, 0.0])
+        for sql, ms, site in self.queries:
+            group = groups[(query_shape(sql), site)]
+            group[0] += 1
+            group[1] += ms
+        duplicates = sorted(
+            (
+                {'sql': shape[:MAX_SQL_LENGTH], 'site': site, 'count': count, 'ms': round(ms, 2)}
+                for (shape, site), (count, ms) in groups.items()
+                if count >= settings.SQL_PROFILER_DUPLICATE_THRESHOLD
+            ),
+            key=lambda group: group['count'], reverse=True,
+        )
+        return {
+            'queries': len(self.queries),
+            'db_ms': round(sum(query[1] for query in self.queries), 2),
+            'duplicates': sum(group['count'] - 1 for group in duplicates),
+            'slowest': [
+                {'sql': sql[:MAX_SQL_LENGTH], 'site': site, 'ms': round(ms, 2)}
+                for sql, ms, site in slowest[:settings.SQL_PROFILER_SLOW_COUNT]
+            ],
+            'n_plus_one': duplicates[:settings.SQL_PROFILER_SLOW_COUNT],
+        }
+
+
+def record_profile(url_name, summary, total_ms):
+    """Ajoute la requête HTTP au cumul de la vue ; garde l'échantillon le plus coûteux."""
+    rows = QueryProfile.objects.filter(url_name=url_name)
+    increments = dict(
+        requests=F('requests') + 1,
+        total_queries=F('total_queries') + summary['queries'],
+        duplicate_queries=F('duplicate_queries') + summary['duplicates'],
+        total_db_ms=F('total_db_ms') + summary['db_ms'],
+        total_ms=F('total_ms') + total_ms,
+        last_seen=timezone.now(),
+    )
+    with transaction.atomic():
+        rows.filter(max_queries__lte=summary['queries']).update(max_queries=summary['queries'], sample=summary)
+        if rows.update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                QueryProfile.objects.create(
+                    url_name=url_name, requests=1,
+                    total_queries=summary['queries'], max_queries=summary['queries'],
+                    duplicate_queries=summary['duplicates'],
+                    total_db_ms=summary['db_ms'], total_ms=total_ms,
+                    sample=summary, last_seen=timezone.now(),
+                )
+        except IntegrityError:
+            # Ligne créée entre-temps par une requête concurrente
+            rows.update(**increments)
+
+
+class SQLProfilerMiddleware:
+    """À placer après AuthenticationMiddleware (l'en-tête est réservé aux superutilisateurs)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_enabled(self, request):
+        if settings.SQL_PROFILER_ENABLED:
+            return True
+        return request.headers.get(PROFILE_HEADER) == '1' and request.user.is_superuser
+
+    def __call__(self, request):
+        if not self.is_enabled(request):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()  # Les requêtes lancées par le template comptent aussi
+        total_ms = round((time.perf_counter() - start) * 1000, 2)
+
+        match = request.resolver_match
+        url_name = (match.view_name or match._func_path) if match else '<non résolue>'
+        summary = recorder.summary()
+        logger.info(json.dumps({
+            'view': url_name,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'ms': total_ms,
+            **summary,
+        }, ensure_ascii=False))
+        try:
+            record_profile(url_name, summary, total_ms)
+        except DatabaseError:
+            logger.exception("Enregistrement du profil SQL impossible pour %s", url_name)
+
+        response['Server-Timing'] = f'db;dur={summary["db_ms"]};desc="{summary["queries"]} requetes SQL"'
+        return response
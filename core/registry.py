@@ -0,0 +1,213 @@
+# core/registry.py
+
+"""
+Registre en mémoire des tables de référence (listes de valeurs, types de
+tâche, pays, rôles...).
+
+- Chaque table de LOOKUP_MODELS est lue une fois par processus, puis sert
+  les recherches par id / nom / code et les choix des formulaires (listes
+  déroulantes des vues et de l'admin) sans requête.
+- Invalidation entre processus : chaque table a un jeton de version stocké
+  dans core.Counter (« registry:<app.Modèle> »), renouvelé par
+  post_save / post_delete. Les jetons sont relus en une requête au plus une
+  fois par requête HTTP (et toutes les LOOKUP_REGISTRY_CHECK_SECONDS hors
+  requête : tâches, commandes) ; une table dont le jeton a changé est
+  rechargée à la lecture suivante.
+- Les écritures sans signaux (update(), bulk_create()) appellent
+  registry.invalidate(Modèle).
+"""
+
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.forms.models import ModelChoiceIterator
+from django.utils import timezone
+
+LOOKUP_MODELS = (
+    'projects.SitePhase',
+    'projects.Batch',
+    'projects.AntennaType',
+    'projects.EnclosureType',
+    'projects.BBMLType',
+    'projects.RadioType',
+    'projects.Client',
+    'projects.SiteType',
+    'projects.InstallationType',
+    'projects.TaskType',
+    'projects.TaskResultType',
+    'projects.ProjectType',
+    'users.Country',
+    'users.Role',
+)
+
+VERSION_PREFIX = 'registry:'
+
+
+class Table:
+    """Contenu d'une table de référence à une version donnée."""
+
+    def __init__(self, rows, version):
+        self.rows = rows
+        self.version = version
+        self.by_pk = {row.pk: row for row in rows}
+        self._indexes = {}
+
+    def get(self, pk):
+        return self.by_pk.get(int(pk)) if pk not in (None, '') else None
+
+    def get_by(self, field, value):
+        """Première ligne dont `field` vaut `value` (index construit à la première demande)."""
+        index = self._indexes.get(field)
+        if index is None:
+            index = {}
+            for row in self.rows:
+                index.setdefault(getattr(row, field), row)
+            self._indexes[field] = index
+        return index.get(value)
+
+    def active(self):
+        return [row for row in self.rows if getattr(row, 'is_active', True)]
+
+
+class Registry:
+
+    def __init__(self):
+        self._tables = {}
+        self._versions = {}
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def handles(self, model):
+        return model._meta.label in LOOKUP_MODELS
+
+    def table(self, model):
+        label = model._meta.label
+        if label not in LOOKUP_MODELS:
+            raise LookupError(f"{label} n'est pas une table de référence du registre")
+        self._check_versions()
+        version = self._versions.get(label, 0)
+        table = self._tables.get(label)
+        if table is None or table.version != version:
+            # Ordre du Meta.ordering, comme les listes déroulantes d'origine
+            table = Table(list(model._default_manager.all()), version)
+            with self._lock:
+                self._tables[label] = table
+        return table
+
+    def get(self, model, pk):
+        return self.table(model).get(pk)
+
+    def get_by(self, model, **lookup):
+        (field, value), = lookup.items()
+        return self.table(model).get_by(field, value)
+
+    def rows(self, model, active_only=False):
+        table = self.table(model)
+        return table.active() if active_only else table.rows
+
+    def choices(self, model, active_only=True):
+        return [(row.pk, str(row)) for row in self.rows(model, active_only)]
+
+    # --- Versions ---
+
+    def expire(self, **kwargs):
+        """Nouvelle requête HTTP : les jetons seront relus à la prochaine lecture."""
+        self._checked_at = None
+
+    def _check_versions(self):
+        from .models import Counter
+
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < settings.LOOKUP_REGISTRY_CHECK_SECONDS:
+            return
+        versions = dict(Counter.objects.filter(name__startswith=VERSION_PREFIX).values_list('name', 'value'))
+        self._versions = {name[len(VERSION_PREFIX):]: value for name, value in versions.items()}
+        self._checked_at = now
+
+    def invalidate(self, model):
+        """Renouvelle le jeton de la table (tous les processus la rechargeront)."""
+        from .models import Counter
+
+        label = model._meta.label
+        # Jeton aléatoire plutôt qu'incrément : après une transaction annulée,
+        # une autre modification ne peut pas retomber sur la version mise en cache.
+        version = random.getrandbits(62)
+        Counter.objects.update_or_create(
+            name=f"{VERSION_PREFIX}{label}", defaults={'value': version, 'computed_at': timezone.now()},
+        )
+        with self._lock:
+            self._tables.pop(label, None)
+            self._versions[label] = version
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+            self._checked_at = None
+
+
+registry = Registry()
+
+
+def _table_changed(sender, **kwargs):
+    registry.invalidate(sender)
+
+
+request_started.connect(registry.expire, dispatch_uid='core.registry.expire')
+for _label in LOOKUP_MODELS:
+    post_save.connect(_table_changed, sender=_label, dispatch_uid=f'core.registry.{_label}.save')
+    post_delete.connect(_table_changed, sender=_label, dispatch_uid=f'core.registry.{_label}.delete')
+
+
+# =================================================================
+# Formulaires
+# =================================================================
+
+class RegistryChoiceIterator(ModelChoiceIterator):
+    """Choix d'un ModelChoiceField lus dans le registre (aucune requête à l'affichage)."""
+
+    def __init__(self, field, rows):
+        super().__init__(field)
+        self.rows = rows
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for row in self.rows:
+            yield self.choice(row)
+
+    def __len__(self):
+        return len(self.rows) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.rows)
+
+
+def bind_choices(field, active_only=True):
+    """
+    Sert les choix d'un ModelChoiceField depuis le registre. Le queryset reste
+    celui de la table (filtré sur is_active si demandé) pour la validation.
+    """
+    model = field.queryset.model
+    if active_only and any(f.name == 'is_active' for f in model._meta.fields):
+        field.queryset = model._default_manager.filter(is_active=True)
+    rows = registry.rows(model, active_only)
+    field.iterator = lambda field: RegistryChoiceIterator(field, rows)
+    field.widget.choices = field.choices
+    return field
+
+
+class RegistryChoicesAdminMixin:
+    """ModelAdmin : listes déroulantes des tables de référence servies par le registre."""
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if (
+            formfield is not None and 'queryset' not in kwargs
+            and registry.handles(db_field.related_model) and not formfield.queryset.query.has_filters()
+        ):
+            bind_choices(formfield, active_only=False)
+        return formfield
@@ -0,0 +1,152 @@
+# core/replica.py
+
+"""
+Lectures des rapports, de l'analytique et des exports sur une réplique.
+
+- L'alias « replica » (DATABASE_REPLICA_URL) est une copie en lecture
+  seule de la base : réplique PostgreSQL, ou instantané SQLite local
+  recopié périodiquement (refresh_replica_snapshot).
+- Seules les vues marquées @replica_safe (ou ReplicaReadMixin) lisent sur
+  la réplique ; tout le reste, et toute écriture, va sur la base principale.
+- Retard de la réplique : après une requête d'écriture (POST, PUT, PATCH,
+  DELETE), la session lit sur la base principale pendant REPLICA_LAG_SECONDS
+  (ReplicaPinMiddleware) : l'utilisateur voit toujours ses propres
+  modifications. Une écriture faite pendant une vue marquée ramène aussi
+  les lectures suivantes de cette vue sur la base principale, de même
+  qu'une transaction ouverte sur la base principale.
+- Les sessions sont toujours lues sur la base principale.
+- Sans alias « replica », les décorateurs sont sans effet.
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+SESSION_KEY = '_primary_until'
+
+# Applications toujours lues sur la base principale
+PRIMARY_APPS = {'sessions'}
+
+_replica_reads = ContextVar('replica_reads', default=False)
+_primary_pinned = ContextVar('primary_pinned', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def reading_from_replica():
+    """Vrai si les lectures du contexte courant vont sur la réplique."""
+    return replica_configured() and _replica_reads.get() and not _primary_pinned.get()
+
+
+@contextmanager
+def use_replica():
+    """Lectures sur la réplique dans le bloc (écritures toujours sur la base principale)."""
+    reads = _replica_reads.set(True)
+    pinned = _primary_pinned.set(False)
+    try:
+        yield
+    finally:
+        _primary_pinned.reset(pinned)
+        _replica_reads.reset(reads)
+
+
+def session_pinned(request):
+    """Vrai si la session a écrit récemment (lectures sur la base principale)."""
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(SESSION_KEY, 0) > time.time()
+
+
+def render_inside(response):
+    # Une TemplateResponse est rendue après la vue : on la rend dans le contexte de lecture
+    if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+        response.render()
+    return response
+
+
+def replica_safe(view):
+    """Vue en lecture seule : ses lectures vont sur la réplique (hors session épinglée)."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_configured() or session_pinned(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return render_inside(view(request, *args, **kwargs))
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_from_replica() or model._meta.app_label in PRIMARY_APPS:
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None  # Lectures cohérentes avec la transaction en cours
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        if _replica_reads.get():
+            # La réplique ne verra pas cette écriture tout de suite : la suite de la vue lit sur la principale
+            _primary_pinned.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaPinMiddleware:
+    """Après une requête d'écriture, la session lit sur la base principale pendant REPLICA_LAG_SECONDS."""
+
+    UNSAFE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method in self.UNSAFE_METHODS and replica_configured() and hasattr(request, 'session'):
+            request.session[SESSION_KEY] = time.time() + settings.REPLICA_LAG_SECONDS
+        return response
+
+
+# =================================================================
+# Instantané SQLite (réplique locale)
+# =================================================================
+
+def refresh_snapshot(source_path, snapshot_path):
+    """
+    Copie cohérente de la base SQLite vers l'instantané (API backup, compatible
+    WAL), remplacé en une fois : les lecteurs voient l'ancienne ou la nouvelle
+    copie, jamais une copie partielle. Retourne la durée en secondes.
+    """
+    start = time.monotonic()
+    directory = os.path.dirname(os.path.abspath(snapshot_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.replica-', suffix='.sqlite3')
+    os.close(fd)
+    try:
+        source = sqlite3.connect(f"file:{source_path}?mode=ro", uri=True)
+        destination = sqlite3.connect(tmp_path)
+        try:
+            source.backup(destination)
+            # Journal classique : l'instantané est ouvert en lecture seule, sans fichiers -wal/-shm
+            destination.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            destination.close()
+            source.close()
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return time.monotonic() - start
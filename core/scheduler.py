@@ -0,0 +1,252 @@
+# core/scheduler.py
+
+"""
+Planificateur de tâches périodiques (commande run_scheduler).
+
+- Chaque application déclare ses tâches dans un module `jobs.py` avec le
+  décorateur @job ; les plannings (format cron à 5 champs) sont recopiés en
+  base à la première exécution puis modifiables dans l'admin.
+- Un bail (SchedulerLease) renouvelé en continu garantit qu'une seule
+  instance exécute les tâches, même si la commande tourne sur plusieurs serveurs.
+- Chaque échéance est réservée (claim_run) avant l'exécution : une tâche plus
+  longue que le bail n'est pas relancée par l'instance qui le reprend.
+- Chaque exécution est historisée (JobRun) avec sa durée et son statut.
+"""
+
+import datetime
+import os
+import socket
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Callable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from . import metrics
+from .models import JobRun, ScheduledJob, SchedulerLease
+
+LEASE_NAME = "scheduler"
+
+
+# =================================================================
+# Plannings cron
+# =================================================================
+
+class CronSchedule:
+    """Expression cron « minute heure jour mois jour-semaine » (0 = dimanche)."""
+
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))
+
+    def __init__(self, expression):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Planning cron invalide (5 champs attendus) : {expression!r}")
+        self.expression = expression
+        (self.minutes, self.hours, self.days, self.months, self.weekdays) = (
+            self._parse(part, low, high) for part, (low, high) in zip(parts, self.RANGES)
+        )
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse(part, low, high):
+        values = set()
+        for item in part.split(','):
+            step = 1
+            if '/' in item:
+                item, step = item.split('/', 1)
+                step = int(step)
+            if item == '*':
+                start, end = low, high
+            elif '-' in item:
+                start, end = (int(v) for v in item.split('-', 1))
+            else:
+                start = end = int(item)
+                if step != 1:
+                    end = high
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"Valeur hors limites dans le planning : {part!r}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day):
+        weekday = (day.weekday() + 1) % 7
+        if day.month not in self.months:
+            return False
+        # Règle cron : si jour du mois ET jour de semaine sont restreints, l'un OU l'autre suffit
+        if not self.any_day and not self.any_weekday:
+            return day.day in self.days or weekday in self.weekdays
+        return day.day in self.days and weekday in self.weekdays
+
+    def next_after(self, moment):
+        """Première échéance strictement postérieure à `moment` (datetime aware)."""
+        moment = timezone.localtime(moment).replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        day = moment.date()
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour, minute)))
+                        if candidate >= moment:
+                            return candidate
+            day += datetime.timedelta(days=1)
+        raise ValueError(f"Aucune échéance trouvée pour le planning {self.expression!r}")
+
+
+# =================================================================
+# Registre des tâches
+# =================================================================
+
+@dataclass
+class JobDefinition:
+    name: str
+    func: Callable
+    schedule: str
+    description: str = ''
+    enabled: bool = True
+
+
+registry = {}
+
+
+def job(schedule, name=None, description='', enabled=True):
+    """
+    Déclare une tâche périodique. La fonction peut retourner un message court
+    (ex: nombre de lignes mises à jour), conservé dans l'historique.
+    """
+    def decorator(func):
+        job_name = name or f"{func.__module__.split('.')[0]}.{func.__name__}"
+        CronSchedule(schedule)  # Valide le planning dès l'import
+        registry[job_name] = JobDefinition(
+            name=job_name,
+            func=func,
+            schedule=schedule,
+            description=description or (func.__doc__ or '').strip().split('\n')[0],
+            enabled=enabled,
+        )
+        return func
+    return decorator
+
+
+def autodiscover():
+    """Importe le module `jobs` de chaque application installée."""
+    autodiscover_modules('jobs')
+    return registry
+
+
+def sync_jobs(now=None):
+    """Crée en base les tâches nouvellement déclarées (le planning en base fait foi ensuite)."""
+    now = now or timezone.now()
+    existing = set(ScheduledJob.objects.values_list('name', flat=True))
+    for definition in registry.values():
+        if definition.name in existing:
+            continue
+        ScheduledJob.objects.get_or_create(
+            name=definition.name,
+            defaults={
+                'description': definition.description[:255],
+                'schedule': definition.schedule,
+                'enabled': definition.enabled,
+                'next_run_at': CronSchedule(definition.schedule).next_after(now),
+            },
+        )
+
+
+# =================================================================
+# Bail (une seule instance active)
+# =================================================================
+
+def default_owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(owner, ttl, now=None):
+    """Prend ou renouvelle le bail ; retourne False s'il est détenu ailleurs et encore valide."""
+    now = now or timezone.now()
+    expires_at = now + datetime.timedelta(seconds=ttl)
+    updated = SchedulerLease.objects.filter(name=LEASE_NAME).filter(
+        Q(owner=owner) | Q(expires_at__lt=now)
+    ).update(owner=owner, expires_at=expires_at)
+    if updated:
+        return True
+    try:
+        with transaction.atomic():
+            SchedulerLease.objects.create(name=LEASE_NAME, owner=owner, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_lease(owner):
+    SchedulerLease.objects.filter(name=LEASE_NAME, owner=owner).delete()
+
+
+# =================================================================
+# Exécution
+# =================================================================
+
+def run_job(scheduled_job, now=None):
+    """Exécute une tâche, historise le résultat et calcule sa prochaine échéance."""
+    definition = registry[scheduled_job.name]
+    started_at = timezone.now()
+    clock = time.monotonic()
+    try:
+        result = definition.func()
+        status, message = JobRun.STATUS_SUCCESS, '' if result is None else str(result)
+    except Exception:
+        status, message = JobRun.STATUS_FAILURE, traceback.format_exc()
+    finished_at = timezone.now()
+    seconds = time.monotonic() - clock
+    metrics.observe('scheduler_job_duration_seconds', seconds, job=scheduled_job.name, status=status)
+    metrics.registry.flush(force=True)
+
+    JobRun.objects.create(
+        job=scheduled_job,
+        started_at=started_at,
+        finished_at=finished_at,
+        duration=datetime.timedelta(seconds=seconds),
+        status=status,
+        message=message,
+    )
+    ScheduledJob.objects.filter(pk=scheduled_job.pk).update(
+        last_run_at=started_at,
+        last_status=status,
+        next_run_at=CronSchedule(scheduled_job.schedule).next_after(now or finished_at),
+    )
+    return status, message
+
+
+def claim_run(scheduled_job, now=None):
+    """
+    Réserve l'échéance courante d'une tâche en avançant next_run_at avant
+    son exécution (mise à jour conditionnelle). Retourne False si une autre
+    instance l'a déjà prise.
+    """
+    now = now or timezone.now()
+    queryset = ScheduledJob.objects.filter(pk=scheduled_job.pk)
+    if scheduled_job.next_run_at is None:
+        queryset = queryset.filter(next_run_at__isnull=True)
+    else:
+        queryset = queryset.filter(next_run_at=scheduled_job.next_run_at)
+    return bool(queryset.update(next_run_at=CronSchedule(scheduled_job.schedule).next_after(now)))
+
+
+def due_jobs(now=None):
+    now = now or timezone.now()
+    return ScheduledJob.objects.filter(
+        enabled=True, name__in=list(registry)
+    ).filter(Q(next_run_at__lte=now) | Q(next_run_at__isnull=True)).order_by('next_run_at')
+
+
+def seconds_until_next_job(now=None, maximum=60):
+    now = now or timezone.now()
+    next_run_at = ScheduledJob.objects.filter(
+        enabled=True, name__in=list(registry), next_run_at__isnull=False
+    ).order_by('next_run_at').values_list('next_run_at', flat=True).first()
+    if next_run_at is None:
+        return maximum
+    return max(1, min(maximum, (next_run_at - now).total_seconds()))
@@ -0,0 +1,80 @@
+# core/sequences.py
+
+"""
+Allocateur de séquences pour les numéros attribués en concurrence
+(références de documents RH, matricules...).
+
+L'attribution se fait par un UPDATE atomique `last_value = last_value + n` :
+la ligne n'est verrouillée que le temps de l'incrément, sans lecture préalable.
+La première attribution d'une période crée la ligne ; si une autre transaction
+l'a créée entre-temps, on retombe sur un select_for_update.
+"""
+
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Sequence
+
+NEVER = 'never'
+YEARLY = 'yearly'
+MONTHLY = 'monthly'
+
+
+def period_for(reset, when=None):
+    """Clé de période d'une séquence selon sa politique de remise à zéro."""
+    if reset == NEVER:
+        return ''
+    when = when or timezone.localdate()
+    if isinstance(when, datetime.datetime):
+        when = when.date()
+    if reset == YEARLY:
+        return f"{when:%Y}"
+    if reset == MONTHLY:
+        return f"{when:%Y-%m}"
+    raise ValueError(f"Politique de remise à zéro inconnue : {reset}")
+
+
+def allocate(name, count=1, reset=NEVER, when=None, initial=None):
+    """
+    Réserve `count` valeurs consécutives de la séquence `name` et les retourne
+    sous forme de range. `initial` (callable) donne la dernière valeur déjà
+    utilisée lorsque la période n'existe pas encore (reprise de données).
+    """
+    if count < 1:
+        raise ValueError("Le nombre de valeurs à réserver doit être positif.")
+    period = period_for(reset, when)
+    lookup = {'name': name, 'period': period}
+
+    with transaction.atomic():
+        updated = Sequence.objects.filter(**lookup).update(last_value=F('last_value') + count)
+        if updated:
+            last = Sequence.objects.filter(**lookup).values_list('last_value', flat=True).get()
+        else:
+            start = initial() if initial else 0
+            try:
+                with transaction.atomic():
+                    Sequence.objects.create(last_value=start + count, **lookup)
+                last = start + count
+            except IntegrityError:
+                # Créée par une transaction concurrente : on la verrouille et on incrémente
+                sequence = Sequence.objects.select_for_update().get(**lookup)
+                sequence.last_value += count
+                sequence.save(update_fields=['last_value'])
+                last = sequence.last_value
+
+    return range(last - count + 1, last + 1)
+
+
+def next_value(name, reset=NEVER, when=None, initial=None):
+    """Raccourci : une seule valeur."""
+    return allocate(name, 1, reset=reset, when=when, initial=initial).start
+
+
+def set_last_value(name, value, reset=NEVER, when=None):
+    """Repositionne une séquence (ex: après une renumérotation complète)."""
+    Sequence.objects.update_or_create(
+        name=name, period=period_for(reset, when), defaults={'last_value': value}
+    )
@@ -0,0 +1,131 @@
+# core/sqlite.py
+
+"""
+Réglages SQLite de production (déploiements pays sur db.sqlite3).
+
+À chaque nouvelle connexion SQLite (signal connection_created) :
+- journal_mode=WAL : les lectures ne bloquent plus les écritures et
+  inversement ; une seule écriture à la fois reste la règle ;
+- busy_timeout : une écriture attend le verrou au lieu d'échouer
+  immédiatement avec « database is locked » ;
+- synchronous=NORMAL : sûr en WAL (une coupure peut perdre les dernières
+  transactions, jamais corrompre la base), bien moins de fsync ;
+- cache_size, mmap_size, temp_store=MEMORY : lectures et tris en mémoire.
+
+Les transactions d'écriture sont ouvertes en BEGIN IMMEDIATE (OPTIONS
+transaction_mode, config/database.py) : le verrou d'écriture est pris dès
+le début, ce qui évite l'échec sans attente d'une transaction qui lit puis
+tente d'écrire alors qu'une autre écrit déjà.
+
+Maintenance (commande sqlite_maintenance, tâche hebdomadaire) : ANALYZE,
+PRAGMA optimize, vacuum incrémental et point de contrôle du WAL.
+
+Sans effet sur les autres moteurs. SQLITE_TUNING=False désactive les
+réglages de connexion.
+"""
+
+import os
+import time
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def connection_pragmas():
+    return [
+        "journal_mode=WAL",
+        f"busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        "synchronous=NORMAL",
+        f"cache_size=-{settings.SQLITE_CACHE_SIZE_KIB}",  # Négatif : taille en Kio
+        f"mmap_size={settings.SQLITE_MMAP_SIZE_MIB * 1024 * 1024}",
+        "temp_store=MEMORY",
+    ]
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    # Connexion sqlite3 brute : ces réglages n'apparaissent ni dans les métriques ni dans le profilage SQL
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])  # Instantané de la réplique (core/replica.py)
+    for pragma in connection_pragmas():
+        if read_only and pragma.startswith(('journal_mode', 'synchronous')):
+            continue
+        connection.connection.execute(f"PRAGMA {pragma}")
+
+
+# =================================================================
+# Maintenance
+# =================================================================
+
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+
+def _pragma(cursor, name):
+    cursor.execute(f"PRAGMA {name}")
+    return cursor.fetchone()[0]
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def database_stats(connection=default_connection):
+    """Taille des fichiers, pages libres et réglages de la base SQLite."""
+    path = connection.settings_dict['NAME']
+    with connection.cursor() as cursor:
+        page_size = _pragma(cursor, 'page_size')
+        cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'sqlite_stat1'")
+        analyzed = 0
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT count(*) FROM sqlite_stat1")
+            analyzed = cursor.fetchone()[0]
+        return {
+            'file_bytes': _size(path),
+            'wal_bytes': _size(f"{path}-wal"),
+            'page_size': page_size,
+            'page_count': _pragma(cursor, 'page_count'),
+            'freelist_count': _pragma(cursor, 'freelist_count'),
+            'journal_mode': _pragma(cursor, 'journal_mode'),
+            'auto_vacuum': AUTO_VACUUM_MODES.get(_pragma(cursor, 'auto_vacuum')),
+            'analyzed_indexes': analyzed,
+        }
+
+
+def run_maintenance(analyze=True, vacuum_pages=0, enable_incremental_vacuum=False, connection=default_connection):
+    """
+    ANALYZE, PRAGMA optimize, vacuum incrémental (vacuum_pages : nombre de
+    pages libres à rendre, 0 = toutes) puis point de contrôle du WAL.
+    enable_incremental_vacuum passe la base en auto_vacuum=INCREMENTAL, ce
+    qui impose un VACUUM complet (base bloquée pendant l'opération).
+    Retourne (mesures avant, mesures après, [(étape, secondes)]).
+    """
+    if connection.vendor != 'sqlite':
+        raise ValueError(f"Maintenance SQLite impossible sur le moteur « {connection.vendor} ».")
+
+    before = database_stats(connection)
+    steps = []
+
+    def step(label, *statements):
+        start = time.monotonic()
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+                cursor.fetchall()
+        steps.append((label, time.monotonic() - start))
+
+    if enable_incremental_vacuum and before['auto_vacuum'] != 'INCREMENTAL':
+        step("VACUUM (auto_vacuum=INCREMENTAL)", "PRAGMA auto_vacuum=INCREMENTAL", "VACUUM")
+    if analyze:
+        step("ANALYZE", "ANALYZE")
+    step("PRAGMA optimize", "PRAGMA optimize")
+    if database_stats(connection)['auto_vacuum'] == 'INCREMENTAL':
+        step("Vacuum incrémental", f"PRAGMA incremental_vacuum({vacuum_pages})" if vacuum_pages else "PRAGMA incremental_vacuum")
+    step("Point de contrôle WAL", "PRAGMA wal_checkpoint(TRUNCATE)")
+
+    return before, database_stats(connection), steps
@@ -1,2 +1,599 @@
+import datetime
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Avg, Count, Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import backup, chunked_pdf, metrics, partitions, pdf, profiling, scheduler
+from core.autocomplete import prefix_filter
+from core.sequences import MONTHLY, YEARLY, allocate, next_value
+from core.benchmarks import BENCHMARKS, compare, run_benchmark, user_for_role
+from core.jobs import synchroniser_partitions
+from core.models import JobRun, QueryProfile, ScheduledJob
+from core.registry import Registry, registry
+from projects.models import Project, Site
+from users.models import Country, CustomUser, EmployeeCountryAssignment, Role
+
+BUDGETS_FILE = os.path.join(os.path.dirname(__file__), 'benchmark_budgets.json')
+
+# Jeu de données des budgets : le modifier impose de remesurer benchmark_budgets.json
+DATASET = dict(
+    countries=2, employees=60, projects=12, sites=300, tasks=1500,
+    work_records=2000, expenses=500, photos=200, seed=42, prefix='BT',
+)
+
+
+class CompareTests(TestCase):
+    """Détection des dépassements par rapport à une référence."""
+
+    reference = {'results': {'home': {'queries': 10, 'p95_ms': 100.0, 'status': 200}}}
+
+    def test_within_budget(self):
+        results = {'results': {'home': {'queries': 10, 'p95_ms': 120.0, 'status': 200}}}
+        self.assertEqual(compare(results, self.reference), [])
+
+    def test_query_regression(self):
+        results = {'results': {'home': {'queries': 11, 'p95_ms': 90.0, 'status': 200}}}
+        self.assertEqual(compare(results, self.reference), [('home', 'queries', 11, 10)])
+        self.assertEqual(compare(results, self.reference, query_tolerance=1), [])
+
+    def test_latency_and_status_regression(self):
+        results = {'results': {'home': {'queries': 5, 'p95_ms': 126.0, 'status': 500}}}
+        self.assertEqual(
+            {metric for _, metric, _, _ in compare(results, self.reference)},
+            {'status', 'p95_ms'},
+        )
+
+    def test_missing_views_and_metrics_are_ignored(self):
+        results = {'results': {'other': {'queries': 500}, 'home': {'queries': 3}}}
+        self.assertEqual(compare(results, self.reference), [])
+
+
+@override_settings(DEBUG=False, SQL_PROFILER_ENABLED=False)
+class ViewBudgetTests(TestCase):
+    """
+    Nombre de requêtes SQL des vues principales sur un petit jeu de données
+    fixe (generate_load_dataset) : une requête N+1 réintroduite fait échouer
+    le test. Après une optimisation, abaisser le budget correspondant.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        # Les photos générées vont dans un dossier temporaire, pas dans MEDIA_ROOT
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media_root))
+        call_command('generate_load_dataset', skip_derived=False, stdout=StringIO(), **DATASET)
+        CustomUser.objects.create_superuser('bench_admin', 'bench_admin@example.com', None)
+        with open(BUDGETS_FILE) as fh:
+            cls.budgets = json.load(fh)['results']
+
+    def test_views_within_query_budget(self):
+        clients = {}
+        for benchmark in BENCHMARKS:
+            with self.subTest(view=benchmark.name):
+                client = clients.get(benchmark.role)
+                if client is None:
+                    client = clients[benchmark.role] = self.client_class()
+                    client.force_login(user_for_role(benchmark.role))
+                result = run_benchmark(benchmark, client, iterations=1, warmup=1)
+                self.assertIsNotNone(result)
+                regressions = compare({'results': {benchmark.name: result}}, {'results': self.budgets})
+                self.assertEqual(regressions, [], f"{benchmark.name} : {result}")
+
+
+class SchedulerTests(TestCase):
+    """Réservation des échéances et statut des tâches en échec."""
+
+    def setUp(self):
+        self.job = ScheduledJob.objects.create(
+            name='core.sauvegarde_incrementale', schedule='0 2 * * *',
+            next_run_at=timezone.now() - datetime.timedelta(minutes=5),
+        )
+
+    def test_due_run_is_claimed_once(self):
+        # Deux instances lisent la même échéance : seule la première l'exécute
+        first, second = ScheduledJob.objects.get(), ScheduledJob.objects.get()
+        self.assertTrue(scheduler.claim_run(first))
+        self.assertFalse(scheduler.claim_run(second))
+        self.assertFalse(scheduler.due_jobs().exists())
+
+    def test_failed_backup_is_recorded_as_failure(self):
+        scheduler.autodiscover()
+        with mock.patch('backup_to_drive.authenticate_drive', side_effect=RuntimeError("settings.yaml absent")):
+            status, message = scheduler.run_job(self.job)
+        self.assertEqual(status, JobRun.STATUS_FAILURE)
+        self.assertIn("settings.yaml absent", message)
+        self.assertEqual(JobRun.objects.get().status, JobRun.STATUS_FAILURE)
+
+
+@override_settings(METRICS_DIR=None)
+class MetricsTests(TestCase):
+    """Registre de métriques : processus issus d'un fork et décorateur timed."""
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork indisponible")
+    def test_forked_child_starts_empty(self):
+        metrics.inc('http_requests_total', view='home')
+        with override_settings(METRICS_DIR=tempfile.gettempdir()):
+            parent_file = metrics.registry.file_path()
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            snapshot = metrics.registry.snapshot()
+            state = json.dumps({'counters': snapshot['counters'], 'file': metrics.registry._file})
+            os.write(write_fd, state.encode())
+            os._exit(0)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as fh:
+            child = json.load(fh)
+        os.waitpid(pid, 0)
+        self.assertEqual(child, {'counters': [], 'file': None})
+        self.assertEqual(metrics.registry._file, parent_file)
+        self.assertEqual(len(metrics.registry.snapshot()['counters']), 1)
+
+    def test_decorator_measures_each_call(self):
+        @metrics.timed('render_duration_seconds', document='test')
+        def render(delay):
+            time.sleep(delay)
+
+        # Un appel court qui démarre pendant un appel long ne doit pas fausser sa durée
+        slow = threading.Thread(target=render, args=(0.2,))
+        slow.start()
+        time.sleep(0.05)
+        render(0)
+        slow.join()
+        (_, _, _, total, count), = metrics.registry.snapshot()['histograms']
+        self.assertEqual(count, 2)
+        self.assertGreaterEqual(total, 0.2)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_view_requires_token_or_superuser(self):
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer autre').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        with override_settings(METRICS_TOKEN=''):
+            # Sans jeton configuré, un en-tête vide n'ouvre pas l'accès
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        self.client.force_login(CustomUser.objects.create(username="admin", is_superuser=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+@override_settings(METRICS_DIR=None, SQL_PROFILER_ENABLED=True)
+class SQLProfilerTests(TestCase):
+    """Origine des requêtes : le code appelant, pas les execute_wrapper empilés."""
+
+    def test_call_site_skips_wrappers(self):
+        recorder = profiling.QueryRecorder()
+        with connection.execute_wrapper(metrics.QueryCounter()), connection.execute_wrapper(recorder):
+            Country.objects.count()
+        (_, _, site), = recorder.queries
+        self.assertTrue(site.startswith("core/tests.py:"), site)
+
+    def test_profile_with_metrics_middleware(self):
+        self.assertIn("core.metrics.MetricsMiddleware", settings.MIDDLEWARE)
+        self.client.force_login(CustomUser.objects.create(username="admin", is_superuser=True))
+        self.assertEqual(self.client.get(reverse('home')).status_code, 200)
+        sample = QueryProfile.objects.get(url_name='home').sample
+        self.assertTrue(sample['slowest'])
+        for query in sample['slowest']:
+            self.assertFalse(query['site'].startswith(("core/metrics.py", "core/profiling.py", "?")), query)
+
+
+class SequenceTests(TestCase):
+    """Allocateur de séquences : valeurs consécutives, remise à zéro par période, reprise."""
+
+    def test_allocations_are_consecutive(self):
+        self.assertEqual(allocate('reference:TEST', 3), range(1, 4))
+        self.assertEqual(next_value('reference:TEST'), 4)
+        self.assertEqual(allocate('reference:TEST', 2), range(5, 7))
+
+    def test_counter_restarts_each_period(self):
+        march, april = datetime.date(2025, 3, 31), datetime.date(2025, 4, 1)
+        self.assertEqual(next_value('employee_id', reset=MONTHLY, when=march), 1)
+        self.assertEqual(next_value('employee_id', reset=MONTHLY, when=march), 2)
+        self.assertEqual(next_value('employee_id', reset=MONTHLY, when=april), 1)
+        self.assertEqual(next_value('employee_id', reset=YEARLY, when=april), 1)
+
+    def test_initial_value_is_read_once(self):
+        initial = mock.Mock(return_value=41)
+        self.assertEqual(next_value('reference:ANCIEN', initial=initial), 42)
+        self.assertEqual(next_value('reference:ANCIEN', initial=initial), 43)
+        initial.assert_called_once_with()
+
+
+class RegistryTests(TestCase):
+    """Registre des tables de référence : lecture sans requête, invalidation entre processus."""
+
+    def setUp(self):
+        self.country = Country.objects.create(name="Bénin", code="BEN")
+
+    def test_rows_are_served_from_memory(self):
+        registry.expire()
+        self.assertEqual(registry.get(Country, self.country.pk).name, "Bénin")
+        with self.assertNumQueries(0):
+            self.assertEqual(registry.get_by(Country, code="BEN").pk, self.country.pk)
+
+    def test_save_invalidates_other_processes(self):
+        other = Registry()  # Registre d'un autre processus
+        self.assertEqual(other.get(Country, self.country.pk).name, "Bénin")
+        self.country.name = "Benin"
+        self.country.save()
+        other.expire()  # Nouvelle requête HTTP dans l'autre processus
+        self.assertEqual(other.get(Country, self.country.pk).name, "Benin")
+
+    def test_update_without_signals_needs_invalidate(self):
+        registry.expire()
+        registry.get(Country, self.country.pk)
+        Country.objects.filter(pk=self.country.pk).update(code="BJ")
+        registry.expire()
+        self.assertEqual(registry.get(Country, self.country.pk).code, "BEN")
+        registry.invalidate(Country)
+        self.assertEqual(registry.get(Country, self.country.pk).code, "BJ")
+
+
+class ChunkedPdfTests(TestCase):
+    """Rapports PDF par lots : lots de pages complètes, pool de rendu borné."""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name="Bénin", code="BEN")
+        coordinator = CustomUser.objects.create(username="coord")
+        project = Project.objects.create(
+            country=country, name="P1", coordinator=coordinator, start_date=datetime.date(2025, 1, 1),
+        )
+        for index in range(7):
+            Site.objects.create(project=project, site_id_client=f"S{index}", name=f"Site {index}")
+
+    @override_settings(PDF_CHUNK_PAGES=2)
+    def test_chunks_end_on_page_boundaries(self):
+        with mock.patch.object(chunked_pdf, '_render_all', return_value=[b'']) as render_all, \
+                mock.patch.object(chunked_pdf, 'merge_pdfs'):
+            chunked_pdf.render_chunked_pdf(
+                'reporting/ran_site_list_pdf.html', Site.objects.all(), 'sites', rows_per_page=2,
+            )
+            jobs, workers = render_all.call_args.args
+            pages = [html_string.count('class="page-end"') for _, html_string, _, _ in jobs]
+        # 7 lignes, 2 pages de 2 lignes par lot : lots de 4 et 3 lignes
+        self.assertEqual(pages, [1, 1])
+        self.assertEqual(workers, 2)
+
+    def test_pool_is_forked_before_jobs_read_the_database(self):
+        events = []
+
+        class Executor:
+            def __init__(self, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def submit(self, fn, *args):
+                events.append('submit')
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        def jobs():
+            for index in range(3):
+                events.append('read')  # Lecture du lot (rouvre la connexion)
+                yield index, '<html></html>', (), 'test'
+
+        with mock.patch.object(chunked_pdf, 'ProcessPoolExecutor', Executor), \
+                mock.patch.object(chunked_pdf.connections, 'close_all', lambda: events.append('close')):
+            parts = chunked_pdf._render_all(jobs(), workers=2)
+        self.assertEqual(len(parts), 3)
+        self.assertEqual(events[:3], ['close', 'submit', 'read'])
+
+    def test_worker_pool_has_a_small_default(self):
+        self.assertEqual(chunked_pdf.render_workers(), 2)
+        with override_settings(PDF_RENDER_WORKERS=0), mock.patch('os.cpu_count', return_value=16):
+            self.assertEqual(chunked_pdf.render_workers(), 16)
+        with override_settings(PDF_ROWS_PER_PAGE=25, PDF_CHUNK_PAGES=12):
+            self.assertEqual(chunked_pdf.chunk_rows(), 300)
+
+
+class AutocompleteTests(TestCase):
+    """Listes à recherche : filtre sur le début des champs, pages et indicateur « more »."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create(username="admin", is_superuser=True)
+        for name in ("Diallo", "diarra", "Dia", "Kone", "Adiallo"):
+            CustomUser.objects.create(username=f"u_{name.lower()}", last_name=name)
+
+    def test_prefix_filter_ignores_case_and_infixes(self):
+        users = prefix_filter(CustomUser.objects.all(), ('last_name',), " dia ")
+        self.assertEqual(sorted(users.values_list('last_name', flat=True)), ["Dia", "Diallo", "diarra"])
+        self.assertEqual(prefix_filter(CustomUser.objects.all(), ('last_name',), "").count(), 6)
+
+    @override_settings(AUTOCOMPLETE_PAGE_SIZE=2)
+    def test_pages_and_more_flag(self):
+        self.client.force_login(self.admin)
+
+        def page(number):
+            data = self.client.get(reverse('users:user_autocomplete'), {'q': "di", 'page': number}).json()
+            return [row['text'] for row in data['results']], data['more']
+
+        self.assertEqual(page(1), (["Dia (u_dia)", "Diallo (u_diallo)"], True))
+        self.assertEqual(page(2), (["diarra (u_diarra)"], False))
+        self.assertEqual(page(3), ([], False))
+        self.assertEqual(page("x"), page(1))  # Numéro invalide : première page
+
+
+class BackupTests(TestCase):
+    """Sauvegarde incrémentale vers un dossier local, puis restauration vérifiée."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.media = os.path.join(self.root, 'media')
+        self.db_path = os.path.join(self.root, 'db.sqlite3')
+        self.target = backup.LocalDirectoryTarget(os.path.join(self.root, 'sauvegarde'))
+        self.write('a.txt', b'alpha')
+        self.write('scans/b.bin', os.urandom(1000))
+        self.execute("CREATE TABLE t (v TEXT)", "INSERT INTO t VALUES ('un')")
+
+    def write(self, name, content):
+        path = os.path.join(self.media, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(content)
+
+    def execute(self, *statements, path=None):
+        db = sqlite3.connect(path or self.db_path)
+        try:
+            rows = [db.execute(statement).fetchall() for statement in statements]
+            db.commit()
+        finally:
+            db.close()
+        return rows[-1]
+
+    def run_backup(self, second):
+        # Identifiant d'instantané à la seconde : horloge fixée pour deux sauvegardes rapprochées
+        clock = mock.Mock(now=mock.Mock(return_value=datetime.datetime(2025, 3, 1, 10, 0, second)))
+        with mock.patch.object(backup, 'datetime', clock):
+            return backup.run_incremental_backup(self.target, self.db_path, self.media, log=lambda message: None)
+
+    def media_files(self, destination):
+        media = os.path.join(destination, 'media')
+        files = {}
+        for root, _, names in os.walk(media):
+            for name in names:
+                with open(os.path.join(root, name), 'rb') as fh:
+                    files[os.path.relpath(os.path.join(root, name), media).replace(os.sep, '/')] = fh.read()
+        return files
+
+    def test_incremental_round_trip(self):
+        first = self.run_backup(0)
+        original = self.media_files(self.root)
+        self.write('a.txt', b'alpha modifie')
+        self.write('c.txt', b'nouveau')
+        self.execute("INSERT INTO t VALUES ('deux')")
+        second = self.run_backup(1)
+        self.assertEqual(second['stats']['unchanged'], 1)  # scans/b.bin n'est ni relu ni renvoyé
+        self.assertEqual(second['stats']['chunks_uploaded'], 2)
+
+        destination = os.path.join(self.root, 'restauration')
+        self.assertEqual(backup.restore_snapshot(self.target, destination, log=lambda message: None), [])
+        self.assertEqual(self.media_files(destination), self.media_files(self.root))
+        self.assertEqual(
+            self.execute("SELECT v FROM t ORDER BY v", path=os.path.join(destination, 'db.sqlite3')),
+            [('deux',), ('un',)],
+        )
+
+        previous = os.path.join(self.root, 'precedente')
+        errors = backup.restore_snapshot(self.target, previous, snapshot_id=first['snapshot'], log=lambda message: None)
+        self.assertEqual(errors, [])
+        self.assertEqual(self.media_files(previous), original)
+
+    def test_corrupted_chunk_is_reported(self):
+        manifest = self.run_backup(0)
+        digest = manifest['files']['a.txt']['chunks'][0]
+        self.target.put_bytes(backup.chunk_key(digest), b'altere')
+        destination = os.path.join(self.root, 'verification')
+        errors = backup.restore_snapshot(self.target, destination, verify_only=True, log=lambda message: None)
+        self.assertEqual(errors, [f"a.txt : bloc corrompu {digest}"])
+        self.assertFalse(os.path.exists(destination))  # Vérification seule : rien n'est écrit
+
+
+class PdfAssetTests(TestCase):
+    """Ressources des PDF : cache LRU sur le disque, aucune lecture hors static/media ni réseau."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        for name in ('static', 'media'):
+            os.makedirs(os.path.join(self.root, name))
+        self.write('static/logo.png', b'png')
+        self.write('secret.txt', b'secret')
+        settings_override = override_settings(
+            STATIC_ROOT=os.path.join(self.root, 'static'), MEDIA_ROOT=os.path.join(self.root, 'media'),
+            PDF_STRICT_LOCAL_ASSETS=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def write(self, name, content):
+        path = os.path.join(self.root, name)
+        with open(path, 'wb') as fh:
+            fh.write(content)
+        return path
+
+    def test_cache_reuses_entries_until_the_file_changes(self):
+        cache = pdf.AssetCache(max_entries=1)
+        path = os.path.join(self.root, 'static/logo.png')
+        self.assertEqual(cache.get(path), (b'png', 'image/png'))
+        self.assertEqual(cache.get(path)[0], b'png')
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        stat = os.stat(path)
+        self.write('static/logo.png', b'png2')
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(cache.get(path)[0], b'png2')
+        self.assertEqual(cache.misses, 2)
+
+        other = self.write('static/other.css', b'body {}')
+        cache.get(other)  # Taille maximale 1 : la plus ancienne entrée est évincée
+        self.assertEqual(len(cache._entries), 1)
+        self.assertIsNone(cache.get(os.path.join(self.root, 'static/absent.png')))
+
+    def test_strict_fetcher_serves_local_files_only(self):
+        base = settings.PDF_BASE_URL.rstrip('/')
+        fetched = pdf.local_url_fetcher(f"{base}/static/logo.png")
+        self.assertEqual((fetched['string'], fetched['mime_type']), (b'png', 'image/png'))
+        for url in (
+            f"{base}/static/../secret.txt",
+            f"{base}/media/../secret.txt",
+            "https://example.com/logo.png",
+        ):
+            with self.subTest(url=url), mock.patch.object(pdf, 'default_url_fetcher') as fetch:
+                with self.assertRaises(ValueError):
+                    pdf.local_url_fetcher(url)
+                fetch.assert_not_called()
+
+        with override_settings(PDF_STRICT_LOCAL_ASSETS=False), \
+                mock.patch.object(pdf, 'default_url_fetcher', return_value={'string': b''}) as fetch:
+            pdf.local_url_fetcher("https://example.com/logo.png")
+            fetch.assert_called_once()
+
+    def test_stylesheets_are_parsed_once(self):
+        self.write('static/report.css', b'body { font-size: 8px; }')
+        stylesheet = pdf.get_stylesheet('report.css')
+        self.assertIs(pdf.get_stylesheet('report.css'), stylesheet)
+        with self.assertRaises(FileNotFoundError):
+            pdf.get_stylesheet('../secret.txt')
+
+
+@unittest.skipUnless(settings.TEST_COUNTRY_PARTITIONS, "profil de tests config.test_settings")
+@override_settings(COUNTRY_PARTITIONS=settings.TEST_COUNTRY_PARTITIONS)
+class PartitionTests(TestCase):
+    """Bases par groupe de pays : référence recopiée dans chaque partition."""
+
+    databases = '__all__'
+
+    def test_reference_rows_follow_the_central_base(self):
+        code, alias = next(iter(settings.COUNTRY_PARTITIONS.items()))
+        country = Country.objects.create(name="Partition", code=code)
+        user = CustomUser.objects.create(username="partition_user")
+        self.assertTrue(Country.objects.using(alias).filter(pk=country.pk).exists())
+
+        user.first_name = "Awa"
+        user.save(update_fields=['first_name'])
+        self.assertEqual(CustomUser.objects.using(alias).get(pk=user.pk).first_name, "Awa")
+
+        user.delete()
+        self.assertFalse(CustomUser.objects.using(alias).filter(pk=user.pk).exists())
+
+    def test_job_copies_rows_written_without_signals(self):
+        alias = partitions.partition_aliases()[0]
+        Country.objects.bulk_create([Country(name="Sans signal", code="ZZZ")])
+        country = Country.objects.get(code="ZZZ")
+        self.assertFalse(Country.objects.using(alias).filter(pk=country.pk).exists())
+        synchroniser_partitions()
+        self.assertTrue(Country.objects.using(alias).filter(pk=country.pk).exists())
+
+
+@unittest.skipUnless(settings.TEST_COUNTRY_PARTITIONS, "profil de tests config.test_settings")
+@override_settings(COUNTRY_PARTITIONS=settings.TEST_COUNTRY_PARTITIONS)
+class PartitionMiddlewareTests(TestCase):
+    """Vues web : périmètre du pays actif, objet routé par son identifiant, listes lues dans chaque base."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        call_command('sync_partitions', '--reserve-ids', stdout=StringIO())
+        self.alias = partitions.partition_aliases()[0]
+        self.central = Country.objects.create(name="Central", code="ZZZ")
+        self.partitioned = Country.objects.create(name="Partition", code=next(iter(settings.COUNTRY_PARTITIONS)))
+        self.manager = CustomUser.objects.create(username="cm")
+        role = Role.objects.create(name="Country Manager")
+        self.projects = {}
+        for country, budget in ((self.central, 100), (self.partitioned, 300)):
+            EmployeeCountryAssignment.objects.create(user=self.manager, country=country, role=role)
+            with partitions.country_scope(country.pk):
+                self.projects[country.code] = Project.objects.create(
+                    country=country, name=f"P-{country.code}", coordinator=self.manager,
+                    start_date=datetime.date(2025, 1, 1 + len(self.projects)), budget_alloue=budget,
+                )
+
+    def request(self, user, **params):
+        request = RequestFactory().get('/', params)
+        request.user = user
+        request.session = {}
+        return request
+
+    def test_scope_follows_the_active_country(self):
+        seen = {}
+
+        def view(request):
+            seen.update(alias=partitions.partition_alias(), read=partitions.read_aliases())
+
+        middleware = partitions.PartitionMiddleware(view)
+        middleware(self.request(self.manager))
+        self.assertEqual(seen, {'alias': 'default', 'read': sorted(['default', self.alias])})
+
+        request = self.request(self.manager, country=self.partitioned.pk)
+        middleware(request)
+        self.assertEqual(seen, {'alias': self.alias, 'read': [self.alias]})
+        self.assertEqual(request.session[partitions.SESSION_KEY], self.partitioned.pk)
+        self.assertEqual(partitions.partition_alias(), 'default')
+
+    def test_object_in_url_is_read_from_its_base(self):
+        project = self.projects[self.partitioned.code]
+        self.assertEqual(partitions.partition_for_id(project.pk), self.alias)
+        self.assertEqual(partitions.partition_for_id(self.projects[self.central.code].pk), 'default')
+        seen = {}
+
+        def view(request, pk):
+            seen['alias'] = partitions.partition_alias()
+        view.view_class = type('ProjectView', (), {'model': Project})
+
+        middleware = partitions.PartitionMiddleware(view)
+        request = self.request(self.manager)
+        with partitions.partition_scope('default'):
+            middleware.process_view(request, view, (), {'pk': project.pk})
+            view(request, pk=project.pk)
+        self.assertEqual(seen['alias'], self.alias)
+
+    def test_merged_queryset(self):
+        with partitions.read_scope(partitions.all_databases()):
+            projects = partitions.across_partitions(Project.objects.order_by('-start_date'))
+            self.assertEqual([p.name for p in projects], ["P-" + self.partitioned.code, "P-ZZZ"])
+            self.assertEqual(projects.count(), 2)
+            self.assertEqual([p.name for p in projects[1:2]], ["P-ZZZ"])
+            self.assertEqual(projects.aggregate(total=Sum('budget_alloue'), avg=Avg('budget_alloue')),
+                             {'total': 400, 'avg': 200})
+            by_coordinator = projects.values('coordinator').annotate(n=Count('pk'))
+            self.assertEqual(list(by_coordinator), [{'coordinator': self.manager.pk, 'n': 2}])
+            self.assertEqual(list(CustomUser.objects.filter(coordinated_projects__in=projects).distinct()), [self.manager])
+
+    def test_project_list_reads_every_base(self):
+        self.client.force_login(CustomUser.objects.create(username="root", is_superuser=True))
+        response = self.client.get(reverse('projects:project_list'))
+        self.assertEqual({p.name for p in response.context['projects']}, {"P-ZZZ", "P-" + self.partitioned.code})
+        self.assertEqual(response.context['total_projects'], 2)
+        response = self.client.get(reverse('projects:project_list'), {'country': self.partitioned.code})
+        self.assertEqual([p.name for p in response.context['projects']], ["P-" + self.partitioned.code])
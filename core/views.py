@@ -7,18 +7,28 @@ from datetime import date
 import json
 
 # 👇 IMPORTS AJOUTÉS DE MA PROPOSITION
-from django.db.models import Sum, DecimalField
+from django.db.models import Sum
 from django.db.models.functions import Coalesce
 from datetime import timedelta
 from decimal import Decimal
 from projects.models import Project, Task, Site
-from finance.models import Depense, Revenu, DEPENSE_CATEGORIE_CHOICES, ObligationFiscale
+from finance.models import Depense, Revenu, DEPENSE_CATEGORIE_CHOICES, CostLedger
+from finance.ledger import with_ledger_total
 from inventaire.models import Equipement
 from logistique.models import Vehicule
-from rh.models import Certification
 # Note: J'utilise CustomUser car il est importé implicitement par 'settings.AUTH_USER_MODEL'
 # mais j'ai besoin de 'Assignation'
 from users.models import CustomUser, Assignation 
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from core import metrics
+from core.counters import get_counters
+from core.partitions import across_partitions
+from finance.jobs import count_upcoming_obligations
+from inventaire.jobs import count_due_inspections
+from rh.jobs import count_expiring_certifications
 
 
 class HomeView(LoginRequiredMixin, TemplateView):
@@ -51,18 +61,19 @@ class HomeView(LoginRequiredMixin, TemplateView):
         })
 
         # --- 2. DONNÉES PERSONNELLES (POUR TOUS) ---
-        personal_tasks = Task.objects.filter(
+        # Bases de tous les pays de l'utilisateur (core/partitions.py)
+        personal_tasks = across_partitions(Task.objects.filter(
             assigned_to=user,
             status__in=["TO_DO", "IN_PROGRESS", "QC_PENDING"],
             site__project__country__id__in=active_country_ids,
-        ).select_related("site__project__country").order_by("due_date")
+        ).select_related("site__project__country").order_by("due_date"))
         context["personal_tasks"] = personal_tasks
 
         # --- 3. LOGIQUE SPÉCIFIQUE PAR RÔLE (EXISTANTE) ---
         # (J'ai laissé tout ton code existant intact ici)
         if IS_CM:
-            cm_projects = Project.objects.filter(country__id__in=active_country_ids)
-            cm_sites = Site.objects.filter(project__country__id__in=active_country_ids)
+            cm_projects = across_partitions(Project.objects.filter(country__id__in=active_country_ids))
+            cm_sites = across_partitions(Site.objects.filter(project__country__id__in=active_country_ids))
             
             status_counts = cm_projects.aggregate(
                 active=Count(Case(When(is_active=True, is_completed=False, then=1))),
@@ -82,10 +93,12 @@ class HomeView(LoginRequiredMixin, TemplateView):
             }
 
         if IS_COORDINATOR:
-            coordinator_projects = Project.objects.filter(
+            coordinator_projects = across_partitions(Project.objects.filter(
                 coordinator=user, country__id__in=active_country_ids
-            )
-            sites_in_projects = Site.objects.filter(project__in=coordinator_projects)
+            ))
+            sites_in_projects = across_partitions(Site.objects.filter(
+                project__coordinator=user, project__country__id__in=active_country_ids
+            ))
             sites_to_plan = sites_in_projects.filter(tasks__isnull=True)
             context.update({
                 "coordinator_project_count": coordinator_projects.count(),
@@ -100,7 +113,7 @@ class HomeView(LoginRequiredMixin, TemplateView):
                 queryset=Task.objects.filter(status__in=["TO_DO", "IN_PROGRESS", "QC_PENDING"]),
                 to_attr="active_tasks_list",
             )
-            tl_assigned_sites = (
+            tl_assigned_sites = across_partitions(
                 Site.objects.filter(
                     team_lead=user, project__country__id__in=active_country_ids
                 )
@@ -130,9 +143,9 @@ class HomeView(LoginRequiredMixin, TemplateView):
                 "my_tasks": my_tasks,
                 "my_active_tasks_count": my_tasks.count(),
                 "my_overdue_tasks_count": my_tasks.filter(due_date__lt=today).count(),
-                "my_completed_tasks_today": Task.objects.filter(
+                "my_completed_tasks_today": across_partitions(Task.objects.filter(
                     assigned_to=user, completion_date__date=today
-                ).count(),
+                )).count(),
             })
 
         # ====================================================================
@@ -145,16 +158,14 @@ class HomeView(LoginRequiredMixin, TemplateView):
             trente_jours_ago = today - timedelta(days=30)
             
             # [Source 7] Calcul de la rentabilité par projet
-            projets = Project.objects.filter(
-                is_active=True, 
-                country__id__in=active_country_ids
-            ).annotate(
-                total_depenses=Coalesce(
-                    Sum('depenses__montant'), 
-                    Decimal('0.00'),
-                    output_field=DecimalField()
-                )
-            ).order_by('-start_date')
+            projets = with_ledger_total(
+                across_partitions(Project.objects.filter(
+                    is_active=True, 
+                    country__id__in=active_country_ids
+                ).order_by('-start_date')),
+                # Lu dans le registre des coûts plutôt que réagrégé depuis Depense
+                'total_depenses', CostLedger.SCOPE_PROJET,
+            )
             
             rentabilite_projets = []
             for p in projets:
@@ -169,17 +180,17 @@ class HomeView(LoginRequiredMixin, TemplateView):
             context['rentabilite_projets'] = rentabilite_projets
 
             # [Source 8] Totaux des 30 derniers jours
-            total_depenses_30j = Depense.objects.filter(
+            total_depenses_30j = across_partitions(Depense.objects.filter(
                 date__gte=trente_jours_ago,
                 projet_associe__country__id__in=active_country_ids
-            ).aggregate(
+            )).aggregate(
                 total=Coalesce(Sum('montant'), Decimal('0.00'))
             )['total']
             
-            total_revenus_30j = Revenu.objects.filter(
+            total_revenus_30j = across_partitions(Revenu.objects.filter(
                 date__gte=trente_jours_ago,
                 projet_facture__country__id__in=active_country_ids
-            ).aggregate(
+            )).aggregate(
                 total=Coalesce(Sum('montant'), Decimal('0.00'))
             )['total']
             
@@ -188,10 +199,10 @@ class HomeView(LoginRequiredMixin, TemplateView):
             context['balance_30j'] = total_revenus_30j - total_depenses_30j
 
             # [Source 8] Dépenses par catégorie
-            depenses_par_categorie = Depense.objects.filter(
+            depenses_par_categorie = across_partitions(Depense.objects.filter(
                 date__gte=trente_jours_ago,
                 projet_associe__country__id__in=active_country_ids
-            ).values('categorie').annotate(
+            )).values('categorie').annotate(
                 total=Sum('montant')
             ).order_by('-total')
             
@@ -214,11 +225,11 @@ class HomeView(LoginRequiredMixin, TemplateView):
 
 
             # ÉTAPE 2: (LIGNE 204 MODIFIÉE) Utilise ce queryset pour filtrer les assignations
-            employes_assignes_ids = Assignation.objects.filter(
+            employes_assignes_ids = across_partitions(Assignation.objects.filter(
                 date_debut_assignation__lte=today,
                 date_fin_assignation__gte=today,
                 employe__in=employes_in_active_countries  # <-- On utilise __in sur la liste d'employés
-            ).values_list('employe_id', flat=True).distinct()
+            ).values_list('employe_id', flat=True).distinct())
 
             employes_inactifs = CustomUser.objects.filter(
                 statut_actuel='ACTIF',
@@ -236,7 +247,7 @@ class HomeView(LoginRequiredMixin, TemplateView):
             context['cout_inactivite_mensuel'] = cout_inactivite
 
             # [Source 14, 15] Suivi des Tâches Global (pour CM)
-            taches_globales = Task.objects.filter(site__project__country__id__in=active_country_ids)
+            taches_globales = across_partitions(Task.objects.filter(site__project__country__id__in=active_country_ids))
             
             context['taches_en_retard'] = taches_globales.filter(
                 due_date__lt=today
@@ -249,7 +260,28 @@ class HomeView(LoginRequiredMixin, TemplateView):
             # New stats from inventaire, logistique, rh
             context['equipement_count'] = Equipement.objects.count()
             context['vehicule_count'] = Vehicule.objects.count()
-            context['expiring_certifications_count'] = Certification.objects.filter(date_expiration__lte=today + timedelta(days=30)).count()
-            context['upcoming_obligations_count'] = ObligationFiscale.objects.filter(date_echeance__gte=today, statut='A_PAYER').count()
+            # Compteurs précalculés par le planificateur (run_scheduler), calcul direct en secours
+            counters = get_counters({
+                'rh.certifications_expirant': count_expiring_certifications,
+                'finance.obligations_a_venir': count_upcoming_obligations,
+                'inventaire.inspections_dues': count_due_inspections,
+            })
+            context['expiring_certifications_count'] = counters['rh.certifications_expirant']
+            context['upcoming_obligations_count'] = counters['finance.obligations_a_venir']
+            context['due_inspections_count'] = counters['inventaire.inspections_dues']
+
+        return context
 
-        return context
\ No newline at end of file
+def metrics_view(request):
+    """
+    Métriques au format texte Prometheus ; réservé au collecteur (jeton
+    METRICS_TOKEN) et aux superutilisateurs. L'adresse du client n'est pas
+    utilisée : derrière le proxy, toutes les requêtes viennent de 127.0.0.1.
+    """
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    authorized = bool(settings.METRICS_TOKEN) and scheme.lower() == 'bearer' and constant_time_compare(
+        token.strip(), settings.METRICS_TOKEN,
+    )
+    if not authorized and not request.user.is_superuser:
+        raise PermissionDenied
+    return HttpResponse(metrics.render_text(), content_type='text/plain; version=0.0.4; charset=utf-8')
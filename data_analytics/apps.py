@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DataAnalyticsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "data_analytics"
+
+    def ready(self):
+        import data_analytics.signals
@@ -0,0 +1,185 @@
+# data_analytics/facts.py
+
+"""
+Alimentation des tables de faits analytiques (AnalyticsFact, ExpenseFact).
+
+Les signaux (data_analytics.signals) enregistrent les seaux modifiés dans
+DirtyBucket ; refresh_dirty() ne recalcule que ces seaux, avec une requête
+groupée par source de données, quel que soit le nombre de seaux.
+rebuild_all() recalcule tout (mise en service, contrôle).
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from finance.models import Depense, Revenu
+from projects.models import Project, Site
+from .models import AnalyticsFact, DirtyBucket, ExpenseFact
+
+ZERO = Decimal('0')
+
+# Mesure -> (queryset source, champ projet, champ date, agrégats)
+FACT_SOURCES = (
+    (lambda: Site.objects.all(), 'project_id', 'start_date',
+     {'sites_started': Count('id')}),
+    (lambda: Site.objects.filter(status='COMPLETED'), 'project_id', 'end_date',
+     {'sites_completed': Count('id')}),
+    (lambda: Site.objects.filter(po_recu=True), 'project_id', 'project__start_date',
+     {'po_sites': Count('id'), 'po_amount': Sum('prix_facturation')}),
+    (lambda: Revenu.objects.all(), 'projet_facture_id', 'date',
+     {'revenue': Sum('montant')}),
+    (lambda: Project.objects.all(), 'id', 'start_date',
+     {'projects_started': Count('id'), 'budget': Sum('budget_alloue'), 'progress': Sum('progress_percentage')}),
+)
+
+
+class _Scope:
+    """Ensemble des seaux à recalculer ; None = tout."""
+
+    def __init__(self, buckets=None, projects=None):
+        self.buckets = buckets      # {(project_id, year, month)}
+        self.projects = projects    # {project_id} recalculés entièrement
+
+    @property
+    def is_full(self):
+        return self.buckets is None and self.projects is None
+
+    def project_ids(self):
+        return {key[0] for key in self.buckets} | set(self.projects)
+
+    def filter(self, queryset, project_field):
+        """Restreint une source aux projets concernés (filtre grossier)."""
+        if self.is_full:
+            return queryset
+        ids = self.project_ids()
+        condition = Q(**{f"{project_field}__in": [pk for pk in ids if pk is not None]})
+        if None in ids:
+            condition |= Q(**{f"{project_field}__isnull": True})
+        return queryset.filter(condition)
+
+    def contains(self, key):
+        return self.is_full or key[0] in self.projects or key in self.buckets
+
+
+def _aggregate_facts(scope):
+    facts = defaultdict(dict)
+    for source, project_field, date_field, aggregates in FACT_SOURCES:
+        rows = (
+            scope.filter(source(), project_field)
+            .exclude(**{f"{date_field}__isnull": True})
+            .annotate(fact_year=ExtractYear(date_field), fact_month=ExtractMonth(date_field))
+            .values(project_field, 'fact_year', 'fact_month')
+            .annotate(**aggregates)
+            .order_by()
+        )
+        for row in rows:
+            key = (row[project_field], row['fact_year'], row['fact_month'])
+            if scope.contains(key):
+                facts[key].update({name: row[name] or ZERO for name in aggregates})
+    return facts
+
+
+def _aggregate_expenses(scope):
+    rows = (
+        scope.filter(Depense.objects.all(), 'projet_associe_id')
+        .annotate(fact_year=ExtractYear('date'), fact_month=ExtractMonth('date'))
+        .values('projet_associe_id', 'fact_year', 'fact_month', 'categorie')
+        .annotate(total=Sum('montant'), count=Count('id'))
+        .order_by()
+    )
+    expenses = {}
+    for row in rows:
+        key = (row['projet_associe_id'], row['fact_year'], row['fact_month'])
+        if scope.contains(key):
+            expenses[key + (row['categorie'],)] = (row['total'] or ZERO, row['count'])
+    return expenses
+
+
+def _delete_existing(scope):
+    if scope.is_full:
+        AnalyticsFact.objects.all().delete()
+        ExpenseFact.objects.all().delete()
+        return
+    for model in (AnalyticsFact, ExpenseFact):
+        stale_ids = [
+            pk for pk, project_id, year, month
+            in scope.filter(model.objects.all(), 'project_id').values_list('pk', 'project_id', 'year', 'month')
+            if scope.contains((project_id, year, month))
+        ]
+        for start in range(0, len(stale_ids), 500):
+            model.objects.filter(pk__in=stale_ids[start:start + 500]).delete()
+
+
+def _refresh(scope):
+    facts = _aggregate_facts(scope)
+    expenses = _aggregate_expenses(scope)
+    project_ids = {key[0] for key in facts} | {key[0] for key in expenses}
+    countries = dict(
+        Project.objects.filter(pk__in=[pk for pk in project_ids if pk is not None]).values_list('pk', 'country_id')
+    )
+
+    with transaction.atomic(using=router.db_for_write(DirtyBucket)):
+        _delete_existing(scope)
+        AnalyticsFact.objects.bulk_create([
+            AnalyticsFact(country_id=countries.get(project_id), project_id=project_id, year=year, month=month, **measures)
+            for (project_id, year, month), measures in facts.items()
+        ], batch_size=500)
+        ExpenseFact.objects.bulk_create([
+            ExpenseFact(
+                country_id=countries.get(project_id), project_id=project_id, year=year, month=month,
+                categorie=categorie, total=total, count=count,
+            )
+            for (project_id, year, month, categorie), (total, count) in expenses.items()
+        ], batch_size=500)
+    return len(facts) + len(expenses)
+
+
+def rebuild_all():
+    """Recalcule toutes les tables de faits. Retourne le nombre de lignes écrites."""
+    with transaction.atomic(using=router.db_for_write(DirtyBucket)):
+        # Les seaux marqués avant le recalcul complet sont couverts par celui-ci
+        last_id = DirtyBucket.objects.order_by('-pk').values_list('pk', flat=True).first()
+        written = _refresh(_Scope())
+        if last_id is not None:
+            DirtyBucket.objects.filter(pk__lte=last_id).delete()
+    return written
+
+
+def refresh_dirty():
+    """
+    Recalcule uniquement les seaux marqués. Retourne (seaux traités, lignes écrites).
+    Les seaux verrouillés par un rafraîchissement concurrent sont ignorés.
+    """
+    with transaction.atomic(using=router.db_for_write(DirtyBucket)):
+        dirty = DirtyBucket.objects.select_for_update(skip_locked=True).values_list('pk', 'project_id', 'year', 'month')
+        dirty = list(dirty)
+        if not dirty:
+            return 0, 0
+
+        buckets, projects = set(), set()
+        for _, project_id, year, month in dirty:
+            if year is None:
+                projects.add(project_id)
+            else:
+                buckets.add((project_id, year, month))
+
+        written = _refresh(_Scope(buckets, projects))
+        DirtyBucket.objects.filter(pk__in=[row[0] for row in dirty]).delete()
+    return len(buckets) + len(projects), written
+
+
+def mark_dirty(project_id, *dates):
+    """Marque les seaux (projet, mois) correspondant aux dates données."""
+    keys = {(project_id, d.year, d.month) for d in dates if d}
+    DirtyBucket.objects.bulk_create([
+        DirtyBucket(project_id=pid, year=year, month=month) for pid, year, month in keys
+    ])
+
+
+def mark_project_dirty(project_id):
+    """Marque tous les seaux d'un projet (pays, budget ou date modifiés)."""
+    DirtyBucket.objects.create(project_id=project_id)
@@ -0,0 +1,13 @@
+# data_analytics/jobs.py
+
+from core.partitions import for_each_partition
+from core.scheduler import job
+from .facts import refresh_dirty
+
+
+@job("*/5 * * * *")
+def rafraichir_tables_de_faits():
+    """Recalcule les seaux analytiques modifiés depuis le dernier passage."""
+    results = for_each_partition(refresh_dirty).values()  # Base centrale et bases par groupe de pays
+    buckets, written = sum(r[0] for r in results), sum(r[1] for r in results)
+    return f"{buckets} seau(x), {written} ligne(s)"
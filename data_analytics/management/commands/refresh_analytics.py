@@ -0,0 +1,27 @@
+# data_analytics/management/commands/refresh_analytics.py
+
+from django.core.management.base import BaseCommand
+
+from data_analytics.facts import rebuild_all, refresh_dirty
+
+
+class Command(BaseCommand):
+    help = (
+        "Met à jour les tables de faits analytiques : recalcule uniquement les seaux "
+        "(pays, projet, année, mois) modifiés depuis le dernier passage, ou tout avec --full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Recalcule toutes les tables de faits (mise en service).")
+
+    def handle(self, *args, **options):
+        if options['full']:
+            written = rebuild_all()
+            self.stdout.write(self.style.SUCCESS(f"✅ Tables de faits reconstruites : {written} ligne(s)."))
+            return
+
+        buckets, written = refresh_dirty()
+        if not buckets:
+            self.stdout.write("Aucun seau à recalculer.")
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ {buckets} seau(x) recalculé(s), {written} ligne(s) écrite(s)."))
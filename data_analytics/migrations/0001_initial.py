@@ -0,0 +1,249 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("projects", "0033_alter_task_assigned_to"),
+        ("users", "0007_alter_profileupdate_data"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DirtyBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "project_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="ID du projet"
+                    ),
+                ),
+                (
+                    "year",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="Année"
+                    ),
+                ),
+                (
+                    "month",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="Mois"
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Seau analytique à recalculer",
+                "verbose_name_plural": "Seaux analytiques à recalculer",
+            },
+        ),
+        migrations.CreateModel(
+            name="AnalyticsFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Année")),
+                ("month", models.PositiveSmallIntegerField(verbose_name="Mois")),
+                (
+                    "sites_started",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Sites démarrés"
+                    ),
+                ),
+                (
+                    "sites_completed",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Sites terminés"
+                    ),
+                ),
+                (
+                    "po_sites",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Sites avec PO"
+                    ),
+                ),
+                (
+                    "po_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Montant facturable (PO)",
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Revenus",
+                    ),
+                ),
+                (
+                    "projects_started",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Projets démarrés"
+                    ),
+                ),
+                (
+                    "budget",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Budget alloué",
+                    ),
+                ),
+                (
+                    "progress",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Somme des avancements",
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projects.project",
+                        verbose_name="Projet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Fait analytique",
+                "verbose_name_plural": "Faits analytiques",
+                "indexes": [
+                    models.Index(
+                        fields=["country", "year", "month"],
+                        name="data_analyt_country_dfbbdb_idx",
+                    )
+                ],
+                "unique_together": {("project", "year", "month")},
+            },
+        ),
+        migrations.CreateModel(
+            name="ExpenseFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveSmallIntegerField(verbose_name="Année")),
+                ("month", models.PositiveSmallIntegerField(verbose_name="Mois")),
+                (
+                    "categorie",
+                    models.CharField(
+                        choices=[
+                            ("LOYER", "Loyer"),
+                            ("ELECTRICITE", "Electricité"),
+                            ("EAU", "Eau"),
+                            ("CARBURANT", "Carburant"),
+                            ("SALAIRE", "Salaire"),
+                            ("IMPOTS", "Impôts"),
+                            ("ACHAT_MATERIEL", "Achat Matériel"),
+                            ("REPARATION_VEHICULE", "Réparation Véhicule"),
+                            ("REPARATION_EQUIPEMENT", "Réparation Équipement"),
+                            ("CERTIFICATION", "Certification"),
+                            ("TRANSPORT", "Transport"),
+                            ("SOUS_TRAITANT", "Sous-traitant"),
+                            ("AUTRE", "Autre"),
+                        ],
+                        max_length=50,
+                        verbose_name="Catégorie",
+                    ),
+                ),
+                (
+                    "total",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=16,
+                        verbose_name="Total des dépenses",
+                    ),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Nombre de dépenses"
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="users.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="projects.project",
+                        verbose_name="Projet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Fait de dépenses",
+                "verbose_name_plural": "Faits de dépenses",
+                "indexes": [
+                    models.Index(
+                        fields=["country", "year", "month"],
+                        name="data_analyt_country_a5eb7f_idx",
+                    )
+                ],
+                "unique_together": {("project", "year", "month", "categorie")},
+            },
+        ),
+    ]
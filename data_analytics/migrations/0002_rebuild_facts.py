@@ -0,0 +1,21 @@
+from django.db import migrations
+
+def rebuild_facts(apps, schema_editor):
+    # Tables de faits calculées depuis les sources de chaque base (base
+    # centrale, puis chaque partition à sa migration)
+    from core.partitions import partition_scope
+    from data_analytics.facts import rebuild_all
+    with partition_scope(schema_editor.connection.alias):
+        rebuild_all()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_analytics', '0001_initial'),
+        ('finance', '0012_rebuild_cost_ledger'),
+        ('projects', '0039_site_site_id_client_upper_site_site_name_upper'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_facts, migrations.RunPython.noop),
+    ]
@@ -1,2 +1,78 @@
+from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+from finance.models import DEPENSE_CATEGORIE_CHOICES
+
+
+# =================================================================
+# Tables de faits pré-agrégées (data_analytics.facts)
+# Granularité : (pays, projet, année, mois). Le pays est celui du projet au
+# moment du rafraîchissement ; projet et pays sont vides pour les dépenses
+# sans projet associé.
+# =================================================================
+
+class AnalyticsFact(models.Model):
+    country = models.ForeignKey('users.Country', on_delete=models.CASCADE, null=True, blank=True, related_name="+", verbose_name=_("Pays"))
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name="+", verbose_name=_("Projet"))
+    year = models.PositiveSmallIntegerField(verbose_name=_("Année"))
+    month = models.PositiveSmallIntegerField(verbose_name=_("Mois"))
+
+    # Sites, par date de démarrage / date de fin (statut COMPLETED)
+    sites_started = models.PositiveIntegerField(default=0, verbose_name=_("Sites démarrés"))
+    sites_completed = models.PositiveIntegerField(default=0, verbose_name=_("Sites terminés"))
+    # Sites avec PO reçu, par date de démarrage du projet
+    po_sites = models.PositiveIntegerField(default=0, verbose_name=_("Sites avec PO"))
+    po_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Montant facturable (PO)"))
+    # Revenus encaissés, par date de réception
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Revenus"))
+    # Projet, par date de démarrage
+    projects_started = models.PositiveIntegerField(default=0, verbose_name=_("Projets démarrés"))
+    budget = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Budget alloué"))
+    progress = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name=_("Somme des avancements"))
+
+    class Meta:
+        verbose_name = _("Fait analytique")
+        verbose_name_plural = _("Faits analytiques")
+        unique_together = ('project', 'year', 'month')
+        indexes = [
+            models.Index(fields=['country', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id or '-'} {self.year}-{self.month:02d}"
+
+
+class ExpenseFact(models.Model):
+    country = models.ForeignKey('users.Country', on_delete=models.CASCADE, null=True, blank=True, related_name="+", verbose_name=_("Pays"))
+    project = models.ForeignKey('projects.Project', on_delete=models.CASCADE, null=True, blank=True, related_name="+", verbose_name=_("Projet"))
+    year = models.PositiveSmallIntegerField(verbose_name=_("Année"))
+    month = models.PositiveSmallIntegerField(verbose_name=_("Mois"))
+    categorie = models.CharField(max_length=50, choices=DEPENSE_CATEGORIE_CHOICES, verbose_name=_("Catégorie"))
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name=_("Total des dépenses"))
+    count = models.PositiveIntegerField(default=0, verbose_name=_("Nombre de dépenses"))
+
+    class Meta:
+        verbose_name = _("Fait de dépenses")
+        verbose_name_plural = _("Faits de dépenses")
+        unique_together = ('project', 'year', 'month', 'categorie')
+        indexes = [
+            models.Index(fields=['country', 'year', 'month']),
+        ]
+
+    def __str__(self):
+        return f"{self.project_id or '-'} {self.year}-{self.month:02d} {self.categorie}"
+
+
+class DirtyBucket(models.Model):
+    """
+    Seau (projet, année, mois) à recalculer, enregistré par les signaux dans la
+    même transaction que la modification. Année/mois vides = tout le projet.
+    """
+    project_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("ID du projet"))
+    year = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name=_("Année"))
+    month = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name=_("Mois"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Seau analytique à recalculer")
+        verbose_name_plural = _("Seaux analytiques à recalculer")
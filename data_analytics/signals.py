@@ -0,0 +1,85 @@
+# data_analytics/signals.py
+
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from finance.models import Depense, Revenu
+from projects.models import Project, Site
+from .facts import mark_dirty, mark_project_dirty
+
+# Champs déterminant le seau (projet, date) de chaque source
+TRACKED_FIELDS = {
+    Site: ('project_id', 'start_date', 'end_date'),
+    Revenu: ('projet_facture_id', 'date'),
+    Depense: ('projet_associe_id', 'date'),
+}
+
+# Champs qui alimentent une mesure : un save(update_fields=...) qui n'en touche
+# aucun (ex: avancement seul) ne marque rien.
+MEASURE_FIELDS = {
+    Site: {'project', 'start_date', 'end_date', 'status', 'po_recu', 'prix_facturation'},
+    Revenu: {'projet_facture', 'date', 'montant'},
+    Depense: {'projet_associe', 'date', 'montant', 'categorie'},
+    Project: {'country', 'start_date', 'budget_alloue', 'progress_percentage'},
+}
+
+
+def _is_relevant(sender, update_fields):
+    return update_fields is None or bool(MEASURE_FIELDS[sender] & set(update_fields))
+
+
+def _mark(instance, values):
+    project_id, *dates = values
+    if isinstance(instance, Site) and project_id:
+        # Le montant PO est rangé à la date de démarrage du projet
+        dates.append(Project.objects.filter(pk=project_id).values_list('start_date', flat=True).first())
+    mark_dirty(project_id, *dates)
+
+
+@receiver(pre_save, sender=Site)
+@receiver(pre_save, sender=Revenu)
+@receiver(pre_save, sender=Depense)
+def remember_previous_bucket(sender, instance, **kwargs):
+    """Mémorise l'ancien seau : une modification de date ou de projet touche deux seaux."""
+    if kwargs.get("raw", False) or not instance.pk or not _is_relevant(sender, kwargs.get("update_fields")):
+        return
+    instance._analytics_previous = (
+        sender.objects.filter(pk=instance.pk).values_list(*TRACKED_FIELDS[sender]).first()
+    )
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Revenu)
+@receiver(post_save, sender=Depense)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Revenu)
+@receiver(post_delete, sender=Depense)
+def mark_analytics_buckets(sender, instance, **kwargs):
+    """Enregistre les seaux analytiques à recalculer (même transaction que la modification)."""
+    if kwargs.get("raw", False):  # Ignore pendant le chargement des fixtures
+        return
+    if not _is_relevant(sender, kwargs.get("update_fields")):
+        return
+
+    _mark(instance, [getattr(instance, field) for field in TRACKED_FIELDS[sender]])
+    previous = getattr(instance, '_analytics_previous', None)
+    if previous:
+        _mark(instance, list(previous))
+        instance._analytics_previous = None
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+def mark_project_buckets(sender, instance, **kwargs):
+    if kwargs.get("raw", False) or not _is_relevant(sender, kwargs.get("update_fields")):
+        return
+    mark_project_dirty(instance.pk)
+
+
+@receiver(pre_delete, sender=Project)
+def mark_detached_expense_buckets(sender, instance, **kwargs):
+    """
+    Les dépenses d'un projet supprimé sont détachées en SQL (SET_NULL, sans
+    signaux) : elles rejoignent les seaux « sans projet » de leurs mois.
+    """
+    mark_dirty(None, *instance.depenses.dates('date', 'month'))
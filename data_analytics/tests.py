@@ -1,2 +1,34 @@
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase
+
+from finance.models import Depense
+from projects.models import Project
+from users.models import Country, CustomUser
+from .facts import rebuild_all, refresh_dirty
+from .models import ExpenseFact
+
+
+class ProjectDeletionFactsTests(TestCase):
+    """Les dépenses détachées d'un projet supprimé rejoignent les faits « sans projet »."""
+
+    def test_deleted_project_expenses_move_to_no_project_bucket(self):
+        country = Country.objects.create(name="Bénin", code="BEN")
+        coordinator = CustomUser.objects.create(username="coord")
+        project = Project.objects.create(
+            country=country, name="P1", coordinator=coordinator, start_date=datetime.date(2025, 1, 1),
+        )
+        for day, amount in ((3, "100.00"), (20, "50.00")):
+            Depense.objects.create(
+                date=datetime.date(2025, 3, day), montant=Decimal(amount), description="x",
+                categorie="CARBURANT", projet_associe=project,
+            )
+        rebuild_all()
+        self.assertFalse(ExpenseFact.objects.filter(project__isnull=True).exists())
+
+        project.delete()
+        refresh_dirty()
+
+        fact = ExpenseFact.objects.get(project__isnull=True, year=2025, month=3)
+        self.assertEqual((fact.total, fact.count), (Decimal("150.00"), 2))
@@ -1,98 +1,102 @@
-from django.db.models import Count, Sum
-from django.db.models.functions import ExtractYear, ExtractMonth
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from core.partitions import add_partition_counts, fan_out, merge_sums, partitioning_enabled
 from projects.models import Site
-from finance.models import Depense, Revenu
-from users.models import CustomUser
+from users.models import CustomUser, with_main_role, with_performance_counts
+from .models import AnalyticsFact, ExpenseFact
+
+# Les agrégats temporels sont lus dans les tables de faits (data_analytics.facts),
+# alimentées incrémentalement à partir des sites, dépenses, revenus et projets.
+# Sans filtre pays et avec des bases par groupe de pays (core.partitions),
+# chaque base est interrogée et les agrégats fusionnés.
+
+def _facts(country_id=None, model=AnalyticsFact):
+    facts = model.objects.all()
+    if country_id:
+        facts = facts.filter(country_id=country_id)
+    return facts
+
+def _merged(country_id, data, keys, sums, reverse=False):
+    """Agrégat de toutes les bases si aucun pays n'est filtré (partitions configurées)."""
+    if country_id or not partitioning_enabled():
+        return data
+    return merge_sums(fan_out(data), keys, sums, reverse)
 
 def get_monthly_site_creation_data(country_id=None, year=None):
     """Agrège les données de création de sites par mois."""
-    sites = Site.objects.all()
-    if country_id:
-        sites = sites.filter(project__country_id=country_id)
+    facts = _facts(country_id).exclude(sites_started=0)
     if year:
-        sites = sites.filter(start_date__year=year)
+        facts = facts.filter(year=year)
 
     monthly_data = (
-        sites.annotate(month=ExtractMonth('start_date'))
-        .values('month')
-        .annotate(site_count=Count('id'))
+        facts.values('month')
+        .annotate(site_count=Sum('sites_started'))
         .order_by('month')
     )
-    return monthly_data
+    return _merged(country_id, monthly_data, ['month'], ['site_count'])
 
 def get_monthly_expense_data(country_id=None, year=None):
     """Agrège les données de dépenses par mois."""
-    expenses = Depense.objects.all()
-    if country_id:
-        expenses = expenses.filter(projet_associe__country_id=country_id)
+    facts = _facts(country_id, ExpenseFact)
     if year:
-        expenses = expenses.filter(date__year=year)
+        facts = facts.filter(year=year)
 
     monthly_data = (
-        expenses.annotate(month=ExtractMonth('date'))
-        .values('month')
-        .annotate(total_expense=Sum('montant'))
+        facts.values('month')
+        .annotate(total_expense=Sum('total'))
         .order_by('month')
     )
-    return monthly_data
+    return _merged(country_id, monthly_data, ['month'], ['total_expense'])
 
 def get_yearly_revenue_data(country_id=None):
     """Agrège les données de revenus par année."""
-    revenues = Revenu.objects.all()
-    if country_id:
-        revenues = revenues.filter(projet_facture__country_id=country_id)
-
     yearly_data = (
-        revenues.annotate(year=ExtractYear('date'))
+        _facts(country_id).exclude(revenue=0)
         .values('year')
-        .annotate(total_revenue=Sum('montant'))
+        .annotate(total_revenue=Sum('revenue'))
         .order_by('year')
     )
-    return yearly_data
+    return _merged(country_id, yearly_data, ['year'], ['total_revenue'])
 
 def get_yearly_site_creation_data(country_id=None):
     """Agrège les données de création de sites par année."""
-    sites = Site.objects.all()
-    if country_id:
-        sites = sites.filter(project__country_id=country_id)
-
     yearly_data = (
-        sites.annotate(year=ExtractYear('start_date'))
+        _facts(country_id).exclude(sites_started=0)
         .values('year')
-        .annotate(site_count=Count('id'))
+        .annotate(site_count=Sum('sites_started'))
         .order_by('year')
     )
-    return yearly_data
+    return _merged(country_id, yearly_data, ['year'], ['site_count'])
 
 def get_team_lead_performance_data(country_id=None):
     """Récupère les données de performance des chefs d'équipe."""
     team_leads = CustomUser.objects.filter(groups__name='Team_Lead')
     if country_id:
         team_leads = team_leads.filter(assignments__country_id=country_id).distinct()
+    completed_sites = Site.objects.filter(team_lead=OuterRef('pk'), status='COMPLETED').order_by().values('team_lead')
+    team_leads = with_performance_counts(team_leads).annotate(
+        completed_sites=Coalesce(Subquery(completed_sites.annotate(count=Count('pk')).values('count')), 0),
+    )
+    team_leads = add_partition_counts(list(team_leads), team_leads)
 
     performance_data = []
     for lead in team_leads:
-        completed_sites = Site.objects.filter(team_lead=lead, status='COMPLETED').count()
         performance_data.append({
             'username': lead.username,
-            'completed_sites': completed_sites,
+            'completed_sites': lead.completed_sites,
             'success_rate': lead.team_lead_success_rate(),
         })
     return performance_data
 
 def get_site_creation_by_year_and_month(country_id=None):
     """Agrège les données de création de sites par année et par mois."""
-    sites = Site.objects.all()
-    if country_id:
-        sites = sites.filter(project__country_id=country_id)
-
     yearly_monthly_data = (
-        sites.annotate(year=ExtractYear('start_date'), month=ExtractMonth('start_date'))
+        _facts(country_id).exclude(sites_started=0)
         .values('year', 'month')
-        .annotate(site_count=Count('id'))
+        .annotate(site_count=Sum('sites_started'))
         .order_by('-year', '-month')
     )
-    return yearly_monthly_data
+    return _merged(country_id, yearly_monthly_data, ['year', 'month'], ['site_count'], reverse=True)
 
 def get_site_creation_pivot_data(country_id=None):
     """Crée un tableau croisé dynamique des données de création de sites."""
@@ -119,9 +123,11 @@ def get_site_creation_pivot_data(country_id=None):
 
 def get_employee_performance_data(country_id=None, year=None, month=None):
     """Récupère les données de performance des employés."""
-    users = CustomUser.objects.all()
+    users = CustomUser.objects.select_related('job_role')
     if country_id:
         users = users.filter(assignments__country_id=country_id).distinct()
+    counts = with_performance_counts(users)
+    users = add_partition_counts(list(with_performance_counts(with_main_role(users))), counts)
 
     # This is a simplified version. For a more accurate calculation, 
     # you would need to filter tasks based on the provided year and month.
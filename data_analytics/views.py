@@ -10,15 +10,23 @@ from .utils import (
     get_site_creation_pivot_data,
 )
 from users.models import Country
+from .facts import refresh_dirty
+from core.replica import reading_from_replica, replica_safe
 from datetime import date
 import calendar
 
 @login_required
+@replica_safe
 def dashboard_view(request):
     countries = Country.objects.filter(is_active=True)
     selected_country_id = request.GET.get('country')
     selected_year = request.GET.get('year', date.today().year)
 
+    # Intègre les modifications récentes avant de lire les tables de faits
+    # (sur la réplique, les faits arrivent déjà rafraîchis par la tâche planifiée)
+    if not reading_from_replica():
+        refresh_dirty()
+
     monthly_site_creation_qs = get_monthly_site_creation_data(selected_country_id, selected_year)
     monthly_expense_qs = get_monthly_expense_data(selected_country_id, selected_year)
     yearly_revenue_qs = get_yearly_revenue_data(selected_country_id)
@@ -11,4 +11,5 @@ class FinanceConfig(AppConfig):
     # AJOUTER CETTE MÉTHODE
     def ready(self):
         # Importer les signaux pour les connecter
-        pass
+        # (finance.signals reste désactivé ; seul le registre des coûts est branché)
+        import finance.ledger
@@ -1,9 +1,10 @@
 # finance/forms.py
 from django import forms
 from .models import Depense, Revenu
-from projects.models import WorkCompletionRecord
-# 'CustomUser' n'est plus nécessaire ici, mais 'Task' l'est
-# from users.models import CustomUser 
+from core.autocomplete import use_autocomplete
+from projects.models import Task, WorkCompletionRecord
+from users.forms import user_label
+from users.models import CustomUser
 
 class DepenseForm(forms.ModelForm):
     class Meta:
@@ -52,4 +53,80 @@ class WorkCompletionForm(forms.ModelForm):
         ]
         widgets = {
             'date': forms.DateInput(attrs={'type': 'date'}),
-        }
\ No newline at end of file
+        }
+
+# =================================================================
+# Saisie en masse (Paie Terrain) : grille hebdomadaire et import CSV
+# =================================================================
+
+WEEK_DAYS = ("Lun", "Mar", "Mer", "Jeu", "Ven", "Sam", "Dim")
+
+
+class WorkWeekForm(forms.Form):
+    week_start = forms.DateField(
+        label="Semaine du (lundi)",
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+    )
+
+
+def task_label(task):
+    """Libellé d'une tâche dans les listes : « [ID client du site] description »."""
+    return f"[{task.site.site_id_client}] {task.description[:30]}"
+
+
+class WorkWeekRowForm(forms.Form):
+    """
+    Une ligne de la grille : un employé sur une tâche, heures par jour.
+    Employés et tâches : listes à recherche (seules les valeurs choisies sont
+    rendues), validées sur les querysets limités aux pays de l'utilisateur
+    fournis par la vue.
+    """
+
+    employee = forms.ModelChoiceField(
+        queryset=CustomUser.objects.none(), required=False, label="Employé",
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    task = forms.ModelChoiceField(
+        queryset=Task.objects.none(), required=False, label="Tâche",
+        widget=forms.Select(attrs={'class': 'form-select form-select-sm'}),
+    )
+    completion_percentage = forms.IntegerField(
+        min_value=0, max_value=100, required=False, label="Achèvement (%)",
+        widget=forms.NumberInput(attrs={'class': 'form-control form-control-sm'}),
+    )
+
+    def __init__(self, *args, employees=None, tasks=None, country_ids=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if employees is not None:
+            self.fields['employee'].queryset = employees
+        if tasks is not None:
+            self.fields['task'].queryset = tasks.select_related('site')
+        self.fields['employee'].label_from_instance = user_label
+        self.fields['task'].label_from_instance = task_label
+        use_autocomplete(self.fields['employee'], 'users:user_autocomplete', country=country_ids)
+        use_autocomplete(self.fields['task'], 'projects:task_autocomplete', open=1, country=country_ids)
+        for index, label in enumerate(WEEK_DAYS):
+            self.fields[f'day_{index}'] = forms.DecimalField(
+                min_value=0, max_value=24, max_digits=5, decimal_places=2, required=False, label=label,
+                widget=forms.NumberInput(attrs={'step': '0.25', 'class': 'form-control form-control-sm'}),
+            )
+
+    def day_fields(self):
+        return [self[f'day_{index}'] for index in range(len(WEEK_DAYS))]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        hours = [cleaned_data.get(f'day_{index}') for index in range(len(WEEK_DAYS))]
+        if any(hours) and not (cleaned_data.get('employee') and cleaned_data.get('task')):
+            raise forms.ValidationError("Employé et tâche sont obligatoires pour une ligne avec des heures.")
+        return cleaned_data
+
+
+WorkWeekRowFormSet = forms.formset_factory(WorkWeekRowForm, extra=15)
+
+
+class WorkRecordImportForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier CSV",
+        help_text="Colonnes : date (AAAA-MM-JJ), employe (matricule ou identifiant), tache (ID), heures, achevement.",
+    )
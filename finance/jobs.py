@@ -0,0 +1,31 @@
+# finance/jobs.py
+
+from datetime import date
+
+from core.counters import set_counters
+from core.partitions import for_each_partition
+from core.scheduler import job
+from .models import ObligationFiscale
+
+
+def count_upcoming_obligations(today=None):
+    today = today or date.today()
+    return sum(for_each_partition(
+        lambda: ObligationFiscale.objects.filter(date_echeance__gte=today, statut='A_PAYER').count()
+    ).values())
+
+
+@job("5 0 * * *")
+def marquer_obligations_en_retard():
+    """Passe en EN_RETARD les obligations fiscales échues et non payées."""
+    updated = sum(for_each_partition(
+        lambda: ObligationFiscale.objects.filter(statut='A_PAYER', date_echeance__lt=date.today()).update(statut='EN_RETARD')
+    ).values())
+    set_counters({'finance.obligations_a_venir': count_upcoming_obligations()})
+    return f"{updated} obligation(s) passée(s) en retard"
+
+
+@job("*/30 * * * *")
+def compter_obligations_a_venir():
+    """Précalcule le nombre d'obligations fiscales à payer (tableau de bord)."""
+    set_counters({'finance.obligations_a_venir': count_upcoming_obligations()})
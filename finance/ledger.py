@@ -0,0 +1,299 @@
+# finance/ledger.py
+
+"""
+Registre des coûts (CostLedger) : totaux courants par site, projet, véhicule,
+équipement et mois, ventilés par catégorie de dépense.
+
+Chaque enregistrement ou suppression de Depense/Revenu applique un delta
+(`total = total + x`) aux lignes concernées, dans la même transaction ; une
+ligne vidée de sa dernière dépense et de son dernier revenu est supprimée. Les
+rapports lisent ensuite une ligne par entité au lieu de réagréger Depense.
+La suppression d'un site, projet, véhicule ou équipement détache ses dépenses
+(SET_NULL, sans signaux) : leur contribution est retirée au préalable.
+rebuild_ledger() / verify_ledger() recalculent le registre depuis les sources.
+
+Le registre reste sur la base centrale (core.partitions) : les totaux d'objets
+lus sur une partition sont chargés par une seconde requête (with_ledger_total) ;
+reconstruction et suppressions d'entités lisent les dépenses de toutes les bases.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, ExtractMonth, ExtractYear
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core.partitions import across_partitions, all_databases, is_partitioned, partitioning_enabled, read_scope
+from inventaire.models import Equipement
+from logistique.models import Vehicule
+from projects.models import Project, Site
+
+from .models import CostLedger, Depense, Revenu
+
+ZERO = Decimal("0.00")
+TOTAL = ''  # Catégorie de la ligne « toutes catégories »
+
+# Portée -> champ de Depense désignant l'entité
+DEPENSE_ENTITY_FIELDS = (
+    (CostLedger.SCOPE_SITE, 'site_concerne_id'),
+    (CostLedger.SCOPE_PROJET, 'projet_associe_id'),
+    (CostLedger.SCOPE_VEHICULE, 'vehicule_concerne_id'),
+    (CostLedger.SCOPE_EQUIPEMENT, 'equipement_concerne_id'),
+)
+DEPENSE_FIELDS = ('montant', 'categorie', 'date') + tuple(field for _, field in DEPENSE_ENTITY_FIELDS)
+REVENU_FIELDS = ('montant', 'date', 'projet_facture_id')
+# Modèle de l'entité -> (portée, champ de Depense)
+ENTITY_SCOPES = {
+    Depense._meta.get_field(field).related_model: (scope, field) for scope, field in DEPENSE_ENTITY_FIELDS
+}
+
+
+def _depense_deltas(values, sign, deltas):
+    montant, categorie, date, *entity_ids = values
+    keys = [
+        (scope, entity_id, '', category)
+        for (scope, _), entity_id in zip(DEPENSE_ENTITY_FIELDS, entity_ids) if entity_id
+        for category in (categorie, TOTAL)
+    ]
+    keys += [(CostLedger.SCOPE_MOIS, 0, f"{date:%Y-%m}", category) for category in (categorie, TOTAL)]
+    for key in keys:
+        deltas[key][0] += sign * montant
+        deltas[key][1] += sign
+
+
+def _revenu_deltas(values, sign, deltas):
+    montant, date, projet_id = values
+    for key in ((CostLedger.SCOPE_PROJET, projet_id, '', TOTAL), (CostLedger.SCOPE_MOIS, 0, f"{date:%Y-%m}", TOTAL)):
+        deltas[key][2] += sign * montant
+        deltas[key][3] += sign
+
+
+def _all_bases(queryset):
+    """Lignes de toutes les bases, quel que soit le périmètre de l'appelant (le registre est global)."""
+    with read_scope(all_databases()):
+        return across_partitions(queryset)
+
+
+def _new_deltas():
+    return defaultdict(lambda: [ZERO, 0, ZERO, 0])
+
+
+def apply_deltas(deltas):
+    """Applique les deltas par UPDATE atomique ; crée les lignes manquantes."""
+    # Ordre stable : deux transactions verrouillent les lignes dans le même ordre
+    for key in sorted(deltas):
+        depenses, nb_depenses, revenus, nb_revenus = deltas[key]
+        if not (depenses or nb_depenses or revenus or nb_revenus):
+            continue
+        scope, entity_id, period, categorie = key
+        rows = CostLedger.objects.filter(scope=scope, entity_id=entity_id, period=period, categorie=categorie)
+        increments = dict(
+            total_depenses=F('total_depenses') + depenses,
+            nb_depenses=F('nb_depenses') + nb_depenses,
+            total_revenus=F('total_revenus') + revenus,
+            nb_revenus=F('nb_revenus') + nb_revenus,
+        )
+        if rows.update(**increments):
+            if nb_depenses < 0 or nb_revenus < 0:
+                rows.filter(nb_depenses=0, nb_revenus=0).delete()
+            continue
+        try:
+            with transaction.atomic():
+                CostLedger.objects.create(
+                    scope=scope, entity_id=entity_id, period=period, categorie=categorie,
+                    total_depenses=depenses, nb_depenses=nb_depenses,
+                    total_revenus=revenus, nb_revenus=nb_revenus,
+                )
+        except IntegrityError:
+            # Ligne créée entre-temps par une transaction concurrente
+            rows.update(**increments)
+
+
+# =================================================================
+# Signaux : tenue du registre
+# =================================================================
+
+@receiver(pre_save, sender=Depense)
+@receiver(pre_save, sender=Revenu)
+def remember_previous_amounts(sender, instance, **kwargs):
+    if kwargs.get("raw", False) or not instance.pk:
+        return
+    fields = DEPENSE_FIELDS if sender is Depense else REVENU_FIELDS
+    instance._ledger_previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Depense)
+@receiver(post_save, sender=Revenu)
+@receiver(post_delete, sender=Depense)
+@receiver(post_delete, sender=Revenu)
+def update_cost_ledger(sender, instance, **kwargs):
+    """Reporte la création, modification ou suppression dans le registre des coûts."""
+    if kwargs.get("raw", False):  # Ignore pendant le chargement des fixtures
+        return
+
+    if sender is Depense:
+        fields, add = DEPENSE_FIELDS, _depense_deltas
+    else:
+        fields, add = REVENU_FIELDS, _revenu_deltas
+
+    deltas = _new_deltas()
+    previous = getattr(instance, '_ledger_previous', None)
+    if previous:
+        add(previous, -1, deltas)
+        instance._ledger_previous = None
+    if 'created' in kwargs:  # post_save (absent pour post_delete)
+        add(tuple(getattr(instance, field) for field in fields), 1, deltas)
+    elif not previous:  # post_delete : on retire la contribution actuelle
+        add(tuple(getattr(instance, field) for field in fields), -1, deltas)
+
+    with transaction.atomic():
+        apply_deltas(deltas)
+
+
+@receiver(pre_delete, sender=Site)
+@receiver(pre_delete, sender=Project)
+@receiver(pre_delete, sender=Vehicule)
+@receiver(pre_delete, sender=Equipement)
+def detach_entity_depenses(sender, instance, **kwargs):
+    """
+    Les dépenses d'une entité supprimée passent « sans entité » (SET_NULL, en
+    SQL) : leur contribution est retirée des lignes de l'entité, qui sont
+    supprimées une fois vides. Les revenus d'un projet (CASCADE) sont retirés
+    par leurs propres signaux.
+    """
+    scope, field = ENTITY_SCOPES[sender]
+    rows = _all_bases(
+        Depense.objects.filter(**{field: instance.pk}).values('categorie').annotate(total=Sum('montant'), nb=Count('id'))
+    )
+    deltas = _new_deltas()
+    for row in rows:
+        for category in (row['categorie'], TOTAL):
+            delta = deltas[(scope, instance.pk, '', category)]
+            delta[0] -= row['total']
+            delta[1] -= row['nb']
+    with transaction.atomic():
+        apply_deltas(deltas)
+
+
+def record_bulk_depenses(depenses):
+    """Reporte dans le registre des dépenses créées par bulk_create (aucun signal émis)."""
+    deltas = _new_deltas()
+    for depense in depenses:
+        _depense_deltas(tuple(getattr(depense, field) for field in DEPENSE_FIELDS), 1, deltas)
+    with transaction.atomic():
+        apply_deltas(deltas)
+
+
+# =================================================================
+# Reconstruction et vérification
+# =================================================================
+
+def compute_expected():
+    """Registre attendu, recalculé depuis Depense et Revenu de toutes les bases : {clé: [dép, nb, rev, nb]}."""
+    expected = _new_deltas()
+
+    def collect(queryset, scope, entity_field, measure, period=False):
+        group = ['fact_year', 'fact_month'] if period else [entity_field]
+        if period:
+            queryset = queryset.annotate(fact_year=ExtractYear('date'), fact_month=ExtractMonth('date'))
+        else:
+            queryset = queryset.exclude(**{f"{entity_field}__isnull": True})
+        by_category = measure == 0
+        for with_category in ((True, False) if by_category else (False,)):
+            fields = group + (['categorie'] if with_category else [])
+            rows = queryset.values(*fields).annotate(total=Sum('montant'), nb=Count('id')).order_by()
+            for row in _all_bases(rows):
+                if period:
+                    entity_id, key_period = 0, f"{row['fact_year']:04d}-{row['fact_month']:02d}"
+                else:
+                    entity_id, key_period = row[entity_field], ''
+                key = (scope, entity_id, key_period, row['categorie'] if with_category else TOTAL)
+                expected[key][measure] += row['total'] or ZERO
+                expected[key][measure + 1] += row['nb']
+
+    for scope, field in DEPENSE_ENTITY_FIELDS:
+        collect(Depense.objects.all(), scope, field, 0)
+    collect(Depense.objects.all(), CostLedger.SCOPE_MOIS, None, 0, period=True)
+    collect(Revenu.objects.all(), CostLedger.SCOPE_PROJET, 'projet_facture_id', 2)
+    collect(Revenu.objects.all(), CostLedger.SCOPE_MOIS, None, 2, period=True)
+    return expected
+
+
+def _stored():
+    return {
+        (row.scope, row.entity_id, row.period, row.categorie):
+            [row.total_depenses, row.nb_depenses, row.total_revenus, row.nb_revenus]
+        for row in CostLedger.objects.all()
+    }
+
+
+def verify_ledger():
+    """Retourne la liste des écarts (clé, stocké, attendu) entre le registre et les sources."""
+    expected = {key: values for key, values in compute_expected().items() if any(values)}
+    stored = {key: values for key, values in _stored().items() if any(values)}
+    empty = [ZERO, 0, ZERO, 0]
+    return [
+        (key, stored.get(key, empty), expected.get(key, empty))
+        for key in sorted(set(expected) | set(stored))
+        if stored.get(key, empty) != expected.get(key, empty)
+    ]
+
+
+def rebuild_ledger():
+    """Remplace tout le registre par les valeurs recalculées. Retourne le nombre de lignes."""
+    expected = compute_expected()
+    with transaction.atomic():
+        CostLedger.objects.all().delete()
+        CostLedger.objects.bulk_create([
+            CostLedger(
+                scope=scope, entity_id=entity_id, period=period, categorie=categorie,
+                total_depenses=values[0], nb_depenses=values[1],
+                total_revenus=values[2], nb_revenus=values[3],
+            )
+            for (scope, entity_id, period, categorie), values in expected.items()
+        ], batch_size=500)
+    return len(expected)
+
+
+# =================================================================
+# Lecture
+# =================================================================
+
+def ledger_total(scope, outer_ref='pk', categories=None, field='total_depenses'):
+    """
+    Expression d'annotation : total du registre pour l'entité courante.
+    Sans `categories`, lit la seule ligne « toutes catégories ».
+    """
+    rows = CostLedger.objects.filter(scope=scope, entity_id=OuterRef(outer_ref))
+    rows = rows.filter(categorie__in=categories) if categories else rows.filter(categorie=TOTAL)
+    total = rows.values('entity_id').annotate(total=Sum(field)).values('total')[:1]
+    return Coalesce(Subquery(total), ZERO, output_field=DecimalField(max_digits=16, decimal_places=2))
+
+
+def with_ledger_total(queryset, name, scope, categories=None, field='total_depenses'):
+    """
+    Objets du queryset avec leur total du registre dans l'attribut `name`.
+    Modèle partitionné (bases par groupe de pays) : le registre n'est pas dans
+    la base des objets, les totaux sont lus par une seconde requête sur la
+    base centrale et la liste des objets est retournée.
+    """
+    if not (partitioning_enabled() and is_partitioned(queryset.model)):
+        return queryset.annotate(**{name: ledger_total(scope, categories=categories, field=field)})
+    objects = list(queryset)
+    rows = CostLedger.objects.filter(scope=scope, entity_id__in=[obj.pk for obj in objects], period='')
+    rows = rows.filter(categorie__in=categories) if categories else rows.filter(categorie=TOTAL)
+    totals = dict(rows.values('entity_id').annotate(total=Sum(field)).values_list('entity_id', 'total'))
+    for obj in objects:
+        setattr(obj, name, totals.get(obj.pk, ZERO))
+    return objects
+
+
+def entity_total(scope, entity_id, field='total_depenses'):
+    """Total « toutes catégories » d'une entité donnée."""
+    value = CostLedger.objects.filter(
+        scope=scope, entity_id=entity_id, period='', categorie=TOTAL
+    ).values_list(field, flat=True).first()
+    return value if value is not None else ZERO
@@ -0,0 +1,31 @@
+# finance/management/commands/rebuild_cost_ledger.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance.ledger import rebuild_ledger, verify_ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit le registre des coûts (totaux par site, projet, véhicule, équipement "
+        "et mois) depuis les dépenses et revenus, ou le vérifie avec --verify."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Compare le registre aux sources sans rien modifier.")
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            count = rebuild_ledger()
+            self.stdout.write(self.style.SUCCESS(f"✅ Registre des coûts reconstruit : {count} ligne(s)."))
+            return
+
+        differences = verify_ledger()
+        for (scope, entity_id, period, categorie), stored, expected in differences:
+            self.stderr.write(self.style.ERROR(
+                f"❌ {scope} {entity_id or period} [{categorie or 'TOTAL'}] : "
+                f"registre={stored} attendu={expected}"
+            ))
+        if differences:
+            raise CommandError(f"{len(differences)} écart(s) détecté(s). Lancez la commande sans --verify pour reconstruire.")
+        self.stdout.write(self.style.SUCCESS("✅ Registre des coûts cohérent avec les dépenses et revenus."))
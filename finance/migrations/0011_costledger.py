@@ -0,0 +1,92 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:27
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("finance", "0010_depense_vehicule_concerne_alter_depense_categorie_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CostLedger",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("SITE", "Site"),
+                            ("PROJET", "Projet"),
+                            ("VEHICULE", "Véhicule"),
+                            ("EQUIPEMENT", "Équipement"),
+                            ("MOIS", "Mois"),
+                        ],
+                        max_length=20,
+                        verbose_name="Portée",
+                    ),
+                ),
+                (
+                    "entity_id",
+                    models.BigIntegerField(default=0, verbose_name="ID de l'entité"),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        max_length=7,
+                        verbose_name="Période (AAAA-MM)",
+                    ),
+                ),
+                (
+                    "categorie",
+                    models.CharField(
+                        blank=True, default="", max_length=50, verbose_name="Catégorie"
+                    ),
+                ),
+                (
+                    "total_depenses",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=16,
+                        verbose_name="Total des dépenses",
+                    ),
+                ),
+                (
+                    "nb_depenses",
+                    models.IntegerField(default=0, verbose_name="Nombre de dépenses"),
+                ),
+                (
+                    "total_revenus",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=16,
+                        verbose_name="Total des revenus",
+                    ),
+                ),
+                (
+                    "nb_revenus",
+                    models.IntegerField(default=0, verbose_name="Nombre de revenus"),
+                ),
+            ],
+            options={
+                "verbose_name": "Registre des coûts",
+                "verbose_name_plural": "Registre des coûts",
+                "unique_together": {("scope", "entity_id", "period", "categorie")},
+            },
+        ),
+    ]
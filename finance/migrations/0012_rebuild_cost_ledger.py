@@ -0,0 +1,20 @@
+from django.db import DEFAULT_DB_ALIAS, migrations
+
+def rebuild_cost_ledger(apps, schema_editor):
+    # Registre recalculé depuis les sources : retire les lignes des entités
+    # supprimées avant la tenue des suppressions (finance.ledger). Le registre
+    # n'existe que sur la base centrale.
+    if schema_editor.connection.alias != DEFAULT_DB_ALIAS:
+        return
+    from finance.ledger import rebuild_ledger
+    rebuild_ledger()
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_costledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_cost_ledger, migrations.RunPython.noop),
+    ]
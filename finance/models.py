@@ -5,6 +5,7 @@ from users.models import Country, Role, CustomUser
 from projects.models import Project, Site
 from logistique.models import Vehicule
 from inventaire.models import Equipement
+from core.metrics import timed
 from PIL import Image
 from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
@@ -87,29 +88,30 @@ class Depense(models.Model):
 
     def save(self, *args, **kwargs):
         if self.recu_scan:
-            img = Image.open(self.recu_scan)
+            with timed('photo_processing_seconds', kind='recu_depense'):
+                img = Image.open(self.recu_scan)
 
-            MAX_SIZE = (1280, 1280)
-            QUALITY = 85
+                MAX_SIZE = (1280, 1280)
+                QUALITY = 85
 
-            if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
-                img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
+                if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
+                    img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
 
-            output = BytesIO()
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
+                output = BytesIO()
+                if img.mode == 'RGBA':
+                    img = img.convert('RGB')
 
-            img.save(output, format='JPEG', quality=QUALITY, optimize=True)
-            output.seek(0)
+                img.save(output, format='JPEG', quality=QUALITY, optimize=True)
+                output.seek(0)
 
-            self.recu_scan = InMemoryUploadedFile(
-                output, 
-                'ImageField', 
-                f"{self.recu_scan.name.split('.')[0]}.jpg", 
-                'image/jpeg', 
-                sys.getsizeof(output), 
-                None
-            )
+                self.recu_scan = InMemoryUploadedFile(
+                    output, 
+                    'ImageField', 
+                    f"{self.recu_scan.name.split('.')[0]}.jpg", 
+                    'image/jpeg', 
+                    sys.getsizeof(output), 
+                    None
+                )
 
         super().save(*args, **kwargs)
 
@@ -154,3 +156,44 @@ class ObligationFiscale(models.Model):
 
     def __str__(self):
         return f"{self.type_impot} - {self.date_echeance}"
+
+
+# =================================================================
+# 4. Modèle CostLedger (registre des coûts, tenu par finance.ledger)
+# =================================================================
+class CostLedger(models.Model):
+    """
+    Totaux courants des dépenses et revenus par entité, mis à jour à chaque
+    enregistrement/suppression de Depense ou Revenu. Une ligne par
+    (portée, entité, période, catégorie) ; la catégorie vide porte le total
+    toutes catégories confondues, ce qui permet de lire une seule ligne par entité.
+    """
+    SCOPE_SITE = "SITE"
+    SCOPE_PROJET = "PROJET"
+    SCOPE_VEHICULE = "VEHICULE"
+    SCOPE_EQUIPEMENT = "EQUIPEMENT"
+    SCOPE_MOIS = "MOIS"
+    SCOPE_CHOICES = (
+        (SCOPE_SITE, _("Site")),
+        (SCOPE_PROJET, _("Projet")),
+        (SCOPE_VEHICULE, _("Véhicule")),
+        (SCOPE_EQUIPEMENT, _("Équipement")),
+        (SCOPE_MOIS, _("Mois")),
+    )
+
+    scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, verbose_name=_("Portée"))
+    entity_id = models.BigIntegerField(default=0, verbose_name=_("ID de l'entité"))  # 0 pour la portée Mois
+    period = models.CharField(max_length=7, blank=True, default='', verbose_name=_("Période (AAAA-MM)"))
+    categorie = models.CharField(max_length=50, blank=True, default='', verbose_name=_("Catégorie"))
+    total_depenses = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"), verbose_name=_("Total des dépenses"))
+    nb_depenses = models.IntegerField(default=0, verbose_name=_("Nombre de dépenses"))
+    total_revenus = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"), verbose_name=_("Total des revenus"))
+    nb_revenus = models.IntegerField(default=0, verbose_name=_("Nombre de revenus"))
+
+    class Meta:
+        verbose_name = _("Registre des coûts")
+        verbose_name_plural = _("Registre des coûts")
+        unique_together = ("scope", "entity_id", "period", "categorie")
+
+    def __str__(self):
+        return f"{self.scope} {self.entity_id or self.period} [{self.categorie or 'TOTAL'}]"
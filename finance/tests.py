@@ -1,2 +1,233 @@
+import datetime
+import unittest
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.partitions import country_scope
+from inventaire.models import Equipement
+from logistique.models import Vehicule
+from projects.models import Project, Site, Task, TaskType, WorkCompletionRecord
+from users.models import Country, CustomUser, EmployeeCountryAssignment, Role
+from .ledger import rebuild_ledger, verify_ledger, with_ledger_total
+from .models import CostLedger, Depense, Revenu
+from .timesheets import TimesheetError, ingest_rows, parse_csv
+
+
+def csv_file(content):
+    return SimpleUploadedFile("heures.csv", content.encode('utf-8'), content_type='text/csv')
+
+
+class TimesheetImportTests(TestCase):
+    """Import CSV des heures : lignes mal formées signalées, employés limités aux pays de l'utilisateur."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.benin = Country.objects.create(name="Bénin", code="BEN")
+        cls.togo = Country.objects.create(name="Togo", code="TGO")
+        cls.manager = CustomUser.objects.create(username="chef")
+        task_type = TaskType.objects.create(name="Pose", code="POSE")
+        role = Role.objects.create(name="Rigger")
+        cls.tasks = {}
+        for country in (cls.benin, cls.togo):
+            project = Project.objects.create(
+                country=country, name=f"P-{country.code}", coordinator=cls.manager,
+                start_date=datetime.date(2025, 1, 1),
+            )
+            site = Site.objects.create(project=project, site_id_client=f"S-{country.code}", name="Site")
+            cls.tasks[country.code] = Task.objects.create(
+                site=site, task_type=task_type, description="Pose", due_date=datetime.date(2025, 6, 1),
+            )
+            employee = CustomUser.objects.create(username=f"tech_{country.code.lower()}")
+            EmployeeCountryAssignment.objects.create(user=employee, country=country, role=role)
+        # Saisie de la grille, affecté au Bénin seulement
+        cls.grid_user = CustomUser.objects.create(username="saisie")
+        cls.grid_user.user_permissions.add(Permission.objects.get(codename='add_workcompletionrecord'))
+        EmployeeCountryAssignment.objects.create(user=cls.grid_user, country=cls.benin, role=role)
+
+    def test_single_column_header_falls_back_to_semicolon(self):
+        with self.assertRaises(TimesheetError) as raised:
+            parse_csv(csv_file("date\n2025-03-01\n"))
+        self.assertIn("Colonnes manquantes", raised.exception.errors[0])
+
+    def test_short_lines_are_reported(self):
+        task = self.tasks['BEN'].pk
+        content = (
+            "date;employe;tache;heures;achevement\n"
+            f"2025-03-01;tech_ben;{task};8;10\n"
+            "2025-03-02\n"
+        )
+        with self.assertRaises(TimesheetError) as raised:
+            parse_csv(csv_file(content))
+        self.assertEqual(len(raised.exception.errors), 1)
+        self.assertTrue(raised.exception.errors[0].startswith("Ligne 3 :"))
+
+    def test_employees_outside_allowed_countries_are_rejected(self):
+        task = self.tasks['BEN'].pk
+        rows = parse_csv(csv_file(
+            "date,employe,tache,heures,achevement\n"
+            f"2025-03-01,tech_ben,{task},8,10\n"
+            f"2025-03-01,tech_tgo,{task},8,10\n"
+        ))
+        with self.assertRaises(TimesheetError) as raised:
+            ingest_rows(rows, self.manager, allowed_country_ids=[self.benin.pk])
+        self.assertEqual(raised.exception.errors, ["Ligne 3 : employé sans affectation active dans vos pays"])
+        self.assertFalse(WorkCompletionRecord.objects.exists())
+
+        created = ingest_rows(rows[:1], self.manager, allowed_country_ids=[self.benin.pk])
+        self.assertEqual(len(created), 1)
+
+    def grid_client(self):
+        self.client.force_login(self.grid_user)
+        return self.client
+
+    def test_grid_renders_searchable_selects(self):
+        response = self.grid_client().get(reverse('finance:work_record_grid'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, reverse('projects:task_autocomplete'))
+        self.assertContains(response, reverse('users:user_autocomplete'))
+        # Aucune option employé/tâche n'est rendue d'avance
+        self.assertNotContains(response, "tech_ben")
+        self.assertNotContains(response, "S-BEN")
+
+    def test_grid_rejects_ids_outside_allowed_countries(self):
+        data = {
+            'week_start': '2025-03-03',
+            'rows-TOTAL_FORMS': '1', 'rows-INITIAL_FORMS': '0',
+            'rows-0-employee': CustomUser.objects.get(username="tech_tgo").pk,
+            'rows-0-task': self.tasks['TGO'].pk,
+            'rows-0-day_0': '8',
+        }
+        response = self.grid_client().post(reverse('finance:work_record_grid'), data)
+        self.assertEqual(response.status_code, 200)
+        errors = response.context['formset'].forms[0].errors
+        self.assertIn('employee', errors)
+        self.assertIn('task', errors)
+        self.assertFalse(WorkCompletionRecord.objects.exists())
+
+        data['rows-0-employee'] = CustomUser.objects.get(username="tech_ben").pk
+        data['rows-0-task'] = self.tasks['BEN'].pk
+        response = self.grid_client().post(reverse('finance:work_record_grid'), data)
+        self.assertRedirects(response, reverse('finance:work_record_list'), fetch_redirect_response=False)
+        self.assertEqual(WorkCompletionRecord.objects.count(), 1)
+
+
+class CostLedgerTests(TestCase):
+    """Tenue du registre des coûts : écritures, suppressions d'entités et reconstruction."""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name="Bénin", code="BEN")
+        cls.project = Project.objects.create(
+            country=country, name="P1", coordinator=CustomUser.objects.create(username="coord"),
+            start_date=datetime.date(2025, 1, 1),
+        )
+        cls.site = Site.objects.create(project=cls.project, site_id_client="S1", name="Site")
+        cls.vehicule = Vehicule.objects.create(nom_vehicule="Pick-up", type="PROPRIETAIRE")
+        cls.equipement = Equipement.objects.create(
+            nom_equipement="Harnais", numero_serie="H-1", cout_achat=Decimal("50.00"),
+            date_prochaine_inspection=datetime.date(2026, 1, 1),
+        )
+
+    def depense(self, montant, categorie="CARBURANT", **entities):
+        return Depense.objects.create(
+            date=datetime.date(2025, 3, 1), montant=Decimal(montant), description="Dépense",
+            categorie=categorie, **entities,
+        )
+
+    def total(self, scope, entity_id, categorie=''):
+        row = CostLedger.objects.filter(scope=scope, entity_id=entity_id, period='', categorie=categorie).first()
+        return row and (row.total_depenses, row.nb_depenses)
+
+    def test_save_edit_and_delete(self):
+        depense = self.depense("100.00", projet_associe=self.project, site_concerne=self.site)
+        self.depense("20.00", categorie="EAU", site_concerne=self.site)
+        self.assertEqual(self.total(CostLedger.SCOPE_SITE, self.site.pk), (Decimal("120.00"), 2))
+        self.assertEqual(self.total(CostLedger.SCOPE_SITE, self.site.pk, "CARBURANT"), (Decimal("100.00"), 1))
+
+        depense.montant, depense.categorie, depense.site_concerne = Decimal("80.00"), "EAU", None
+        depense.save()
+        self.assertEqual(self.total(CostLedger.SCOPE_SITE, self.site.pk), (Decimal("20.00"), 1))
+        self.assertIsNone(self.total(CostLedger.SCOPE_SITE, self.site.pk, "CARBURANT"))  # Ligne vidée supprimée
+        self.assertEqual(self.total(CostLedger.SCOPE_PROJET, self.project.pk, "EAU"), (Decimal("80.00"), 1))
+
+        depense.delete()
+        self.assertIsNone(self.total(CostLedger.SCOPE_PROJET, self.project.pk))
+        self.assertEqual(verify_ledger(), [])
+
+    def test_entity_deletion_removes_its_rows(self):
+        self.depense("100.00", projet_associe=self.project, site_concerne=self.site)
+        self.depense("30.00", vehicule_concerne=self.vehicule, equipement_concerne=self.equipement)
+        Revenu.objects.create(date=datetime.date(2025, 3, 1), montant=Decimal("500.00"), projet_facture=self.project)
+
+        self.vehicule.delete()
+        self.equipement.delete()
+        self.project.delete()  # Sites en cascade, revenus en cascade
+        self.assertFalse(CostLedger.objects.exclude(scope=CostLedger.SCOPE_MOIS).exists())
+        month = CostLedger.objects.get(scope=CostLedger.SCOPE_MOIS, period="2025-03", categorie='')
+        self.assertEqual((month.total_depenses, month.total_revenus), (Decimal("130.00"), Decimal("0.00")))
+        self.assertEqual(verify_ledger(), [])
+
+    def test_rebuild_restores_the_ledger(self):
+        self.depense("100.00", projet_associe=self.project, site_concerne=self.site)
+        Revenu.objects.create(date=datetime.date(2025, 3, 1), montant=Decimal("500.00"), projet_facture=self.project)
+        CostLedger.objects.filter(scope=CostLedger.SCOPE_SITE, categorie='').update(total_depenses=Decimal("1.00"))
+        CostLedger.objects.create(scope=CostLedger.SCOPE_VEHICULE, entity_id=999, total_depenses=Decimal("5.00"))
+        self.assertEqual(len(verify_ledger()), 2)
+
+        rebuild_ledger()
+        self.assertEqual(verify_ledger(), [])
+        self.assertEqual(self.total(CostLedger.SCOPE_SITE, self.site.pk), (Decimal("100.00"), 1))
+        self.assertFalse(CostLedger.objects.filter(scope=CostLedger.SCOPE_VEHICULE).exists())
+
+
+@unittest.skipUnless(settings.TEST_COUNTRY_PARTITIONS, "profil de tests config.test_settings")
+@override_settings(COUNTRY_PARTITIONS=settings.TEST_COUNTRY_PARTITIONS)
+class PartitionedLedgerTests(TestCase):
+    """Totaux du registre (base centrale) pour des sites lus sur une partition."""
+
+    databases = '__all__'
+
+    def test_site_totals_are_read_from_the_central_base(self):
+        call_command('sync_partitions', '--reserve-ids', stdout=StringIO())
+        country = Country.objects.create(name="Partition", code=next(iter(settings.COUNTRY_PARTITIONS)))
+        with country_scope(country.pk):
+            project = Project.objects.create(
+                country=country, name="P1", coordinator=CustomUser.objects.create(username="coord"),
+                start_date=datetime.date(2025, 1, 1),
+            )
+            site = Site.objects.create(project=project, site_id_client="S1", name="Site")
+            Depense.objects.create(
+                date=datetime.date(2025, 3, 1), montant=Decimal("120.00"), description="Carburant",
+                categorie="CARBURANT", projet_associe=project, site_concerne=site,
+            )
+            sites = with_ledger_total(Site.objects.all(), 'total_expenses', CostLedger.SCOPE_SITE)
+        self.assertEqual([(obj.pk, obj.total_expenses) for obj in sites], [(site.pk, Decimal("120.00"))])
+
+    def test_site_deletion_and_rebuild_read_every_base(self):
+        call_command('sync_partitions', '--reserve-ids', stdout=StringIO())
+        country = Country.objects.create(name="Partition", code=next(iter(settings.COUNTRY_PARTITIONS)))
+        with country_scope(country.pk):
+            project = Project.objects.create(
+                country=country, name="P1", coordinator=CustomUser.objects.create(username="coord"),
+                start_date=datetime.date(2025, 1, 1),
+            )
+            site = Site.objects.create(project=project, site_id_client="S1", name="Site")
+            Depense.objects.create(
+                date=datetime.date(2025, 3, 1), montant=Decimal("40.00"), description="Carburant",
+                categorie="CARBURANT", projet_associe=project, site_concerne=site,
+            )
+        # Hors du périmètre du pays : le registre et sa vérification lisent toutes les bases
+        self.assertEqual(verify_ledger(), [])
+        site.delete()
+        self.assertFalse(CostLedger.objects.filter(scope=CostLedger.SCOPE_SITE).exists())
+        self.assertEqual(verify_ledger(), [])
+        rebuild_ledger()
+        row = CostLedger.objects.get(scope=CostLedger.SCOPE_PROJET, entity_id=project.pk, categorie='')
+        self.assertEqual(row.total_depenses, Decimal("40.00"))
@@ -0,0 +1,199 @@
+# finance/timesheets.py
+
+"""
+Saisie en masse des enregistrements de travail (Paie Terrain) : grille
+hebdomadaire et import CSV.
+
+Contrairement à la saisie unitaire, tout est résolu en quelques requêtes :
+- les taux horaires (pays, rôle) -> taux sont chargés une seule fois (RateTable) ;
+- employés et tâches sont validés en bloc, les coûts calculés en mémoire ;
+- les enregistrements sont insérés par bulk_create, puis la progression des
+  tâches est recalculée avec un seul agrégat groupé.
+"""
+
+import csv
+import io
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from projects.models import SyncChange, Task, WorkCompletionRecord
+from projects.sync import log_changes
+from users.models import CustomUser, EmployeeCountryAssignment
+from .models import SalaryStructure
+
+HOURS_PER_MONTH = 160  # Même hypothèse que finance.signals : 20 jours * 8h
+
+CSV_COLUMNS = ('date', 'employe', 'tache', 'heures', 'achevement')
+
+
+class TimesheetError(Exception):
+    """Lignes invalides : rien n'est enregistré. `errors` contient les messages."""
+
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} ligne(s) invalide(s)")
+        self.errors = errors
+
+
+@dataclass
+class TimesheetRow:
+    line: int
+    date: date
+    employee_id: int
+    task_id: int
+    duration_hours: Decimal
+    completion_percentage: int = 0
+
+
+class RateTable:
+    """Taux horaires par employé, résolus via (pays, rôle) de sa première affectation active."""
+
+    def __init__(self, employee_ids):
+        monthly = {
+            (country_id, role_id): amount
+            for country_id, role_id, amount in SalaryStructure.objects.values_list('country_id', 'role_id', 'base_amount')
+        }
+        self.hourly = {key: amount / HOURS_PER_MONTH for key, amount in monthly.items()}
+
+        # Première affectation active (même ordre que employee.assignments.filter(...).first())
+        self.assignment = {}
+        assignments = EmployeeCountryAssignment.objects.filter(
+            user_id__in=employee_ids, is_active=True
+        ).order_by('user_id', 'pk').values_list('user_id', 'country_id', 'role_id')
+        for user_id, country_id, role_id in assignments:
+            self.assignment.setdefault(user_id, (country_id, role_id))
+
+    def rate_for(self, employee_id):
+        key = self.assignment.get(employee_id)
+        if key is None:
+            return Decimal('0')
+        return self.hourly.get(key, Decimal('0'))
+
+
+def _to_decimal(value, label):
+    try:
+        return Decimal(str(value).strip().replace(',', '.') or '0')
+    except InvalidOperation:
+        raise ValueError(f"{label} invalide : {value!r}")
+
+
+def _cell(raw, column):
+    """Valeur d'une colonne ; les lignes trop courtes du CSV donnent None."""
+    return (raw.get(column) or '').strip()
+
+
+def parse_csv(uploaded_file):
+    """
+    Lit un CSV (séparateur ; ou ,) avec les colonnes date, employe (matricule
+    ou nom d'utilisateur), tache (ID), heures, achevement.
+    """
+    content = uploaded_file.read()
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    try:
+        delimiter = csv.Sniffer().sniff(content.splitlines()[0] if content else ',', delimiters=';,').delimiter
+    except csv.Error:
+        delimiter = ';'  # En-tête sans séparateur reconnaissable : celui d'Excel en français
+    reader = csv.DictReader(io.StringIO(content), delimiter=delimiter)
+    missing = set(CSV_COLUMNS) - set(reader.fieldnames or ())
+    if missing:
+        raise TimesheetError([f"Colonnes manquantes : {', '.join(sorted(missing))}"])
+
+    raw_rows = list(reader)
+    references = {_cell(row, 'employe') for row in raw_rows}
+    employees = {}
+    for pk, employee_id, username in CustomUser.objects.filter(
+        Q(employee_id__in=references) | Q(username__in=references)
+    ).values_list('pk', 'employee_id', 'username'):
+        employees.setdefault(username, pk)
+        if employee_id:
+            employees[employee_id] = pk  # Le matricule est prioritaire
+
+    rows, errors = [], []
+    for line, raw in enumerate(raw_rows, start=2):
+        try:
+            employee = employees.get(_cell(raw, 'employe'))
+            if employee is None:
+                raise ValueError(f"employé inconnu : {_cell(raw, 'employe')!r}")
+            rows.append(TimesheetRow(
+                line=line,
+                date=datetime.strptime(_cell(raw, 'date'), '%Y-%m-%d').date(),
+                employee_id=employee,
+                task_id=int(_cell(raw, 'tache')),
+                duration_hours=_to_decimal(_cell(raw, 'heures'), "Durée"),
+                completion_percentage=int(_cell(raw, 'achevement') or 0),
+            ))
+        except (ValueError, TypeError) as e:
+            errors.append(f"Ligne {line} : {e}")
+    if errors:
+        raise TimesheetError(errors)
+    return rows
+
+
+def ingest_rows(rows, created_by, allowed_country_ids=None):
+    """
+    Valide et enregistre les lignes en bloc (tout ou rien). Retourne la liste
+    des WorkCompletionRecord créés. `allowed_country_ids` limite les tâches
+    et les employés aux pays de l'utilisateur (None = pas de restriction).
+    """
+    tasks = Task.objects.filter(pk__in={row.task_id for row in rows})
+    employees = EmployeeCountryAssignment.objects.filter(user_id__in={row.employee_id for row in rows}, is_active=True)
+    if allowed_country_ids is not None:
+        tasks = tasks.filter(site__project__country_id__in=allowed_country_ids)
+        employees = employees.filter(country_id__in=allowed_country_ids)
+    task_ids = set(tasks.values_list('pk', flat=True))
+    employee_ids = set(employees.values_list('user_id', flat=True))
+
+    errors = []
+    for row in rows:
+        if row.task_id not in task_ids:
+            errors.append(f"Ligne {row.line} : tâche {row.task_id} introuvable ou hors de vos pays")
+        if row.employee_id not in employee_ids:
+            errors.append(f"Ligne {row.line} : employé sans affectation active dans vos pays")
+        if row.duration_hours < 0 or row.duration_hours > 24:
+            errors.append(f"Ligne {row.line} : durée hors limites ({row.duration_hours} h)")
+        if not 0 <= row.completion_percentage <= 100:
+            errors.append(f"Ligne {row.line} : achèvement hors limites ({row.completion_percentage} %)")
+    if errors:
+        raise TimesheetError(errors)
+
+    rates = RateTable({row.employee_id for row in rows})
+    records = []
+    for row in rows:
+        record = WorkCompletionRecord(
+            task_id=row.task_id,
+            employee_id=row.employee_id,
+            date=row.date,
+            duration_hours=row.duration_hours,
+            completion_percentage=row.completion_percentage,
+            created_by=created_by,
+        )
+        # Même règle que le signal calculate_work_record_cost
+        if row.duration_hours > 0:
+            rate = rates.rate_for(row.employee_id)
+            record.hourly_rate_used = rate.quantize(Decimal('0.01'))
+            record.cost = (row.duration_hours * rate).quantize(Decimal('0.01'))
+        records.append(record)
+
+    with transaction.atomic():
+        created = WorkCompletionRecord.objects.bulk_create(records, batch_size=500)
+        update_tasks_progress(task_ids & {row.task_id for row in rows})
+    return created
+
+
+def update_tasks_progress(task_ids):
+    """Progression des tâches = somme des achèvements saisis, plafonnée à 100 (un seul agrégat)."""
+    totals = dict(
+        WorkCompletionRecord.objects.filter(task_id__in=task_ids)
+        .values('task_id')
+        .annotate(total=Sum('completion_percentage'))
+        .values_list('task_id', 'total')
+    )
+    tasks = list(Task.objects.filter(pk__in=task_ids).only('pk', 'site_id', 'progress_percentage'))
+    for task in tasks:
+        task.progress_percentage = min(100, totals.get(task.pk) or 0)
+    Task.objects.bulk_update(tasks, ['progress_percentage'], batch_size=500)
+    log_changes(SyncChange.TASK, tasks)  # bulk_update n'émet pas de signaux
@@ -23,6 +23,8 @@ urlpatterns = [
     # 5. Paie Terrain (Work Records)
     path("paie-terrain/", views.WorkRecordListView.as_view(), name="work_record_list"), # <-- AJOUTÉ
     path("paie-terrain/creer/", views.WorkRecordCreateView.as_view(), name="work_record_create"), # <-- AJOUTÉ
+    path("paie-terrain/grille/", views.WorkRecordGridView.as_view(), name="work_record_grid"),
+    path("paie-terrain/importer/", views.WorkRecordImportView.as_view(), name="work_record_import"),
 
     # 6. Obligations Fiscales
     path("obligations-fiscales/", views.ObligationFiscaleListView.as_view(), name="obligationfiscale_list"),
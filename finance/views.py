@@ -1,21 +1,29 @@
 # finance/views.py
 
 # --- Imports Django ---
+import datetime
+
+from django.contrib import messages
 from django.urls import reverse_lazy
-from django.shortcuts import get_object_or_404
+from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView, FormView
 
 # --- Imports Locaux (de cette app) ---
 from .models import Depense, Revenu, SalaryStructure, ObligationFiscale
-from .forms import DepenseForm, WorkCompletionForm, RevenuForm
+from .forms import (
+    DepenseForm, WorkCompletionForm, RevenuForm,
+    WorkWeekForm, WorkWeekRowFormSet, WorkRecordImportForm, WEEK_DAYS,
+)
+from .timesheets import TimesheetError, TimesheetRow, ingest_rows, parse_csv
 
 # --- Imports Externes (d'autres apps) ---
-from projects.models import WorkCompletionRecord
+from projects.models import Task, WorkCompletionRecord
+from users.models import CustomUser
+from core.conditional import conditional_page
 from core.mixins import ExpenseManagementMixin
+from core.partitions import across_partitions, routed_by
+from core.pdf import pdf_response, render_template_to_pdf
 
 
 # ==========================================================
@@ -25,11 +33,11 @@ from core.mixins import ExpenseManagementMixin
 class FinanceCountryIsolationMixin(LoginRequiredMixin):
     """
     Mixin pour isoler les requêtes financières aux pays actifs de l'utilisateur.
-    S'applique à toutes les ListView.
+    S'applique à toutes les ListView (lues dans les bases de tous ces pays).
     """
     def get_queryset(self):
         # Récupère le queryset de base (ex: Depense.objects.all())
-        qs = super().get_queryset() 
+        qs = across_partitions(super().get_queryset())
         user = self.request.user
 
         # Le Superuser voit tout
@@ -73,25 +81,30 @@ class FinanceDashboardView(LoginRequiredMixin, TemplateView):
         active_countries = self.request.user.active_country_ids
         
         # Ajoute des statistiques (filtrées par pays)
-        context['total_depenses'] = Depense.objects.filter(
+        context['total_depenses'] = across_partitions(Depense.objects.filter(
             projet_associe__country__id__in=active_countries
-        ).count()
-        context['total_revenus'] = Revenu.objects.filter(
+        )).count()
+        context['total_revenus'] = across_partitions(Revenu.objects.filter(
             projet_facture__country__id__in=active_countries
-        ).count()
+        )).count()
         context['total_structures'] = SalaryStructure.objects.filter(
             country__id__in=active_countries
         ).count()
         return context
 
+def depense_version(request, depense_id):
+    """Valeurs de la dépense : le PDF n'est rendu à nouveau que si elle a changé."""
+    fields = [field.attname for field in Depense._meta.concrete_fields]
+    return list(Depense.objects.filter(id=depense_id).values_list(*fields))
+
+
+@routed_by('depense_id')
+@conditional_page(depense_version)
 def depense_pdf_view(request, depense_id):
     depense = get_object_or_404(Depense, id=depense_id)
-    html_string = render_to_string('finance/depense_pdf.html', {'depense': depense})
-    html = HTML(string=html_string, base_url=request.build_absolute_uri())
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="depense_{depense.id}.pdf"'
-    return response
+    # Le reçu scanné (MEDIA_URL) est lu sur le disque par le service PDF
+    pdf = render_template_to_pdf('finance/depense_pdf.html', {'depense': depense})
+    return pdf_response(pdf, f"depense_{depense.id}.pdf")
 
 class DepenseListView(FinanceCountryIsolationMixin, ListView):
     """Liste les dépenses (filtrées par le Mixin)."""
@@ -100,7 +113,8 @@ class DepenseListView(FinanceCountryIsolationMixin, ListView):
     context_object_name = "expenses" # Correspond à vos templates
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # Projet (et son pays, affiché par __str__) et déclarant lus avec la liste
+        qs = super().get_queryset().select_related('projet_associe__country', 'employe_declarant')
         user = self.request.user
 
         if user.is_superuser or user.is_cm or user.is_coordinator or user.groups.filter(name='Finance').exists():
@@ -184,11 +198,124 @@ class WorkRecordCreateView(LoginRequiredMixin, CreateView):
             context['country_code'] = "N/A"
         return context
 
+class TimesheetMixin(PermissionRequiredMixin):
+    """Saisie en masse : tâches et employés limités aux pays actifs de l'utilisateur."""
+    permission_required = 'projects.add_workcompletionrecord'
+
+    def allowed_country_ids(self):
+        user = self.request.user
+        return None if user.is_superuser else user.active_country_ids
+
+    def employees(self):
+        """Employés acceptés par la grille (affectation active dans les pays de l'utilisateur)."""
+        employees = CustomUser.objects.filter(is_active=True, assignments__is_active=True)
+        country_ids = self.allowed_country_ids()
+        if country_ids is not None:
+            employees = employees.filter(assignments__country_id__in=country_ids)
+        return employees.distinct()
+
+    def tasks(self):
+        """Tâches en cours acceptées par la grille."""
+        tasks = Task.objects.exclude(status='COMPLETED')
+        country_ids = self.allowed_country_ids()
+        if country_ids is not None:
+            tasks = tasks.filter(site__project__country_id__in=country_ids)
+        return tasks
+
+    def ingest(self, rows):
+        """Enregistre les lignes ; retourne le nombre créé ou None (erreurs signalées)."""
+        try:
+            created = ingest_rows(rows, self.request.user, self.allowed_country_ids())
+        except TimesheetError as e:
+            for error in e.errors[:50]:
+                messages.error(self.request, error)
+            return None
+        messages.success(self.request, f"{len(created)} enregistrement(s) de travail créé(s).")
+        return len(created)
+
+
+class WorkRecordGridView(TimesheetMixin, TemplateView):
+    """Grille hebdomadaire : une ligne par couple employé/tâche, un champ d'heures par jour."""
+    template_name = "finance/work_completion_grid.html"
+
+    def get_forms(self):
+        data = self.request.POST if self.request.method == 'POST' else None
+        today = datetime.date.today()
+        week_form = WorkWeekForm(data, initial={'week_start': today - datetime.timedelta(days=today.weekday())})
+        formset = WorkWeekRowFormSet(
+            data, prefix='rows',
+            form_kwargs={
+                'employees': self.employees(), 'tasks': self.tasks(), 'country_ids': self.allowed_country_ids(),
+            },
+        )
+        return week_form, formset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if 'formset' not in kwargs:
+            context['week_form'], context['formset'] = self.get_forms()
+        context['week_days'] = WEEK_DAYS
+        return context
+
+    def post(self, request, *args, **kwargs):
+        week_form, formset = self.get_forms()
+        if not (week_form.is_valid() and formset.is_valid()):
+            return self.render_to_response(self.get_context_data(week_form=week_form, formset=formset))
+
+        week_start = week_form.cleaned_data['week_start']
+        rows = []
+        for line, data in enumerate(formset.cleaned_data, start=1):
+            hours = [(index, data.get(f'day_{index}')) for index in range(len(WEEK_DAYS))]
+            hours = [(index, value) for index, value in hours if value]
+            if not hours:
+                continue
+            for index, value in hours:
+                rows.append(TimesheetRow(
+                    line=line,
+                    date=week_start + datetime.timedelta(days=index),
+                    employee_id=data['employee'].pk,
+                    task_id=data['task'].pk,
+                    duration_hours=value,
+                ))
+            # L'achèvement déclaré est rattaché au dernier jour travaillé de la ligne
+            rows[-1].completion_percentage = data.get('completion_percentage') or 0
+
+        if not rows:
+            messages.warning(request, "Aucune heure saisie.")
+        elif self.ingest(rows) is not None:
+            return redirect('finance:work_record_list')
+        return self.render_to_response(self.get_context_data(week_form=week_form, formset=formset))
+
+
+class WorkRecordImportView(TimesheetMixin, FormView):
+    """Import CSV des enregistrements de travail (tout ou rien)."""
+    template_name = "finance/work_completion_import.html"
+    form_class = WorkRecordImportForm
+    success_url = reverse_lazy("finance:work_record_list")
+
+    def form_valid(self, form):
+        try:
+            rows = parse_csv(form.cleaned_data['fichier'])
+        except TimesheetError as e:
+            for error in e.errors[:50]:
+                messages.error(self.request, error)
+            return self.form_invalid(form)
+        except UnicodeDecodeError:
+            form.add_error('fichier', "Le fichier doit être encodé en UTF-8.")
+            return self.form_invalid(form)
+        if self.ingest(rows) is None:
+            return self.form_invalid(form)
+        return super().form_valid(form)
+
+
 class ObligationFiscaleListView(LoginRequiredMixin, ListView):
     model = ObligationFiscale
     template_name = "finance/obligationfiscale_list.html"
     context_object_name = "obligations"
 
+    def get_queryset(self):
+        return across_partitions(super().get_queryset())
+
 class ObligationFiscaleCreateView(PermissionRequiredMixin, CreateView):
     model = ObligationFiscale
     template_name = "finance/obligationfiscale_form.html"
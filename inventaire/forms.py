@@ -1,6 +1,13 @@
 from django import forms
+from core.autocomplete import use_autocomplete
+from users.forms import user_label
 from .models import Equipement, AllocationEquipement
 
+
+def equipement_label(equipement):
+    return f"{equipement.nom_equipement} ({equipement.numero_serie})"
+
+
 class EquipementForm(forms.ModelForm):
     class Meta:
         model = Equipement
@@ -13,3 +20,11 @@ class AllocationEquipementForm(forms.ModelForm):
     class Meta:
         model = AllocationEquipement
         fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Listes à recherche : le stock et les employés ne sont pas chargés à l'ouverture du formulaire
+        self.fields['equipement'].label_from_instance = equipement_label
+        self.fields['employe_assigne'].label_from_instance = user_label
+        use_autocomplete(self.fields['equipement'], 'inventaire:equipement_autocomplete')
+        use_autocomplete(self.fields['employe_assigne'], 'users:user_autocomplete')
@@ -0,0 +1,23 @@
+# inventaire/jobs.py
+
+from datetime import date, timedelta
+
+from core.counters import set_counters
+from core.scheduler import job
+from .models import Equipement
+
+# Fenêtre d'alerte avant la prochaine inspection
+INSPECTION_WARNING_DAYS = 7
+
+
+def count_due_inspections(today=None):
+    today = today or date.today()
+    return Equipement.objects.exclude(statut='HORS_SERVICE').filter(
+        date_prochaine_inspection__lte=today + timedelta(days=INSPECTION_WARNING_DAYS)
+    ).count()
+
+
+@job("15 * * * *")
+def compter_inspections_dues():
+    """Précalcule le nombre d'équipements dont l'inspection est due sous 7 jours."""
+    set_counters({'inventaire.inspections_dues': count_due_inspections()})
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventaire", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="equipement",
+            index=models.Index(
+                django.db.models.functions.text.Upper("nom_equipement"),
+                name="equipement_nom_upper",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="equipement",
+            index=models.Index(
+                django.db.models.functions.text.Upper("numero_serie"),
+                name="equipement_serie_upper",
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 
@@ -21,6 +22,11 @@ class Equipement(models.Model):
     class Meta:
         verbose_name = _("Équipement")
         verbose_name_plural = _("Équipements")
+        # Recherche par début de nom ou de numéro de série (core/autocomplete.py)
+        indexes = [
+            models.Index(Upper("nom_equipement"), name="equipement_nom_upper"),
+            models.Index(Upper("numero_serie"), name="equipement_serie_upper"),
+        ]
 
     def __str__(self):
         return self.nom_equipement
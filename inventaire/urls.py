@@ -8,6 +8,7 @@ urlpatterns = [
     path('equipements/create/', views.EquipementCreateView.as_view(), name='equipement_create'),
     path('equipements/<int:pk>/update/', views.EquipementUpdateView.as_view(), name='equipement_update'),
     path('equipements/<int:pk>/delete/', views.EquipementDeleteView.as_view(), name='equipement_delete'),
+    path('equipements/autocomplete/', views.EquipementAutocompleteView.as_view(), name='equipement_autocomplete'),
 
     path('allocations/', views.AllocationEquipementListView.as_view(), name='allocationequipement_list'),
     path('allocations/create/', views.AllocationEquipementCreateView.as_view(), name='allocationequipement_create'),
@@ -2,7 +2,8 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from .models import Equipement, AllocationEquipement
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from .forms import EquipementForm
+from core.autocomplete import AutocompleteView
+from .forms import AllocationEquipementForm, EquipementForm, equipement_label
 
 class EquipementListView(LoginRequiredMixin, ListView):
     model = Equipement
@@ -29,6 +30,15 @@ class EquipementDeleteView(PermissionRequiredMixin, DeleteView):
     success_url = reverse_lazy('inventaire:equipement_list')
     permission_required = 'inventaire.delete_equipement'
 
+class EquipementAutocompleteView(AutocompleteView):
+    """Équipements pour les listes à recherche : début du nom ou du numéro de série (stock commun, sans pays)."""
+    model = Equipement
+    search_fields = ('nom_equipement', 'numero_serie')
+    ordering = ('nom_equipement', 'pk')
+
+    def label(self, obj):
+        return equipement_label(obj)
+
 
 class AllocationEquipementListView(LoginRequiredMixin, ListView):
     model = AllocationEquipement
@@ -38,14 +48,14 @@ class AllocationEquipementListView(LoginRequiredMixin, ListView):
 class AllocationEquipementCreateView(PermissionRequiredMixin, CreateView):
     model = AllocationEquipement
     template_name = 'inventaire/allocationequipement_form.html'
-    fields = '__all__'
+    form_class = AllocationEquipementForm
     success_url = reverse_lazy('inventaire:allocationequipement_list')
     permission_required = 'inventaire.add_allocationequipement'
 
 class AllocationEquipementUpdateView(PermissionRequiredMixin, UpdateView):
     model = AllocationEquipement
     template_name = 'inventaire/allocationequipement_form.html'
-    fields = '__all__'
+    form_class = AllocationEquipementForm
     success_url = reverse_lazy('inventaire:allocationequipement_list')
     permission_required = 'inventaire.change_allocationequipement'
 
@@ -0,0 +1,19 @@
+from django import forms
+from core.autocomplete import use_autocomplete
+from users.forms import user_label
+from .models import MissionLogistique
+
+
+class MissionLogistiqueForm(forms.ModelForm):
+    class Meta:
+        model = MissionLogistique
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Listes à recherche : véhicules, employés et sites ne sont pas chargés à l'ouverture du formulaire
+        for name in ('conducteur', 'team_members'):
+            self.fields[name].label_from_instance = user_label
+            use_autocomplete(self.fields[name], 'users:user_autocomplete')
+        use_autocomplete(self.fields['vehicule'], 'logistique:vehicule_autocomplete')
+        use_autocomplete(self.fields['site_concerne'], 'projects:site_autocomplete')
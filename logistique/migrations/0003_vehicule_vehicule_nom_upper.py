@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logistique", "0002_missionlogistique_end_date_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="vehicule",
+            index=models.Index(
+                django.db.models.functions.text.Upper("nom_vehicule"),
+                name="vehicule_nom_upper",
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from projects.models import Site
@@ -23,6 +24,8 @@ class Vehicule(models.Model):
     class Meta:
         verbose_name = _("Véhicule")
         verbose_name_plural = _("Véhicules")
+        # Recherche par début de nom (core/autocomplete.py)
+        indexes = [models.Index(Upper("nom_vehicule"), name="vehicule_nom_upper")]
 
     def __str__(self):
         return self.nom_vehicule
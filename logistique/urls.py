@@ -8,6 +8,7 @@ urlpatterns = [
     path('vehicules/create/', views.VehiculeCreateView.as_view(), name='vehicule_create'),
     path('vehicules/<int:pk>/update/', views.VehiculeUpdateView.as_view(), name='vehicule_update'),
     path('vehicules/<int:pk>/delete/', views.VehiculeDeleteView.as_view(), name='vehicule_delete'),
+    path('vehicules/autocomplete/', views.VehiculeAutocompleteView.as_view(), name='vehicule_autocomplete'),
 
     path('missions/', views.MissionLogistiqueListView.as_view(), name='missionlogistique_list'),
     path('missions/create/', views.MissionLogistiqueCreateView.as_view(), name='missionlogistique_create'),
@@ -2,9 +2,10 @@ from django.urls import reverse_lazy
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
 from .models import Vehicule, MissionLogistique
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from core.autocomplete import AutocompleteView
+from core.partitions import across_partitions
+from core.pdf import pdf_response, render_template_to_pdf
+from .forms import MissionLogistiqueForm
 
 class MissionLogistiqueDetailView(LoginRequiredMixin, DetailView):
     model = MissionLogistique
@@ -16,12 +17,8 @@ class MissionLetterPdfView(LoginRequiredMixin, DetailView):
     template_name = 'logistique/mission_letter_pdf.html'
 
     def render_to_response(self, context, **response_kwargs):
-        html_string = render_to_string(self.template_name, context)
-        html = HTML(string=html_string)
-        pdf = html.write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="mission_letter_{self.object.pk}.pdf"'
-        return response
+        pdf = render_template_to_pdf(self.template_name, context)
+        return pdf_response(pdf, f"mission_letter_{self.object.pk}.pdf")
 
 class VehiculeListView(LoginRequiredMixin, ListView):
     model = Vehicule
@@ -48,23 +45,32 @@ class VehiculeDeleteView(PermissionRequiredMixin, DeleteView):
     success_url = reverse_lazy('logistique:vehicule_list')
     permission_required = 'logistique.delete_vehicule'
 
+class VehiculeAutocompleteView(AutocompleteView):
+    """Véhicules pour les listes à recherche (flotte commune, sans pays)."""
+    model = Vehicule
+    search_fields = ('nom_vehicule',)
+    ordering = ('nom_vehicule', 'pk')
+
 
 class MissionLogistiqueListView(LoginRequiredMixin, ListView):
     model = MissionLogistique
     template_name = 'logistique/missionlogistique_list.html'
     context_object_name = 'missions'
 
+    def get_queryset(self):
+        return across_partitions(super().get_queryset())
+
 class MissionLogistiqueCreateView(PermissionRequiredMixin, CreateView):
     model = MissionLogistique
     template_name = 'logistique/missionlogistique_form.html'
-    fields = '__all__'
+    form_class = MissionLogistiqueForm
     success_url = reverse_lazy('logistique:missionlogistique_list')
     permission_required = 'logistique.add_missionlogistique'
 
 class MissionLogistiqueUpdateView(PermissionRequiredMixin, UpdateView):
     model = MissionLogistique
     template_name = 'logistique/missionlogistique_form.html'
-    fields = '__all__'
+    form_class = MissionLogistiqueForm
     success_url = reverse_lazy('logistique:missionlogistique_list')
     permission_required = 'logistique.change_missionlogistique'
 
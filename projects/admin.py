@@ -3,13 +3,18 @@ from .models import (
     Project, Site, Task, TaskPhoto, Inspection, TransmissionLink,
     ProjectType, SitePhase, Batch, AntennaType, EnclosureType, BBMLType,
     RadioType, Client, SiteRadioConfiguration, SiteType, InstallationType,
-    TaskResultType, TaskType, UninstallationReport, UninstalledEquipment
+    TaskResultType, TaskType, UninstallationReport, UninstalledEquipment, SiteImport
 )
+from core.registry import RegistryChoicesAdminMixin
 from users.admin import AssignationInline
 
 
+class LookupChoicesAdmin(RegistryChoicesAdminMixin, admin.ModelAdmin):
+    """Listes déroulantes des tables de référence servies par le registre (core.registry)."""
+
+
 @admin.register(Project)
-class ProjectAdmin(admin.ModelAdmin):
+class ProjectAdmin(RegistryChoicesAdminMixin, admin.ModelAdmin):
     inlines = [AssignationInline]
     list_display = ('name', 'country', 'client', 'statut', 'budget_alloue')
     list_filter = ('country', 'client', 'statut')
@@ -29,8 +34,18 @@ class UninstallationReportAdmin(admin.ModelAdmin):
     search_fields = ('task__site__name',)
 
 
-admin.site.register(Site)
-admin.site.register(Task)
+@admin.register(SiteImport)
+class SiteImportAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'project', 'mode', 'status', 'processed_rows', 'imported_rows', 'updated_rows', 'error_rows', 'created_by', 'created_at')
+    list_filter = ('status', 'mode')
+    readonly_fields = (
+        'total_rows', 'processed_rows', 'imported_rows', 'updated_rows', 'unchanged_rows', 'removed_rows',
+        'error_rows', 'started_at', 'finished_at',
+    )
+
+
+admin.site.register(Site, LookupChoicesAdmin)
+admin.site.register(Task, LookupChoicesAdmin)
 admin.site.register(TaskPhoto)
 admin.site.register(Inspection)
 admin.site.register(TransmissionLink)
@@ -42,7 +57,7 @@ admin.site.register(EnclosureType)
 admin.site.register(BBMLType)
 admin.site.register(RadioType)
 admin.site.register(Client)
-admin.site.register(SiteRadioConfiguration)
+admin.site.register(SiteRadioConfiguration, LookupChoicesAdmin)
 admin.site.register(SiteType)
 admin.site.register(InstallationType)
 admin.site.register(TaskResultType)
@@ -0,0 +1,184 @@
+# projects/api.py
+
+"""
+API JSON des équipes terrain (application mobile hors ligne).
+
+    GET  api/sync/?token=...&kinds=tasks,sites   flux différentiel (projects.sync)
+    POST api/tasks/<pk>/                         statut, résultat, ticket (JSON)
+    POST api/tasks/<pk>/photos/                  ajout de photos (multipart)
+    POST api/sites/<pk>/inspections/             nouvelle inspection (JSON)
+
+Les objets sont limités aux pays actifs de l'utilisateur, comme avec
+CountryIsolationMixin. Les réponses sont compressées (gzip) et le flux
+accepte If-None-Match : un client à jour reçoit un 304 sans corps.
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_http_methods
+
+from core.partitions import partition_alias, routed_by
+from .forms import InspectionForm, TaskPhotoForm, TaskSyncForm
+from .models import Site, SyncChange, Task, TaskPhoto
+from .sync import SYNC_KINDS, build_feed, latest_change_id, serialize_objects
+from .views import can_update_task, can_upload_task_photo, update_site_status_for_task
+
+KIND_BY_KEY = {spec.key: kind for kind, spec in SYNC_KINDS.items()}
+
+
+def _json(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def api_view(methods):
+    """Authentification de session (401 JSON au lieu d'une redirection), méthodes, gzip."""
+    def decorator(view):
+        @gzip_page
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return _json({'error': "Authentification requise."}, status=401)
+            try:
+                return view(request, *args, **kwargs)
+            except PermissionDenied:
+                return _json({'error': "Accès refusé."}, status=403)
+            except Http404:
+                return _json({'error': "Objet introuvable."}, status=404)
+        return wrapper
+    return decorator
+
+
+def _country_ids(user):
+    return None if user.is_superuser else user.active_country_ids
+
+
+def _scoped(model, user):
+    """Queryset limité aux pays actifs (règles de CountryIsolationMixin)."""
+    country_ids = _country_ids(user)
+    queryset = model.objects.all()
+    if country_ids is None:
+        return queryset
+    if model is Site:
+        return queryset.filter(project__country__id__in=country_ids)
+    return queryset.filter(site__project__country__id__in=country_ids)
+
+
+def _payload(request):
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+# =================================================================
+# Lecture : flux de synchronisation
+# =================================================================
+
+@api_view(["GET"])
+def sync_feed(request):
+    keys = request.GET.get('kinds')
+    kinds = [KIND_BY_KEY.get(key) for key in keys.split(',')] if keys else list(SYNC_KINDS)
+    if None in kinds:
+        return _json({'error': f"Types inconnus. Valeurs possibles : {', '.join(KIND_BY_KEY)}"}, status=400)
+
+    country_ids = _country_ids(request.user)
+    token = request.GET.get('token', '')
+    # Même jeton, mêmes types et aucune modification visible depuis : réponse identique
+    state = f"{request.user.pk}|{latest_change_id(country_ids)}|{token}|{','.join(sorted(kinds))}"
+    etag = f'"{hashlib.md5(state.encode()).hexdigest()}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = _json(build_feed(country_ids, token=token, kinds=kinds))
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+# =================================================================
+# Écriture
+# =================================================================
+
+@routed_by("pk")
+@api_view(["POST", "PATCH"])
+def task_update(request, pk):
+    task = get_object_or_404(_scoped(Task, request.user).select_related('site__project__country', 'task_type'), pk=pk)
+    if not can_update_task(request.user, task):
+        raise PermissionDenied
+
+    payload = _payload(request)
+    if payload is None:
+        return _json({'error': "Corps JSON invalide."}, status=400)
+    # Mise à jour partielle : les champs absents gardent leur valeur
+    data = model_to_dict(task, fields=TaskSyncForm._meta.fields)
+    data.update({key: payload[key] for key in TaskSyncForm._meta.fields if key in payload})
+
+    form = TaskSyncForm(data, instance=task)
+    if not form.is_valid():
+        return _json({'errors': form.errors.get_json_data()}, status=400)
+    with transaction.atomic(using=partition_alias()):
+        task = form.save()
+        update_site_status_for_task(task)
+    return _json({'tasks': serialize_objects(SyncChange.TASK, [task.pk])})
+
+
+@routed_by("pk")
+@api_view(["POST"])
+def task_photos(request, pk):
+    task = get_object_or_404(_scoped(Task, request.user).select_related('site__project__country'), pk=pk)
+    if not can_upload_task_photo(request.user, task):
+        raise PermissionDenied
+
+    form = TaskPhotoForm(request.POST)
+    photos = request.FILES.getlist('photo')
+    if not form.is_valid() or not photos:
+        errors = form.errors.get_json_data()
+        if not photos:
+            errors['photo'] = [{'message': "Aucune photo envoyée.", 'code': 'required'}]
+        return _json({'errors': errors}, status=400)
+
+    with transaction.atomic(using=partition_alias()):
+        created = [
+            TaskPhoto.objects.create(
+                task=task, photo=photo, caption=form.cleaned_data.get('caption', ''), uploaded_by=request.user,
+            )
+            for photo in photos
+        ]
+    return _json({'photos': serialize_objects(SyncChange.PHOTO, [photo.pk for photo in created])}, status=201)
+
+
+@routed_by("pk")
+@api_view(["POST"])
+def site_inspections(request, pk):
+    site = get_object_or_404(_scoped(Site, request.user), pk=pk)
+    user = request.user
+    if not (user.is_superuser or user.is_cm or user.is_coordinator):
+        raise PermissionDenied
+
+    payload = _payload(request)
+    if payload is None:
+        return _json({'error': "Corps JSON invalide."}, status=400)
+    form = InspectionForm(payload)
+    if not form.is_valid():
+        return _json({'errors': form.errors.get_json_data()}, status=400)
+
+    with transaction.atomic(using=partition_alias()):
+        form.instance.site = site
+        form.instance.inspector = user
+        inspection = form.save()
+        # Mise à jour du résultat de la dernière inspection sur le site
+        site.last_inspection_result = inspection.resultat_inspection
+        site.save(update_fields=["last_inspection_result"])
+    return _json({'inspections': serialize_objects(SyncChange.INSPECTION, [inspection.pk])}, status=201)
@@ -8,3 +8,4 @@ class ProjectsConfig(AppConfig):
     # 💡 AJOUT CRITIQUE : Connecter les signaux
     def ready(self):
         import projects.signals
+        import projects.sync  # Journal des modifications (synchronisation mobile)
@@ -9,7 +9,8 @@ from django.forms.widgets import DateInput
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 
-
+from core.autocomplete import use_autocomplete
+from core.registry import bind_choices, registry
 from .models import (
     Project,
     Site,
@@ -17,14 +18,13 @@ from .models import (
     Inspection,
     SiteRadioConfiguration,
     RadioType,
-    SiteType,
-    InstallationType,
     TaskResultType,
-    TaskType,
     TaskPhoto,
     UninstallationReport,
     UninstalledEquipment,
+    SiteImport,
 )
+from users.forms import user_label
 from users.models import CustomUser, Role
 
 
@@ -49,11 +49,13 @@ class ProjectForm(ModelForm):
         user = kwargs.pop("user", None)
         super().__init__(*args, **kwargs)
 
+        bind_choices(self.fields["client"], active_only=False)
+        bind_choices(self.fields["project_type"], active_only=False)
+
+        coordinator_role = None
         if user:
             # Récupère le rôle 'Country Manager'
-            cm_role = Role.objects.filter(
-                name__in=["Country Manager", "Country_Manager"]
-            ).first()
+            cm_role = registry.get_by(Role, name="Country Manager") or registry.get_by(Role, name="Country_Manager")
 
             if cm_role:
                 # Isole les IDs de pays où l'utilisateur est CM actif
@@ -67,9 +69,9 @@ class ProjectForm(ModelForm):
                 ].queryset.filter(id__in=active_cm_country_ids)
 
             # Filtre les Coordonnateurs
-            coordinator_role = Role.objects.filter(
-                name__in=["Project Coordinator", "Project_Coordinator"]
-            ).first()
+            coordinator_role = (
+                registry.get_by(Role, name="Project Coordinator") or registry.get_by(Role, name="Project_Coordinator")
+            )
             if coordinator_role:
                 coordinator_ids = (
                     CustomUser.objects.filter(
@@ -85,6 +87,13 @@ class ProjectForm(ModelForm):
                     id__in=coordinator_ids
                 )
 
+        # Liste à recherche (users:user_autocomplete) au lieu de tous les employés
+        self.fields["coordinator"].label_from_instance = user_label
+        use_autocomplete(
+            self.fields["coordinator"], "users:user_autocomplete",
+            role=coordinator_role.pk if coordinator_role else None,
+        )
+
 
 # -----------------------------------------------------------------------------
 # 2. Site Form (Mise à jour)
@@ -120,8 +129,11 @@ class SiteForm(ModelForm):
         super().__init__(*args, **kwargs)
 
         # 3. Logique de filtrage générale (S'applique TOUJOURS)
-        self.fields["site_type"].queryset = SiteType.objects.filter(is_active=True)
-        self.fields["installation_type"].queryset = InstallationType.objects.filter(is_active=True)
+        # Listes de référence servies par le registre (aucune requête à l'affichage)
+        bind_choices(self.fields["site_type"])
+        bind_choices(self.fields["installation_type"])
+        for name in ("phase", "batch", "antenna_type", "enclosure_type", "bb_ml"):
+            bind_choices(self.fields[name], active_only=False)
 
         # --- SÉCURITÉ : Ces lignes doivent être ICI, hors du "if project" ---
         # Cela garantit que même sans projet, le formulaire bloque si c'est vide
@@ -137,8 +149,9 @@ class SiteForm(ModelForm):
         # ------------------------------------------------------------------
 
         # 4. Logique spécifique au Projet
+        team_lead_params = {}
         if project:
-            team_lead_role = Role.objects.filter(name="Team Lead").first()
+            team_lead_role = registry.get_by(Role, name="Team Lead")
             
             # Filtrage des Team Leads
             team_leads_in_country = CustomUser.objects.filter(
@@ -153,6 +166,11 @@ class SiteForm(ModelForm):
             self.fields["team_lead"].queryset = team_leads_in_country.distinct()
             self.fields["team_lead"].label = _(f"Team Lead (pour {project.country.code})")
             self.fields["team_lead"].required = False
+            team_lead_params = {"country": project.country_id, "role": team_lead_role.pk if team_lead_role else None}
+
+        # Liste à recherche (users:user_autocomplete) limitée aux mêmes pays et rôle
+        self.fields["team_lead"].label_from_instance = user_label
+        use_autocomplete(self.fields["team_lead"], "users:user_autocomplete", **team_lead_params)
 # -----------------------------------------------------------------------------
 # 3. SiteRadioConfiguration Formset
 # -----------------------------------------------------------------------------
@@ -179,6 +197,10 @@ class SiteRadioConfigurationForm(ModelForm):
         model = SiteRadioConfiguration
         fields = ["radio_type", "quantity"]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        bind_choices(self.fields["radio_type"])
+
 
 # Crée le Formset.
 SiteRadioConfigurationFormset = inlineformset_factory(
@@ -222,7 +244,7 @@ class TaskForm(ModelForm):
         
         super().__init__(*args, **kwargs)
 
-        self.fields["task_type"].queryset = TaskType.objects.filter(is_active=True)
+        bind_choices(self.fields["task_type"])
 
         if site:
             # Récupérer tous les utilisateurs actifs du pays du projet
@@ -234,6 +256,13 @@ class TaskForm(ModelForm):
 
             self.fields["assigned_to"].queryset = assigned_users_in_country
 
+        # Liste à recherche (users:user_autocomplete) limitée au pays du projet
+        self.fields["assigned_to"].label_from_instance = user_label
+        use_autocomplete(
+            self.fields["assigned_to"], "users:user_autocomplete",
+            country=site.project.country_id if site else None,
+        )
+
 
 class TaskUpdateForm(ModelForm):
     class Meta:
@@ -259,9 +288,11 @@ class TaskUpdateForm(ModelForm):
         super().__init__(*args, **kwargs)
 
         self.fields["task_type"].disabled = True
+        bind_choices(self.fields["task_type"], active_only=False)
 
-        if self.instance and self.instance.task_type:
-            self.fields["result_type"].queryset = self.instance.task_type.allowed_result_types.all()
+        if self.instance and self.instance.task_type_id:
+            # Résultats autorisés du type de tâche, sans charger le type lui-même
+            self.fields["result_type"].queryset = TaskResultType.objects.filter(tasktype=self.instance.task_type_id)
         else:
             self.fields["result_type"].queryset = TaskResultType.objects.none()
 
@@ -278,8 +309,10 @@ class TaskUpdateForm(ModelForm):
 
         self.fields["assigned_to"].label = _("Assigner à (Employé)")
         self.fields["assigned_to"].empty_label = _("--- Sélectionner un membre de l'équipe ---")
-        self.fields["assigned_to"].label_from_instance = lambda obj: (
-            f"{obj.get_full_name()} ({obj.username})" if obj.get_full_name() else obj.username
+        self.fields["assigned_to"].label_from_instance = user_label
+        use_autocomplete(
+            self.fields["assigned_to"], "users:user_autocomplete",
+            country=self.instance.site.project.country_id if self.instance.site_id else None,
         )
 
         for field in self.fields.values():
@@ -330,8 +363,10 @@ class SimpleTaskUpdateForm(ModelForm):
             self.fields["assigned_to"].queryset = assigned_users_in_country.order_by('first_name', 'last_name')
             self.fields["assigned_to"].label = _("Assigner à (Employé)")
             self.fields["assigned_to"].empty_label = _("--- Sélectionner un membre de l'équipe ---")
-            self.fields["assigned_to"].label_from_instance = lambda obj: (
-                f"{obj.get_full_name()} ({obj.username})" if obj.get_full_name() else obj.username
+            self.fields["assigned_to"].label_from_instance = user_label
+            use_autocomplete(
+                self.fields["assigned_to"], "users:user_autocomplete",
+                country=self.instance.site.project.country_id,
             )
 
         if self.instance.result_type:
@@ -405,6 +440,30 @@ class TaskPhotoForm(forms.ModelForm):
         }
 
 
+class TaskSyncForm(ModelForm):
+    """Mise à jour d'une tâche depuis l'API mobile (projects.api) : champs de terrain uniquement."""
+
+    class Meta:
+        model = Task
+        fields = ["status", "result_type", "ticket_number"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance and self.instance.task_type_id:
+            # Résultats autorisés du type de tâche, sans charger le type lui-même
+            self.fields["result_type"].queryset = TaskResultType.objects.filter(tasktype=self.instance.task_type_id)
+        else:
+            self.fields["result_type"].queryset = TaskResultType.objects.none()
+
+    def save(self, commit=True):
+        task = super().save(commit=False)
+        if task.status == "COMPLETED" and task.result_type and not task.completion_date:
+            task.completion_date = timezone.now()
+        if commit:
+            task.save()
+        return task
+
+
 # -----------------------------------------------------------------------------
 # 6. Inspection Form
 # -----------------------------------------------------------------------------
@@ -471,4 +530,21 @@ UninstalledEquipmentFormset = inlineformset_factory(
     extra=1,  # Commence avec 1 formulaire vide
     can_delete=True,
     min_num=0, # Autorise de n'avoir aucun équipement
-)
\ No newline at end of file
+)
+
+class SiteImportForm(ModelForm):
+    """Dépôt d'un classeur de sites (traité en arrière-plan, projects.site_import)."""
+
+    class Meta:
+        model = SiteImport
+        fields = ["mode", "file"]
+        widgets = {
+            "mode": forms.RadioSelect,
+            "file": forms.ClearableFileInput(attrs={"accept": ".xlsx"}),
+        }
+
+    def clean_file(self):
+        file = self.cleaned_data["file"]
+        if not file.name.lower().endswith(".xlsx"):
+            raise forms.ValidationError(_("Le fichier doit être un classeur Excel (.xlsx)."))
+        return file
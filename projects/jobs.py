@@ -0,0 +1,46 @@
+# projects/jobs.py
+
+from decimal import Decimal
+
+from django.db.models import Avg
+
+from core.partitions import for_each_partition
+from core.scheduler import job
+from .models import Project, Site
+from .site_import import process_pending_imports
+from .sync import purge_changes
+
+
+def resync_progress():
+    averages = dict(
+        Site.objects.filter(project__is_active=True)
+        .values('project_id')
+        .annotate(avg_progress=Avg('progress_percentage'))
+        .values_list('project_id', 'avg_progress')
+    )
+    updated = 0
+    for project in Project.objects.filter(is_active=True):
+        expected = (averages.get(project.pk) or Decimal('0.00')).quantize(Decimal('0.01'))
+        if project.progress_percentage != expected:
+            project.update_progress()
+            updated += 1
+    return updated
+
+
+@job("30 1 * * *")
+def resynchroniser_avancement_projets():
+    """Recalcule l'avancement des projets actifs dont la valeur stockée a dérivé."""
+    updated = sum(for_each_partition(resync_progress).values())
+    return f"{updated} projet(s) recalculé(s)"
+
+
+@job("45 2 * * *")
+def purger_journal_synchronisation():
+    """Supprime les modifications synchronisées plus anciennes que SYNC_CHANGE_RETENTION_DAYS."""
+    return f"{purge_changes()} modification(s) purgée(s)"
+
+
+@job("* * * * *")
+def traiter_imports_sites():
+    """Traite les imports de sites en attente (sans worker process_site_imports dédié)."""
+    return f"{process_pending_imports()} import(s) traité(s)"
@@ -1,7 +1,9 @@
 import logging
+from itertools import groupby
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from users.models import CustomUser
+from core.sequences import MONTHLY, set_last_value
+from users.models import CustomUser, EMPLOYEE_ID_SEQUENCE
 
 logger = logging.getLogger(__name__)
 
@@ -13,35 +15,39 @@ class Command(BaseCommand):
 
         # Filter for all users with a hire_date, as per the requirement to apply to all employees,
         # including old ones, to ensure they conform to the new format.
-        users_to_update = CustomUser.objects.filter(
-            hire_date__isnull=False
-        ).order_by('hire_date', 'id') # Order for consistent 'NN' generation
-
-        total_users = users_to_update.count()
+        # Ranks (NN) are assigned by id within each hire month, as in CustomUser._generate_employee_id.
+        users_to_update = list(
+            CustomUser.objects.filter(hire_date__isnull=False)
+            .order_by('hire_date__year', 'hire_date__month', 'id')
+            .only('id', 'username', 'email', 'hire_date', 'employee_id')
+        )
+
+        total_users = len(users_to_update)
         self.stdout.write(f'Found {total_users} users requiring an employee ID.')
 
         if not users_to_update:
             self.stdout.write(self.style.WARNING('No users found requiring an employee ID. Exiting.'))
             return
 
-        updated_count = 0
+        # Single pass: ranks are computed per month in memory instead of one query per user.
+        last_rank_by_month = {}
+        for _, month_users in groupby(users_to_update, key=lambda u: (u.hire_date.year, u.hire_date.month)):
+            month_users = list(month_users)
+            for rank, user in enumerate(month_users, start=1):
+                user.employee_id = f"{user.hire_date:%y%m}{rank:02d}"
+            last_rank_by_month[month_users[0].hire_date] = len(month_users)
+
         with transaction.atomic():
+            # Clear first so that renumbering never collides with the unique constraint.
+            CustomUser.objects.filter(pk__in=[u.pk for u in users_to_update]).update(employee_id=None)
+            CustomUser.objects.bulk_update(users_to_update, ['employee_id'], batch_size=500)
+
+            # Realign the monthly sequences so that new hires continue after the last rank.
+            for hire_date, last_rank in last_rank_by_month.items():
+                set_last_value(EMPLOYEE_ID_SEQUENCE, last_rank, reset=MONTHLY, when=hire_date)
+
+        if options['verbosity'] > 1:
             for user in users_to_update:
-                try:
-                    # Call the new _generate_employee_id method
-                    user.employee_id = user._generate_employee_id()
-                    if user.employee_id:
-                        user.save(update_fields=['employee_id'])
-                        updated_count += 1
-                        self.stdout.write(f'Successfully generated ID {user.employee_id} for user {user.username or user.email}.')
-                    else:
-                        self.stdout.write(self.style.WARNING(f'Skipping user {user.username or user.email} (ID: {user.pk}) as employee ID could not be generated (missing hire_date?).'))
-
-                except Exception as e:
-                    self.stderr.write(self.style.ERROR(f'Error generating ID for user {user.username or user.email} (ID: {user.pk}): {e}'))
-                    # Depending on policy, you might want to re-raise or continue
-
-        self.stdout.write(self.style.SUCCESS(f'Finished generating employee IDs. {updated_count} out of {total_users} users updated successfully.'))
-
-        if updated_count != total_users:
-            self.stdout.write(self.style.WARNING('Some users could not be updated. Please check the logs for errors.'))
+                self.stdout.write(f'Successfully generated ID {user.employee_id} for user {user.username or user.email}.')
+
+        self.stdout.write(self.style.SUCCESS(f'Finished generating employee IDs. {total_users} out of {total_users} users updated successfully.'))
@@ -0,0 +1,33 @@
+# projects/management/commands/process_site_imports.py
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from projects.site_import import process_pending_imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker des imports de sites : traite les imports en attente dès leur dépôt "
+        "(sinon, la tâche planifiée traiter_imports_sites les prend chaque minute)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Traite les imports en attente puis s'arrête.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Attente entre deux recherches, en secondes (défaut : 2).")
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        try:
+            while True:
+                close_old_connections()
+                count = process_pending_imports(log=log)
+                if count:
+                    self.stdout.write(self.style.SUCCESS(f"{count} import(s) traité(s)"))
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Arrêt demandé.")
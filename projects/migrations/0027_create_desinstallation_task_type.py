@@ -2,7 +2,7 @@ from django.db import migrations
 
 def create_desinstallation_task_type(apps, schema_editor):
     TaskType = apps.get_model('projects', 'TaskType')
-    TaskType.objects.create(
+    TaskType.objects.using(schema_editor.connection.alias).create(
         name='Désinstallation',
         code='DESINSTALLATION',
         category='CLOSURE',
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0033_alter_task_assigned_to"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("task", "Tâche"),
+                            ("site", "Site"),
+                            ("photo", "Photo de tâche"),
+                            ("inspection", "Inspection"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type d'objet",
+                    ),
+                ),
+                ("object_id", models.BigIntegerField(verbose_name="ID de l'objet")),
+                (
+                    "country_id",
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name="ID du pays"
+                    ),
+                ),
+                (
+                    "deleted",
+                    models.BooleanField(default=False, verbose_name="Supprimé"),
+                ),
+                ("changed_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                "verbose_name": "Modification synchronisée",
+                "verbose_name_plural": "Modifications synchronisées",
+                "indexes": [
+                    models.Index(
+                        fields=["country_id", "id"],
+                        name="projects_sy_country_b7f229_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0034_syncchange"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="syncchange",
+            name="project_id",
+            field=models.BigIntegerField(
+                blank=True, null=True, verbose_name="ID du projet"
+            ),
+        ),
+        migrations.AddField(
+            model_name="syncchange",
+            name="site_id",
+            field=models.BigIntegerField(
+                blank=True, null=True, verbose_name="ID du site"
+            ),
+        ),
+        migrations.AddField(
+            model_name="syncchange",
+            name="task_id",
+            field=models.BigIntegerField(
+                blank=True, null=True, verbose_name="ID de la tâche"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="syncchange",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("project", "Projet"),
+                    ("task", "Tâche"),
+                    ("site", "Site"),
+                    ("photo", "Photo de tâche"),
+                    ("inspection", "Inspection"),
+                ],
+                max_length=20,
+                verbose_name="Type d'objet",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="syncchange",
+            index=models.Index(
+                fields=["project_id", "id"], name="projects_sy_project_fa773e_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="syncchange",
+            index=models.Index(
+                fields=["site_id", "id"], name="projects_sy_site_id_0d8edc_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="syncchange",
+            index=models.Index(
+                fields=["task_id", "id"], name="projects_sy_task_id_c2ab8a_idx"
+            ),
+        ),
+    ]
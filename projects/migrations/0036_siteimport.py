@@ -0,0 +1,118 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0035_syncchange_graph"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SiteImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        upload_to="imports_sites/", verbose_name="Classeur Excel"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("RUNNING", "En cours"),
+                            ("DONE", "Terminé"),
+                            ("FAILED", "Échec"),
+                            ("CANCELLED", "Annulé"),
+                        ],
+                        db_index=True,
+                        default="PENDING",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "total_rows",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Lignes du fichier"
+                    ),
+                ),
+                (
+                    "processed_rows",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Lignes traitées"
+                    ),
+                ),
+                (
+                    "imported_rows",
+                    models.PositiveIntegerField(default=0, verbose_name="Sites créés"),
+                ),
+                (
+                    "error_rows",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Lignes rejetées"
+                    ),
+                ),
+                (
+                    "cancel_requested",
+                    models.BooleanField(
+                        default=False, verbose_name="Annulation demandée"
+                    ),
+                ),
+                (
+                    "error_report",
+                    models.FileField(
+                        blank=True,
+                        upload_to="imports_sites/erreurs/",
+                        verbose_name="Rapport d'erreurs",
+                    ),
+                ),
+                ("message", models.TextField(blank=True, verbose_name="Message")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Importé par",
+                    ),
+                ),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="site_imports",
+                        to="projects.project",
+                        verbose_name="Projet",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Import de sites",
+                "verbose_name_plural": "Imports de sites",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:18
+
+from django.db import migrations, models
+
+
+def rename_duplicate_sites(apps, schema_editor):
+    """
+    Doublons (projet, ID client) créés par les imports successifs : le site le
+    plus ancien garde son ID, les suivants sont renommés « ID~pk ». Ils ne sont
+    pas supprimés (tâches, photos, facturation), à fusionner à la main.
+    """
+    Site = apps.get_model('projects', 'Site')
+    sites = Site.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        sites.values('project_id', 'site_id_client')
+        .annotate(count=models.Count('pk'))
+        .filter(count__gt=1)
+    )
+    max_length = Site._meta.get_field('site_id_client').max_length
+    for duplicate in duplicates:
+        extra = sites.filter(
+            project_id=duplicate['project_id'], site_id_client=duplicate['site_id_client']
+        ).order_by('pk')[1:]
+        for site in extra:
+            suffix = f"~{site.pk}"
+            site.site_id_client = site.site_id_client[:max_length - len(suffix)] + suffix
+            site.save(update_fields=['site_id_client'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0036_siteimport"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="siteimport",
+            name="mode",
+            field=models.CharField(
+                choices=[
+                    ("CREATE", "Création (les sites déjà présents sont rejetés)"),
+                    ("UPSERT", "Mise à jour (les sites déjà présents sont modifiés)"),
+                ],
+                default="CREATE",
+                max_length=10,
+                verbose_name="Mode",
+            ),
+        ),
+        migrations.AddField(
+            model_name="siteimport",
+            name="removed_rows",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Sites absents du fichier"
+            ),
+        ),
+        migrations.AddField(
+            model_name="siteimport",
+            name="unchanged_rows",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Sites inchangés"
+            ),
+        ),
+        migrations.AddField(
+            model_name="siteimport",
+            name="updated_rows",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Sites mis à jour"
+            ),
+        ),
+        migrations.RunPython(rename_duplicate_sites, migrations.RunPython.noop),
+    ]
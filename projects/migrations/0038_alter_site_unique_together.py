@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:18
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("projects", "0037_siteimport_upsert_rename_duplicate_sites"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="site",
+            unique_together={("project", "site_id_client")},
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0005_queryprofile"),
+        ("projects", "0038_alter_site_unique_together"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                django.db.models.functions.text.Upper("site_id_client"),
+                name="site_id_client_upper",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="site",
+            index=models.Index(
+                django.db.models.functions.text.Upper("name"), name="site_name_upper"
+            ),
+        ),
+    ]
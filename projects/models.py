@@ -4,7 +4,9 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from core.models import Departement
+from core.metrics import timed
 from django.db.models import Avg
+from django.db.models.functions import Upper
 from datetime import date
 from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal  # Pour garantir la précision des calculs
@@ -391,13 +393,11 @@ class Project(models.Model):
         """Calcule le total des dépenses pour ce projet."""
         
         # 👇 IMPORTATION LOCALE
-        
-        # ✅ CORRECTION :
-        # On utilise 'projet_associe' qui est la clé étrangère
-        # directe vers Project dans ton modèle Depense.
-        return self.depenses.aggregate(
-            total=models.Sum("montant", default=Decimal("0.00"))
-        )["total"]
+        from finance.ledger import entity_total
+        from finance.models import CostLedger
+
+        # Total courant tenu par le registre des coûts (finance.ledger)
+        return entity_total(CostLedger.SCOPE_PROJET, self.pk)
 
 # =================================================================
 # 3. Modèle Site (Le Lieu d'Intervention)
@@ -603,7 +603,9 @@ class Site(models.Model):
     # --- PROPERTIES ---
     @property
     def transmission_display_name(self):
-        link = self.transmission_link_a.first() or self.transmission_link_b.first()
+        # Plus petit ID parmi .all() (et non .first()) : les liaisons préchargées sont réutilisées
+        links = list(self.transmission_link_a.all()) or list(self.transmission_link_b.all())
+        link = min(links, key=lambda item: item.pk, default=None)
         if link:
             ordered_names = sorted([link.site_a.name, link.site_b.name])
             return f"{ordered_names[0]} - {ordered_names[1]}"
@@ -613,6 +615,13 @@ class Site(models.Model):
         verbose_name = _("Site")
         verbose_name_plural = _("Sites")
         ordering = ["project", "site_id_client"]
+        # Clé de l'import en mise à jour (projects.site_import)
+        unique_together = ("project", "site_id_client")
+        # Recherche par début d'ID ou de nom (core/autocomplete.py)
+        indexes = [
+            models.Index(Upper("site_id_client"), name="site_id_client_upper"),
+            models.Index(Upper("name"), name="site_name_upper"),
+        ]
 
     def __str__(self):
         return f"{self.site_id_client} - {self.name}"
@@ -916,35 +925,36 @@ class TaskPhoto(models.Model):
             is_new_upload = not self.pk or hasattr(self.photo.file, 'chunks') # Une vérification simple
 
             if self.pk is None or is_new_upload:
-                img = Image.open(self.photo)
+                with timed('photo_processing_seconds', kind='task_photo'):
+                    img = Image.open(self.photo)
                 
-                MAX_SIZE = (1280, 1280)
-                QUALITY = 65  # 💡 Diminution supplémentaire de la qualité (de 80 à 65)
-                            # pour garantir un poids très faible sans dégrader trop l'image.
+                    MAX_SIZE = (1280, 1280)
+                    QUALITY = 65  # 💡 Diminution supplémentaire de la qualité (de 80 à 65)
+                                # pour garantir un poids très faible sans dégrader trop l'image.
 
-                # 2. Redimensionnement
-                if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
-                    # Utilise Image.LANCZOS pour un meilleur redimensionnement (meilleure qualité)
-                    img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
+                    # 2. Redimensionnement
+                    if img.size[0] > MAX_SIZE[0] or img.size[1] > MAX_SIZE[1]:
+                        # Utilise Image.LANCZOS pour un meilleur redimensionnement (meilleure qualité)
+                        img.thumbnail(MAX_SIZE, Image.Resampling.LANCZOS)
 
-                # 3. Sauvegarde de l'image optimisée
-                output = BytesIO()
+                    # 3. Sauvegarde de l'image optimisée
+                    output = BytesIO()
                 
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
+                    if img.mode == 'RGBA':
+                        img = img.convert('RGB')
                     
-                img.save(output, format='JPEG', quality=QUALITY, optimize=True) # Ajout de optimize=True
-                output.seek(0)
-
-                # 4. Remplace le contenu du champ 'photo'
-                self.photo = InMemoryUploadedFile(
-                    output, 
-                    'ImageField', 
-                    f"{self.photo.name.split('.')[0]}.jpg", 
-                    'image/jpeg', 
-                    sys.getsizeof(output), 
-                    None
-                )
+                    img.save(output, format='JPEG', quality=QUALITY, optimize=True) # Ajout de optimize=True
+                    output.seek(0)
+
+                    # 4. Remplace le contenu du champ 'photo'
+                    self.photo = InMemoryUploadedFile(
+                        output, 
+                        'ImageField', 
+                        f"{self.photo.name.split('.')[0]}.jpg", 
+                        'image/jpeg', 
+                        sys.getsizeof(output), 
+                        None
+                    )
 
         # 5. Appel de la méthode save originale
         super().save(*args, **kwargs)
@@ -1117,3 +1127,121 @@ class UninstalledEquipment(models.Model):
     def __str__(self):
         return f"{self.equipment_name} (x{self.quantity})"
 
+
+
+# =================================================================
+# 11. Journal des modifications (synchronisation des clients mobiles)
+# =================================================================
+class SyncChange(models.Model):
+    """
+    Une ligne par création, modification ou suppression d'un objet synchronisé
+    (projects.sync). L'ID sert de jeton de synchronisation : un client qui
+    envoie le jeton N reçoit les objets modifiés depuis la ligne N.
+    Projet, site et tâche parents servent aussi de marqueur de version des
+    pages de détail (réponses 304, voir projects.sync.change_marker).
+    """
+    PROJECT = "project"
+    TASK = "task"
+    SITE = "site"
+    PHOTO = "photo"
+    INSPECTION = "inspection"
+    KIND_CHOICES = (
+        (PROJECT, _("Projet")),
+        (TASK, _("Tâche")),
+        (SITE, _("Site")),
+        (PHOTO, _("Photo de tâche")),
+        (INSPECTION, _("Inspection")),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name=_("Type d'objet"))
+    object_id = models.BigIntegerField(verbose_name=_("ID de l'objet"))
+    country_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("ID du pays"))
+    project_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("ID du projet"))
+    site_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("ID du site"))
+    task_id = models.BigIntegerField(null=True, blank=True, verbose_name=_("ID de la tâche"))
+    deleted = models.BooleanField(default=False, verbose_name=_("Supprimé"))
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = _("Modification synchronisée")
+        verbose_name_plural = _("Modifications synchronisées")
+        indexes = [
+            models.Index(fields=["country_id", "id"]),
+            models.Index(fields=["project_id", "id"]),
+            models.Index(fields=["site_id", "id"]),
+            models.Index(fields=["task_id", "id"]),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} {self.object_id}{' (supprimé)' if self.deleted else ''}"
+
+
+# =================================================================
+# 12. Import de sites depuis Excel (projects.site_import)
+# =================================================================
+class SiteImport(models.Model):
+    """
+    Import d'un classeur de sites pour un projet, traité en arrière-plan
+    (process_site_imports ou tâche planifiée) : validation de chaque ligne,
+    enregistrement par lots, rapport des lignes rejetées.
+    """
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+    STATUS_CHOICES = (
+        (PENDING, _("En attente")),
+        (RUNNING, _("En cours")),
+        (DONE, _("Terminé")),
+        (FAILED, _("Échec")),
+        (CANCELLED, _("Annulé")),
+    )
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+    CREATE = "CREATE"
+    UPSERT = "UPSERT"
+    MODE_CHOICES = (
+        (CREATE, _("Création (les sites déjà présents sont rejetés)")),
+        (UPSERT, _("Mise à jour (les sites déjà présents sont modifiés)")),
+    )
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name="site_imports", verbose_name=_("Projet"))
+    file = models.FileField(upload_to="imports_sites/", verbose_name=_("Classeur Excel"))
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=CREATE, verbose_name=_("Mode"))
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Importé par"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True, verbose_name=_("Statut"))
+    total_rows = models.PositiveIntegerField(default=0, verbose_name=_("Lignes du fichier"))
+    processed_rows = models.PositiveIntegerField(default=0, verbose_name=_("Lignes traitées"))
+    imported_rows = models.PositiveIntegerField(default=0, verbose_name=_("Sites créés"))
+    updated_rows = models.PositiveIntegerField(default=0, verbose_name=_("Sites mis à jour"))
+    unchanged_rows = models.PositiveIntegerField(default=0, verbose_name=_("Sites inchangés"))
+    removed_rows = models.PositiveIntegerField(default=0, verbose_name=_("Sites absents du fichier"))
+    error_rows = models.PositiveIntegerField(default=0, verbose_name=_("Lignes rejetées"))
+    cancel_requested = models.BooleanField(default=False, verbose_name=_("Annulation demandée"))
+    error_report = models.FileField(upload_to="imports_sites/erreurs/", blank=True, verbose_name=_("Rapport d'erreurs"))
+    message = models.TextField(blank=True, verbose_name=_("Message"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Import de sites")
+        verbose_name_plural = _("Imports de sites")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Import #{self.pk} - {self.project} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
+
+    @property
+    def progress_percent(self):
+        if self.status == self.DONE:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, int(self.processed_rows * 100 / self.total_rows))
@@ -0,0 +1,448 @@
+# projects/site_import.py
+
+"""
+Import de sites depuis un classeur Excel (SiteImport), hors requête web.
+
+- Le classeur est lu en flux (openpyxl read_only) ; chaque ligne est
+  validée indépendamment : une référence inconnue (type de site, modèle
+  radio, team lead...), une date invalide ou un ID client en double rejette
+  la ligne, pas l'import.
+- Mode CREATE : un site déjà présent dans le projet est rejeté. Mode
+  UPSERT (classeur renvoyé chaque semaine) : les sites existants, chargés
+  une seule fois, sont comparés en mémoire à la ligne ; seuls les sites
+  modifiés sont écrits (bulk_update), une cellule vide conserve la valeur
+  en base. Les sites absents du fichier sont signalés, jamais supprimés.
+- Les lignes valides sont enregistrées par lots de CHUNK_SIZE, chacun dans
+  sa propre transaction courte : projects_site n'est jamais verrouillée
+  pendant tout l'import et un lot en échec n'annule pas les précédents.
+- L'avancement est enregistré après chaque lot (page de suivi) ;
+  l'annulation demandée est prise en compte entre deux lots.
+- Les lignes rejetées sont reprises dans un rapport XLSX (ligne, erreur,
+  valeurs d'origine).
+
+Traitement : commande process_site_imports (worker) ou tâche planifiée
+projects.jobs.traiter_imports_sites.
+"""
+
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+from openpyxl import Workbook, load_workbook
+
+from core.partitions import for_each_partition
+from core.registry import registry
+from data_analytics.facts import mark_project_dirty
+from users.models import CustomUser
+from .models import (
+    AntennaType,
+    BBMLType,
+    EnclosureType,
+    InstallationType,
+    RadioType,
+    Site,
+    SiteImport,
+    SiteRadioConfiguration,
+    SiteType,
+    SyncChange,
+    Task,
+    TaskResultType,
+    TaskType,
+)
+from .sync import log_changes
+
+CHUNK_SIZE = 200
+
+# Un import « en cours » sans nouvelles depuis ce délai a perdu son worker
+STALE_AFTER = timedelta(minutes=15)
+
+# Colonnes du classeur (première ligne = en-têtes)
+COLUMNS = (
+    "ID Client", "Nom", "Type de site", "Type d'installation", "Team Lead", "Date de début",
+    "Modèle radio", "Quantité radio", "Type d'antenne", "BB/ML", "Type de boîtier",
+)
+(COL_ID_CLIENT, COL_NAME, COL_SITE_TYPE, COL_INSTALL_TYPE, COL_TEAM_LEAD, COL_START_DATE,
+ COL_RADIO_MODEL, COL_RADIO_QTY, COL_ANTENNA_TYPE, COL_BB_ML, COL_ENCLOSURE_TYPE) = range(len(COLUMNS))
+
+# Tâches créées terminées pour chaque site importé
+TASK_CODES_TO_COMPLETE = ['CLEANUP', 'ANTENNA_INSTALL', 'QA_PHOTOS', 'EHS_PRE', 'ATP', 'SRS', 'IMK']
+SUCCESS_RESULT_CODE = 'DONE'
+DEFAULT_INSTALLATION_TYPE = "Non spécifié"
+
+# Champs du site comparés et mis à jour en mode UPSERT
+UPSERT_FIELDS = (
+    'name', 'site_type_id', 'installation_type_id', 'team_lead_id', 'start_date',
+    'antenna_type_id', 'bb_ml_id', 'enclosure_type_id',
+)
+
+
+class RowError(Exception):
+    pass
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+def normalize(value):
+    """Recherche tolérante : espaces, accents et casse ignorés."""
+    return str(value).strip().encode('ascii', 'ignore').decode('ascii').upper()
+
+
+class Lookups:
+    """Tables de référence indexées une fois par import (aucune requête par ligne)."""
+
+    def __init__(self):
+        self._tables = {}
+
+    def _table(self, model, field):
+        key = (model, field)
+        if key not in self._tables:
+            if registry.handles(model):
+                rows = ((row.pk, getattr(row, field)) for row in registry.rows(model))
+            else:
+                rows = model.objects.values_list('pk', field)
+            self._tables[key] = {normalize(value): pk for pk, value in rows}
+        return self._tables[key]
+
+    def get_id(self, model, value, field='name'):
+        """Identifiant de la référence, None si la cellule est vide ; RowError si inconnue."""
+        if value is None or not str(value).strip():
+            return None
+        pk = self._table(model, field).get(normalize(value))
+        if pk is None:
+            raise RowError(f"{model._meta.verbose_name} « {str(value).strip()} » introuvable")
+        return pk
+
+
+def parse_date(value):
+    if value is None or (isinstance(value, str) and not value.strip()):
+        return None
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    try:
+        if isinstance(value, str):
+            return date.fromisoformat(value.strip())
+        # Date Excel numérique (jours depuis 1900)
+        return date(1900, 1, 1) + timedelta(days=int(value) - 2)
+    except (ValueError, TypeError, OverflowError):
+        raise RowError(f"Date de début invalide : « {value} »")
+
+
+def _cell(row, index):
+    return row[index] if len(row) > index else None
+
+
+def validate_row(row, lookups):
+    """Ligne du classeur -> valeurs du site et de sa configuration radio ; RowError si invalide."""
+    site_id_client = str(_cell(row, COL_ID_CLIENT) or '').strip()
+    name = str(_cell(row, COL_NAME) or '').strip()
+    if not site_id_client or not name:
+        raise RowError("ID Client ou Nom manquant")
+
+    radio_model = _cell(row, COL_RADIO_MODEL)
+    try:
+        radio_qty = int(_cell(row, COL_RADIO_QTY) or 0)
+    except (ValueError, TypeError):
+        raise RowError(f"Quantité radio invalide : « {_cell(row, COL_RADIO_QTY)} »")
+
+    return {
+        'site_id_client': site_id_client,
+        'name': name,
+        'site_type_id': lookups.get_id(SiteType, _cell(row, COL_SITE_TYPE)),
+        'installation_type_id': lookups.get_id(InstallationType, _cell(row, COL_INSTALL_TYPE)),
+        'team_lead_id': lookups.get_id(CustomUser, _cell(row, COL_TEAM_LEAD), field='username'),
+        'start_date': parse_date(_cell(row, COL_START_DATE)),
+        'antenna_type_id': lookups.get_id(AntennaType, _cell(row, COL_ANTENNA_TYPE)),
+        'bb_ml_id': lookups.get_id(BBMLType, _cell(row, COL_BB_ML)),
+        'enclosure_type_id': lookups.get_id(EnclosureType, _cell(row, COL_ENCLOSURE_TYPE)),
+        'radio_type_id': lookups.get_id(RadioType, radio_model) if radio_qty > 0 else None,
+        'radio_qty': radio_qty,
+    }
+
+
+class SiteImporter:
+    """Exécute un SiteImport (statut RUNNING) jusqu'à DONE, CANCELLED ou FAILED."""
+
+    def __init__(self, site_import, log=None):
+        self.site_import = site_import
+        self.project = site_import.project
+        self.log = log or (lambda message: None)
+        self.lookups = Lookups()
+        self.upsert = site_import.mode == SiteImport.UPSERT
+        self.errors = []           # (ligne, erreur, valeurs)
+        self.missing = []          # sites du projet absents du fichier (UPSERT)
+        self.existing = {}         # ID Client normalisé -> site en base (UPSERT : Site, CREATE : pk)
+        self.seen_ids = set()      # ID Client déjà rencontrés dans le fichier
+
+    def run(self):
+        site_import = self.site_import
+        try:
+            self.prepare()
+            workbook = load_workbook(site_import.file, read_only=True, data_only=True)
+            try:
+                sheet = workbook.active
+                SiteImport.objects.filter(pk=site_import.pk).update(total_rows=max((sheet.max_row or 1) - 1, 0))
+                chunk = []
+                for line, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
+                    if not any(value not in (None, '') for value in row):
+                        continue
+                    chunk.append((line, row))
+                    if len(chunk) == CHUNK_SIZE:
+                        self.process_chunk(chunk)
+                        chunk = []
+                if chunk:
+                    self.process_chunk(chunk)
+            finally:
+                workbook.close()
+        except ImportCancelled:
+            self.finish(SiteImport.CANCELLED, "Import annulé : les lots déjà enregistrés sont conservés.")
+        except Exception as exc:
+            self.finish(SiteImport.FAILED, f"Erreur inattendue : {exc}")
+            raise
+        else:
+            self.finish(SiteImport.DONE, "")
+        return site_import
+
+    def prepare(self):
+        self.creator = self.site_import.created_by or CustomUser.objects.filter(is_superuser=True).first()
+        self.assignee = self.creator or CustomUser.objects.filter(is_active=True).first()
+        self.task_types = [t for t in registry.rows(TaskType) if t.code in TASK_CODES_TO_COMPLETE]
+        missing = set(TASK_CODES_TO_COMPLETE) - {t.code for t in self.task_types}
+        if missing:
+            raise ValueError(f"types de tâche manquants : {', '.join(sorted(missing))}")
+        self.result_type = registry.get_by(TaskResultType, code=SUCCESS_RESULT_CODE)
+        if self.result_type is None:
+            raise ValueError(f"type de résultat {SUCCESS_RESULT_CODE} manquant")
+        self.default_installation_type, _ = InstallationType.objects.get_or_create(
+            name=DEFAULT_INSTALLATION_TYPE, defaults={'is_active': True}
+        )
+        if self.upsert:
+            # Une seule lecture des sites du projet (et de leurs radios) pour tout l'import
+            sites = (
+                self.project.sites.only('project', 'site_id_client', *UPSERT_FIELDS)
+                .prefetch_related('radio_configurations').order_by('pk')
+            )
+            for site in sites:
+                self.existing.setdefault(normalize(site.site_id_client), site)
+        else:
+            for pk, value in self.project.sites.values_list('pk', 'site_id_client'):
+                self.existing.setdefault(normalize(value), pk)
+
+    def validate(self, row):
+        """Valeurs de la ligne et site existant (UPSERT) ; RowError si invalide."""
+        values = validate_row(row, self.lookups)
+        key = normalize(values['site_id_client'])
+        if key in self.seen_ids:
+            raise RowError(f"Site « {values['site_id_client']} » en double dans le fichier")
+        self.seen_ids.add(key)
+        existing = self.existing.get(key)
+        if existing is not None and not self.upsert:
+            raise RowError(f"Site « {values['site_id_client']} » déjà présent dans le projet")
+        return values, existing
+
+    def diff(self, site, values):
+        """
+        Applique la ligne au site en mémoire : (champs modifiés, radio à écrire
+        ou None). Les cellules vides ne modifient rien.
+        """
+        changed = []
+        for field in UPSERT_FIELDS:
+            value = values[field]
+            if value is not None and getattr(site, field) != value:
+                setattr(site, field, value)
+                changed.append(field)
+        radio = None
+        if values['radio_type_id']:
+            current = {c.radio_type_id: c.quantity for c in site.radio_configurations.all()}
+            if current.get(values['radio_type_id']) != values['radio_qty']:
+                radio = SiteRadioConfiguration(
+                    site=site, radio_type_id=values['radio_type_id'], quantity=values['radio_qty'],
+                )
+        return changed, radio
+
+    def process_chunk(self, chunk):
+        if SiteImport.objects.filter(pk=self.site_import.pk, cancel_requested=True).exists():
+            raise ImportCancelled()
+
+        new, changed, radios, fields = [], [], [], set()
+        unchanged = rejected = 0
+        for line, row in chunk:
+            try:
+                values, site = self.validate(row)
+            except RowError as exc:
+                self.errors.append((line, str(exc), row))
+                rejected += 1
+                continue
+            if site is None:
+                new.append(values)
+                continue
+            site_fields, radio = self.diff(site, values)
+            if site_fields or radio:
+                changed.append(site)
+                fields.update(site_fields)
+                if radio:
+                    radios.append(radio)
+            else:
+                unchanged += 1
+
+        with transaction.atomic(using=router.db_for_write(Site, instance=self.project)):
+            created = self.save_sites(new)
+            self.update_sites(changed, fields, radios)
+            SiteImport.objects.filter(pk=self.site_import.pk).update(
+                processed_rows=F('processed_rows') + len(chunk),
+                imported_rows=F('imported_rows') + created,
+                updated_rows=F('updated_rows') + len(changed),
+                unchanged_rows=F('unchanged_rows') + unchanged,
+                error_rows=F('error_rows') + rejected,
+                updated_at=timezone.now(),
+            )
+        self.log(
+            f"{len(chunk)} ligne(s) traitée(s), {created} site(s) créé(s), "
+            f"{len(changed)} mis à jour, {unchanged} inchangé(s)"
+        )
+
+    def save_sites(self, rows):
+        if not rows:
+            return 0
+        radios = {}
+        sites = []
+        for values in rows:
+            radio_type_id, quantity = values.pop('radio_type_id'), values.pop('radio_qty')
+            site = Site(
+                project=self.project,
+                created_by=self.creator,
+                # Les tâches initiales sont créées terminées
+                progress_percentage=100,
+                status='COMPLETED',
+                **values,
+            )
+            site.installation_type_id = site.installation_type_id or self.default_installation_type.pk
+            site.start_date = site.start_date or date.today()
+            if radio_type_id:
+                radios[id(site)] = (radio_type_id, quantity)
+            sites.append(site)
+
+        Site.objects.bulk_create(sites)
+        now = timezone.now()
+        tasks = [
+            Task(
+                site=site,
+                task_type=task_type,
+                description=f"Tâche initiale '{task_type.name}' - Importation de Site",
+                assigned_to=self.assignee,
+                due_date=now.date(),
+                status='COMPLETED',
+                progress_percentage=100,
+                result_type=self.result_type,
+                completion_date=now,
+                created_by=self.creator,
+            )
+            for site in sites
+            for task_type in self.task_types
+        ]
+        Task.objects.bulk_create(tasks)
+        SiteRadioConfiguration.objects.bulk_create([
+            SiteRadioConfiguration(site=site, radio_type_id=radios[id(site)][0], quantity=radios[id(site)][1])
+            for site in sites if id(site) in radios
+        ])
+        # bulk_create n'émet pas de signaux
+        log_changes(SyncChange.SITE, sites)
+        log_changes(SyncChange.TASK, tasks)
+        return len(sites)
+
+    def update_sites(self, sites, fields, radios):
+        if not sites:
+            return
+        if fields:
+            Site.objects.bulk_update(sites, sorted(fields))
+        # Une configuration par (site, modèle radio) : seule la quantité change
+        SiteRadioConfiguration.objects.bulk_create(
+            radios, update_conflicts=True, unique_fields=['site', 'radio_type'], update_fields=['quantity'],
+        )
+        log_changes(SyncChange.SITE, sites)
+
+    def finish(self, status, message):
+        site_import = self.site_import
+        if self.upsert and status == SiteImport.DONE:
+            self.missing = [site for key, site in self.existing.items() if key not in self.seen_ids]
+            site_import.removed_rows = len(self.missing)
+        if self.errors or self.missing:
+            site_import.error_report.save(
+                f"import_{site_import.pk}_erreurs.xlsx", ContentFile(error_report(self.errors, self.missing)), save=False,
+            )
+        site_import.refresh_from_db(fields=['total_rows', 'processed_rows', 'imported_rows', 'updated_rows', 'unchanged_rows', 'error_rows'])
+        if site_import.imported_rows or site_import.updated_rows:
+            self.project.update_progress()
+            mark_project_dirty(self.project.pk)
+        if status == SiteImport.DONE:
+            site_import.total_rows = site_import.processed_rows
+        site_import.status = status
+        site_import.message = message
+        site_import.finished_at = timezone.now()
+        site_import.save()
+
+
+def error_report(errors, missing=()):
+    """
+    Classeur XLSX des lignes rejetées (ligne, erreur puis colonnes d'origine)
+    et, en mode UPSERT, des sites du projet absents du fichier.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Erreurs")
+    sheet.append(["Ligne", "Erreur", *COLUMNS])
+    for line, message, row in errors:
+        sheet.append([line, message, *row])
+    if missing:
+        sheet = workbook.create_sheet("Absents du fichier")
+        sheet.append(["ID Client", "Nom"])
+        for site in missing:
+            sheet.append([site.site_id_client, site.name])
+    output = BytesIO()
+    workbook.save(output)
+    return output.getvalue()
+
+
+# =================================================================
+# Exécution en arrière-plan
+# =================================================================
+
+def claim(site_import):
+    """Passe l'import en RUNNING ; False si un autre worker l'a déjà pris."""
+    now = timezone.now()
+    claimed = SiteImport.objects.filter(pk=site_import.pk, status=SiteImport.PENDING).update(
+        status=SiteImport.RUNNING, started_at=now, updated_at=now,
+    )
+    if claimed:
+        site_import.refresh_from_db()
+    return bool(claimed)
+
+
+def _process_pending(log):
+    # Imports abandonnés par un worker arrêté en cours de traitement
+    SiteImport.objects.filter(status=SiteImport.RUNNING, updated_at__lt=timezone.now() - STALE_AFTER).update(
+        status=SiteImport.FAILED, message="Import interrompu (worker arrêté).", finished_at=timezone.now(),
+    )
+    # Annulés avant d'avoir commencé
+    SiteImport.objects.filter(status=SiteImport.PENDING, cancel_requested=True).update(
+        status=SiteImport.CANCELLED, finished_at=timezone.now(),
+    )
+    done = 0
+    for site_import in SiteImport.objects.filter(status=SiteImport.PENDING).select_related('project').order_by('pk'):
+        if not claim(site_import):
+            continue
+        log(f"Import #{site_import.pk} ({site_import.project})")
+        try:
+            SiteImporter(site_import, log).run()
+        except Exception as exc:
+            log(f"Import #{site_import.pk} en échec : {exc}")
+        done += 1
+    return done
+
+
+def process_pending_imports(log=None):
+    """Traite les imports en attente de toutes les bases ; retourne le nombre d'imports traités."""
+    return sum(for_each_partition(_process_pending, log or (lambda message: None)).values())
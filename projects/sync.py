@@ -0,0 +1,376 @@
+# projects/sync.py
+
+"""
+Synchronisation différentielle des tâches, sites, photos et inspections pour
+les clients mobiles (API JSON de projects.api).
+
+- Chaque création, modification ou suppression est inscrite dans SyncChange
+  (signaux ci-dessous, ou log_changes() après un bulk_create/bulk_update).
+- Le jeton de synchronisation est l'ID de la dernière modification transmise,
+  suffixé d'une empreinte des pays et types demandés : si l'un change, le
+  client reçoit un instantané complet.
+- L'instantané est paginé comme le flux (SYNC_PAGE_SIZE lignes) : tant qu'il
+  n'est pas terminé, le jeton porte aussi un curseur « type.pk » (parcours
+  par type puis par clé croissante). Seule la première page a reset=True.
+- Les modifications des dernières SYNC_CHANGE_LAG_SECONDS secondes sont
+  retenues jusqu'au prochain appel : une transaction encore ouverte peut
+  valider un ID inférieur au jeton déjà distribué.
+- Avec des bases par groupe de pays (core.partitions), les lignes sont lues
+  dans la base de chaque pays demandé puis fusionnées par clé (les
+  identifiants sont uniques toutes bases confondues) ; le journal est central.
+- Les lignes sont transmises en colonnes ({"fields": [...], "rows": [[...]]}).
+  Un objet modifié absent du résultat a été supprimé ou est sorti du périmètre.
+- Chaque ligne porte aussi les IDs projet / site / tâche parents :
+  change_marker() en tire la version des pages de détail (core.conditional).
+"""
+
+import datetime
+import zlib
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Max, Min
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.partitions import all_databases, partition_for_country, partition_scope, partitioning_enabled
+
+from .models import (
+    Inspection,
+    Project,
+    Site,
+    SiteRadioConfiguration,
+    SyncChange,
+    Task,
+    TaskPhoto,
+    TransmissionLink,
+    UninstallationReport,
+    UninstalledEquipment,
+)
+
+
+@dataclass
+class SyncKind:
+    key: str                # Clé de la charge utile (ex: "tasks")
+    model: type
+    fields: tuple
+    country_path: str       # Chemin vers le pays depuis le modèle
+    parent: type            # Modèle parent, encore présent quand l'objet est supprimé
+    parent_attr: str
+    parent_paths: dict      # Colonne de SyncChange -> chemin depuis le parent
+    own_column: str = None  # Colonne de SyncChange qui reçoit l'ID de l'objet lui-même
+    file_fields: tuple = ()
+
+
+SITE_PARENT_PATHS = {'site_id': 'pk', 'project_id': 'project_id', 'country_id': 'project__country_id'}
+
+SYNC_KINDS = {
+    SyncChange.SITE: SyncKind(
+        'sites', Site,
+        ('id', 'project_id', 'site_id_client', 'name', 'location', 'status', 'progress_percentage',
+         'team_lead_id', 'start_date', 'end_date', 'last_inspection_result'),
+        'project__country_id', Project, 'project_id', {'project_id': 'pk', 'country_id': 'country_id'},
+        own_column='site_id',
+    ),
+    SyncChange.TASK: SyncKind(
+        'tasks', Task,
+        ('id', 'site_id', 'task_type_id', 'assigned_to_id', 'status', 'progress_percentage',
+         'result_type_id', 'due_date', 'ticket_number', 'description'),
+        'site__project__country_id', Site, 'site_id', SITE_PARENT_PATHS,
+        own_column='task_id',
+    ),
+    SyncChange.PHOTO: SyncKind(
+        'photos', TaskPhoto,
+        ('id', 'task_id', 'photo', 'caption', 'uploaded_by_id', 'uploaded_at'),
+        'task__site__project__country_id', Task, 'task_id',
+        {'task_id': 'pk', 'site_id': 'site_id', 'project_id': 'site__project_id', 'country_id': 'site__project__country_id'},
+        file_fields=('photo',),
+    ),
+    SyncChange.INSPECTION: SyncKind(
+        'inspections', Inspection,
+        ('id', 'site_id', 'type_inspection', 'inspector_id', 'resultat_inspection',
+         'date_inspection', 'rapport_photos_url', 'commentaires'),
+        'site__project__country_id', Site, 'site_id', SITE_PARENT_PATHS,
+    ),
+}
+
+# Le projet n'est pas transmis aux clients mobiles : il n'est journalisé que
+# pour le marqueur de version des pages.
+LOGGED_KINDS = {
+    **SYNC_KINDS,
+    SyncChange.PROJECT: SyncKind(
+        'projects', Project, (), 'country_id', Project, 'pk', {},
+    ),
+}
+KIND_BY_MODEL = {spec.model: kind for kind, spec in LOGGED_KINDS.items()}
+
+
+# =================================================================
+# Journalisation
+# =================================================================
+
+def log_changes(kind, objects, deleted=False):
+    """Inscrit des modifications faites sans signaux (bulk_create, bulk_update, update)."""
+    spec = LOGGED_KINDS[kind]
+    if spec.parent is spec.model:
+        # Projet : tout est lu sur l'objet (il n'existe plus en base après suppression)
+        changes = [
+            SyncChange(kind=kind, object_id=obj.pk, deleted=deleted, project_id=obj.pk, country_id=obj.country_id)
+            for obj in objects
+        ]
+        SyncChange.objects.bulk_create(changes, batch_size=500)
+        return
+
+    columns = list(spec.parent_paths)
+    parents = {
+        row[0]: dict(zip(columns, row[1:]))
+        for row in spec.parent.objects.filter(
+            pk__in={getattr(obj, spec.parent_attr) for obj in objects}
+        ).values_list('pk', *spec.parent_paths.values())
+    }
+    changes = []
+    for obj in objects:
+        graph = dict(parents.get(getattr(obj, spec.parent_attr), {}))
+        if spec.own_column:
+            graph[spec.own_column] = obj.pk
+        changes.append(SyncChange(kind=kind, object_id=obj.pk, deleted=deleted, **graph))
+    SyncChange.objects.bulk_create(changes, batch_size=500)
+
+
+def touch(kind, pks):
+    """Journalise une modification d'objets dont une donnée liée a changé (rapport, configuration...)."""
+    spec = LOGGED_KINDS[kind]
+    pks = [pk for pk in pks if pk]
+    if pks:
+        log_changes(kind, list(spec.model.objects.filter(pk__in=pks).only('pk', spec.parent_attr)))
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Site)
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=TaskPhoto)
+@receiver(post_save, sender=Inspection)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Site)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=TaskPhoto)
+@receiver(post_delete, sender=Inspection)
+def record_sync_change(sender, instance, **kwargs):
+    """Journalise la modification dans la même transaction que l'objet."""
+    if kwargs.get("raw", False):  # Ignore pendant le chargement des fixtures
+        return
+    log_changes(KIND_BY_MODEL[sender], [instance], deleted='created' not in kwargs)
+
+
+@receiver(post_save, sender=SiteRadioConfiguration)
+@receiver(post_delete, sender=SiteRadioConfiguration)
+@receiver(post_save, sender=TransmissionLink)
+@receiver(post_delete, sender=TransmissionLink)
+def record_site_detail_change(sender, instance, **kwargs):
+    """Configuration radio ou liaison modifiée : le site (et ses pages) changent de version."""
+    if kwargs.get("raw", False):
+        return
+    if sender is TransmissionLink:
+        touch(SyncChange.SITE, [instance.site_a_id, instance.site_b_id])
+    else:
+        touch(SyncChange.SITE, [instance.site_id])
+
+
+@receiver(post_save, sender=UninstallationReport)
+@receiver(post_delete, sender=UninstallationReport)
+@receiver(post_save, sender=UninstalledEquipment)
+@receiver(post_delete, sender=UninstalledEquipment)
+def record_task_report_change(sender, instance, **kwargs):
+    """Rapport de désinstallation modifié : la tâche change de version."""
+    if kwargs.get("raw", False):
+        return
+    if sender is UninstallationReport:
+        touch(SyncChange.TASK, [instance.task_id])
+    else:
+        touch(SyncChange.TASK, UninstallationReport.objects.filter(
+            pk=instance.uninstallation_report_id
+        ).values_list('task_id', flat=True))
+
+
+def change_marker(condition):
+    """
+    Version d'un ensemble d'objets (ex: Q(project_id=...)) : dernier ID et
+    nombre de modifications journalisées. Le nombre change aussi quand une
+    transaction plus ancienne valide un ID inférieur au dernier.
+    """
+    row = SyncChange.objects.filter(condition).aggregate(last=Max('id'), count=Count('id'))
+    return row['last'] or 0, row['count']
+
+
+def purge_changes(older_than_days=None):
+    """Supprime les modifications anciennes ; les clients plus anciens recevront un instantané."""
+    days = older_than_days if older_than_days is not None else settings.SYNC_CHANGE_RETENTION_DAYS
+    cutoff = timezone.now() - datetime.timedelta(days=days)
+    deleted, _ = SyncChange.objects.filter(changed_at__lt=cutoff).delete()
+    return deleted
+
+
+# =================================================================
+# Flux de modifications
+# =================================================================
+
+def _scope_key(country_ids, kinds):
+    countries = 'all' if country_ids is None else ','.join(str(pk) for pk in sorted(country_ids))
+    return format(zlib.crc32(f"{countries}|{','.join(kinds)}".encode()), 'x')
+
+
+def _parse_token(token, scope):
+    """
+    (ID, curseur d'instantané ou None) contenus dans le jeton, ou None si
+    le jeton est absent, invalide ou émis pour un autre périmètre.
+    """
+    if not token:
+        return None
+    last_id, _, rest = token.partition('-')
+    token_scope, _, cursor = rest.partition('-')
+    if token_scope != scope or not last_id.isdigit():
+        return None
+    if not cursor:
+        return int(last_id), None
+    kind_index, _, after = cursor.partition('.')
+    if not (kind_index.isdigit() and after.isdigit()):
+        return None
+    return int(last_id), (int(kind_index), int(after))
+
+
+def _visible_changes(country_ids):
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.SYNC_CHANGE_LAG_SECONDS)
+    changes = SyncChange.objects.filter(changed_at__lte=cutoff)
+    if country_ids is not None:
+        changes = changes.filter(country_id__in=country_ids)
+    return changes
+
+
+def latest_change_id(country_ids):
+    return _visible_changes(country_ids).aggregate(last=Max('id'))['last'] or 0
+
+
+def _queryset(spec, country_ids):
+    queryset = spec.model.objects.order_by()
+    if country_ids is not None:
+        queryset = queryset.filter(**{f"{spec.country_path}__in": country_ids})
+    return queryset
+
+
+def _serialize(spec, queryset):
+    rows = [list(row) for row in queryset.values_list(*spec.fields)]
+    for name in spec.file_fields:
+        index = spec.fields.index(name)
+        for row in rows:
+            row[index] = default_storage.url(row[index]) if row[index] else None
+    return {'fields': list(spec.fields), 'rows': rows}
+
+
+def _partition_groups(country_ids):
+    """[(base, pays lus dans cette base)] du périmètre (None = tous les pays de la base)."""
+    if not partitioning_enabled():
+        return [(DEFAULT_DB_ALIAS, country_ids)]
+    if country_ids is None:
+        return [(alias, None) for alias in all_databases()]
+    groups = {}
+    for country_id in country_ids:
+        groups.setdefault(partition_for_country(country_id), []).append(country_id)
+    return sorted(groups.items())
+
+
+def _read(spec, country_ids, limit=None, **filters):
+    """Lignes du périmètre triées par clé, lues dans la base de chaque pays (au plus `limit`)."""
+    rows = []
+    for alias, ids in _partition_groups(country_ids):
+        queryset = _queryset(spec, ids).filter(**filters).order_by('pk')
+        if limit is not None:
+            queryset = queryset[:limit]
+        with partition_scope(alias):
+            rows.extend(_serialize(spec, queryset)['rows'])
+    rows.sort(key=lambda row: row[0])
+    return {'fields': list(spec.fields), 'rows': rows[:limit]}
+
+
+def serialize_objects(kind, pks):
+    """Lignes à jour d'objets donnés (réponse des écritures de l'API)."""
+    spec = SYNC_KINDS[kind]
+    return _serialize(spec, spec.model.objects.filter(pk__in=pks).order_by('pk'))
+
+
+def _snapshot_page(feed, kinds, country_ids, cursor, limit):
+    """
+    Remplit `feed` avec au plus `limit` lignes de l'instantané, à partir de
+    `cursor` (indice du type, dernier pk transmis). Retourne le curseur de
+    la page suivante, ou None si l'instantané est terminé.
+    """
+    kind_index, after = cursor
+    remaining = limit
+    next_cursor = None
+    for index, kind in enumerate(kinds):
+        spec = SYNC_KINDS[kind]
+        feed[spec.key] = {'fields': list(spec.fields), 'rows': []}
+        if index < kind_index or next_cursor is not None:
+            continue
+        if not remaining:
+            next_cursor = (index, 0)
+            continue
+        # Une ligne de plus que la page : indique s'il reste des lignes de ce type
+        data = _read(spec, country_ids, remaining + 1, pk__gt=after if index == kind_index else 0)
+        if len(data['rows']) > remaining:
+            del data['rows'][remaining:]
+            next_cursor = (index, data['rows'][-1][0])
+        remaining -= len(data['rows'])
+        feed[spec.key] = data
+    return next_cursor
+
+
+def build_feed(country_ids, token=None, kinds=None, limit=None):
+    """
+    Modifications visibles depuis `token` pour les pays donnés (None = tous).
+    Retourne un dictionnaire prêt à être encodé en JSON.
+    """
+    kinds = sorted(kinds or SYNC_KINDS)
+    limit = limit or settings.SYNC_PAGE_SIZE
+    scope = _scope_key(country_ids, kinds)
+    since, cursor = _parse_token(token, scope) or (None, None)
+
+    if since is not None:
+        # Modifications purgées depuis le dernier passage du client : instantané complet
+        oldest = SyncChange.objects.aggregate(first=Min('id'))['first']
+        if oldest is not None and since < oldest - 1:
+            since, cursor = None, None
+
+    if since is None or cursor is not None:
+        if since is None:
+            since = latest_change_id(country_ids)  # Lu avant les données : rien n'est perdu
+        feed = {'token': None, 'reset': cursor is None, 'more': False, 'deleted': {}}
+        cursor = _snapshot_page(feed, kinds, country_ids, cursor or (0, 0), limit)
+        feed['token'] = f"{since}-{scope}" + (f"-{cursor[0]}.{cursor[1]}" if cursor else '')
+        feed['more'] = cursor is not None
+        return feed
+
+    changes = list(
+        _visible_changes(country_ids).filter(id__gt=since, kind__in=kinds)
+        .order_by('id').values_list('id', 'kind', 'object_id')[:limit]
+    )
+    last_id = changes[-1][0] if changes else since
+    feed = {
+        'token': f"{last_id}-{scope}",
+        'reset': False,
+        'more': len(changes) == limit,
+        'deleted': {},
+    }
+    for kind in kinds:
+        spec = SYNC_KINDS[kind]
+        pks = {object_id for _, change_kind, object_id in changes if change_kind == kind}
+        data = _read(spec, country_ids, pk__in=pks) if pks else {
+            'fields': list(spec.fields), 'rows': [],
+        }
+        feed[spec.key] = data
+        gone = pks - {row[0] for row in data['rows']}
+        if gone:
+            feed['deleted'][spec.key] = sorted(gone)
+    return feed
@@ -1,2 +1,240 @@
+import datetime
+import shutil
+import tempfile
+import unittest
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from openpyxl import Workbook
+
+from core.partitions import country_scope
+from users.models import Country, CustomUser, EmployeeCountryAssignment, Role
+from .models import Project, Site, SiteImport, SiteType, SyncChange, Task, TaskResultType, TaskType
+from .site_import import COLUMNS, TASK_CODES_TO_COMPLETE, process_pending_imports
+from .sync import build_feed
+
+
+@override_settings(SYNC_CHANGE_LAG_SECONDS=0)
+class SyncFeedTests(TestCase):
+    """Flux de synchronisation : instantané paginé par curseur, puis modifications."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(name="Bénin", code="BEN")
+        cls.project = Project.objects.create(
+            country=cls.country, name="P1", coordinator=CustomUser.objects.create(username="coord"),
+            start_date=datetime.date(2025, 1, 1),
+        )
+        cls.sites = [Site.objects.create(project=cls.project, site_id_client=f"S{i}", name="Site") for i in range(5)]
+
+    def test_snapshot_is_paginated(self):
+        pages, token = [], None
+        while True:
+            feed = build_feed([self.country.pk], token=token, kinds=[SyncChange.SITE], limit=2)
+            pages.append(feed)
+            token = feed['token']
+            if not feed['more']:
+                break
+        self.assertEqual([len(page['sites']['rows']) for page in pages], [2, 2, 1])
+        self.assertEqual([page['reset'] for page in pages], [True, False, False])
+        ids = [row[0] for page in pages for row in page['sites']['rows']]
+        self.assertEqual(ids, [site.pk for site in self.sites])
+
+        # Le jeton final reprend au dernier ID lu avant la première page
+        feed = build_feed([self.country.pk], token=token, kinds=[SyncChange.SITE], limit=2)
+        self.assertEqual((feed['reset'], feed['sites']['rows']), (False, []))
+
+    def test_changes_during_snapshot_follow_it(self):
+        first = build_feed([self.country.pk], kinds=[SyncChange.SITE], limit=3)
+        added = Site.objects.create(project=self.project, site_id_client="S-new", name="Site")
+        second = build_feed([self.country.pk], token=first['token'], kinds=[SyncChange.SITE], limit=3)
+        self.assertFalse(second['more'])
+        delta = build_feed([self.country.pk], token=second['token'], kinds=[SyncChange.SITE], limit=3)
+        self.assertIn(added.pk, [row[0] for row in delta['sites']['rows']])
+
+
+@unittest.skipUnless(settings.TEST_COUNTRY_PARTITIONS, "profil de tests config.test_settings")
+@override_settings(COUNTRY_PARTITIONS=settings.TEST_COUNTRY_PARTITIONS)
+@override_settings(SYNC_CHANGE_LAG_SECONDS=0)
+class PartitionedSyncFeedTests(TestCase):
+    """Flux de synchronisation d'un utilisateur dont les pays sont dans deux bases."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        call_command('sync_partitions', '--reserve-ids', stdout=StringIO())
+        coordinator = CustomUser.objects.create(username="coord")
+        self.countries = [
+            Country.objects.create(name="Central", code="ZZZ"),
+            Country.objects.create(name="Partition", code=next(iter(settings.COUNTRY_PARTITIONS))),
+        ]
+        self.sites = []
+        for country in self.countries:
+            with country_scope(country.pk):
+                project = Project.objects.create(
+                    country=country, name=country.name, coordinator=coordinator, start_date=datetime.date(2025, 1, 1),
+                )
+                self.sites += [Site.objects.create(project=project, site_id_client=f"S{i}", name="Site") for i in range(2)]
+
+    def test_snapshot_and_changes_cover_both_bases(self):
+        country_ids = [country.pk for country in self.countries]
+        pages, token = [], None
+        while True:
+            feed = build_feed(country_ids, token=token, kinds=[SyncChange.SITE], limit=3)
+            pages.append(feed)
+            token = feed['token']
+            if not feed['more']:
+                break
+        ids = [row[0] for page in pages for row in page['sites']['rows']]
+        self.assertEqual(ids, sorted(site.pk for site in self.sites))
+
+        changed = self.sites[-1]
+        with country_scope(self.countries[1].pk):
+            changed.name = "Renommé"
+            changed.save()
+        delta = build_feed(country_ids, token=token, kinds=[SyncChange.SITE])
+        self.assertEqual([(row[0], row[3]) for row in delta['sites']['rows']], [(changed.pk, "Renommé")])
+        self.assertEqual(delta['deleted'], {})
+
+
+def workbook_file(rows):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    output = BytesIO()
+    workbook.save(output)
+    return ContentFile(output.getvalue(), name="sites.xlsx")
+
+
+class SiteImportTests(TestCase):
+    """Import de sites en arrière-plan : création, rejets ligne par ligne, mise à jour (UPSERT)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name="Bénin", code="BEN")
+        cls.user = CustomUser.objects.create(username="coord")
+        cls.project = Project.objects.create(
+            country=country, name="P1", coordinator=cls.user, start_date=datetime.date(2025, 1, 1),
+        )
+        for code in TASK_CODES_TO_COMPLETE:
+            TaskType.objects.create(name=code.title(), code=code)
+        TaskResultType.objects.create(name="Terminé", code="DONE")
+        SiteType.objects.create(name="Macro")
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def run_import(self, rows, mode=SiteImport.CREATE):
+        site_import = SiteImport.objects.create(
+            project=self.project, file=workbook_file(rows), mode=mode, created_by=self.user,
+        )
+        self.assertEqual(process_pending_imports(), 1)
+        site_import.refresh_from_db()
+        return site_import
+
+    def test_invalid_rows_are_rejected_individually(self):
+        site_import = self.run_import([
+            ("S1", "Site 1", "Macro", None, "coord", "2025-03-01"),
+            ("S2", "Site 2", "Inconnu"),
+            ("S1", "Site 1 bis"),
+            ("S3", "Site 3", None, None, None, "hier"),
+            ("S4", "Site 4"),
+        ])
+        self.assertEqual(site_import.status, SiteImport.DONE)
+        self.assertEqual((site_import.imported_rows, site_import.error_rows), (2, 3))
+        self.assertTrue(site_import.error_report)
+        self.assertEqual(sorted(self.project.sites.values_list('site_id_client', flat=True)), ["S1", "S4"])
+        site = self.project.sites.get(site_id_client="S1")
+        self.assertEqual((site.team_lead, site.start_date), (self.user, datetime.date(2025, 3, 1)))
+        self.assertEqual(site.tasks.filter(status='COMPLETED').count(), len(TASK_CODES_TO_COMPLETE))
+
+    def test_upsert_updates_changed_sites_only(self):
+        self.run_import([("S1", "Site 1", "Macro"), ("S2", "Site 2"), ("S3", "Site 3")])
+        site_import = self.run_import(
+            [("S1", "Site 1"), ("S2", "Site 2 renommé"), ("S4", "Site 4")], mode=SiteImport.UPSERT,
+        )
+        self.assertEqual(site_import.status, SiteImport.DONE)
+        self.assertEqual(
+            (site_import.imported_rows, site_import.updated_rows, site_import.unchanged_rows, site_import.removed_rows),
+            (1, 1, 1, 1),
+        )
+        sites = {site.site_id_client: site for site in self.project.sites.select_related('site_type')}
+        self.assertEqual(sites["S2"].name, "Site 2 renommé")
+        self.assertEqual(sites["S1"].site_type.name, "Macro")  # Cellule vide : valeur conservée
+        self.assertIn("S3", sites)  # Absent du fichier : signalé, pas supprimé
+
+
+class TaskAutocompleteTests(TestCase):
+    """Liste à recherche des tâches (grille des heures) : pays de l'utilisateur, tâches ouvertes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username="chef")
+        task_type = TaskType.objects.create(name="Pose", code="POSE")
+        cls.countries = {}
+        for code in ("BEN", "TGO"):
+            country = cls.countries[code] = Country.objects.create(name=code, code=code)
+            project = Project.objects.create(
+                country=country, name=f"P-{code}", coordinator=cls.user, start_date=datetime.date(2025, 1, 1),
+            )
+            site = Site.objects.create(project=project, site_id_client=f"{code}-1", name="Site")
+            for status in ("TO_DO", "COMPLETED"):
+                Task.objects.create(
+                    site=site, task_type=task_type, description=status, status=status,
+                    due_date=datetime.date(2025, 6, 1),
+                )
+        EmployeeCountryAssignment.objects.create(
+            user=cls.user, country=cls.countries["BEN"], role=Role.objects.create(name="Chef"),
+        )
+
+    def search(self, **params):
+        self.client.force_login(self.user)
+        return self.client.get(reverse('projects:task_autocomplete'), params).json()
+
+    def test_limited_to_user_countries(self):
+        results = self.search()['results']
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(row['text'].startswith("[BEN-1]") for row in results))
+        self.assertEqual(self.search(q="tgo")['results'], [])
+
+    def test_open_excludes_completed_tasks(self):
+        results = self.search(open=1)['results']
+        self.assertEqual([row['text'] for row in results], ["[BEN-1] TO_DO"])
+
+
+class SiteAutocompleteTests(TestCase):
+    """Liste à recherche des sites : limitée aux pays actifs de l'utilisateur."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create(username="chef")
+        cls.sites = {}
+        for code in ("BEN", "TGO"):
+            country = Country.objects.create(name=code, code=code)
+            project = Project.objects.create(
+                country=country, name=f"P-{code}", coordinator=cls.user, start_date=datetime.date(2025, 1, 1),
+            )
+            cls.sites[code] = Site.objects.create(project=project, site_id_client=f"S-{code}", name="Site")
+        EmployeeCountryAssignment.objects.create(
+            user=cls.user, country=cls.sites["BEN"].project.country, role=Role.objects.create(name="Chef"),
+        )
+
+    def search(self, user, **params):
+        self.client.force_login(user)
+        return [row['id'] for row in self.client.get(reverse('projects:site_autocomplete'), params).json()['results']]
+
+    def test_other_countries_are_excluded(self):
+        self.assertEqual(self.search(self.user, q="s-"), [self.sites["BEN"].pk])
+        self.assertEqual(self.search(self.user, country=self.sites["TGO"].project.country_id), [])
+
+    def test_superuser_sees_every_country(self):
+        admin = CustomUser.objects.create(username="admin", is_superuser=True)
+        self.assertEqual(self.search(admin, q="s-"), [self.sites["BEN"].pk, self.sites["TGO"].pk])
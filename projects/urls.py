@@ -4,7 +4,7 @@ from django.urls import path
 from django.shortcuts import render
 from django.db.models import Q
 
-from . import views
+from . import api, views
 from .views import (
     ProjectListView,
     ProjectDetailView,
@@ -51,6 +51,8 @@ urlpatterns = [
     ),
     path("site/<int:pk>/edit/", views.SiteUpdateView.as_view(), name="site_update"),
     path("site/<int:pk>/", SiteDetailView.as_view(), name="site_detail"),
+    path("sites/autocomplete/", views.SiteAutocompleteView.as_view(), name="site_autocomplete"),
+    path("tasks/autocomplete/", views.TaskAutocompleteView.as_view(), name="task_autocomplete"),
 
     # 4. INTERFACE TÂCHES
     path(
@@ -94,4 +96,21 @@ urlpatterns = [
         views.TransmissionLinkCreateView.as_view(),
         name="transmission_link_create",
     ), 
+
+    # 8. IMPORT DE SITES (Excel, traité en arrière-plan)
+    path(
+        "<int:project_pk>/sites/import/",
+        views.SiteImportCreateView.as_view(),
+        name="site_import_create",
+    ),
+    path("imports/<int:pk>/", views.SiteImportDetailView.as_view(), name="site_import_detail"),
+    path("imports/<int:pk>/status/", views.SiteImportStatusView.as_view(), name="site_import_status"),
+    path("imports/<int:pk>/cancel/", views.SiteImportCancelView.as_view(), name="site_import_cancel"),
+    path("imports/<int:pk>/errors/", views.SiteImportErrorReportView.as_view(), name="site_import_errors"),
+
+    # 9. API JSON (application mobile, synchronisation différentielle)
+    path("api/sync/", api.sync_feed, name="api_sync"),
+    path("api/tasks/<int:pk>/", api.task_update, name="api_task_update"),
+    path("api/tasks/<int:pk>/photos/", api.task_photos, name="api_task_photos"),
+    path("api/sites/<int:pk>/inspections/", api.site_inspections, name="api_site_inspections"),
 ]
\ No newline at end of file
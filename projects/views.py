@@ -9,6 +9,7 @@ from django.core.exceptions import PermissionDenied
 from django.db import transaction
 from django.db.models import Avg, Count, Q
 from django.db.models.functions import ExtractYear
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
 from django.utils.translation import gettext_lazy as _
@@ -28,6 +29,7 @@ from .forms import (
     ProjectForm,
     SimpleTaskUpdateForm,
     SiteForm,
+    SiteImportForm,
     SiteRadioConfigurationFormset,
     TaskForm,
     TaskPhotoForm,
@@ -40,12 +42,19 @@ from .models import (
     Inspection,
     Project,
     Site,
+    SiteImport,
+    SyncChange,
     Task,
     TaskPhoto,
     TransmissionLink,
     UninstallationReport,
 )
+from .site_import import COLUMNS as SITE_IMPORT_COLUMNS
+from .sync import change_marker
 from users.models import Country, CustomUser
+from core.autocomplete import AutocompleteView
+from core.mixins import ConditionalGetMixin
+from core.partitions import across_partitions, partition_alias, routed_by
 
 
 # =================================================================
@@ -234,7 +243,7 @@ class ProjectListView(CountryIsolationMixin, ListView):
 
         # --- ANNOTATIONS ET TRI ---
         qs = (
-            qs.select_related("country", "coordinator", "project_type")
+            qs.select_related("country", "coordinator", "project_type", "client")
             .annotate(
                 site_count=Count("sites", distinct=True),
                 global_progress=Avg(
@@ -246,7 +255,8 @@ class ProjectListView(CountryIsolationMixin, ListView):
             .order_by("-start_date")
         )
 
-        return qs
+        # Bases de tous les pays de l'utilisateur (core/partitions.py)
+        return across_partitions(qs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -279,6 +289,7 @@ class ProjectListView(CountryIsolationMixin, ListView):
             base_qs_for_filters = Project.objects.all()
         else:
             base_qs_for_filters = super(ProjectListView, self).get_queryset()
+        base_qs_for_filters = across_partitions(base_qs_for_filters)
 
         # CORRECTION CRITIQUE : Filtrer les pays selon l'isolation (using base_qs)
         country_ids = (
@@ -335,11 +346,15 @@ class ProjectListView(CountryIsolationMixin, ListView):
 
 # ... (ProjectListView inchangée) ...
 
-class ProjectDetailView(CountryIsolationMixin, DetailView):
+class ProjectDetailView(CountryIsolationMixin, ConditionalGetMixin, DetailView):
     model = Project
     template_name = "projects/project_detail.html"
     context_object_name = "project"
 
+    def get_version(self):
+        # Projet, sites, tâches, photos et inspections du projet
+        return change_marker(Q(project_id=self.get_object().pk))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         project = self.object
@@ -362,7 +377,10 @@ class ProjectDetailView(CountryIsolationMixin, DetailView):
         
         # Préfetche les données qui seront utilisées dans le template
         sites = sites_qs.prefetch_related(
-            "tasks", "inspections", "team_lead"
+            "tasks", "inspections", "team_lead",
+            # Site.transmission_display_name
+            "transmission_link_a__site_a", "transmission_link_a__site_b",
+            "transmission_link_b__site_a", "transmission_link_b__site_b",
         )
         
         # =========================================================
@@ -535,7 +553,7 @@ class SiteCreateView(
         site_instance.created_by = self.request.user
 
         # ✅ CORRECTION : Sauvegarde atomique complète
-        with transaction.atomic():
+        with transaction.atomic(using=partition_alias()):
             # Sauvegarder d'abord le site
             site_instance.save()
 
@@ -623,6 +641,56 @@ class TaskCreateView(
         return reverse("projects:project_detail", kwargs={"pk": self.site.project.pk})
 
 
+def can_update_task(user, task):
+    """Droit de modifier une tâche (formulaire web et API mobile)."""
+    if user.is_superuser:
+        return True
+    if user == task.site.project.coordinator:
+        return True
+    if task.site.project.country.id in user.active_country_ids and user.is_cm:
+        return True
+    if task.site.team_lead == user:
+        return True
+    if task.assigned_to == user:
+        return True
+    return False
+
+
+def can_upload_task_photo(user, task):
+    """Droit d'ajouter des photos à une tâche (formulaire web et API mobile)."""
+    return (
+        user.is_superuser
+        or user == task.assigned_to
+        or user == task.site.team_lead
+        or user == task.site.project.coordinator
+        or task.site.project.country.id in user.active_country_ids
+    )
+
+
+def update_site_status_for_task(task):
+    """Statut du site après la complétion d'une tâche SRS ou IMK réussie."""
+    if task.status != "COMPLETED":
+        return
+    site = task.site
+    # Logique métier pour les types spécifiques
+    if (
+        task.task_type
+        and task.task_type.code == "SRS"
+        and task.result_type
+        and task.result_type.code == "DONE"
+    ):
+        site.status = "SRS_COMPLETED"
+        site.save(update_fields=["status"])  # 💡 Mise à jour spécifique
+    elif (
+        task.task_type
+        and task.task_type.code == "IMK"
+        and task.result_type
+        and task.result_type.code == "DONE"
+    ):
+        site.status = "IMK_COMPLETED"
+        site.save(update_fields=["status"])  # 💡 Mise à jour spécifique
+
+
 class TaskUpdateView(CountryIsolationMixin, UserPassesTestMixin, UpdateView):
    
     model = Task
@@ -652,48 +720,14 @@ class TaskUpdateView(CountryIsolationMixin, UserPassesTestMixin, UpdateView):
 
     def test_func(self):
         """Vérifie que l'utilisateur peut modifier cette tâche"""
-        user = self.request.user
-        task = self.get_object()
-
-        if user.is_superuser:
-            return True
-        if user == task.site.project.coordinator:
-            return True
-        if task.site.project.country.id in user.active_country_ids and user.is_cm:
-            return True
-        if task.site.team_lead == user:
-            return True
-        if task.assigned_to == user:
-            return True
-        return False
+        return can_update_task(self.request.user, self.get_object())
 
     def form_valid(self, form):
         response = super().form_valid(form)
 
         # Logique de mise à jour du site
-        task = form.instance
-        site = task.site
-
         # Le signal post_save gère la mise à jour de site.progress_percentage
-
-        if task.status == "COMPLETED":
-            # Logique métier pour les types spécifiques
-            if (
-                task.task_type
-                and task.task_type.code == "SRS"
-                and task.result_type
-                and task.result_type.code == "DONE"
-            ):
-                site.status = "SRS_COMPLETED"
-                site.save(update_fields=["status"])  # 💡 Mise à jour spécifique
-            elif (
-                task.task_type
-                and task.task_type.code == "IMK"
-                and task.result_type
-                and task.result_type.code == "DONE"
-            ):
-                site.status = "IMK_COMPLETED"
-                site.save(update_fields=["status"])  # 💡 Mise à jour spécifique
+        update_site_status_for_task(form.instance)
 
         # ✅ Retrait de site.update_progress() : c'est géré par le signal post_save de Task.
 
@@ -708,6 +742,7 @@ class TaskUpdateView(CountryIsolationMixin, UserPassesTestMixin, UpdateView):
 class TaskPhotoUploadView(CountryIsolationMixin, UserPassesTestMixin, FormView):
     form_class = TaskPhotoForm
     template_name = "projects/task_photo_upload.html"
+    partition_kwarg = "pk"  # Tâche (core/partitions.py)
 
     # 💡 AMÉLIORATION : Récupère et stocke la tâche une seule fois
     def dispatch(self, request, *args, **kwargs):
@@ -719,15 +754,7 @@ class TaskPhotoUploadView(CountryIsolationMixin, UserPassesTestMixin, FormView):
 
     def test_func(self):
         """Vérifie que l'utilisateur peut uploader une photo pour cette tâche"""
-        user = self.request.user
-        task = self.task  # Utilise l'objet stocké
-        return (
-            user.is_superuser
-            or user == task.assigned_to
-            or user == task.site.team_lead
-            or user == task.site.project.coordinator
-            or task.site.project.country.id in user.active_country_ids
-        )
+        return can_upload_task_photo(self.request.user, self.task)  # Utilise l'objet stocké
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -748,7 +775,7 @@ class TaskPhotoUploadView(CountryIsolationMixin, UserPassesTestMixin, FormView):
         if photos:
             try:
                 # ... (Logique de sauvegarde)
-                with transaction.atomic():
+                with transaction.atomic(using=partition_alias()):
                     for photo in photos:
                         TaskPhoto.objects.create(
                             task=task,
@@ -810,17 +837,17 @@ class InspectionCreateView(CountryIsolationMixin, UserPassesTestMixin, CreateVie
         context["site"] = self.site
         return context
 
-    @transaction.atomic
     def form_valid(self, form):
         # 1. Lie l'inspection au site et définit l'inspecteur
         form.instance.site = self.site
         form.instance.inspector = self.request.user
 
-        response = super().form_valid(form)  # Sauvegarde l'Inspection
+        with transaction.atomic(using=partition_alias()):
+            response = super().form_valid(form)  # Sauvegarde l'Inspection
 
-        # 2. Mise à jour du résultat de la dernière inspection sur le modèle Site
-        self.site.last_inspection_result = self.object.resultat_inspection
-        self.site.save(update_fields=["last_inspection_result"])
+            # 2. Mise à jour du résultat de la dernière inspection sur le modèle Site
+            self.site.last_inspection_result = self.object.resultat_inspection
+            self.site.save(update_fields=["last_inspection_result"])
 
         return response
 
@@ -861,7 +888,7 @@ class TeamLeadTasksView(CountryIsolationMixin, ListView):
             .order_by("site__site_id_client", "due_date")
         )
 
-        return queryset
+        return across_partitions(queryset)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -875,12 +902,12 @@ class TeamLeadTasksView(CountryIsolationMixin, ListView):
         # For debug section
         context["user_groups"] = [g.name for g in user.groups.all()]
         active_country_ids = user.active_country_ids
-        context["sites_managed_count"] = Site.objects.filter(
+        context["sites_managed_count"] = across_partitions(Site.objects.filter(
             team_lead=user, project__country__id__in=active_country_ids
-        ).count()
-        context["assigned_tasks_count"] = Task.objects.filter(
+        )).count()
+        context["assigned_tasks_count"] = across_partitions(Task.objects.filter(
             assigned_to=user, site__project__country__id__in=active_country_ids
-        ).count()
+        )).count()
 
         return context
 
@@ -918,7 +945,7 @@ class SiteUpdateView(CountryIsolationMixin, UpdateView):
         # 💥 AJOUT CRITIQUE : Assigner l'utilisateur qui fait la modification
         form.instance.updated_by = self.request.user
 
-        with transaction.atomic():
+        with transaction.atomic(using=partition_alias()):
             self.object = form.save()  # Sauvegarde du Site
 
             if radio_formset and radio_formset.is_valid():
@@ -935,11 +962,15 @@ class SiteUpdateView(CountryIsolationMixin, UpdateView):
             return super().form_valid(form)
 
 
-class SiteDetailView(CountryIsolationMixin, DetailView):
+class SiteDetailView(CountryIsolationMixin, ConditionalGetMixin, DetailView):
     model = Site
     template_name = "projects/site_detail.html"
     context_object_name = "site"
 
+    def get_version(self):
+        site = self.get_object()
+        return change_marker(Q(site_id=site.pk) | Q(kind=SyncChange.PROJECT, object_id=site.project_id))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         site = self.object
@@ -1036,7 +1067,7 @@ class TransmissionLinkCreateView(CountryIsolationMixin, TemplateView):
             link_id = f"{site_a_id_clean}-{site_b_id_clean}" 
             
             try:
-                with transaction.atomic():
+                with transaction.atomic(using=partition_alias()):
                     # Sauvegarde Site A
                     site_a = form_a.save(commit=False)
                     site_a.project = project
@@ -1120,11 +1151,22 @@ class ProjectCreateView(
         return reverse("projects:project_list")
 
 
-class TaskReportView(CountryIsolationMixin, DetailView):
+class TaskReportView(CountryIsolationMixin, ConditionalGetMixin, DetailView):
     model = Task
     template_name = "projects/task_report.html"
     context_object_name = "task"
 
+    def get_queryset(self):
+        return super().get_queryset().select_related("site__project__country")
+
+    def get_version(self):
+        task = self.get_object()
+        return change_marker(
+            Q(task_id=task.pk)
+            | Q(kind=SyncChange.SITE, object_id=task.site_id)
+            | Q(kind=SyncChange.PROJECT, object_id=task.site.project_id)
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         task = self.get_object()
@@ -1152,7 +1194,7 @@ class ProjectTableView(CountryIsolationMixin, ListView):
     context_object_name = "projects"
 
     def get_queryset(self):
-        qs = super().get_queryset().select_related("country", "coordinator", "client")
+        qs = across_partitions(super().get_queryset().select_related("country", "coordinator", "client"))
 
         # Annoter avec des informations agrégées
         qs = qs.annotate(
@@ -1190,7 +1232,7 @@ class ProjectTableView(CountryIsolationMixin, ListView):
         # 2. Utiliser les PKs pour créer un nouveau QuerySet simple sur le modèle Project,
         # puis faire le distinct sur les pays.
         country_pks = (
-            Project.objects.filter(pk__in=project_pks)
+            across_partitions(Project.objects.filter(pk__in=project_pks))
             .values_list("country__pk", flat=True)
             .distinct()
         )
@@ -1203,7 +1245,7 @@ class ProjectTableView(CountryIsolationMixin, ListView):
         # ✅ CORRECTION COORDINATEURS (Évite le TypeError)
         # Même logique pour les coordinateurs.
         coordinator_ids = (
-            Project.objects.filter(pk__in=project_pks)
+            across_partitions(Project.objects.filter(pk__in=project_pks))
             .values_list("coordinator", flat=True)
             .distinct()
         )
@@ -1217,7 +1259,7 @@ class ProjectTableView(CountryIsolationMixin, ListView):
         
         # 4. Récupérer les années distinctes en utilisant la même logique
         context["available_years"] = (
-            Project.objects.filter(pk__in=project_pks)
+            across_partitions(Project.objects.filter(pk__in=project_pks))
             .annotate(year=ExtractYear("start_date"))
             .values_list("year", flat=True)
             .distinct()
@@ -1234,6 +1276,7 @@ class ProjectTableView(CountryIsolationMixin, ListView):
         context["is_cm"] = user.is_cm
         return context
 
+@routed_by("pk")
 @login_required
 @require_POST
 def task_photo_delete(request, pk):
@@ -1325,7 +1368,7 @@ class UninstallationReportView(LoginRequiredMixin, UserPassesTestMixin, View):
         equipment_formset = UninstalledEquipmentFormset(request.POST, instance=report)
 
         if report_form.is_valid() and equipment_formset.is_valid():
-            with transaction.atomic():
+            with transaction.atomic(using=partition_alias()):
                 # Sauvegarder le rapport
                 report_instance = report_form.save(commit=False)
                 if not report_instance.pk:  # Si c'est une création
@@ -1353,3 +1396,155 @@ class UninstallationReportView(LoginRequiredMixin, UserPassesTestMixin, View):
         }
         messages.error(request, _("Erreur lors de la sauvegarde. Vérifiez les champs."))
         return render(request, self.template_name, context)
+
+
+# =================================================================
+# 9. IMPORT DE SITES DEPUIS EXCEL (traitement en arrière-plan)
+# =================================================================
+
+
+class SiteImportCreateView(LoginRequiredMixin, IsCoordinatorCMOrSuperuserMixin, CreateView):
+    """Dépôt du classeur : l'import est traité par le worker (projects.site_import)."""
+
+    model = SiteImport
+    form_class = SiteImportForm
+    template_name = "projects/site_import_form.html"
+
+    def dispatch(self, request, *args, **kwargs):
+        self.project = get_object_or_404(Project, pk=self.kwargs["project_pk"])
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["project"] = self.project
+        context["columns"] = SITE_IMPORT_COLUMNS
+        context["recent_imports"] = self.project.site_imports.select_related("created_by")[:10]
+        return context
+
+    def form_valid(self, form):
+        form.instance.project = self.project
+        form.instance.created_by = self.request.user
+        response = super().form_valid(form)
+        messages.success(self.request, _("Fichier reçu : l'import démarre en arrière-plan."))
+        return response
+
+    def get_success_url(self):
+        return reverse("projects:site_import_detail", kwargs={"pk": self.object.pk})
+
+
+class SiteImportAccessMixin(LoginRequiredMixin, IsCoordinatorCMOrSuperuserMixin):
+    """Import de l'URL, accessible aux mêmes utilisateurs que la création de sites du projet."""
+
+    partition_kwarg = "pk"  # Import (core/partitions.py)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.site_import = get_object_or_404(SiteImport.objects.select_related("project"), pk=self.kwargs["pk"])
+        self.project = self.site_import.project
+        return super().dispatch(request, *args, **kwargs)
+
+
+def site_import_progress(site_import):
+    return {
+        "status": site_import.status,
+        "status_display": str(site_import.get_status_display()),
+        "progress": site_import.progress_percent,
+        "total_rows": site_import.total_rows,
+        "processed_rows": site_import.processed_rows,
+        "imported_rows": site_import.imported_rows,
+        "updated_rows": site_import.updated_rows,
+        "unchanged_rows": site_import.unchanged_rows,
+        "removed_rows": site_import.removed_rows,
+        "error_rows": site_import.error_rows,
+        "cancel_requested": site_import.cancel_requested,
+        "message": site_import.message,
+        "finished": site_import.is_finished,
+        "has_error_report": bool(site_import.error_report),
+    }
+
+
+class SiteImportDetailView(SiteImportAccessMixin, TemplateView):
+    template_name = "projects/site_import_detail.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["site_import"] = self.site_import
+        context["project"] = self.project
+        context["progress"] = site_import_progress(self.site_import)
+        return context
+
+
+class SiteImportStatusView(SiteImportAccessMixin, View):
+    """Avancement en JSON (interrogé périodiquement par la page de suivi)."""
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(site_import_progress(self.site_import))
+
+
+class SiteAutocompleteView(CountryIsolationMixin, AutocompleteView):
+    """
+    Sites pour les listes à recherche (core/autocomplete.py), limités aux pays
+    actifs de l'utilisateur. Recherche sur le début de l'ID client ou du nom.
+    ?project=<id> / ?country=<id> (répétables) restreignent la liste.
+    """
+    model = Site
+    search_fields = ("site_id_client", "name")
+    ordering = ("site_id_client", "pk")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        project_ids = self.get_ids("project")
+        if project_ids:
+            queryset = queryset.filter(project_id__in=project_ids)
+        country_ids = self.get_ids("country")
+        if country_ids:
+            queryset = queryset.filter(project__country_id__in=country_ids)
+        return across_partitions(queryset)
+
+
+class TaskAutocompleteView(CountryIsolationMixin, AutocompleteView):
+    """
+    Tâches pour les listes à recherche (grille de saisie des heures), limitées
+    aux pays actifs de l'utilisateur. Recherche sur le début de l'ID client du
+    site ou de la description. ?site=<id> / ?country=<id> (répétables)
+    restreignent la liste ; ?open=1 écarte les tâches terminées.
+    Lit la base de la requête seulement : la grille enregistre dans cette base.
+    """
+    model = Task
+    search_fields = ("site__site_id_client", "description")
+    ordering = ("site__site_id_client", "pk")
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related("site")
+        site_ids = self.get_ids("site")
+        if site_ids:
+            queryset = queryset.filter(site_id__in=site_ids)
+        country_ids = self.get_ids("country")
+        if country_ids:
+            queryset = queryset.filter(site__project__country_id__in=country_ids)
+        if self.request.GET.get("open"):
+            queryset = queryset.exclude(status="COMPLETED")
+        return queryset
+
+    def label(self, obj):
+        return f"[{obj.site.site_id_client}] {obj.description[:30]}"
+
+
+class SiteImportCancelView(SiteImportAccessMixin, View):
+    def post(self, request, *args, **kwargs):
+        updated = SiteImport.objects.filter(
+            pk=self.site_import.pk, status__in=[SiteImport.PENDING, SiteImport.RUNNING]
+        ).update(cancel_requested=True)
+        if updated:
+            messages.info(request, _("Annulation demandée : l'import s'arrête après le lot en cours."))
+        return redirect("projects:site_import_detail", pk=self.site_import.pk)
+
+
+class SiteImportErrorReportView(SiteImportAccessMixin, View):
+    def get(self, request, *args, **kwargs):
+        if not self.site_import.error_report:
+            raise Http404("Aucune ligne rejetée pour cet import.")
+        return FileResponse(
+            self.site_import.error_report.open("rb"),
+            as_attachment=True,
+            filename=f"import_{self.site_import.pk}_erreurs.xlsx",
+        )
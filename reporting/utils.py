@@ -1,19 +1,24 @@
-from projects.models import Project, Site
-from django.db.models import Sum, Count
-from django.db.models.functions import ExtractYear
+from django.db.models import Sum
+from core.partitions import across_partitions
+from data_analytics.models import AnalyticsFact
 
-def get_project_performance_by_year(country_id=None):
-    """Agrège les données de performance des projets par année."""
-    projects = Project.objects.all()
+# Lecture des tables de faits pré-agrégées (data_analytics.facts),
+# dans les bases de tous les pays de l'utilisateur (core.partitions)
+
+def _facts(country_id=None):
+    facts = AnalyticsFact.objects.all()
     if country_id:
-        projects = projects.filter(country_id=country_id)
+        facts = facts.filter(country_id=country_id)
+    return across_partitions(facts)
 
+def get_project_performance_by_year(country_id=None):
+    """Agrège les données de performance des projets par année."""
     performance_data = (
-        projects.annotate(year=ExtractYear('start_date'))
+        _facts(country_id).exclude(projects_started=0)
         .values('year')
         .annotate(
-            total_budget=Sum('budget_alloue'),
-            total_progress=Sum('progress_percentage')
+            total_budget=Sum('budget'),
+            total_progress=Sum('progress')
         )
         .order_by('year')
     )
@@ -21,28 +26,20 @@ def get_project_performance_by_year(country_id=None):
 
 def get_site_completion_rate_by_year(country_id=None):
     """Agrège les données de complétion des sites par année."""
-    sites = Site.objects.filter(status='COMPLETED')
-    if country_id:
-        sites = sites.filter(project__country_id=country_id)
-
     completion_data = (
-        sites.annotate(year=ExtractYear('end_date'))
+        _facts(country_id).exclude(sites_completed=0)
         .values('year')
-        .annotate(completed_sites=Count('id'))
+        .annotate(completed_sites=Sum('sites_completed'))
         .order_by('year')
     )
     return completion_data
 
 def get_site_profitability_by_year(country_id=None):
     """Agrège les données de rentabilité des sites par année."""
-    sites = Site.objects.filter(po_recu=True)
-    if country_id:
-        sites = sites.filter(project__country_id=country_id)
-
     profitability_data = (
-        sites.annotate(year=ExtractYear('project__start_date'))
+        _facts(country_id).exclude(po_sites=0)
         .values('year')
-        .annotate(total_revenue=Sum('prix_facturation'))
+        .annotate(total_revenue=Sum('po_amount'))
         .order_by('year')
     )
     return profitability_data
@@ -4,19 +4,47 @@ from projects.models import Site, TransmissionLink, Project  # 👈 AJOUT DE PRO
 from users.models import Country
 from logistique.models import Vehicule
 from inventaire.models import Equipement
-from django.db.models import Sum, F, Q, Count
+from django.db.models import Count
 from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from core.chunked_pdf import render_chunked_pdf
+from core.pdf import pdf_response, render_template_to_pdf
 import openpyxl
 from datetime import date
 from .utils import get_project_performance_by_year, get_site_completion_rate_by_year, get_site_profitability_by_year
+from data_analytics.facts import refresh_dirty
+from finance.models import CostLedger
+from finance.ledger import with_ledger_total
+from django.db.models import Q
+from core.conditional import conditional_page
+from core.metrics import timed
+from core.partitions import across_partitions
+from core.replica import reading_from_replica, replica_safe
+from projects.sync import change_marker
+
+
+def site_list_version(request):
+    """
+    Marqueur de version des listes de sites (page, PDF, Excel) : journal des
+    modifications (projects.sync) restreint aux filtres pays / projet.
+    """
+    condition = Q()
+    for param, column in (('country', 'country_id'), ('project', 'project_id')):
+        value = request.GET.get(param, '')
+        if value.isdigit():
+            condition &= Q(**{column: value})
+    return change_marker(condition)
 
 @login_required
+@replica_safe
 def performance_annuelle_view(request):
     countries = Country.objects.filter(is_active=True)
     selected_country_id = request.GET.get('country')
 
+    # Intègre les modifications récentes avant de lire les tables de faits
+    # (sur la réplique, les faits arrivent déjà rafraîchis par la tâche planifiée)
+    if not reading_from_replica():
+        refresh_dirty()
+
     project_performance_qs = get_project_performance_by_year(selected_country_id)
     site_completion_qs = get_site_completion_rate_by_year(selected_country_id)
     site_profitability_qs = get_site_profitability_by_year(selected_country_id)
@@ -46,6 +74,7 @@ def performance_annuelle_view(request):
 # =================================================================
 
 @login_required
+@replica_safe
 def site_profitability_report_view(request):
     countries = Country.objects.filter(is_active=True)
     selected_country_id = request.GET.get('country')
@@ -61,26 +90,27 @@ def site_profitability_report_view(request):
     if selected_project_id:
         sites_qs = sites_qs.filter(project_id=selected_project_id)
 
-    sites_with_profit = sites_qs.annotate(
-        total_expenses=Sum('depenses__montant'),
-        profit=F('prix_facturation') - F('total_expenses')
-    )
+    # Totaux lus dans le registre des coûts (une ligne par site)
+    sites_with_profit = with_ledger_total(across_partitions(sites_qs), 'total_expenses', CostLedger.SCOPE_SITE)
+    for site in sites_with_profit:
+        site.profit = site.prix_facturation - site.total_expenses
 
     context = {
         'sites': sites_with_profit,
         'countries': countries,
-        'projects': projects_qs,
+        'projects': across_partitions(projects_qs),
         'selected_country_id': selected_country_id,
         'selected_project_id': selected_project_id,
     }
     return render(request, 'reporting/site_profitability_report.html', context)
 
 @login_required
+@replica_safe
 def cost_per_vehicle_report_view(request):
     vehicules_qs = Vehicule.objects.all()
 
-    vehicules_with_cost = vehicules_qs.annotate(
-        total_cost=Sum('depenses__montant', filter=Q(depenses__categorie__in=['CARBURANT', 'REPARATION_VEHICULE']))
+    vehicules_with_cost = with_ledger_total(
+        vehicules_qs, 'total_cost', CostLedger.SCOPE_VEHICULE, categories=['CARBURANT', 'REPARATION_VEHICULE']
     )
 
     context = {
@@ -89,6 +119,7 @@ def cost_per_vehicle_report_view(request):
     return render(request, 'reporting/cost_per_vehicle_report.html', context)
 
 @login_required
+@replica_safe
 def inventory_status_report_view(request):
     equipments_qs = Equipement.objects.values('statut').annotate(count=Count('statut'))
 
@@ -102,9 +133,11 @@ def inventory_status_report_view(request):
 # =================================================================
 
 @login_required
+@replica_safe
 
 
 
+@conditional_page(site_list_version)
 def ran_site_list_view(request):
 
     countries = Country.objects.filter(is_active=True)
@@ -128,7 +161,7 @@ def ran_site_list_view(request):
     ).prefetch_related(
         'radio_configurations__radio_type',
         'inspections',
-        'tasks'
+        'tasks__task_type'
     )
 
     if selected_country_id:
@@ -143,9 +176,9 @@ def ran_site_list_view(request):
         sites_qs = sites_qs.filter(start_date__month=selected_month)
 
     context = {
-        'sites': sites_qs,
+        'sites': across_partitions(sites_qs),
         'countries': countries,
-        'projects': projects_qs,
+        'projects': across_partitions(projects_qs),
         'selected_country_id': selected_country_id,
         'selected_project_id': selected_project_id,
         'selected_year': selected_year,
@@ -156,6 +189,8 @@ def ran_site_list_view(request):
     return render(request, 'reporting/ran_site_list.html', context)
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
 def ran_site_list_pdf(request):
 
     selected_country_id = request.GET.get('country')
@@ -166,7 +201,7 @@ def ran_site_list_pdf(request):
     sites_qs = Site.objects.filter(project__project_type__is_transmission=False).select_related(
         'project__country', 'departement', 'site_type', 
         'antenna_type', 'enclosure_type', 'bb_ml'
-    ).prefetch_related('radio_configurations__radio_type')
+    ).prefetch_related('radio_configurations__radio_type', 'tasks__task_type')
 
     if selected_country_id:
         sites_qs = sites_qs.filter(project__country_id=selected_country_id)
@@ -177,15 +212,17 @@ def ran_site_list_pdf(request):
     if selected_month:
         sites_qs = sites_qs.filter(start_date__month=selected_month)
 
-    html_string = render_to_string('reporting/ran_site_list_pdf.html', {'sites': sites_qs})
-    html = HTML(string=html_string)
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="ran_sites_report.pdf"'
-    return response
+    pdf = render_chunked_pdf(
+        'reporting/ran_site_list_pdf.html', across_partitions(sites_qs), 'sites',
+        stylesheets=['css/pdf/ran_site_list.css'],
+    )
+    return pdf_response(pdf, "ran_sites_report.pdf")
 
 @login_required
+@replica_safe
 
+@conditional_page(site_list_version)
+@timed('render_duration_seconds', format='xlsx', document='ran_sites')
 def ran_site_list_excel(request):
     # 1. RÉCUPÉRATION DES FILTRES (Identiques à ta vue de liste)
     selected_country_id = request.GET.get('country')
@@ -234,7 +271,7 @@ def ran_site_list_excel(request):
     sheet.append(headers)
 
     # 4. REMPLISSAGE DES DONNÉES
-    for site in sites_qs:
+    for site in across_partitions(sites_qs):
         # On récupère toutes les tâches du site une seule fois
         tasks = site.tasks.all()
         
@@ -290,6 +327,8 @@ def ran_site_list_excel(request):
 # =================================================================
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
 def transmission_site_list_view(request):
     countries = Country.objects.filter(is_active=True)
     
@@ -316,9 +355,9 @@ def transmission_site_list_view(request):
         links_qs = links_qs.filter(created_at__month=selected_month) # Filtre sur link.created_at
         
     context = {
-        'links': links_qs,
+        'links': across_partitions(links_qs),
         'countries': countries,
-        'projects': projects_qs,
+        'projects': across_partitions(projects_qs),
         'selected_country_id': selected_country_id,
         'selected_project_id': selected_project_id,
         'selected_year': selected_year,
@@ -329,6 +368,8 @@ def transmission_site_list_view(request):
     return render(request, 'reporting/transmission_site_list.html', context)
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
 def transmission_site_list_pdf(request):
     selected_country_id = request.GET.get('country')
     selected_project_id = request.GET.get('project')
@@ -349,14 +390,16 @@ def transmission_site_list_pdf(request):
     if selected_month:
         links_qs = links_qs.filter(created_at__month=selected_month)
 
-    html_string = render_to_string('reporting/transmission_site_list_pdf.html', {'links': links_qs})
-    html = HTML(string=html_string)
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="transmission_sites_report.pdf"'
-    return response
+    pdf = render_chunked_pdf(
+        'reporting/transmission_site_list_pdf.html', across_partitions(links_qs), 'links',
+        stylesheets=['css/pdf/transmission_site_list.css'],
+    )
+    return pdf_response(pdf, "transmission_sites_report.pdf")
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
+@timed('render_duration_seconds', format='xlsx', document='transmission_sites')
 def transmission_site_list_excel(request):
     selected_country_id = request.GET.get('country')
     selected_project_id = request.GET.get('project')
@@ -388,7 +431,7 @@ def transmission_site_list_excel(request):
         "ATP STATUT SITE A", "ATP STATUT SITE B", "COMMENT"
     ]
     sheet.append(headers)
-    for link in links_qs:
+    for link in across_partitions(links_qs):
         radios = ", ".join([f"{radio.radio_type.name} ({radio.quantity})" for radio in link.site_a.radio_configurations.all()])
         row = [
             link.link_id, link.site_a.name, link.site_b.name,
@@ -416,6 +459,8 @@ def transmission_site_list_excel(request):
 # =================================================================
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
 def survey_site_list_view(request):
     countries = Country.objects.filter(is_active=True)
     
@@ -441,9 +486,9 @@ def survey_site_list_view(request):
         sites_qs = sites_qs.filter(start_date__month=selected_month)
 
     context = {
-        'sites': sites_qs,
+        'sites': across_partitions(sites_qs),
         'countries': countries,
-        'projects': projects_qs,
+        'projects': across_partitions(projects_qs),
         'selected_country_id': selected_country_id,
         'selected_project_id': selected_project_id,
         'selected_year': selected_year,
@@ -454,6 +499,8 @@ def survey_site_list_view(request):
     return render(request, 'reporting/survey_site_list.html', context)
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
 def survey_site_list_pdf(request):
     selected_country_id = request.GET.get('country')
     selected_project_id = request.GET.get('project')
@@ -473,14 +520,16 @@ def survey_site_list_pdf(request):
     if selected_month:
         sites_qs = sites_qs.filter(start_date__month=selected_month)
 
-    html_string = render_to_string('reporting/survey_site_list_pdf.html', {'sites': sites_qs})
-    html = HTML(string=html_string)
-    pdf = html.write_pdf()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="survey_sites_report.pdf"'
-    return response
+    pdf = render_template_to_pdf(
+        'reporting/survey_site_list_pdf.html', {'sites': across_partitions(sites_qs)},
+        stylesheets=['css/pdf/survey_site_list.css'],
+    )
+    return pdf_response(pdf, "survey_sites_report.pdf")
 
 @login_required
+@replica_safe
+@conditional_page(site_list_version)
+@timed('render_duration_seconds', format='xlsx', document='survey_sites')
 def survey_site_list_excel(request):
     selected_country_id = request.GET.get('country')
     selected_project_id = request.GET.get('project')
@@ -508,7 +557,7 @@ def survey_site_list_excel(request):
         "Project Name", "Annee", "Mois", "SURVEY STATUT", "RAPPORT STATUT", "COMMENT"
     ]
     sheet.append(headers)
-    for site in sites_qs:
+    for site in across_partitions(sites_qs):
         row = [
             site.name, site.site_id_client, site.project.country.name,
             site.departement.name if site.departement else "",
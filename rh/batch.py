@@ -0,0 +1,259 @@
+# rh/batch.py
+
+"""
+Génération par lot des documents RH (attestations, certificats de travail,
+cartes de travail) dans une seule archive ZIP.
+
+- Les employés, contrats et certifications sont chargés en quelques requêtes.
+- Les références séquentielles sont réservées en un seul bloc par type.
+- Le HTML est rendu dans le processus principal (accès base de données), puis
+  WeasyPrint convertit les PDF en parallèle dans un pool de processus.
+- Chaque PDF est écrit dans le ZIP dès qu'il est prêt : la mémoire reste bornée
+  par le nombre de rendus en cours, pas par le nombre d'employés.
+
+Les lots demandés depuis l'interface (DocumentBatch) sont traités hors requête
+web par la tâche planifiée generer_lots_documents (process_pending_batches) :
+le pool de processus n'est jamais créé dans un worker web.
+"""
+
+import datetime
+import itertools
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import connections
+from django.db.models import Prefetch
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from users.models import CustomUser, with_main_role
+from .models import Contract, DocumentBatch
+from .utils import reserver_references_sequentielles
+
+# Lot resté « En cours » au-delà de ce délai : worker arrêté pendant le rendu
+STALE_AFTER = timedelta(hours=1)
+
+# Paramètres de chaque type de document (mêmes templates que les vues unitaires)
+DOCUMENT_SPECS = {
+    'attestation': {
+        'template': 'rh/attestation_pdf.html',
+        'document_type': 'ATTESTATION',
+        'prefix': 'AT',
+        'folder': 'attestations',
+    },
+    'certificat': {
+        'template': 'rh/certificat_travail_pdf.html',
+        'document_type': 'CERTIFICAT_TRAVAIL',
+        'prefix': 'CT',
+        'folder': 'certificats',
+    },
+    'work_card': {
+        'template': 'rh/work_card.html',
+        'document_type': None,  # Pas de référence sur la carte de travail
+        'prefix': None,
+        'folder': 'cartes',
+    },
+}
+
+
+def select_employees(country_id=None, department_id=None, contract_type_id=None, statut=None):
+    """
+    Employés ciblés par le lot, avec contrats (du plus récent au plus ancien),
+    certifications et données du rôle principal (CustomUser.main_role :
+    affectations actives, groupe Team_Lead, projets coordonnés) préchargés.
+    """
+    employees = CustomUser.objects.filter(is_active=True).select_related(
+        'job_role', 'department', 'contract_type'
+    )
+    if country_id:
+        employees = employees.filter(
+            assignments__country_id=country_id, assignments__is_active=True
+        ).distinct()
+    if department_id:
+        employees = employees.filter(department_id=department_id)
+    if contract_type_id:
+        employees = employees.filter(contract_type_id=contract_type_id)
+    if statut:
+        employees = employees.filter(statut_actuel=statut)
+
+    return with_main_role(employees).prefetch_related(
+        Prefetch('contracts', queryset=Contract.objects.order_by('-start_date'), to_attr='contracts_by_date'),
+        'certifications',
+    ).order_by('last_name', 'first_name', 'pk')
+
+
+def _build_context(document, employee, reference, today):
+    contract = employee.contracts_by_date[0] if employee.contracts_by_date else None
+    if document == 'work_card':
+        return {
+            'employee': employee,
+            'contract': contract,
+            'certifications': employee.certifications.all(),
+        }
+    context = {
+        'object': employee,
+        'employee': employee,
+        'year': today.year,
+        'generation_date': today,
+        'reference': reference,
+    }
+    if document == 'certificat':
+        context['contract'] = contract
+    return context
+
+
+def _iter_jobs(employees, documents):
+    """Produit (nom dans l'archive, HTML) pour chaque employé et type de document."""
+    today = datetime.date.today()
+    employees = list(employees)
+
+    references = {}
+    for document in documents:
+        spec = DOCUMENT_SPECS[document]
+        if spec['document_type'] and employees:
+            references[document] = iter(reserver_references_sequentielles(
+                document_type=spec['document_type'],
+                count=len(employees),
+                code_document_prefix=spec['prefix'],
+            ))
+
+    for employee in employees:
+        for document in documents:
+            spec = DOCUMENT_SPECS[document]
+            reference = next(references[document]) if document in references else None
+            html_string = render_to_string(spec['template'], _build_context(document, employee, reference, today))
+            arcname = f"{spec['folder']}/{document}_{employee.username}.pdf"
+            yield arcname, html_string
+
+
+def _init_worker():
+    """Initialise Django dans les processus du pool (nécessaire hors fork)."""
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+        django.setup()
+
+
+def _render_job(job):
+    from core import metrics
+    from core.pdf import render_pdf
+    arcname, html_string = job
+    pdf = render_pdf(html_string, document=arcname.rpartition('/')[0])
+    # Les processus du pool se terminent sans passer par atexit
+    metrics.registry.flush(force=True)
+    return arcname, pdf
+
+
+def generate_documents_zip(output, employees, documents, workers=None, log=None):
+    """
+    Écrit dans `output` (chemin ou fichier binaire) un ZIP contenant les PDF
+    demandés pour chaque employé. Retourne le nombre de PDF générés.
+    """
+    unknown = set(documents) - set(DOCUMENT_SPECS)
+    if unknown:
+        raise ValueError(f"Type(s) de document inconnu(s) : {', '.join(sorted(unknown))}")
+
+    workers = workers or os.cpu_count() or 1
+    jobs = _iter_jobs(employees, documents)
+    count = 0
+
+    # Les PDF sont déjà compressés : ZIP_STORED évite de les recompresser pour rien.
+    with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+        if workers == 1:
+            for job in jobs:
+                arcname, pdf = _render_job(job)
+                archive.writestr(arcname, pdf)
+                count += 1
+                if log:
+                    log(f"  -> {arcname}")
+            return count
+
+        # _iter_jobs lit la base avant de produire le premier rendu : les connexions,
+        # qui ne doivent pas être partagées avec les processus enfants, sont fermées
+        # ensuite, juste avant le premier submit (création des processus).
+        first = next(jobs, None)
+        if first is None:
+            return count
+        jobs = itertools.chain([first], jobs)
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                # Fenêtre bornée : on ne prépare que deux rendus d'avance par processus.
+                while not exhausted and len(pending) < workers * 2:
+                    job = next(jobs, None)
+                    if job is None:
+                        exhausted = True
+                    else:
+                        pending.add(executor.submit(_render_job, job))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    arcname, pdf = future.result()
+                    archive.writestr(arcname, pdf)
+                    count += 1
+                    if log:
+                        log(f"  -> {arcname}")
+
+    return count
+
+
+def run_batch(batch, log=None):
+    """Génère l'archive d'un lot DocumentBatch déjà passé en RUNNING."""
+    employees = select_employees(
+        country_id=batch.country_id,
+        department_id=batch.department_id,
+        contract_type_id=batch.contract_type_id,
+        statut=batch.statut or None,
+    )
+    try:
+        batch.employee_count = employees.count()
+        with tempfile.TemporaryFile() as archive:
+            batch.document_count = generate_documents_zip(archive, employees, batch.documents, log=log)
+            archive.seek(0)
+            batch.archive.save(f"documents_rh_{batch.pk}_{datetime.date.today():%Y%m%d}.zip", File(archive), save=False)
+        batch.status = DocumentBatch.DONE
+    except Exception as exc:
+        batch.status = DocumentBatch.FAILED
+        batch.message = str(exc)
+        raise
+    finally:
+        batch.finished_at = timezone.now()
+        batch.save()
+
+
+def claim(batch):
+    """Passe le lot en RUNNING ; False si un autre worker l'a déjà pris."""
+    now = timezone.now()
+    claimed = DocumentBatch.objects.filter(pk=batch.pk, status=DocumentBatch.PENDING).update(
+        status=DocumentBatch.RUNNING, started_at=now, updated_at=now,
+    )
+    if claimed:
+        batch.refresh_from_db()
+    return bool(claimed)
+
+
+def process_pending_batches(log=None):
+    """Traite les lots en attente ; retourne le nombre de lots traités."""
+    log = log or (lambda message: None)
+    DocumentBatch.objects.filter(status=DocumentBatch.RUNNING, updated_at__lt=timezone.now() - STALE_AFTER).update(
+        status=DocumentBatch.FAILED, message="Génération interrompue (worker arrêté).", finished_at=timezone.now(),
+    )
+    done = 0
+    for batch in DocumentBatch.objects.filter(status=DocumentBatch.PENDING).order_by('pk'):
+        if not claim(batch):
+            continue
+        log(f"Lot #{batch.pk} : {', '.join(batch.documents)}")
+        try:
+            run_batch(batch, log)
+        except Exception as exc:
+            log(f"Lot #{batch.pk} en échec : {exc}")
+        done += 1
+    return done
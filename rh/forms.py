@@ -1,4 +1,5 @@
 from django import forms
+from users.models import Country, Department, ContractType, EMPLOYEE_STATUS_CHOICES
 from .models import Certification, PaiementSalaire
 
 class CertificationForm(forms.ModelForm):
@@ -13,3 +14,29 @@ class PaiementSalaireForm(forms.ModelForm):
     class Meta:
         model = PaiementSalaire
         fields = '__all__'
+
+class DocumentBatchForm(forms.Form):
+    DOCUMENT_CHOICES = (
+        ('attestation', "Attestation de travail"),
+        ('certificat', "Certificat de travail"),
+        ('work_card', "Carte de travail"),
+    )
+
+    documents = forms.MultipleChoiceField(
+        choices=DOCUMENT_CHOICES, widget=forms.CheckboxSelectMultiple,
+        initial=['attestation'], label="Documents à générer",
+    )
+    country = forms.ModelChoiceField(queryset=Country.objects.filter(is_active=True), required=False, label="Pays")
+    department = forms.ModelChoiceField(queryset=Department.objects.all(), required=False, label="Département")
+    contract_type = forms.ModelChoiceField(queryset=ContractType.objects.all(), required=False, label="Type de contrat")
+    statut = forms.ChoiceField(
+        choices=(('', '---------'),) + EMPLOYEE_STATUS_CHOICES, required=False, label="Statut de l'employé",
+    )
+
+class PayrollRunForm(forms.Form):
+    country = forms.ModelChoiceField(queryset=Country.objects.filter(is_active=True), label="Pays")
+    month = forms.TypedChoiceField(
+        coerce=int, label="Mois",
+        choices=[(m, f"{m:02d}") for m in range(1, 13)],
+    )
+    year = forms.IntegerField(min_value=2000, max_value=2100, label="Année")
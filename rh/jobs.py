@@ -0,0 +1,32 @@
+# rh/jobs.py
+
+from datetime import date, timedelta
+
+from core.counters import set_counters
+from core.scheduler import job
+from .batch import process_pending_batches
+from .models import Certification
+
+# Délai utilisé par Certification.statut_expiration pour « Expire bientôt »
+EXPIRATION_WARNING_DAYS = 30
+
+
+def count_expiring_certifications(today=None):
+    today = today or date.today()
+    return Certification.objects.filter(date_expiration__lte=today + timedelta(days=EXPIRATION_WARNING_DAYS)).count()
+
+
+@job("*/30 * * * *")
+def compter_certifications_expirant():
+    """Précalcule le nombre de certifications expirées ou expirant sous 30 jours."""
+    today = date.today()
+    set_counters({
+        'rh.certifications_expirant': count_expiring_certifications(today),
+        'rh.certifications_expirees': Certification.objects.filter(date_expiration__lt=today).count(),
+    })
+
+
+@job("* * * * *")
+def generer_lots_documents():
+    """Génère les archives ZIP des lots de documents RH demandés depuis l'interface."""
+    return f"{process_pending_batches()} lot(s) traité(s)"
@@ -0,0 +1,45 @@
+# rh/management/commands/generate_hr_documents.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.batch import DOCUMENT_SPECS, generate_documents_zip, select_employees
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère par lot les attestations, certificats de travail et/ou cartes de travail "
+        "des employés sélectionnés dans une seule archive ZIP."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', type=str, help="Chemin du fichier ZIP à créer.")
+        parser.add_argument(
+            '--documents', nargs='+', choices=sorted(DOCUMENT_SPECS), default=['attestation'],
+            help="Types de documents à générer (défaut : attestation).",
+        )
+        parser.add_argument('--country', type=int, help="ID du pays d'affectation active.")
+        parser.add_argument('--department', type=int, help="ID du département.")
+        parser.add_argument('--contract-type', type=int, help="ID du type de contrat.")
+        parser.add_argument('--statut', type=str, help="Statut actuel de l'employé (ACTIF, EN_CONGE, INACTIF).")
+        parser.add_argument('--workers', type=int, default=None, help="Nombre de processus de rendu (défaut : nombre de CPU).")
+
+    def handle(self, *args, **options):
+        employees = select_employees(
+            country_id=options['country'],
+            department_id=options['department'],
+            contract_type_id=options['contract_type'],
+            statut=options['statut'],
+        )
+        total = employees.count()
+        if not total:
+            raise CommandError("Aucun employé ne correspond aux critères.")
+
+        self.stdout.write(f"Génération de {', '.join(options['documents'])} pour {total} employé(s)...")
+        count = generate_documents_zip(
+            options['output'],
+            employees,
+            options['documents'],
+            workers=options['workers'],
+            log=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(f"✅ {count} PDF écrits dans {options['output']}"))
@@ -0,0 +1,44 @@
+# rh/management/commands/run_payroll.py
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rh.payroll import execute_payroll
+from users.models import Country
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcule et enregistre la paie mensuelle (PaiementSalaire + Depense) de tous les "
+        "employés actifs d'un pays. Utiliser --dry-run pour un simple aperçu."
+    )
+
+    def add_arguments(self, parser):
+        today = datetime.date.today()
+        parser.add_argument('--country', type=int, required=True, help="ID du pays.")
+        parser.add_argument('--month', type=int, default=today.month, help="Mois (défaut : mois courant).")
+        parser.add_argument('--year', type=int, default=today.year, help="Année (défaut : année courante).")
+        parser.add_argument('--dry-run', action='store_true', help="Affiche l'aperçu sans rien enregistrer.")
+
+    def handle(self, *args, **options):
+        if not Country.objects.filter(pk=options['country']).exists():
+            raise CommandError(f"Pays introuvable : {options['country']}")
+        if not 1 <= options['month'] <= 12:
+            raise CommandError("Le mois doit être compris entre 1 et 12.")
+
+        run = execute_payroll(options['country'], options['year'], options['month'], dry_run=options['dry_run'])
+
+        if options['verbosity'] > 1 or options['dry_run']:
+            for line in run.lines:
+                self.stdout.write(
+                    f"  {line.employee_name:<40} base {line.base_salary:>12} "
+                    f"terrain {line.field_cost:>12} ({line.field_records}) = {line.total:>12}"
+                )
+        self.stdout.write(
+            f"{len(run.payable)} paiement(s), total {run.total} — {run.already_paid} employé(s) déjà payé(s)."
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Simulation : rien n'a été enregistré."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {run.created} paiement(s) enregistré(s)."))
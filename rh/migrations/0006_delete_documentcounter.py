@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-19 13:23
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rh", "0005_documentrequest"),
+        ("core", "0003_copy_document_counters"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="DocumentCounter",
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rh", "0006_delete_documentcounter"),
+        ("users", "0008_customuser_name_upper_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DocumentBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("documents", models.JSONField(default=list, verbose_name="Documents")),
+                (
+                    "statut",
+                    models.CharField(
+                        blank=True, max_length=20, verbose_name="Statut de l'employé"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("PENDING", "En attente"),
+                            ("RUNNING", "En cours"),
+                            ("DONE", "Terminé"),
+                            ("FAILED", "Échec"),
+                        ],
+                        db_index=True,
+                        default="PENDING",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "employee_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Employés"),
+                ),
+                (
+                    "document_count",
+                    models.PositiveIntegerField(default=0, verbose_name="PDF générés"),
+                ),
+                (
+                    "archive",
+                    models.FileField(
+                        blank=True,
+                        upload_to="documents_rh/lots/",
+                        verbose_name="Archive ZIP",
+                    ),
+                ),
+                ("message", models.TextField(blank=True, verbose_name="Message")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "contract_type",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="users.contracttype",
+                        verbose_name="Type de contrat",
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="users.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+                (
+                    "created_by",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Demandé par",
+                    ),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="users.department",
+                        verbose_name="Département",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Lot de documents RH",
+                "verbose_name_plural": "Lots de documents RH",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -58,19 +58,6 @@ class Contract(models.Model):
     def __str__(self):
         return f"Contract for {self.employee.username} - {self.job_title}"
 
-class DocumentCounter(models.Model):
-    document_type = models.CharField(max_length=50, verbose_name=_("Type de document"))
-    year = models.IntegerField(verbose_name=_("Année"))
-    last_number = models.IntegerField(default=0, verbose_name=_("Dernier numéro utilisé"))
-
-    class Meta:
-        verbose_name = _("Compteur de document")
-        verbose_name_plural = _("Compteurs de documents")
-        unique_together = ('document_type', 'year')
-
-    def __str__(self):
-        return f"Compteur pour {self.document_type} ({self.year}): {self.last_number}"
-
 class DocumentRequest(models.Model):
     DOCUMENT_CHOICES = (
         ("attestation", _("Attestation de travail")),
@@ -100,3 +87,50 @@ class DocumentRequest(models.Model):
 
     def __str__(self):
         return f"Demande de {self.get_document_type_display()} pour {self.employee.username}"
+
+
+class DocumentBatch(models.Model):
+    """
+    Génération par lot de documents RH (rh.batch), demandée depuis l'interface
+    et traitée en arrière-plan par la tâche planifiée generer_lots_documents :
+    le rendu (pool de processus WeasyPrint) n'a jamais lieu dans une requête web.
+    """
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    STATUS_CHOICES = (
+        (PENDING, _("En attente")),
+        (RUNNING, _("En cours")),
+        (DONE, _("Terminé")),
+        (FAILED, _("Échec")),
+    )
+    FINISHED = (DONE, FAILED)
+
+    documents = models.JSONField(default=list, verbose_name=_("Documents"))
+    country = models.ForeignKey('users.Country', on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Pays"))
+    department = models.ForeignKey('users.Department', on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Département"))
+    contract_type = models.ForeignKey('users.ContractType', on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Type de contrat"))
+    statut = models.CharField(max_length=20, blank=True, verbose_name=_("Statut de l'employé"))
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+", verbose_name=_("Demandé par"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True, verbose_name=_("Statut"))
+    employee_count = models.PositiveIntegerField(default=0, verbose_name=_("Employés"))
+    document_count = models.PositiveIntegerField(default=0, verbose_name=_("PDF générés"))
+    archive = models.FileField(upload_to="documents_rh/lots/", blank=True, verbose_name=_("Archive ZIP"))
+    message = models.TextField(blank=True, verbose_name=_("Message"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Lot de documents RH")
+        verbose_name_plural = _("Lots de documents RH")
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Lot #{self.pk} ({self.get_status_display()})"
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
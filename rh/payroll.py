@@ -0,0 +1,181 @@
+# rh/payroll.py
+
+"""
+Paie mensuelle par lot : calcule et enregistre en une seule transaction les
+paiements de salaire (PaiementSalaire + Depense associée) de tous les
+employés actifs d'un pays.
+
+Montant payé = salaire de base + coûts des travaux terrain non encore payés.
+- Salaire de base : salaire_mensuel_base de l'employé, sinon la structure
+  salariale (pays, rôle) de son affectation active dans le pays.
+- Travaux terrain : WorkCompletionRecord non payés jusqu'à la fin du mois,
+  sur des tâches du pays ; ils sont ensuite marqués payés en un seul UPDATE.
+
+Les employés déjà payés pour le mois sont ignorés (unique_together sur
+employé/mois/année) : relancer la paie ne crée pas de doublon. La ligne du
+pays est verrouillée avant le calcul : deux confirmations simultanées sont
+sérialisées et la seconde ne voit plus que les employés restant à payer.
+
+Avec des bases par groupe de pays (core.partitions), les travaux terrain sont
+lus et marqués payés sur la base du pays (country_scope), dans sa propre
+transaction ; paiements, dépenses et verrou restent sur la base centrale.
+"""
+
+import calendar
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max, Sum
+
+from core.partitions import country_scope, partition_alias, partition_scope
+from data_analytics.facts import mark_dirty
+from finance.ledger import record_bulk_depenses
+from finance.models import Depense, SalaryStructure
+from projects.models import WorkCompletionRecord
+from users.models import Country, CustomUser, EmployeeCountryAssignment
+from .models import PaiementSalaire
+
+ZERO = Decimal("0.00")
+PAID_STATUSES = ("ACTIF", "EN_CONGE")
+
+
+@dataclass
+class PayLine:
+    employee_id: int
+    employee_name: str
+    base_salary: Decimal
+    field_cost: Decimal
+    field_records: int
+
+    @property
+    def total(self):
+        return self.base_salary + self.field_cost
+
+
+@dataclass
+class PayrollRun:
+    country_id: int
+    year: int
+    month: int
+    lines: list
+    already_paid: int
+    last_record_id: int = 0
+    created: int = 0
+
+    @property
+    def period_end(self):
+        return datetime.date(self.year, self.month, calendar.monthrange(self.year, self.month)[1])
+
+    @property
+    def payable(self):
+        return [line for line in self.lines if line.total > 0]
+
+    @property
+    def total(self):
+        return sum((line.total for line in self.payable), ZERO)
+
+
+def _unpaid_records(country_id, period_end):
+    return WorkCompletionRecord.objects.filter(
+        is_paid_out=False,
+        date__lte=period_end,
+        task__site__project__country_id=country_id,
+    )
+
+
+def compute_payroll(country_id, year, month):
+    """Calcule la paie du mois sans rien écrire (quelques requêtes groupées)."""
+    run = PayrollRun(country_id=country_id, year=year, month=month, lines=[], already_paid=0)
+
+    # Rôle de l'affectation active dans le pays (la première, comme pour la paie terrain)
+    roles = {}
+    for user_id, role_id in EmployeeCountryAssignment.objects.filter(
+        country_id=country_id, is_active=True,
+        user__is_active=True, user__statut_actuel__in=PAID_STATUSES,
+    ).order_by('user_id', 'pk').values_list('user_id', 'role_id'):
+        roles.setdefault(user_id, role_id)
+
+    paid = set(PaiementSalaire.objects.filter(
+        employe_id__in=roles, mois=month, annee=year,
+    ).values_list('employe_id', flat=True))
+    run.already_paid = len(paid)
+
+    structures = dict(
+        SalaryStructure.objects.filter(country_id=country_id).values_list('role_id', 'base_amount')
+    )
+    records = _unpaid_records(country_id, run.period_end).filter(employee_id__in=roles)
+    run.last_record_id = records.aggregate(last=Max('pk'))['last'] or 0
+    field_costs = {
+        row['employee_id']: row
+        for row in records.values('employee_id').annotate(total=Sum('cost'), count=Count('id')).order_by()
+    }
+
+    employees = CustomUser.objects.filter(pk__in=set(roles) - paid).order_by('last_name', 'first_name')
+    for pk, first_name, last_name, username, base in employees.values_list(
+        'pk', 'first_name', 'last_name', 'username', 'salaire_mensuel_base'
+    ):
+        costs = field_costs.get(pk, {})
+        run.lines.append(PayLine(
+            employee_id=pk,
+            employee_name=f"{first_name} {last_name}".strip() or username,
+            base_salary=base if base else structures.get(roles[pk], ZERO),
+            field_cost=costs.get('total') or ZERO,
+            field_records=costs.get('count', 0),
+        ))
+    return run
+
+
+def execute_payroll(country_id, year, month, declared_by=None, dry_run=False):
+    """
+    Calcule puis enregistre la paie du mois. En mode dry_run, retourne
+    seulement l'aperçu. Le calcul et l'écriture se font dans une seule
+    transaction, après verrouillage du pays.
+    """
+    if dry_run:
+        with country_scope(country_id):
+            return compute_payroll(country_id, year, month)
+
+    # Base centrale puis base du pays (la même sans partitions) : la partition est validée la première
+    with transaction.atomic(), country_scope(country_id), transaction.atomic(using=partition_alias()):
+        # Verrou par pays, puis calcul : les paiements d'une confirmation concurrente sont vus ici
+        Country.objects.select_for_update().filter(pk=country_id).first()
+        run = compute_payroll(country_id, year, month)
+        lines = run.payable
+        if not lines:
+            return run
+
+        period_end = run.period_end
+        # Dépenses sans projet : base centrale, quel que soit le périmètre
+        depenses = Depense.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+            Depense(
+                date=period_end,
+                montant=line.total,
+                description=f"Salaire {month:02d}/{year} - {line.employee_name}",
+                categorie="SALAIRE",
+                employe_declarant=declared_by,
+            )
+            for line in lines
+        ], batch_size=500)
+        PaiementSalaire.objects.bulk_create([
+            PaiementSalaire(
+                employe_id=line.employee_id, mois=month, annee=year,
+                montant_paye=line.total, depense_associee=depense,
+            )
+            for line, depense in zip(lines, depenses)
+        ], batch_size=500)
+
+        # Seuls les enregistrements pris en compte dans le calcul sont marqués payés
+        _unpaid_records(country_id, period_end).filter(
+            employee_id__in=[line.employee_id for line in lines if line.field_records],
+            pk__lte=run.last_record_id,
+        ).update(is_paid_out=True)
+
+        # bulk_create n'émet pas de signaux : registre des coûts et faits analytiques
+        record_bulk_depenses(depenses)
+        with partition_scope(DEFAULT_DB_ALIAS):
+            mark_dirty(None, period_end)
+
+    run.created = len(depenses)
+    return run
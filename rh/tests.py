@@ -1,2 +1,208 @@
+import datetime
+import unittest
+from concurrent.futures import Future
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.partitions import country_scope
+from finance.models import Depense, SalaryStructure
+from projects.models import Project, Site, Task, TaskResultType, TaskType, WorkCompletionRecord
+from users.models import Country, CustomUser, EmployeeCountryAssignment, Role, with_main_role, with_performance_counts
+from . import batch
+from .batch import _iter_jobs, select_employees
+from .models import DocumentBatch, PaiementSalaire
+from .payroll import execute_payroll
+
+
+class DocumentBatchTests(TestCase):
+    """Lots de documents RH : rendu hors requête web, rôles préchargés."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(name="Bénin", code="BEN")
+        roles = [Role.objects.create(name=name) for name in ("Country Manager", "Field Team", "Rigger")]
+        for index in range(6):
+            employee = CustomUser.objects.create(username=f"emp{index}", first_name="Emp", last_name=str(index))
+            EmployeeCountryAssignment.objects.create(user=employee, country=cls.country, role=roles[index % 3])
+        cls.manager = CustomUser.objects.create(username="rh")
+        cls.manager.user_permissions.add(Permission.objects.get(codename="change_documentrequest"))
+
+    def test_main_role_is_preloaded(self):
+        employees = list(select_employees(country_id=self.country.pk))
+        with self.assertNumQueries(0):
+            roles = [employee.main_role for employee in employees]
+        self.assertEqual(roles, [CustomUser.objects.get(pk=employee.pk).main_role for employee in employees])
+
+    def test_queries_do_not_grow_with_employees(self):
+        def count_queries(limit):
+            employees = select_employees(country_id=self.country.pk)[:limit]
+            with CaptureQueriesContext(connection) as queries:
+                list(_iter_jobs(employees, ['attestation', 'work_card']))
+            return len(queries)
+
+        count_queries(1)  # Création des compteurs de références
+        self.assertEqual(count_queries(2), count_queries(6))
+
+    def test_connections_are_closed_after_the_reads(self):
+        events = []
+
+        class Executor:
+            def __init__(self, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc_info):
+                return False
+
+            def submit(self, fn, *args):
+                events.append('submit')
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        employees = select_employees(country_id=self.country.pk)
+        with CaptureQueriesContext(connection) as queries, \
+                mock.patch.object(batch, 'ProcessPoolExecutor', Executor), \
+                mock.patch.object(batch.connections, 'close_all', lambda: events.append(len(queries))):
+            count = batch.generate_documents_zip(BytesIO(), employees, ['attestation'], workers=2)
+        self.assertEqual(count, 6)
+        # Fermeture avant le premier submit, aucune requête ensuite
+        self.assertEqual(events[:2], [len(queries), 'submit'])
+
+    def test_view_queues_batch_without_rendering(self):
+        self.client.force_login(self.manager)
+        response = self.client.post('/rh/documents/batch/', {'documents': ['attestation'], 'country': self.country.pk})
+        batch = DocumentBatch.objects.get()
+        self.assertRedirects(response, f'/rh/documents/batch/{batch.pk}/')
+        self.assertEqual(batch.status, DocumentBatch.PENDING)
+        self.assertFalse(batch.archive)
+
+
+class PayrollTests(TestCase):
+    """Paie par lot : relancer la confirmation ne paie pas deux fois."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(name="Bénin", code="BEN")
+        role = Role.objects.create(name="Rigger")
+        SalaryStructure.objects.create(country=cls.country, role=role, base_amount=Decimal("300.00"))
+        cls.employees = []
+        for index in range(3):
+            employee = CustomUser.objects.create(username=f"tech{index}")
+            EmployeeCountryAssignment.objects.create(user=employee, country=cls.country, role=role)
+            cls.employees.append(employee)
+
+    def test_already_paid_employees_are_skipped(self):
+        depense = Depense.objects.create(
+            date=datetime.date(2025, 3, 31), montant=Decimal("300.00"), description="Salaire", categorie="SALAIRE",
+        )
+        PaiementSalaire.objects.create(
+            employe=self.employees[0], mois=3, annee=2025, montant_paye=Decimal("300.00"), depense_associee=depense,
+        )
+
+        preview = execute_payroll(self.country.pk, 2025, 3, dry_run=True)
+        self.assertEqual((preview.already_paid, len(preview.payable)), (1, 2))
+
+        run = execute_payroll(self.country.pk, 2025, 3)
+        self.assertEqual(run.created, 2)
+        rerun = execute_payroll(self.country.pk, 2025, 3)
+        self.assertEqual((rerun.created, rerun.already_paid), (0, 3))
+        self.assertEqual(PaiementSalaire.objects.filter(mois=3, annee=2025).count(), 3)
+        self.assertEqual(Depense.objects.filter(categorie="SALAIRE").count(), 3)
+
+
+@unittest.skipUnless(settings.TEST_COUNTRY_PARTITIONS, "profil de tests config.test_settings")
+@override_settings(COUNTRY_PARTITIONS=settings.TEST_COUNTRY_PARTITIONS)
+class PartitionedPayrollTests(TestCase):
+    """Paie d'un pays partitionné : travaux terrain lus et marqués payés sur sa base."""
+
+    databases = '__all__'
+
+    def test_field_records_are_paid_on_the_partition(self):
+        call_command('sync_partitions', '--reserve-ids', stdout=StringIO())
+        country = Country.objects.create(name="Partition", code=next(iter(settings.COUNTRY_PARTITIONS)))
+        role = Role.objects.create(name="Rigger")
+        SalaryStructure.objects.create(country=country, role=role, base_amount=Decimal("300.00"))
+        employee = CustomUser.objects.create(username="tech")
+        EmployeeCountryAssignment.objects.create(user=employee, country=country, role=role)
+        with country_scope(country.pk):
+            project = Project.objects.create(
+                country=country, name="P1", coordinator=employee, start_date=datetime.date(2025, 1, 1),
+            )
+            site = Site.objects.create(project=project, site_id_client="S1", name="Site")
+            task = Task.objects.create(
+                site=site, task_type=TaskType.objects.create(name="Pose", code="POSE"), description="Pose",
+                due_date=datetime.date(2025, 3, 10),
+            )
+            record = WorkCompletionRecord.objects.create(
+                task=task, employee=employee, date=datetime.date(2025, 3, 10), cost=Decimal("50.00"),
+            )
+
+        run = execute_payroll(country.pk, 2025, 3)
+        self.assertEqual((run.created, run.total), (1, Decimal("350.00")))
+        with country_scope(country.pk):
+            record.refresh_from_db()
+        self.assertTrue(record.is_paid_out)
+
+
+class EmployeePerformanceTests(TestCase):
+    """Taux de performance lus dans les compteurs préchargés : mêmes valeurs, requêtes constantes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        country = Country.objects.create(name="Bénin", code="BEN")
+        field_team = Role.objects.create(name="Field Team")
+        coordinator = CustomUser.objects.create(username="coord")
+        lead = CustomUser.objects.create(username="lead")
+        lead.groups.add(Group.objects.create(name="Team_Lead"))
+        project = Project.objects.create(country=country, name="P1", coordinator=coordinator, start_date=datetime.date(2025, 1, 1))
+        task_type = TaskType.objects.create(name="Pose", code="POSE")
+        success = TaskResultType.objects.create(name="OK", code="OK")
+        failure = TaskResultType.objects.create(name="KO", code="KO", is_success=False)
+        for index in range(4):
+            technician = CustomUser.objects.create(username=f"tech{index}")
+            EmployeeCountryAssignment.objects.create(user=technician, country=country, role=field_team)
+            site = Site.objects.create(project=project, site_id_client=f"S{index}", name="Site", team_lead=lead)
+            for number in range(index + 1):
+                done = number % 2 == 0
+                Task.objects.create(
+                    site=site, task_type=task_type, description="Pose", assigned_to=technician,
+                    due_date=datetime.date(2025, 3, 10), status='COMPLETED' if done else 'IN_PROGRESS',
+                    result_type=(success if number % 4 == 0 else failure) if done else None,
+                    completion_date=timezone.make_aware(datetime.datetime(2025, 3, 5 + 3 * number)) if done else None,
+                )
+        cls.manager = CustomUser.objects.create_superuser("admin", "admin@example.com", None)
+
+    def test_counts_match_per_employee_rates(self):
+        rates = ('technician_completion_rate', 'team_lead_success_rate', 'coordinator_on_time_completion_rate')
+        users = with_performance_counts(with_main_role(CustomUser.objects.order_by('pk')))
+        with self.assertNumQueries(3):
+            preloaded = [(user.main_role, *(getattr(user, rate)() for rate in rates)) for user in users]
+        expected = [
+            (user.main_role, *(getattr(user, rate)() for rate in rates))
+            for user in CustomUser.objects.order_by('pk')
+        ]
+        self.assertEqual(preloaded, expected)
+
+    def test_view_queries_do_not_grow_with_employees(self):
+        self.client.force_login(self.manager)
+
+        def count_queries():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get('/rh/employees/performance/').status_code, 200)
+            return len(queries)
+
+        before = count_queries()
+        CustomUser.objects.create(username="tech_new")
+        self.assertEqual(count_queries(), before)
@@ -10,6 +10,7 @@ urlpatterns = [
     path('certifications/<int:pk>/delete/', views.CertificationDeleteView.as_view(), name='certification_delete'),
 
     path('paiements-salaires/', views.PaiementSalaireListView.as_view(), name='paiementsalaire_list'),
+    path('paiements-salaires/run/', views.PayrollRunView.as_view(), name='payroll_run'),
     path('paiements-salaires/create/', views.PaiementSalaireCreateView.as_view(), name='paiementsalaire_create'),
     path('paiements-salaires/<int:pk>/update/', views.PaiementSalaireUpdateView.as_view(), name='paiementsalaire_update'),
     path('paiements-salaires/<int:pk>/delete/', views.PaiementSalaireDeleteView.as_view(), name='paiementsalaire_delete'),
@@ -27,6 +28,9 @@ urlpatterns = [
     path('contracts/<int:pk>/sign/', views.ContractSignView.as_view(), name='contract_sign'),
 
     path('documents/request/', views.RequestDocumentView.as_view(), name='request_document'),
+    path('documents/batch/', views.DocumentBatchView.as_view(), name='document_batch'),
+    path('documents/batch/<int:pk>/', views.DocumentBatchDetailView.as_view(), name='document_batch_detail'),
+    path('documents/batch/<int:pk>/download/', views.DocumentBatchDownloadView.as_view(), name='document_batch_download'),
 
     path('documents/requests/', views.DocumentRequestListView.as_view(), name='documentrequest_list'),
     path('documents/requests/<int:pk>/', views.DocumentRequestDetailView.as_view(), name='documentrequest_detail'),
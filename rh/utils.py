@@ -1,23 +1,30 @@
 from datetime import datetime
-from rh.models import DocumentCounter
-from django.db import transaction
+from core.sequences import YEARLY, allocate
+
+
+def _formater_reference(numero, year, code_entite, code_departement, code_document_prefix):
+    numero_formate = str(numero).zfill(3)
+    return f"Réf : {code_entite}/{code_departement}/{code_document_prefix}/{numero_formate}/{year}"
+
+
+def reserver_references_sequentielles(document_type, count, code_entite="NTC-G", code_departement="HR", code_document_prefix=""):
+    """
+    Réserve un bloc de `count` références consécutives en une seule écriture
+    (génération par lot), avec un reset annuel du compteur.
+    """
+    today = datetime.now()
+    numeros = allocate(f"reference:{document_type}", count, reset=YEARLY, when=today)
+    return [
+        _formater_reference(numero, today.year, code_entite, code_departement, code_document_prefix)
+        for numero in numeros
+    ]
+
 
 def generer_reference_sequentielle(document_type, code_entite="NTC-G", code_departement="HR", code_document_prefix=""):
     """
     Génère une référence séquentielle unique pour un type de document donné,
     avec un reset annuel du compteur.
     """
-    current_year = datetime.now().year
-    with transaction.atomic():
-        counter, created = DocumentCounter.objects.get_or_create(
-            document_type=document_type,
-            year=current_year,
-            defaults={'last_number': 0}
-        )
-        counter.last_number += 1
-        counter.save()
-
-        numero_formate = str(counter.last_number).zfill(3)
-        
-        reference_complete = f"Réf : {code_entite}/{code_departement}/{code_document_prefix}/{numero_formate}/{current_year}"
-        return reference_complete
\ No newline at end of file
+    return reserver_references_sequentielles(
+        document_type, 1, code_entite, code_departement, code_document_prefix
+    )[0]
@@ -1,78 +1,20 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, View
-from .models import Certification, PaiementSalaire, Contract, DocumentRequest
-from users.models import CustomUser
+from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, View, FormView
+from .models import Certification, PaiementSalaire, Contract, DocumentBatch, DocumentRequest
+from users.models import CustomUser, with_main_role, with_performance_counts
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from .forms import CertificationForm
-from django.http import HttpResponse, HttpResponseForbidden
+from .forms import CertificationForm, DocumentBatchForm, PayrollRunForm
+from django.http import FileResponse, Http404, HttpResponseForbidden
 import uuid
-from django.template.loader import render_to_string
-from weasyprint import HTML
 import datetime
-from django.conf import settings
-import os
-import mimetypes
-from pathlib import Path
-from urllib.parse import urlparse
-import weasyprint
+from core.mixins import ReplicaReadMixin
+from core.partitions import add_partition_counts
+from core.pdf import pdf_response, render_template_to_pdf
 from .utils import generer_reference_sequentielle
-
-def django_weasyprint_url_fetcher(url, *args, **kwargs):
-    """
-    Custom URL fetcher for WeasyPrint that handles Django static and media files.
-    Gère les URL absolues générées lorsque base_url est défini.
-    """
-    # 1. Handle file:// URLs directly
-    if url.startswith('file:'):
-        parsed_url = urlparse(url)
-        file_path = Path(parsed_url.path)
-        if file_path.exists():
-            mime_type, encoding = mimetypes.guess_type(file_path.name)
-            return {
-                'file_obj': open(file_path, 'rb'),
-                'mime_type': mime_type,
-                'encoding': encoding,
-            }
-
-    # 2. Handle Django static files (Correction clé pour base_url absolu)
-    if settings.STATIC_URL:
-        parsed_url = urlparse(url)
-        # On travaille avec le chemin (path) de l'URL absolue (ex: /static/images/logo.png)
-        path = parsed_url.path
-        
-        # Le chemin doit commencer par STATIC_URL (ex: /static/)
-        if path.startswith(settings.STATIC_URL):
-            # Enlever le préfixe STATIC_URL et forcer la casse en minuscule
-            static_path = path.replace(settings.STATIC_URL, '', 1).lower()
-
-            # Utilisation de os.path.join pour construire le chemin absolu de manière fiable
-            absolute_path = os.path.join(settings.STATIC_ROOT, static_path) 
-
-            if os.path.exists(absolute_path):
-                mime_type, encoding = mimetypes.guess_type(absolute_path)
-
-                return {
-                    'file_obj': open(absolute_path, 'rb'),
-                    'mime_type': mime_type,
-                    'encoding': encoding,
-                }
-
-    # 3. Handle Django media files
-    if settings.MEDIA_URL and url.startswith(settings.MEDIA_URL):
-        media_path = url.replace(settings.MEDIA_URL, '', 1)
-        absolute_path = os.path.join(settings.MEDIA_ROOT, media_path)
-        if os.path.exists(absolute_path):
-            mime_type, encoding = mimetypes.guess_type(absolute_path)
-            return {
-                'file_obj': open(absolute_path, 'rb'),
-                'mime_type': mime_type,
-                'encoding': encoding,
-            }
-
-    # 4. Fallback to WeasyPrint's default URL fetcher
-    return weasyprint.default_url_fetcher(url, *args, **kwargs)
+from .batch import select_employees
+from .payroll import execute_payroll
 
 class ContractListView(LoginRequiredMixin, ListView):
     model = Contract
@@ -95,13 +37,9 @@ class ContractPdfView(LoginRequiredMixin, DetailView):
     template_name = 'rh/contract_pdf.html'
 
     def render_to_response(self, context, **response_kwargs):
-        html_string = render_to_string(self.template_name, context)
-        # CORRECTION BASE_URL: Utilisation de l'URL externe fixe
-        html = HTML(string=html_string, base_url='http://extranet.ntc-group.org/', url_fetcher=django_weasyprint_url_fetcher)
-        pdf = html.write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="contract_{self.object.pk}.pdf"'
-        return response
+        # Rendu via le service partagé (ressources locales en cache, aucun accès réseau)
+        pdf = render_template_to_pdf(self.template_name, context)
+        return pdf_response(pdf, f"contract_{self.object.pk}.pdf")
 
 class ContractSignView(LoginRequiredMixin, UpdateView):
     model = Contract
@@ -179,6 +117,32 @@ class PaiementSalaireDeleteView(PermissionRequiredMixin, DeleteView):
     permission_required = 'rh.delete_paiementsalaire'
 
 
+class PayrollRunView(PermissionRequiredMixin, FormView):
+    """Paie mensuelle par lot : aperçu (simulation) puis enregistrement de tous les paiements."""
+    form_class = PayrollRunForm
+    template_name = 'rh/payroll_run_form.html'
+    permission_required = 'rh.add_paiementsalaire'
+
+    def get_initial(self):
+        today = datetime.date.today()
+        return {'month': today.month, 'year': today.year}
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        confirm = 'confirm' in self.request.POST
+        run = execute_payroll(
+            data['country'].pk, data['year'], data['month'],
+            declared_by=self.request.user, dry_run=not confirm,
+        )
+        if not confirm:
+            return self.render_to_response(self.get_context_data(form=form, run=run))
+        if run.created:
+            messages.success(self.request, f"{run.created} paiement(s) de salaire enregistré(s) pour {data['month']:02d}/{data['year']}.")
+        else:
+            messages.warning(self.request, "Aucun paiement à enregistrer pour cette période.")
+        return redirect('rh:paiementsalaire_list')
+
+
 class EmployeeListView(LoginRequiredMixin, ListView):
 
     model = CustomUser
@@ -197,14 +161,17 @@ class EmployeeDetailView(LoginRequiredMixin, DetailView):
     context_object_name = 'employee'
 
 
-class EmployeePerformanceView(LoginRequiredMixin, ListView):
+class EmployeePerformanceView(LoginRequiredMixin, ReplicaReadMixin, ListView):
     model = CustomUser
     template_name = 'rh/employee_performance.html'
     context_object_name = 'employees'
 
     def get_queryset(self):
-        users = CustomUser.objects.all()
-        
+        # Rôle principal et compteurs des taux préchargés : aucune requête par employé
+        users = with_performance_counts(with_main_role(CustomUser.objects.select_related('job_role')))
+        # Tâches des bases par groupe de pays ajoutées aux compteurs (core/partitions.py)
+        users = add_partition_counts(list(users), with_performance_counts(CustomUser.objects.all()))
+
         # Trier les utilisateurs en Python
         def sort_key(user):
             if user.main_role == 'Field Team':
@@ -236,13 +203,8 @@ class AttestationPDFView(LoginRequiredMixin, DetailView):
         return context
 
     def render_to_response(self, context, **response_kwargs):
-        html_string = render_to_string(self.template_name, context)
-        # CORRECTION BASE_URL: Utilisation de l'URL externe fixe
-        html = HTML(string=html_string, base_url='http://extranet.ntc-group.org/', url_fetcher=django_weasyprint_url_fetcher)
-        pdf = html.write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="attestation_{self.object.username}.pdf"'
-        return response
+        pdf = render_template_to_pdf(self.template_name, context)
+        return pdf_response(pdf, f"attestation_{self.object.username}.pdf")
 
 class CertificatTravailPDFView(LoginRequiredMixin, DetailView):
     model = CustomUser
@@ -262,13 +224,8 @@ class CertificatTravailPDFView(LoginRequiredMixin, DetailView):
         return context
 
     def render_to_response(self, context, **response_kwargs):
-        html_string = render_to_string(self.template_name, context)
-        # CORRECTION BASE_URL: Utilisation de l'URL externe fixe
-        html = HTML(string=html_string, base_url='http://extranet.ntc-group.org/', url_fetcher=django_weasyprint_url_fetcher)
-        pdf = html.write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="certificat_{self.object.username}.pdf"'
-        return response
+        pdf = render_template_to_pdf(self.template_name, context)
+        return pdf_response(pdf, f"certificat_{self.object.username}.pdf")
 
 def generate_work_card(request, employee_id):
     employee = get_object_or_404(CustomUser, id=employee_id)
@@ -282,6 +239,59 @@ def generate_work_card(request, employee_id):
     }
     return render(request, 'rh/work_card.html', context)
 
+class DocumentBatchView(PermissionRequiredMixin, FormView):
+    """
+    Génération par lot des documents RH dans une seule archive ZIP. Le lot est
+    enregistré puis rendu en arrière-plan (tâche generer_lots_documents).
+    """
+    form_class = DocumentBatchForm
+    template_name = 'rh/document_batch_form.html'
+    permission_required = 'rh.change_documentrequest'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['recent_batches'] = DocumentBatch.objects.select_related('created_by')[:10]
+        return context
+
+    def form_valid(self, form):
+        data = form.cleaned_data
+        employees = select_employees(
+            country_id=data['country'].pk if data['country'] else None,
+            department_id=data['department'].pk if data['department'] else None,
+            contract_type_id=data['contract_type'].pk if data['contract_type'] else None,
+            statut=data['statut'] or None,
+        )
+        if not employees.exists():
+            messages.warning(self.request, "Aucun employé ne correspond aux critères sélectionnés.")
+            return self.form_invalid(form)
+
+        batch = DocumentBatch.objects.create(
+            documents=data['documents'],
+            country=data['country'],
+            department=data['department'],
+            contract_type=data['contract_type'],
+            statut=data['statut'] or '',
+            created_by=self.request.user,
+        )
+        messages.info(self.request, "Lot enregistré : l'archive sera disponible ici dès la fin de la génération.")
+        return redirect('rh:document_batch_detail', pk=batch.pk)
+
+class DocumentBatchDetailView(PermissionRequiredMixin, DetailView):
+    model = DocumentBatch
+    template_name = 'rh/document_batch_detail.html'
+    context_object_name = 'batch'
+    permission_required = 'rh.change_documentrequest'
+
+class DocumentBatchDownloadView(PermissionRequiredMixin, View):
+    permission_required = 'rh.change_documentrequest'
+
+    def get(self, request, pk):
+        batch = get_object_or_404(DocumentBatch, pk=pk, status=DocumentBatch.DONE)
+        if not batch.archive:
+            raise Http404("Archive indisponible.")
+        filename = f"documents_rh_{batch.created_at:%Y%m%d}_{batch.pk}.zip"
+        return FileResponse(batch.archive.open('rb'), as_attachment=True, filename=filename, content_type='application/zip')
+
 class RequestDocumentView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         document_type = request.POST.get("document_type")
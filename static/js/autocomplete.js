@@ -0,0 +1,137 @@
+// static/js/autocomplete.js
+// Listes à recherche (core/autocomplete.py) : le <select> ne contient que les
+// valeurs choisies ; les options sont demandées à data-autocomplete-url
+// (?q=<début>&page=<n>) pendant la saisie.
+(function () {
+    "use strict";
+
+    const DELAY = 250;
+
+    function setup(select) {
+        const multiple = select.multiple;
+        const wrapper = document.createElement("div");
+        wrapper.className = "position-relative";
+        const chips = document.createElement("div");
+        chips.className = "d-flex flex-wrap gap-1 mb-1";
+        const input = document.createElement("input");
+        input.type = "search";
+        input.className = "form-control";
+        input.placeholder = select.dataset.placeholder || "";
+        input.autocomplete = "off";
+        const menu = document.createElement("div");
+        menu.className = "list-group position-absolute w-100 shadow d-none";
+        menu.style.zIndex = 1050;
+        menu.style.maxHeight = "300px";
+        menu.style.overflowY = "auto";
+
+        select.parentNode.insertBefore(wrapper, select);
+        wrapper.append(chips, input, menu, select);
+        select.classList.add("d-none");
+        if (select.id) {
+            // Le <label for> du champ désigne désormais la zone de recherche
+            input.id = select.id + "_search";
+            const label = document.querySelector('label[for="' + select.id + '"]');
+            if (label) label.htmlFor = input.id;
+        }
+
+        let timer = null;
+        let request = 0;
+
+        function renderChips() {
+            chips.replaceChildren();
+            Array.from(select.selectedOptions).filter((option) => option.value).forEach((option) => {
+                const chip = document.createElement("span");
+                chip.className = "badge bg-secondary d-inline-flex align-items-center";
+                chip.textContent = option.textContent;
+                const remove = document.createElement("button");
+                remove.type = "button";
+                remove.className = "btn-close btn-close-white ms-1";
+                remove.style.fontSize = "0.6em";
+                remove.setAttribute("aria-label", "Retirer");
+                remove.addEventListener("click", () => {
+                    option.selected = false;
+                    if (!multiple) select.value = "";
+                    select.dispatchEvent(new Event("change", {bubbles: true}));
+                    renderChips();
+                });
+                chip.append(remove);
+                chips.append(chip);
+            });
+        }
+
+        function choose(result) {
+            let option = Array.from(select.options).find((item) => item.value === String(result.id));
+            if (!option) {
+                option = new Option(result.text, result.id);
+                select.add(option);
+            }
+            option.selected = true;
+            select.dispatchEvent(new Event("change", {bubbles: true}));
+            renderChips();
+            input.value = "";
+            close();
+        }
+
+        function close() {
+            menu.classList.add("d-none");
+            menu.replaceChildren();
+        }
+
+        function load(page) {
+            const current = ++request;
+            const url = new URL(select.dataset.autocompleteUrl, window.location.href);
+            url.searchParams.set("q", input.value);
+            url.searchParams.set("page", page);
+            fetch(url, {credentials: "same-origin", headers: {"Accept": "application/json"}})
+                .then((response) => response.json())
+                .then((data) => {
+                    if (current !== request) return;  // réponse d'une saisie dépassée
+                    if (page === 1) menu.replaceChildren();
+                    const more = menu.querySelector("[data-more]");
+                    if (more) more.remove();
+                    data.results.forEach((result) => {
+                        const item = document.createElement("button");
+                        item.type = "button";
+                        item.className = "list-group-item list-group-item-action py-1";
+                        item.textContent = result.text;
+                        item.addEventListener("click", () => choose(result));
+                        menu.append(item);
+                    });
+                    if (data.more) {
+                        const next = document.createElement("button");
+                        next.type = "button";
+                        next.dataset.more = "1";
+                        next.className = "list-group-item list-group-item-action py-1 text-primary";
+                        next.textContent = "Plus…";
+                        next.addEventListener("click", () => load(page + 1));
+                        menu.append(next);
+                    }
+                    if (!menu.children.length) {
+                        const empty = document.createElement("div");
+                        empty.className = "list-group-item text-muted py-1";
+                        empty.textContent = "Aucun résultat";
+                        menu.append(empty);
+                    }
+                    menu.classList.remove("d-none");
+                });
+        }
+
+        input.addEventListener("input", () => {
+            clearTimeout(timer);
+            timer = setTimeout(() => load(1), DELAY);
+        });
+        input.addEventListener("focus", () => load(1));
+        input.addEventListener("keydown", (event) => {
+            if (event.key === "Escape") close();
+            if (event.key === "Enter") event.preventDefault();
+        });
+        document.addEventListener("click", (event) => {
+            if (!wrapper.contains(event.target)) close();
+        });
+        renderChips();
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        document.querySelectorAll("select[data-autocomplete-url]").forEach(setup);
+    });
+})();
@@ -8,6 +8,12 @@ from django_countries.fields import CountryField
 import phonenumbers
 
 
+def user_label(user):
+    """Libellé d'un employé dans les listes : « Nom complet (identifiant) »."""
+    full_name = user.get_full_name()
+    return f"{full_name} ({user.username})" if full_name else user.username
+
+
 class EnhancedLoginForm(AuthenticationForm):
     username = forms.CharField(
         widget=forms.TextInput(attrs={
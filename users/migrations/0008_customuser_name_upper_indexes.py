@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:37
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0007_alter_profileupdate_data"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                django.db.models.functions.text.Upper("last_name"),
+                name="customuser_last_name_upper",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                django.db.models.functions.text.Upper("first_name"),
+                name="customuser_first_name_upper",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customuser",
+            index=models.Index(
+                django.db.models.functions.text.Upper("username"),
+                name="customuser_username_upper",
+            ),
+        ),
+    ]
@@ -1,10 +1,13 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.auth.models import AbstractUser, Group
 from datetime import date
 from django.utils.translation import gettext_lazy as _
 from projects.models import Project, Task
 from decimal import Decimal
 from phonenumber_field.modelfields import PhoneNumberField
+from core.sequences import MONTHLY, next_value
 
 # =================================================================
 # 1. Modèle Country (Le Locataire / Tenant)
@@ -84,6 +87,9 @@ EMPLOYEE_STATUS_CHOICES = (
     ("INACTIF", _("Inactif")),
 )
 
+# Séquence (core.Sequence) des rangs NN du matricule AAMMNN
+EMPLOYEE_ID_SEQUENCE = 'employee_id'
+
 BLOOD_GROUP_CHOICES = (
     ('A+', 'A+'), ('A-', 'A-'), ('B+', 'B+'), ('B-', 'B-'),
     ('AB+', 'AB+'), ('AB-', 'AB-'), ('O+', 'O+'), ('O-', 'O-'),
@@ -140,32 +146,38 @@ class CustomUser(AbstractUser):
     class Meta:
         verbose_name = "Employé"
         verbose_name_plural = "Employés"
+        # Recherche par début de nom (core/autocomplete.py)
+        indexes = [
+            models.Index(Upper("last_name"), name="customuser_last_name_upper"),
+            models.Index(Upper("first_name"), name="customuser_first_name_upper"),
+            models.Index(Upper("username"), name="customuser_username_upper"),
+        ]
 
     def _generate_employee_id(self):
         if not self.hire_date:
             return None
 
-        year_str = str(self.hire_date.year)[-2:]
-        month_str = f"{self.hire_date.month:02d}"
-
-        # Find the count of employees hired in the same month and year
-        # Order by 'id' to ensure a stable rank for existing employees if generated retroactively
-        employees_in_month = CustomUser.objects.filter(
-            hire_date__year=self.hire_date.year,
-            hire_date__month=self.hire_date.month
-        ).order_by('id')
-
-        # Determine the rank (NN)
-        rank = 0
-        for i, emp in enumerate(employees_in_month):
-            if emp.pk == self.pk: # If self is already in the database, use its position
-                rank = i + 1
-                break
-        
-        if rank == 0: # If self is new or not yet saved, assume it's the next in rank
-             rank = employees_in_month.count() + 1
-             
-        return f"{year_str}{month_str}{rank:02d}"
+        prefix = f"{self.hire_date:%y%m}"
+
+        # Rang (NN) attribué par l'allocateur de séquences, remis à zéro chaque mois d'embauche.
+        # À la première embauche d'un mois, on repart du plus grand rang déjà attribué.
+        rank = next_value(
+            EMPLOYEE_ID_SEQUENCE,
+            reset=MONTHLY,
+            when=self.hire_date,
+            initial=lambda: self._max_employee_rank(prefix),
+        )
+        return f"{prefix}{rank:02d}"
+
+    @staticmethod
+    def _max_employee_rank(prefix):
+        ranks = [
+            int(employee_id[len(prefix):])
+            for employee_id in CustomUser.objects.filter(employee_id__startswith=prefix)
+            .values_list('employee_id', flat=True)
+            if employee_id[len(prefix):].isdigit()
+        ]
+        return max(ranks, default=0)
 
 
     def save(self, *args, **kwargs):
@@ -180,8 +192,17 @@ class CustomUser(AbstractUser):
     # Méthodes de vérification de rôle (version méthode)
     def is_team_lead_user(self):
         """Vérifie si l'utilisateur appartient au groupe 'Team_Lead'."""
+        # Groupes préchargés (rh.batch.select_employees)
+        if hasattr(self, "team_lead_groups"):
+            return bool(self.team_lead_groups)
         return self.groups.filter(name__iexact="Team_Lead").exists()
 
+    def coordinates_active_project(self):
+        """Coordonne au moins un projet actif (annotation préchargée si présente)."""
+        if hasattr(self, "has_active_coordinated_project"):
+            return self.has_active_coordinated_project
+        return self.coordinated_projects.filter(is_active=True).exists()
+
     def is_coordinator_user(self):
         """Vérifie si l'utilisateur est un Project Coordinator actif."""
         user_roles = {r.lower() for r in self.get_active_role_names()}
@@ -260,7 +281,7 @@ class CustomUser(AbstractUser):
             return "Administrateur Système"
         if "country manager" in user_roles or "country_manager" in user_roles:
             return "Country Manager"
-        if ("project coordinator" in user_roles or "project_coordinator" in user_roles) or self.coordinated_projects.filter(is_active=True).exists():
+        if ("project coordinator" in user_roles or "project_coordinator" in user_roles) or self.coordinates_active_project():
             return "Coordinateur de Projet"
         if self.is_team_lead_user():
             return "Team Lead"
@@ -281,6 +302,10 @@ class CustomUser(AbstractUser):
         if not self.is_authenticated:
             return set()
 
+        # Affectations actives préchargées (rh.batch.select_employees)
+        if hasattr(self, "active_assignments"):
+            return {assignment.role.name for assignment in self.active_assignments}
+
         return set(
             self.assignments.filter(
                 is_active=True, country__is_active=True
@@ -297,6 +322,9 @@ class CustomUser(AbstractUser):
 
     def technician_completion_rate(self):
         """Taux d'achèvement pour un technicien."""
+        # Compteurs préchargés (with_performance_counts)
+        if hasattr(self, "assigned_task_count"):
+            return _rate(self.assigned_success_count, self.assigned_task_count)
         assigned_tasks = self.assigned_tasks.all()
         if not assigned_tasks.exists():
             return Decimal('0.00')
@@ -308,6 +336,8 @@ class CustomUser(AbstractUser):
 
     def team_lead_success_rate(self):
         """Taux de succès pour un Team Lead."""
+        if hasattr(self, "led_task_count"):
+            return _rate(self.led_success_count, self.led_task_count)
         led_sites = self.led_sites.all()
         if not led_sites.exists():
             return Decimal('0.00')
@@ -323,6 +353,8 @@ class CustomUser(AbstractUser):
 
     def coordinator_on_time_completion_rate(self):
         """Taux de complétion à temps pour un coordinateur."""
+        if hasattr(self, "coordinated_task_count"):
+            return _rate(self.coordinated_on_time_count, self.coordinated_task_count)
         coordinated_projects = self.coordinated_projects.all()
         if not coordinated_projects.exists():
             return Decimal('0.00')
@@ -434,3 +466,51 @@ class ProfileUpdateHistory(models.Model):
 
     def __str__(self):
         return f"Historique pour {self.employee.username} ({self.status}) le {self.reviewed_at.strftime('%d-%m-%Y')}"
+
+
+# =================================================================
+# 9. Préchargements pour les listes d'employés
+# =================================================================
+def _rate(part, total):
+    return (Decimal(part) / Decimal(total)) * 100 if total else Decimal('0.00')
+
+
+def with_main_role(users):
+    """
+    Précharge les données de CustomUser.main_role (affectations actives,
+    groupe Team_Lead, projets coordonnés) : aucune requête par employé.
+    """
+    return users.annotate(
+        has_active_coordinated_project=Exists(Project.objects.filter(coordinator=OuterRef('pk'), is_active=True)),
+    ).prefetch_related(
+        Prefetch(
+            'assignments',
+            queryset=EmployeeCountryAssignment.objects.filter(is_active=True, country__is_active=True).select_related('role'),
+            to_attr='active_assignments',
+        ),
+        Prefetch('groups', queryset=Group.objects.filter(name__iexact="Team_Lead"), to_attr='team_lead_groups'),
+    )
+
+
+def _task_count(owner, **filters):
+    """Nombre de tâches dont `owner` (chemin depuis la tâche) désigne l'employé courant."""
+    tasks = Task.objects.filter(**{owner: OuterRef('pk')}, **filters).order_by().values(owner)
+    return Coalesce(Subquery(tasks.annotate(count=Count('pk')).values('count')), 0)
+
+
+def with_performance_counts(users):
+    """
+    Annote les compteurs des taux de performance (technicien, Team Lead,
+    coordinateur), lus ensuite sans requête par les méthodes *_rate.
+    """
+    success = {'status': 'COMPLETED', 'result_type__is_success': True}
+    return users.annotate(
+        assigned_task_count=_task_count('assigned_to'),
+        assigned_success_count=_task_count('assigned_to', **success),
+        led_task_count=_task_count('site__team_lead'),
+        led_success_count=_task_count('site__team_lead', **success),
+        coordinated_task_count=_task_count('site__project__coordinator'),
+        coordinated_on_time_count=_task_count(
+            'site__project__coordinator', completion_date__isnull=False, completion_date__date__lte=F('due_date'),
+        ),
+    )
@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.urls import reverse
+
+from .models import Country, CustomUser, EmployeeCountryAssignment, Role
+
+
+class UserAutocompleteTests(TestCase):
+    """Liste à recherche des employés : limitée aux pays actifs de l'utilisateur."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.benin = Country.objects.create(name="Bénin", code="BEN")
+        cls.togo = Country.objects.create(name="Togo", code="TGO")
+        role = Role.objects.create(name="Rigger")
+        cls.manager = CustomUser.objects.create(username="chef", last_name="Chef")
+        EmployeeCountryAssignment.objects.create(user=cls.manager, country=cls.benin, role=role)
+        cls.employees = {}
+        for country in (cls.benin, cls.togo):
+            employee = CustomUser.objects.create(username=f"tech_{country.code.lower()}", last_name="Tech")
+            EmployeeCountryAssignment.objects.create(user=employee, country=country, role=role)
+            cls.employees[employee.username] = employee
+
+    def search(self, user, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('users:user_autocomplete'), params)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_other_countries_are_excluded(self):
+        self.assertEqual(self.search(self.manager, q="tech"), [self.employees["tech_ben"].pk])
+        # Pays demandé hors de ceux de l'utilisateur : aucun résultat
+        self.assertEqual(self.search(self.manager, country=self.togo.pk), [])
+
+    def test_superuser_sees_every_country(self):
+        admin = CustomUser.objects.create(username="admin", is_superuser=True)
+        self.assertEqual(
+            self.search(admin, q="tech"), [self.employees["tech_ben"].pk, self.employees["tech_tgo"].pk],
+        )
+        self.assertEqual(self.search(admin, country=self.togo.pk), [self.employees["tech_tgo"].pk])
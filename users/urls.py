@@ -11,7 +11,8 @@ from .views import (
     EmployeeDocumentUploadView,
     EnhancedLoginView,
     ProfileUpdateHistoryView,
-    EmployeeDetailView
+    EmployeeDetailView,
+    UserAutocompleteView,
 )
 
 app_name = 'users'
@@ -41,6 +42,7 @@ urlpatterns = [
     path('employees/', EmployeeListView.as_view(), name='employee_list'),
     path('employee/add/', EmployeeCreateView.as_view(), name='employee_add'),
     path('employee/<int:pk>/', EmployeeDetailView.as_view(), name='employee_detail'),
+    path('employees/autocomplete/', UserAutocompleteView.as_view(), name='user_autocomplete'),
 
     # 💡 AJOUTEZ CETTE LIGNE MANQUANTE
     path('employee/<int:pk>/update/', EmployeeUpdateView.as_view(), name='employee_update'),
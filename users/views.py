@@ -5,7 +5,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.core.exceptions import FieldDoesNotExist
 from django.db import transaction
-from django.db.models import ForeignKey, DateField, OneToOneField
+from django.db.models import Exists, ForeignKey, DateField, OneToOneField, OuterRef
 from django.conf import settings
 from django.core.files.storage import FileSystemStorage
 from django.core.files.base import ContentFile
@@ -16,9 +16,11 @@ from datetime import date, datetime
 import os
 import io
 from PIL import Image
+from core.autocomplete import AutocompleteView
+from core.metrics import timed
 
-from .forms import EnhancedLoginForm, EmployeeCreateForm, ProfileUpdateForm, EmployeeDocumentForm
-from .models import CustomUser, ProfileUpdate, ProfileUpdateHistory
+from .forms import EnhancedLoginForm, EmployeeCreateForm, ProfileUpdateForm, EmployeeDocumentForm, user_label
+from .models import CustomUser, EmployeeCountryAssignment, ProfileUpdate, ProfileUpdateHistory
 from phonenumber_field.phonenumber import PhoneNumber
 
 
@@ -28,7 +30,7 @@ class EnhancedLoginView(View):
     
     def get(self, request):
         if request.user.is_authenticated:
-            return redirect('core:home')  # Redirige vers la page d'accueil si déjà connecté
+            return redirect('home')  # Redirige vers la page d'accueil si déjà connecté
         
         form = EnhancedLoginForm()
         return render(request, self.template_name, {'form': form})
@@ -48,7 +50,7 @@ class EnhancedLoginView(View):
                 request.session.set_expiry(1209600)  # 2 semaines
             
             # Redirection après connexion
-            next_url = request.POST.get('next') or 'core:home'
+            next_url = request.POST.get('next') or 'home'
             return redirect(next_url)
         
         # Si le formulaire est invalide
@@ -424,14 +426,15 @@ class ProfileUpdateDetailView(LoginRequiredMixin, View):
         temp_path = os.path.join(settings.TEMP_MEDIA_ROOT, filename)
         if os.path.exists(temp_path):
             try:
-                # Redimensionner l'image
-                img = Image.open(temp_path)
-                img.thumbnail((300, 300))
-                
-                # Sauvegarder
-                img_io = io.BytesIO()
-                img.save(img_io, format='JPEG', quality=85)
-                img_content = ContentFile(img_io.getvalue())
+                with timed('photo_processing_seconds', kind='photo_profil'):
+                    # Redimensionner l'image
+                    img = Image.open(temp_path)
+                    img.thumbnail((300, 300))
+
+                    # Sauvegarder
+                    img_io = io.BytesIO()
+                    img.save(img_io, format='JPEG', quality=85)
+                    img_content = ContentFile(img_io.getvalue())
                 
                 # Générer un nom unique
                 unique_name = f"profile_{employee.pk}_{int(timezone.now().timestamp())}.jpg"
@@ -547,4 +550,43 @@ class EmployeeDetailView(LoginRequiredMixin, DetailView):
     """Vue pour afficher les détails d'un employé"""
     model = CustomUser
     template_name = 'users/employee_detail.html'
-    context_object_name = 'employee'
\ No newline at end of file
+    context_object_name = 'employee'
+
+
+class UserAutocompleteView(AutocompleteView):
+    """
+    Employés actifs pour les listes à recherche (core/autocomplete.py).
+    Recherche sur le début du nom, du prénom ou de l'identifiant.
+    ?country=<id> (répétable) : affectation active dans ces pays ;
+    ?role=<id> (répétable) : avec l'un de ces rôles.
+    Hors superutilisateur, limité aux pays actifs de l'utilisateur.
+    """
+    model = CustomUser
+    search_fields = ('last_name', 'first_name', 'username')
+    ordering = ('last_name', 'first_name', 'pk')
+
+    def get_queryset(self):
+        user = self.request.user
+        country_ids = self.get_ids('country')
+        role_ids = self.get_ids('role')
+        if not user.is_superuser:
+            allowed = set(user.active_country_ids)
+            country_ids = [pk for pk in country_ids if pk in allowed] if country_ids else list(allowed)
+            if not country_ids:
+                return CustomUser.objects.none()
+
+        queryset = CustomUser.objects.filter(is_active=True)
+        if not country_ids and not role_ids:
+            return queryset
+        # Affectation active (mêmes critères que les formulaires de projets) ; EXISTS évite un DISTINCT
+        assignments = EmployeeCountryAssignment.objects.filter(
+            user=OuterRef('pk'), is_active=True, end_date__isnull=True,
+        )
+        if country_ids:
+            assignments = assignments.filter(country_id__in=country_ids)
+        if role_ids:
+            assignments = assignments.filter(role_id__in=role_ids)
+        return queryset.filter(Exists(assignments))
+
+    def label(self, obj):
+        return user_label(obj)
@@ -3,9 +3,7 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from .models import PermissionRequest, ApprovalStep
 from .forms import PermissionRequestForm
 from django.urls import reverse_lazy
-from django.http import HttpResponse
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from core.pdf import pdf_response, render_template_to_pdf
 from django.utils import timezone
 
 class PermissionRequestCreateView(LoginRequiredMixin, CreateView):
@@ -42,12 +40,8 @@ class PermissionRequestPdfView(LoginRequiredMixin, DetailView):
         return ['workflow/permission_pdf.html']
 
     def render_to_response(self, context, **response_kwargs):
-        html_string = render_to_string(self.get_template_names(), context)
-        html = HTML(string=html_string)
-        pdf = html.write_pdf()
-        response = HttpResponse(pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{self.object.request_type}_{self.object.pk}.pdf"'
-        return response
+        pdf = render_template_to_pdf(self.get_template_names()[0], context)
+        return pdf_response(pdf, f"{self.object.request_type}_{self.object.pk}.pdf")
 
 class ApprovalRequestListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
     model = PermissionRequest